@@ -0,0 +1,346 @@
+"""
+Cache für Vertragsdetails (Metadaten + dekodierte Analyse)
+- Tier 1: In-Process-LRU mit Byte-Budget
+- Tier 2 (optional): gemeinsamer SQLite-Cache für alle Worker eines Hosts
+- Invalidierung bei Re-Analyse, Re-Scoring und Löschen; andere Worker
+  übernehmen Invalidierungen über ein Sequenz-Log im Shared-Tier
+- ETag je Analyse-Stand für If-None-Match / 304
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Dict, List, Optional
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = contracts_db_path()
+
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Im Multi-Worker-Betrieb (DEPLOYMENT_MODE=multi) standardmäßig aktiv
+ANALYSIS_CACHE_SHARED = os.getenv(
+    "ANALYSIS_CACHE_SHARED", "true" if os.getenv("DEPLOYMENT_MODE", "single").lower() == "multi" else "false"
+).lower() == "true"
+ANALYSIS_CACHE_DB = os.getenv(
+    "ANALYSIS_CACHE_DB", os.path.join(os.path.dirname(DB_PATH), "analysis_cache.db")
+)
+# Wie oft ein Worker das Invalidierungs-Log der anderen Worker abfragt (Sekunden)
+INVALIDATION_POLL_INTERVAL = float(os.getenv("ANALYSIS_CACHE_POLL_INTERVAL", "1.0"))
+
+META_COLUMNS = ("contract_id", "filename", "contract_type", "created_at", "status", "risk_level", "risk_score")
+
+CachedContract = namedtuple("CachedContract", ["meta", "analysis", "etag", "size"])
+
+
+def _etag(meta: Dict, analysis_json: Optional[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps(meta, sort_keys=True, default=str).encode("utf-8"))
+    digest.update((analysis_json or "").encode("utf-8"))
+    return f'"{meta["contract_id"][:12]}-{digest.hexdigest()[:20]}"'
+
+
+def _build_entry(meta: Dict, analysis_json: Optional[str]) -> CachedContract:
+    analysis = json.loads(analysis_json) if analysis_json else None
+    size = len(analysis_json or "") + 256
+    return CachedContract(meta, analysis, _etag(meta, analysis_json), size)
+
+
+# ============================================================================
+# TIER 1: IN-PROCESS LRU
+# ============================================================================
+
+class _LRUCache:
+    """LRU mit Byte-Budget statt Eintragsanzahl."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, CachedContract]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedContract]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedContract):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.size
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+
+    def pop(self, key: str):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ============================================================================
+# TIER 2: SHARED SQLITE
+# ============================================================================
+
+class _SharedTier:
+    """Gemeinsamer Cache aller Worker eines Hosts (WAL, kurze Verbindungen)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.last_seq = 0
+        self._next_poll = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    contract_id TEXT PRIMARY KEY,
+                    etag TEXT NOT NULL,
+                    meta_json TEXT NOT NULL,
+                    analysis_json TEXT,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache_invalidations (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    contract_id TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+            self.last_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM analysis_cache_invalidations"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def get(self, contract_id: str) -> Optional[CachedContract]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT etag, meta_json, analysis_json FROM analysis_cache WHERE contract_id = ?",
+                (contract_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        etag, meta_json, analysis_json = row
+        analysis = json.loads(analysis_json) if analysis_json else None
+        return CachedContract(json.loads(meta_json), analysis, etag, len(analysis_json or "") + 256)
+
+    def put(self, entry: CachedContract, analysis_json: Optional[str], read_at: float):
+        """Nur speichern, wenn seit read_at (Beginn des DB-Lesens) niemand invalidiert hat."""
+        contract_id = entry.meta["contract_id"]
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (contract_id, etag, meta_json, analysis_json, stored_at) "
+                "SELECT ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM analysis_cache_invalidations "
+                "WHERE created_at >= ? AND contract_id IN (?, '*'))",
+                (contract_id, entry.etag, json.dumps(entry.meta, default=str), analysis_json, time.time(),
+                 read_at, contract_id)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def invalidate(self, contract_ids: List[Optional[str]]):
+        """None in der Liste invalidiert alles."""
+        conn = self._connect()
+        try:
+            if None in contract_ids:
+                conn.execute("DELETE FROM analysis_cache")
+                contract_ids = [None]
+            else:
+                conn.executemany("DELETE FROM analysis_cache WHERE contract_id = ?", [(c,) for c in contract_ids])
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO analysis_cache_invalidations (contract_id, created_at) VALUES (?, ?)",
+                [(c or "*", now) for c in contract_ids]
+            )
+            # Log kurz halten: eine Stunde reicht für alle Worker
+            conn.execute("DELETE FROM analysis_cache_invalidations WHERE created_at < ?", (time.time() - 3600,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def poll_invalidations(self) -> list:
+        """Invalidierungen anderer Worker seit dem letzten Poll (gedrosselt)."""
+        now = time.monotonic()
+        if now < self._next_poll:
+            return []
+        self._next_poll = now + INVALIDATION_POLL_INTERVAL
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT seq, contract_id FROM analysis_cache_invalidations WHERE seq > ? ORDER BY seq",
+                (self.last_seq,)
+            ).fetchall()
+        finally:
+            conn.close()
+        if rows:
+            self.last_seq = rows[-1][0]
+        return [r[1] for r in rows]
+
+
+# ============================================================================
+# ÖFFENTLICHE API
+# ============================================================================
+
+_lru = _LRUCache(ANALYSIS_CACHE_MAX_BYTES)
+_shared: Optional[_SharedTier] = None
+_stats = {"hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+# Wird bei jeder Invalidierung erhöht; Leser, die währenddessen aus der DB
+# geladen haben, legen ihr (evtl. veraltetes) Ergebnis nicht mehr ab
+_generation = 0
+_generation_lock = threading.Lock()
+
+if ANALYSIS_CACHE_SHARED:
+    try:
+        _shared = _SharedTier(ANALYSIS_CACHE_DB)
+    except Exception as e:
+        logger.warning(f"Shared analysis cache disabled: {e}")
+
+
+def _apply_remote_invalidations():
+    global _generation
+    if _shared is None:
+        return
+    for contract_id in _shared.poll_invalidations():
+        with _generation_lock:
+            _generation += 1
+            if contract_id == "*":
+                _lru.clear()
+            else:
+                _lru.pop(contract_id)
+
+
+def _load_from_db(contract_id: str):
+    conn = sqlite3.connect(DB_PATH, timeout=30.0)
+    try:
+        return conn.execute(
+            f"SELECT {', '.join('c.' + col for col in META_COLUMNS)}, ar.analysis_json "
+            "FROM contracts c LEFT JOIN analysis_results ar ON ar.contract_id = c.contract_id "
+            "WHERE c.contract_id = ?",
+            (contract_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def get_contract_view(contract_id: str) -> Optional[CachedContract]:
+    """Metadaten + dekodierte Analyse eines Vertrags (LRU -> Shared -> DB)."""
+    _apply_remote_invalidations()
+
+    from .metrics import record_cache
+
+    entry = _lru.get(contract_id)
+    record_cache("analysis", entry is not None)
+    if entry is not None:
+        _stats["hits"] += 1
+        return entry
+
+    if _shared is not None:
+        try:
+            entry = _shared.get(contract_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared analysis cache read failed: {e}")
+            entry = None
+        record_cache("analysis_shared", entry is not None)
+        if entry is not None:
+            _stats["shared_hits"] += 1
+            _lru.put(contract_id, entry)
+            return entry
+
+    _stats["misses"] += 1
+    generation, read_at = _generation, time.time()
+    row = _load_from_db(contract_id)
+    if not row:
+        return None
+
+    meta = dict(zip(META_COLUMNS, row[:len(META_COLUMNS)]))
+    analysis_json = row[len(META_COLUMNS)]
+    entry = _build_entry(meta, analysis_json)
+    with _generation_lock:
+        if _generation != generation:
+            # Parallel invalidiert: Ergebnis ausliefern, aber nicht cachen
+            return entry
+        _lru.put(contract_id, entry)
+    if _shared is not None:
+        try:
+            _shared.put(entry, analysis_json, read_at)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared analysis cache write failed: {e}")
+    return entry
+
+
+def invalidate_contract(contract_id: Optional[str] = None):
+    """Verwirft den Cache eines Vertrags (None = alle) in allen Tiers."""
+    invalidate_contracts([contract_id])
+
+
+def invalidate_contracts(contract_ids: List[Optional[str]]):
+    """Wie invalidate_contract, für viele Verträge mit einem Schreibzugriff im Shared-Tier."""
+    global _generation
+    if not contract_ids:
+        return
+    _stats["invalidations"] += len(contract_ids)
+    with _generation_lock:
+        _generation += 1
+        if None in contract_ids:
+            _lru.clear()
+        else:
+            for contract_id in contract_ids:
+                _lru.pop(contract_id)
+    if _shared is not None:
+        try:
+            _shared.invalidate(list(contract_ids))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared analysis cache invalidation failed: {e}")
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Prüft If-None-Match (inkl. Listen und *)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def get_cache_stats() -> Dict:
+    return {
+        **_stats,
+        "entries": len(_lru),
+        "bytes": _lru.bytes,
+        "max_bytes": _lru.max_bytes,
+        "shared": _shared is not None,
+    }
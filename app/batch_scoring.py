@@ -0,0 +1,350 @@
+"""
+Vektorisiertes Batch-Scoring für das gesamte Portfolio
+- Promotete Felder aus extracted_data liegen typisiert in contract_fields
+- Jede Regel ist ein NumPy-Prädikat über alle Verträge gleichzeitig
+- Schwellwerte kommen aus ENTERPRISE_SAAS_STANDARDS bzw. den Engine-Grenzen
+- risk_level/risk_score werden gebündelt zurückgeschrieben
+"""
+
+import json
+import time
+import sqlite3
+import logging
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = contracts_db_path()
+
+# Spalte -> (Quellfelder in extracted_data, Typ)
+PROMOTED_FIELDS = {
+    "auto_renew": (["auto_renew"], "bool"),
+    "renewal_notice_days": (["renewal_notice_days"], "num"),
+    "termination_notice_days": (["termination_notice_days"], "num"),
+    "uptime_sla_percent": (["uptime_sla_percent"], "num"),
+    "service_credits": (["service_credits"], "bool"),
+    "liability_cap_multiple_acv": (["liability_cap_multiple_acv", "liability_cap_multiple"], "num"),
+    "data_outside_eu": (["data_location"], "location"),
+    "dp_addendum_included": (["dp_addendum_included"], "bool"),
+    "data_export_clause": (["data_export_clause"], "bool"),
+    "price_escalation": (["price_escalation_clause", "price_adjustment_clause", "rent_escalation_clause"], "bool"),
+    "price_escalation_cap_percent": (["price_escalation_cap", "escalation_percent_per_year"], "num"),
+    "probation_period_months": (["probation_period_months"], "num"),
+    "vacation_days_per_year": (["vacation_days_per_year"], "num"),
+    "overtime_included": (["overtime_included"], "bool"),
+    "overtime_cap_hours": (["overtime_cap_hours"], "num"),
+    "post_contract_non_compete": (["post_contract_non_compete"], "bool"),
+    "non_compete_compensation": (["non_compete_compensation"], "bool"),
+    "warranty_months": (["warranty_months"], "num"),
+    "payment_terms_days": (["payment_terms_days"], "num"),
+    "audit_rights": (["audit_rights"], "bool"),
+    "penalty_amount_eur": (["penalty_amount_eur", "penalty_amount"], "num"),
+    "duration_indefinite": (["duration_indefinite"], "bool"),
+}
+FIELD_COLUMNS = list(PROMOTED_FIELDS)
+
+EU_LOCATIONS = ("EU", "EWR", "EEA", "EUROP", "DEUTSCHLAND", "GERMANY")
+
+# Engine-Grenzen aus risk_engine.py (nicht in der SaaS-Konfiguration abgebildet)
+MAX_PROBATION_MONTHS = 6
+MIN_VACATION_DAYS = 20
+MIN_WARRANTY_MONTHS = 12
+MIN_PAYMENT_DAYS = 14
+MAX_NDA_PENALTY_EUR = 100000
+MIN_RENEWAL_NOTICE_DAYS = 30
+
+SEVERITY_WEIGHTS = {"critical": 25, "high": 15, "medium": 8}
+
+BatchRule = namedtuple("BatchRule", ["rule_id", "contract_types", "severity", "predicate"])
+
+
+def get_db():
+    conn = sqlite3.connect(DB_PATH, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_field_tables(conn=None):
+    """Erstellt die Tabelle der promoteten Felder"""
+    own_conn = conn is None
+    conn = conn or get_db()
+    columns = ",\n            ".join(f"{col} REAL" for col in FIELD_COLUMNS)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS contract_fields (
+            contract_id TEXT PRIMARY KEY,
+            contract_type TEXT NOT NULL,
+            {columns},
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contract_fields_type ON contract_fields(contract_type)")
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+# ============================================================================
+# FELD-PROMOTION
+# ============================================================================
+
+def _promote_value(value, kind: str) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if kind == "bool":
+        if isinstance(value, str):
+            return 0.0 if value.strip().lower() in ("false", "nein", "no", "0") else 1.0
+        return 1.0 if value else 0.0
+    if kind == "location":
+        location = str(value).upper()
+        return 0.0 if any(eu in location for eu in EU_LOCATIONS) else 1.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def promote_fields(extracted: Dict) -> List[Optional[float]]:
+    """Wandelt extracted_data in die typisierten contract_fields-Spalten um."""
+    row = []
+    for column, (sources, kind) in PROMOTED_FIELDS.items():
+        value = next((extracted[k] for k in sources if extracted.get(k) not in (None, "")), None)
+        row.append(_promote_value(value, kind))
+    return row
+
+
+def upsert_contract_fields(conn, contract_id: str, contract_type: str, extracted: Dict):
+    """Schreibt die promoteten Felder eines Vertrags (im Transaktionskontext des Aufrufers)."""
+    placeholders = ", ".join("?" for _ in range(len(FIELD_COLUMNS) + 2))
+    conn.execute(
+        f"INSERT OR REPLACE INTO contract_fields (contract_id, contract_type, {', '.join(FIELD_COLUMNS)}) VALUES ({placeholders})",
+        [contract_id, contract_type] + promote_fields(extracted or {})
+    )
+
+
+def backfill_contract_fields(batch_size: int = 1000) -> int:
+    """Promotet die Felder aller bestehenden Analysen."""
+    conn = get_db()
+    init_field_tables(conn)
+    cursor = conn.execute("""
+        SELECT c.contract_id, c.contract_type, ar.analysis_json
+        FROM contracts c JOIN analysis_results ar ON ar.contract_id = c.contract_id
+    """)
+    placeholders = ", ".join("?" for _ in range(len(FIELD_COLUMNS) + 2))
+    sql = f"INSERT OR REPLACE INTO contract_fields (contract_id, contract_type, {', '.join(FIELD_COLUMNS)}) VALUES ({placeholders})"
+    total = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            try:
+                extracted = json.loads(row["analysis_json"]).get("extracted_data") or {}
+            except (TypeError, ValueError):
+                extracted = {}
+            params.append([row["contract_id"], row["contract_type"]] + promote_fields(extracted))
+        conn.executemany(sql, params)
+        total += len(params)
+    conn.commit()
+    conn.close()
+    logger.info(f"contract_fields backfilled: {total} rows")
+    return total
+
+
+# ============================================================================
+# REGELN
+# ============================================================================
+
+def _is_true(col):
+    return col == 1
+
+
+def _not_true(col):
+    return ~(col == 1)
+
+
+def build_rules(standards: Dict = None) -> List[BatchRule]:
+    """Vektorisierte Regeln; Schwellwerte werden bei jedem Lauf aus der Konfiguration gelesen."""
+    if standards is None:
+        from enterprise_saas_config import ENTERPRISE_SAAS_STANDARDS
+        standards = ENTERPRISE_SAAS_STANDARDS
+
+    uptime_target = standards["sla_requirements"]["uptime"]["target"] * 100
+    uptime_minimum = standards["sla_requirements"]["uptime"]["minimum"] * 100
+    cap_multiple = standards["liability_and_indemnification"]["cap"]["multiple_of_acv"]
+    max_notice_days = standards["vendor_lock_in_prevention"]["termination_rights"]["notice_period_days"]
+    max_increase_percent = standards["financial_terms"]["price_protection"]["cpi_adjustment_max"] * 100
+    dpa_required = standards["data_protection"]["dp_addendum"]["required"]
+
+    saas = ("saas",)
+    return [
+        # SaaS (ENTERPRISE_SAAS_STANDARDS)
+        BatchRule("saas_dpa_missing", saas, "critical",
+                  lambda c: _not_true(c["dp_addendum_included"]) if dpa_required else np.zeros(len(c["dp_addendum_included"]), bool)),
+        BatchRule("saas_auto_renewal_short_notice", saas, "critical",
+                  lambda c: _is_true(c["auto_renew"]) & (c["renewal_notice_days"] < MIN_RENEWAL_NOTICE_DAYS)),
+        BatchRule("saas_auto_renewal_no_notice", saas, "high",
+                  lambda c: _is_true(c["auto_renew"]) & np.isnan(c["renewal_notice_days"])),
+        BatchRule("saas_data_outside_eu", saas, "high", lambda c: _is_true(c["data_outside_eu"])),
+        BatchRule("saas_no_data_export", saas, "high", lambda c: _not_true(c["data_export_clause"])),
+        BatchRule("saas_liability_cap_above_acv", saas, "high",
+                  lambda c: c["liability_cap_multiple_acv"] > cap_multiple),
+        BatchRule("saas_uptime_below_minimum", saas, "high", lambda c: c["uptime_sla_percent"] < uptime_minimum),
+        BatchRule("saas_uptime_below_target_without_credits", saas, "medium",
+                  lambda c: (c["uptime_sla_percent"] < uptime_target) & _not_true(c["service_credits"])),
+        BatchRule("saas_notice_period_too_long", saas, "medium",
+                  lambda c: c["termination_notice_days"] > max_notice_days),
+        BatchRule("price_escalation_uncapped", ("saas", "vendor", "rental"), "medium",
+                  lambda c: _is_true(c["price_escalation"]) & np.isnan(c["price_escalation_cap_percent"])),
+        BatchRule("price_escalation_above_cpi_cap", ("saas", "vendor", "rental"), "medium",
+                  lambda c: c["price_escalation_cap_percent"] > max_increase_percent),
+        # Arbeitsverträge (RiskScoringEngine)
+        BatchRule("employment_probation_too_long", ("employment",), "critical",
+                  lambda c: c["probation_period_months"] > MAX_PROBATION_MONTHS),
+        BatchRule("employment_vacation_below_minimum", ("employment",), "critical",
+                  lambda c: c["vacation_days_per_year"] < MIN_VACATION_DAYS),
+        BatchRule("employment_overtime_uncapped", ("employment",), "critical",
+                  lambda c: _is_true(c["overtime_included"]) & np.isnan(c["overtime_cap_hours"])),
+        BatchRule("employment_non_compete_without_compensation", ("employment",), "critical",
+                  lambda c: _is_true(c["post_contract_non_compete"]) & _not_true(c["non_compete_compensation"])),
+        # Lieferanten (VendorRiskScoringEngine)
+        BatchRule("vendor_warranty_short_or_missing", ("vendor",), "critical",
+                  lambda c: np.isnan(c["warranty_months"]) | (c["warranty_months"] < MIN_WARRANTY_MONTHS)),
+        BatchRule("vendor_no_audit_rights", ("vendor",), "high", lambda c: _not_true(c["audit_rights"])),
+        BatchRule("vendor_short_payment_terms", ("vendor",), "medium",
+                  lambda c: c["payment_terms_days"] < MIN_PAYMENT_DAYS),
+        # NDAs (NDARiskScoringEngine)
+        BatchRule("nda_indefinite", ("nda",), "critical", lambda c: _is_true(c["duration_indefinite"])),
+        BatchRule("nda_high_penalty", ("nda",), "medium", lambda c: c["penalty_amount_eur"] > MAX_NDA_PENALTY_EUR),
+    ]
+
+
+def score_to_level(scores: np.ndarray) -> np.ndarray:
+    """Vektorisierte Variante von _score_to_level() der Risk Engines (minimal wird wie im Analyse-Ergebnis als low gespeichert)."""
+    return np.select(
+        [scores >= 70, scores >= 55, scores >= 40],
+        ["critical", "high", "medium"],
+        default="low",
+    )
+
+
+def score_risk_flags(risk_flags: List[Dict]) -> tuple:
+    """(Score, Level) einer Liste von Risiko-Flags nach der Formel der Risk Engines."""
+    weighted = sum(SEVERITY_WEIGHTS.get((flag.get("severity") or "").lower(), 0) for flag in risk_flags)
+    score = min(weighted, 100)
+    return score, str(score_to_level(np.array([score]))[0])
+
+
+# ============================================================================
+# BATCH-SCORING
+# ============================================================================
+
+def score_columns(contract_types: np.ndarray, columns: Dict[str, np.ndarray], rules: List[BatchRule]) -> Dict:
+    """Wertet alle Regeln über die Spalten-Arrays aus und liefert Scores, Levels und Trefferzahlen."""
+    n = len(contract_types)
+    weighted = np.zeros(n, dtype=np.int64)
+    rule_hits = {}
+    with np.errstate(invalid="ignore"):
+        for rule in rules:
+            applies = np.isin(contract_types, rule.contract_types)
+            hits = applies & rule.predicate(columns)
+            rule_hits[rule.rule_id] = int(hits.sum())
+            weighted += hits * SEVERITY_WEIGHTS.get(rule.severity, 0)
+    scores = np.minimum(weighted, 100)
+    return {"scores": scores, "levels": score_to_level(scores), "rule_hits": rule_hits}
+
+
+def rescore_portfolio(dry_run: bool = False, standards: Dict = None) -> Dict:
+    """
+    Bewertet alle Verträge mit promoteten Feldern neu und schreibt Änderungen
+    gebündelt zurück (contracts und risk_assessment im Analyse-JSON); Caches
+    werden nur für geänderte Verträge verworfen.
+    """
+    started = time.perf_counter()
+    rules = build_rules(standards)
+    rule_types = sorted({t for rule in rules for t in rule.contract_types})
+
+    conn = get_db()
+    init_field_tables(conn)
+    placeholders = ", ".join("?" for _ in rule_types)
+    rows = conn.execute(f"""
+        SELECT f.contract_id, f.contract_type, c.risk_level, c.risk_score, {', '.join('f.' + col for col in FIELD_COLUMNS)}
+        FROM contract_fields f JOIN contracts c ON c.contract_id = f.contract_id
+        WHERE f.contract_type IN ({placeholders})
+    """, rule_types).fetchall()
+    loaded = time.perf_counter()
+
+    if not rows:
+        conn.close()
+        return {"contracts": 0, "changed": 0, "rule_hits": {}, "duration_ms": 0}
+
+    # Verträge ohne jegliche promotete Felder behalten ihre bisherige Bewertung
+    matrix = np.array([r[4:] for r in rows], dtype=np.float64)
+    keep = ~np.all(np.isnan(matrix), axis=1)
+    matrix = matrix[keep]
+    rows = [r for r, k in zip(rows, keep) if k]
+
+    contract_ids = [r[0] for r in rows]
+    contract_types = np.array([r[1] for r in rows], dtype=object)
+    columns = {col: matrix[:, i] for i, col in enumerate(FIELD_COLUMNS)}
+
+    result = score_columns(contract_types, columns, rules)
+    scores, levels = result["scores"], result["levels"]
+    scored = time.perf_counter()
+
+    old_scores = np.array([r[3] if r[3] is not None else -1 for r in rows])
+    old_levels = np.array([r[2] or "" for r in rows])
+    changed = np.flatnonzero((old_scores != scores) | (old_levels != levels))
+
+    if not dry_run and len(changed):
+        updates = [(str(levels[i]), int(scores[i]), contract_ids[i]) for i in changed]
+        conn.executemany("UPDATE contracts SET risk_level = ?, risk_score = ? WHERE contract_id = ?", updates)
+        # Analyse-JSON mitziehen, sonst zeigen Detailansicht und Report den alten Score
+        conn.executemany("""
+            UPDATE analysis_results SET analysis_json = json_set(analysis_json,
+                '$.risk_assessment.overall_risk_level', ?, '$.risk_assessment.overall_risk_score', ?)
+            WHERE contract_id = ? AND json_type(analysis_json, '$.risk_assessment') = 'object'
+        """, updates)
+        conn.commit()
+    conn.close()
+
+    if not dry_run and len(changed):
+        from .analysis_cache import invalidate_contracts
+        from .report_cache import invalidate_reports_many
+        changed_ids = [contract_ids[i] for i in changed]
+        invalidate_contracts(changed_ids)
+        invalidate_reports_many(changed_ids)
+    finished = time.perf_counter()
+
+    stats = {
+        "contracts": len(rows),
+        "changed": int(len(changed)),
+        "dry_run": dry_run,
+        "rule_hits": result["rule_hits"],
+        "level_distribution": {str(level): int(count) for level, count in zip(*np.unique(levels, return_counts=True))},
+        "load_ms": round((loaded - started) * 1000, 1),
+        "score_ms": round((scored - loaded) * 1000, 1),
+        "write_ms": round((finished - scored) * 1000, 1),
+        "duration_ms": round((finished - started) * 1000, 1),
+    }
+    logger.info(f"Portfolio rescored: {stats['contracts']} contracts, {stats['changed']} changed in {stats['duration_ms']}ms")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Portfolio-weites Re-Scoring")
+    parser.add_argument("--backfill", action="store_true", help="contract_fields aus analysis_results neu aufbauen")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.backfill:
+        backfill_contract_fields()
+    print(json.dumps(rescore_portfolio(dry_run=args.dry_run), indent=2))
@@ -0,0 +1,222 @@
+"""
+Klausel-Erklärungen mit Cache
+- Schlüssel: normalisierter Klausel-Hash + Vertragstyp + Prompt-Version;
+  Standardklauseln werden so nur einmal pro Vertragstyp erklärt
+- Fehlende Erklärungen gebündelt: bis EXPLAIN_BATCH_SIZE Klauseln pro
+  LLM-Anfrage, Antwort als JSON-Array; Batches laufen parallel über den
+  gemeinsamen AsyncOpenAI-Client
+- Fallback-Antworten bei Fehlern werden nicht gecacht
+"""
+
+import os
+import json
+import asyncio
+import sqlite3
+import logging
+from typing import Dict, List
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen an Prompt oder Antwortformat erhöhen – alte Einträge werden ignoriert
+EXPLAIN_PROMPT_VERSION = 1
+
+EXPLAIN_MODEL = os.getenv("EXPLAIN_MODEL", "gpt-4o-mini")
+EXPLAIN_BATCH_SIZE = int(os.getenv("EXPLAIN_BATCH_SIZE", "8"))
+EXPLAIN_MAX_CLAUSES = int(os.getenv("EXPLAIN_MAX_CLAUSES", "60"))
+EXPLAIN_MAX_CLAUSE_CHARS = 4000
+
+TYPE_NAMES = {
+    "employment": "Arbeitsvertrag",
+    "saas": "SaaS-Vertrag",
+    "vendor": "Lieferantenvertrag",
+    "nda": "Geheimhaltungsvereinbarung",
+    "service": "Dienstleistungsvertrag",
+    "rental": "Mietvertrag",
+    "purchase": "Kaufvertrag",
+    "general": "Vertrag"
+}
+
+SYSTEM_PROMPT = "Du bist ein erfahrener deutscher Rechtsanwalt. Antworte nur mit validem JSON, keine Markdown-Backticks."
+
+ITEM_SCHEMA = (
+    '{"index": <Nummer der Klausel>, "risk_level": "low oder medium oder high oder critical", '
+    '"explanation": "Was bedeutet diese Klausel konkret für den Vertragspartner? (2-3 Saetze, verstaendlich)", '
+    '"legal_assessment": "Rechtliche Einschaetzung nach deutschem Recht - ist die Klausel wirksam? Gibt es Risiken? (2-3 Saetze)", '
+    '"related_laws": ["Liste der relevanten Paragraphen, z.B. BGB 307, ArbZG 3"], '
+    '"recommendations": ["Konkrete Handlungsempfehlung 1", "Konkrete Handlungsempfehlung 2"]}'
+)
+
+RESULT_FIELDS = ("risk_level", "explanation", "legal_assessment", "related_laws", "recommendations")
+
+
+def init_explanation_tables(conn=None):
+    """Cache der Klausel-Erklärungen"""
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS clause_explanations (
+            clause_hash TEXT NOT NULL,
+            contract_type TEXT NOT NULL,
+            prompt_version INTEGER NOT NULL,
+            result_json TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (clause_hash, contract_type, prompt_version)
+        )
+    """)
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def fallback_explanation(clause_text: str, reason: str) -> Dict:
+    return {
+        "clause_text": clause_text,
+        "risk_level": "medium",
+        "explanation": reason,
+        "legal_assessment": "Bitte lassen Sie diese Klausel von einem Rechtsanwalt pruefen.",
+        "related_laws": ["BGB"],
+        "recommendations": ["Rechtliche Beratung einholen"],
+        "cached": False,
+    }
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def _lookup(hashes: List[str], contract_type: str) -> Dict[str, Dict]:
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        placeholders = ",".join("?" * len(hashes))
+        rows = conn.execute(
+            f"SELECT clause_hash, result_json FROM clause_explanations WHERE contract_type = ? AND prompt_version = ? "
+            f"AND clause_hash IN ({placeholders})", (contract_type, EXPLAIN_PROMPT_VERSION, *hashes)
+        ).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE clause_explanations SET hits = hits + 1 WHERE clause_hash = ? AND contract_type = ? AND prompt_version = ?",
+                [(r[0], contract_type, EXPLAIN_PROMPT_VERSION) for r in rows]
+            )
+            conn.commit()
+    finally:
+        conn.close()
+    return {r[0]: json.loads(r[1]) for r in rows}
+
+
+def _store(results: Dict[str, Dict], contract_type: str):
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO clause_explanations (clause_hash, contract_type, prompt_version, result_json) VALUES (?, ?, ?, ?)",
+            [(h, contract_type, EXPLAIN_PROMPT_VERSION, json.dumps(r, ensure_ascii=False)) for h, r in results.items()]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ============================================================================
+# LLM
+# ============================================================================
+
+def build_prompt(clause_texts: List[str], contract_type: str) -> str:
+    type_name = TYPE_NAMES.get(contract_type, "Vertrag")
+    clauses = "\n\n".join(f'KLAUSEL {i}:\n"{text[:EXPLAIN_MAX_CLAUSE_CHARS]}"' for i, text in enumerate(clause_texts))
+    return f"""Analysiere jede der folgenden Vertragsklauseln aus einem {type_name} nach deutschem Recht.
+
+{clauses}
+
+Antworte NUR mit validem JSON ohne Markdown-Formatierung, ein Eintrag pro Klausel in derselben Reihenfolge:
+{{"explanations": [{ITEM_SCHEMA}]}}"""
+
+
+def _parse_batch(result_text: str, count: int) -> List[Dict]:
+    """Einträge der Antwort nach Index; fehlende Einträge bleiben None."""
+    from .llm_client import _parse_llm_response
+
+    data = _parse_llm_response(result_text)
+    items = data.get("explanations", []) if isinstance(data, dict) else data
+    results: List = [None] * count
+    for position, item in enumerate(items if isinstance(items, list) else []):
+        if not isinstance(item, dict) or not item.get("explanation"):
+            continue
+        index = item.get("index", position)
+        if isinstance(index, int) and 0 <= index < count and results[index] is None:
+            results[index] = {field: item.get(field) for field in RESULT_FIELDS}
+    return results
+
+
+async def _explain_batch(clause_texts: List[str], contract_type: str) -> List:
+    from .llm_client import get_async_client
+    from .metrics import stage_timer, record_llm_usage
+
+    usage = None
+    try:
+        with stage_timer("llm_call", model=EXPLAIN_MODEL, purpose="clause_explain"):
+            response = await get_async_client().chat.completions.create(
+                model=EXPLAIN_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": build_prompt(clause_texts, contract_type)}
+                ],
+                temperature=0.3,
+                response_format={"type": "json_object"},
+            )
+        usage = getattr(response, "usage", None)
+        results = _parse_batch(response.choices[0].message.content.strip(), len(clause_texts))
+        record_llm_usage(EXPLAIN_MODEL, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+        return results
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON parse error in clause explain: {e}")
+        record_llm_usage(
+            EXPLAIN_MODEL, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None), status="invalid_json"
+        )
+        return [None] * len(clause_texts)
+    except Exception as e:
+        logger.error(f"Clause explain error: {e}")
+        record_llm_usage(EXPLAIN_MODEL, None, None, status="error")
+        return [None] * len(clause_texts)
+
+
+async def explain_clauses(clause_texts: List[str], contract_type: str = "general") -> List[Dict]:
+    """
+    Erklärungen in Eingabereihenfolge, jeweils mit clause_text und cached.
+
+    Gleiche Klauseln (nach Normalisierung) werden nur einmal angefragt.
+    """
+    from starlette.concurrency import run_in_threadpool
+    from .clause_index import text_hash
+    from .metrics import record_cache
+
+    contract_type = contract_type if contract_type in TYPE_NAMES else "general"
+    hashes = [text_hash(t) for t in clause_texts]
+    cached = await run_in_threadpool(_lookup, list(set(hashes)), contract_type)
+    for h in hashes:
+        record_cache("clause_explain", h in cached)
+
+    missing: Dict[str, str] = {}
+    for h, text in zip(hashes, clause_texts):
+        if h not in cached and h not in missing:
+            missing[h] = text
+    fresh: Dict[str, Dict] = {}
+    if missing:
+        keys = list(missing)
+        batches = [keys[i:i + EXPLAIN_BATCH_SIZE] for i in range(0, len(keys), EXPLAIN_BATCH_SIZE)]
+        answers = await asyncio.gather(*(_explain_batch([missing[k] for k in batch], contract_type) for batch in batches))
+        for batch, results in zip(batches, answers):
+            fresh.update({k: r for k, r in zip(batch, results) if r is not None})
+        if fresh:
+            await run_in_threadpool(_store, fresh, contract_type)
+
+    explanations = []
+    for h, text in zip(hashes, clause_texts):
+        if h in cached:
+            explanations.append({**cached[h], "clause_text": text, "cached": True})
+        elif h in fresh:
+            explanations.append({**fresh[h], "clause_text": text, "cached": False})
+        else:
+            explanations.append(fallback_explanation(text, "Die automatische Analyse ist fehlgeschlagen."))
+    return explanations
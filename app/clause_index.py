@@ -0,0 +1,242 @@
+"""
+Klausel-Index pro Vertragsdatei
+- Segmentierung an §-/Artikel-/Ziffern-Überschriften; bei PDFs zusätzlich
+  Layout-Signale aus PyMuPDF-Spans (fett, größere Schrift, vom Extraktor)
+- Pro Klausel: ID, Nummer, Überschrift, Seite, Zeichen-Offsets im
+  extrahierten Text (Text-Store) und normalisierter Text-Hash
+- Persistiert pro Datei-Hash in contract_clauses (Duplikate teilen den Index)
+"""
+
+import re
+import sqlite3
+import hashlib
+from collections import namedtuple
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+from .database import contracts_db_path
+
+# Bei Änderungen an der Segmentierung erhöhen – Index wird neu aufgebaut
+SEGMENTER_VERSION = 1
+
+MAX_HEADING_CHARS = 100
+
+Clause = namedtuple("Clause", ["clause_id", "ordinal", "number", "heading", "page", "start", "end", "text_hash"])
+
+NUMBERED_HEADING_RE = re.compile(
+    r"^(?P<number>§\s*\d+[a-z]?|Art(?:ikel|\.)\s*\d+[a-z]?|\d{1,2}(?:\.\d{1,2})*\.?|[IVX]{1,5}\.)\s*(?P<title>.*)$"
+)
+PARAGRAPH_MARK_RE = re.compile(r"^\(\d+\)|^[a-z]\)")
+WORD_RE = re.compile(r"\w+")
+
+
+def init_clause_tables(conn=None):
+    """Klausel-Index pro Datei-Hash"""
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contract_clauses (
+            file_sha256 TEXT NOT NULL,
+            clause_id TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            number TEXT,
+            heading TEXT NOT NULL,
+            page INTEGER,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            text_hash TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (file_sha256, clause_id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contract_clauses_hash ON contract_clauses(text_hash)")
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def normalise(text: str) -> str:
+    """Kleinschreibung, nur Wortzeichen, einfache Leerzeichen."""
+    return " ".join(WORD_RE.findall(text.lower()))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(normalise(text).encode("utf-8")).hexdigest()[:16]
+
+
+# ============================================================================
+# SEGMENTIERUNG
+# ============================================================================
+
+def _heading_of(line: str, layout_headings: Set[str]) -> Optional[tuple]:
+    """(Nummer, Titel) falls die Zeile eine Überschrift ist, sonst None."""
+    if not line or len(line) > MAX_HEADING_CHARS or PARAGRAPH_MARK_RE.match(line):
+        return None
+    match = NUMBERED_HEADING_RE.match(line)
+    if match:
+        number, title = match.group("number").strip(), match.group("title").strip()
+        # "1. Die Parteien vereinbaren, dass ..." ist ein Listenpunkt, keine Überschrift
+        if number.startswith("§") or number.lower().startswith("art") or (title[:1].isupper() and not title.endswith((".", ",", ";"))):
+            return number, title
+    if line in layout_headings:
+        return None, line
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 4 and all(c.isupper() for c in letters) and len(line) <= 60:
+        return None, line
+    return None
+
+
+def segment(text: str, layout_headings: Set[str] = frozenset(), page_starts: Sequence[int] = ()) -> List[Clause]:
+    """
+    Teilt den Text in Klauseln; Offsets beziehen sich auf text.
+
+    Alles vor der ersten Überschrift wird zur Klausel "Präambel". Folgen
+    zwei Überschriften direkt aufeinander ("§ 9" / "Verschwiegenheit"),
+    werden sie zusammengefasst.
+    """
+    raw = []  # [number, heading, start, has_body]
+    offset = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+        heading = _heading_of(stripped, layout_headings)
+        if heading:
+            number, title = heading
+            if raw and not raw[-1][3]:
+                raw[-1][0] = raw[-1][0] or number
+                raw[-1][1] = f"{raw[-1][1]} {title}".strip()
+            else:
+                raw.append([number, title, offset, False])
+        elif stripped:
+            if not raw:
+                raw.append([None, "Präambel", offset, False])
+            raw[-1][3] = True
+        offset += len(line) + 1
+
+    clauses = []
+    for ordinal, (number, heading, start, _) in enumerate(raw):
+        end = raw[ordinal + 1][2] if ordinal + 1 < len(raw) else len(text)
+        body = text[start:end].strip()
+        if number and body.startswith(number):
+            body = body[len(number):]
+        page = None
+        if page_starts:
+            page = sum(1 for p in page_starts if p <= start)
+        clauses.append(Clause(
+            clause_id=f"c{ordinal:03d}",
+            ordinal=ordinal,
+            number=number,
+            heading=(heading or number or "")[:MAX_HEADING_CHARS],
+            page=page,
+            start=start,
+            end=end,
+            text_hash=text_hash(body),
+        ))
+    return clauses
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+def build_clause_index(contract_id: str, path: Path, sections=None) -> List[Clause]:
+    """
+    Index eines Vertrags aufbauen (oder vorhandenen zurückgeben).
+
+    sections: bereits extrahierte Abschnitte (extractors.load_sections),
+    sonst werden sie aus dem Text-Store geladen.
+    """
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        row = conn.execute("SELECT file_sha256, mime_type FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
+        sha256, mime_type = (row[0], row[1]) if row else (None, None)
+        if sha256:
+            existing = _load(conn, sha256)
+            if existing:
+                return existing
+
+        from .extractors import load_sections, PDF_MIME
+        sections = sections if sections is not None else load_sections(contract_id, path)
+        text = "\n".join(s.text for s in sections)
+
+        # Layout-Überschriften liefert der PDF-Extraktor gleich mit
+        layout_headings = {h for s in sections for h in s.headings}
+        page_starts: List[int] = []
+        if mime_type == PDF_MIME or (mime_type is None and Path(path).suffix.lower() == ".pdf"):
+            position = 0
+            for s in sections:
+                page_starts.append(position)
+                position += len(s.text) + 1
+
+        clauses = segment(text, layout_headings, page_starts)
+        if sha256 and all(getattr(s, "complete", True) for s in sections):
+            conn.execute("DELETE FROM contract_clauses WHERE file_sha256 = ?", (sha256,))
+            conn.executemany(
+                "INSERT INTO contract_clauses (file_sha256, clause_id, ordinal, number, heading, page, start_offset, "
+                "end_offset, text_hash, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(sha256, *c, SEGMENTER_VERSION) for c in clauses]
+            )
+            conn.commit()
+        return clauses
+    finally:
+        conn.close()
+
+
+def _load(conn, sha256: str) -> List[Clause]:
+    rows = conn.execute(
+        "SELECT clause_id, ordinal, number, heading, page, start_offset, end_offset, text_hash, version "
+        "FROM contract_clauses WHERE file_sha256 = ? ORDER BY ordinal", (sha256,)
+    ).fetchall()
+    if not rows or rows[0][-1] != SEGMENTER_VERSION:
+        return []
+    return [Clause(*r[:-1]) for r in rows]
+
+
+def get_clauses(contract_id: str) -> List[Clause]:
+    """Gespeicherter Index (leer, falls noch nicht aufgebaut)."""
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        row = conn.execute("SELECT file_sha256 FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
+        return _load(conn, row[0]) if row and row[0] else []
+    finally:
+        conn.close()
+
+
+def clause_to_dict(clause: Clause, text: str = None) -> Dict:
+    result = clause._asdict()
+    if text is not None:
+        result["text"] = text[clause.start:clause.end].strip()
+    return result
+
+
+def locate_clause(clauses: List[Clause], text: str, snippet: str) -> Optional[str]:
+    """ID der Klausel, die einen (vom LLM zitierten) Ausschnitt enthält."""
+    needle = normalise(snippet or "")
+    if not needle or not clauses:
+        return None
+    bodies = [normalise(text[c.start:c.end]) for c in clauses]
+    for clause, body in zip(clauses, bodies):
+        if needle in body:
+            return clause.clause_id
+    # Fallback: größter Anteil gemeinsamer Wörter (LLM zitiert selten wörtlich)
+    words = set(needle.split())
+    best, best_score = None, 0.0
+    for clause, body in zip(clauses, bodies):
+        score = len(words & set(body.split())) / len(words)
+        if score > best_score:
+            best, best_score = clause.clause_id, score
+    return best if best_score >= 0.5 else None
+
+
+def search_clauses(clauses: List[Clause], text: str, query: str, limit: int = 3) -> List[Dict]:
+    """Einfaches Ranking nach Wortüberlappung mit der Frage (Copilot-Kontext)."""
+    words = {w for w in normalise(query).split() if len(w) > 3}
+    if not words:
+        return []
+    scored = []
+    for clause in clauses:
+        body = set(normalise(text[clause.start:clause.end]).split())
+        overlap = len(words & body)
+        if overlap:
+            scored.append((overlap, clause))
+    scored.sort(key=lambda x: (-x[0], x[1].ordinal))
+    return [clause_to_dict(c, text) for _, c in scored[:limit]]
@@ -0,0 +1,393 @@
+"""
+Klausel-Bibliothek
+- Standard- und eigene Klauseln in der Tabelle clauses, Volltextsuche über FTS5
+  (Fallback LIKE, falls SQLite ohne FTS5 gebaut ist)
+- Nutzung: Klauseln analysierter Verträge werden per Text-Hash (exakt) und
+  Shingle-Containment (ähnlich) gegen die Bibliothek gematcht
+- usage_count wird inkrementell gepflegt (Deltas pro Vertrag), die Seite liest
+  nur diese Zähler und ein Aggregat
+"""
+
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+# Anteil der Bibliotheks-Shingles, die in einer Vertragsklausel vorkommen müssen
+LIBRARY_MATCH_THRESHOLD = float(os.getenv("LIBRARY_MATCH_THRESHOLD", "0.7"))
+
+CATEGORIES = {
+    "general": "Allgemein", "saas": "SaaS", "nda": "NDA", "purchase": "Kaufvertrag",
+    "vendor": "Lieferant", "rental": "Mietvertrag", "employment": "Arbeitsvertrag", "service": "Dienstleistung",
+}
+
+SEED_CLAUSES = [
+    ("Kündigungsklausel Standard", "general", "low",
+     "Der Vertrag kann von beiden Parteien mit einer Frist von 30 Tagen zum Monatsende gekündigt werden. Die Kündigung bedarf der Schriftform.",
+     "Diese Standard-Kündigungsklausel entspricht den üblichen Gepflogenheiten im deutschen Vertragsrecht. Die 30-Tage-Frist ist ausgewogen und gibt beiden Parteien ausreichend Zeit für die Neuorganisation.",
+     ["BGB § 621", "BGB § 622"]),
+    ("Haftungsbegrenzung 1x ACV", "saas", "medium",
+     "Die Haftung des Anbieters ist auf den jährlichen Vertragswert (Annual Contract Value) begrenzt. Dies gilt nicht für Vorsatz und grobe Fahrlässigkeit.",
+     "Eine Haftungsbegrenzung auf 1x ACV ist marktüblich für SaaS-Verträge. Bei kritischen Anwendungen sollte eine höhere Grenze (2-3x ACV) verhandelt werden.",
+     ["BGB § 276", "BGB § 307"]),
+    ("Geheimhaltung 5 Jahre", "nda", "low",
+     "Die empfangende Partei verpflichtet sich, alle vertraulichen Informationen für einen Zeitraum von 5 Jahren nach Beendigung des Vertrags geheim zu halten.",
+     "Eine 5-jährige Geheimhaltungsfrist ist Standard für die meisten Geschäftsbeziehungen. Bei technischen Informationen kann eine längere Frist angemessen sein.",
+     ["GeschGehG § 2", "BGB § 823"]),
+    ("Auto-Renewal 30 Tage", "saas", "low",
+     "Der Vertrag verlängert sich automatisch um jeweils 12 Monate, sofern er nicht mit einer Frist von 30 Tagen vor Ablauf gekündigt wird.",
+     "30 Tage Kündigungsfrist bei Auto-Renewal ist kundenfreundlich. Kritisch sind Klauseln mit weniger als 14 Tagen oder automatischer Verlängerung um mehr als 12 Monate.",
+     ["BGB § 309 Nr. 9"]),
+    ("Datenlokation EU", "saas", "low",
+     "Sämtliche Kundendaten werden ausschließlich auf Servern innerhalb der Europäischen Union verarbeitet und gespeichert.",
+     "EU-Datenlokation ist optimal für DSGVO-Compliance. Vermeiden Sie Klauseln, die USA-Server erlauben, ohne explizite Nennung von EU-US Data Privacy Framework.",
+     ["DSGVO Art. 44-49", "BDSG § 80"]),
+    ("Eigentumsübergang bei Zahlung", "purchase", "low",
+     "Das Eigentum an der Ware geht erst mit vollständiger Bezahlung des Kaufpreises auf den Käufer über (Eigentumsvorbehalt).",
+     "Ein einfacher Eigentumsvorbehalt ist Standard und schützt den Verkäufer. Bei größeren Geschäften kann ein verlängerter oder erweiterter Eigentumsvorbehalt sinnvoll sein.",
+     ["BGB § 449", "BGB § 929"]),
+    ("Vertragsstrafe 10%", "vendor", "medium",
+     "Bei Verzug mit der Lieferung ist der Lieferant verpflichtet, eine Vertragsstrafe in Höhe von 10% des Auftragswertes zu zahlen, maximal jedoch 50% des Gesamtauftragswertes.",
+     "10% Vertragsstrafe ist im oberen Bereich des Üblichen. Die Deckelung auf 50% schützt vor unverhältnismäßigen Forderungen. Achten Sie auf klare Definition des Verzugsbeginns.",
+     ["BGB § 339-345", "BGB § 307"]),
+    ("Indexmiete jährlich", "rental", "medium",
+     "Die Miete wird jährlich entsprechend der Veränderung des Verbraucherpreisindex angepasst. Eine Anpassung erfolgt nur, wenn der Index um mindestens 3% gestiegen ist.",
+     "Indexmieten sind bei Gewerbemietverträgen üblich. Die 3%-Schwelle schützt vor häufigen Anpassungen. Achten Sie auf den Basismonat und die Berechnungsmethode.",
+     ["BGB § 557b"]),
+]
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_fts_available: Optional[bool] = None
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def init_clause_library(conn=None):
+    """Bibliothek, FTS-Index, Nutzungen; Standardklauseln beim ersten Start"""
+    from .clause_index import text_hash
+
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS clauses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            contract_type TEXT NOT NULL DEFAULT 'general',
+            risk TEXT NOT NULL DEFAULT 'low',
+            text TEXT NOT NULL,
+            explanation TEXT,
+            laws_json TEXT DEFAULT '[]',
+            text_hash TEXT NOT NULL,
+            is_custom INTEGER DEFAULT 0,
+            created_by TEXT,
+            usage_count INTEGER DEFAULT 0,
+            last_used_at TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clauses_hash ON clauses(text_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clauses_usage ON clauses(usage_count DESC)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS clause_usages (
+            clause_id INTEGER NOT NULL,
+            contract_id TEXT NOT NULL,
+            match_type TEXT NOT NULL,
+            score REAL NOT NULL,
+            contract_clause_id TEXT,
+            PRIMARY KEY (clause_id, contract_id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clause_usages_contract ON clause_usages(contract_id)")
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS clauses_fts USING fts5(
+                name, text, explanation, content='clauses', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS clauses_fts_ai AFTER INSERT ON clauses BEGIN
+                INSERT INTO clauses_fts(rowid, name, text, explanation) VALUES (new.id, new.name, new.text, new.explanation);
+            END;
+            CREATE TRIGGER IF NOT EXISTS clauses_fts_ad AFTER DELETE ON clauses BEGIN
+                INSERT INTO clauses_fts(clauses_fts, rowid, name, text, explanation) VALUES ('delete', old.id, old.name, old.text, old.explanation);
+            END;
+            CREATE TRIGGER IF NOT EXISTS clauses_fts_au AFTER UPDATE OF name, text, explanation ON clauses BEGIN
+                INSERT INTO clauses_fts(clauses_fts, rowid, name, text, explanation) VALUES ('delete', old.id, old.name, old.text, old.explanation);
+                INSERT INTO clauses_fts(rowid, name, text, explanation) VALUES (new.id, new.name, new.text, new.explanation);
+            END;
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 not available, clause search falls back to LIKE: {e}")
+
+    if not conn.execute("SELECT 1 FROM clauses LIMIT 1").fetchone():
+        conn.executemany(
+            "INSERT INTO clauses (name, contract_type, risk, text, explanation, laws_json, text_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(name, ctype, risk, text, expl, json.dumps(laws, ensure_ascii=False), text_hash(text))
+             for name, ctype, risk, text, expl, laws in SEED_CLAUSES]
+        )
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def _has_fts(conn) -> bool:
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = bool(conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clauses_fts'"
+        ).fetchone())
+    return _fts_available
+
+
+def _fts_query(query: str) -> str:
+    """Nutzereingabe als Präfix-Suche; Tokens quoten, damit FTS-Syntax nicht greift."""
+    return " ".join(f'"{token}"*' for token in TOKEN_RE.findall(query))
+
+
+def _row_to_clause(row) -> Dict:
+    return {
+        "id": row[0], "name": row[1], "contract_type": row[2], "category": CATEGORIES.get(row[2], row[2]),
+        "risk": row[3], "text": row[4], "explanation": row[5], "laws": json.loads(row[6] or "[]"),
+        "is_custom": bool(row[7]), "usage_count": row[8], "last_used_at": row[9],
+    }
+
+
+CLAUSE_COLUMNS = "c.id, c.name, c.contract_type, c.risk, c.text, c.explanation, c.laws_json, c.is_custom, c.usage_count, c.last_used_at"
+
+
+# ============================================================================
+# ABFRAGEN
+# ============================================================================
+
+def list_clauses(query: str = None, contract_type: str = None, page: int = 1, per_page: int = 20) -> Dict:
+    """Paginiert, nach Nutzung sortiert; mit Suchbegriff nach FTS-Relevanz."""
+    page, per_page = max(1, page), min(max(1, per_page), 100)
+    where, params, order = [], [], "c.usage_count DESC, c.id"
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        source = "clauses c"
+        if query and _fts_query(query):
+            if _has_fts(conn):
+                source = "clauses_fts f JOIN clauses c ON c.id = f.rowid"
+                where.append("clauses_fts MATCH ?")
+                params.append(_fts_query(query))
+                order = "bm25(clauses_fts), c.usage_count DESC"
+            else:
+                where.append("(c.name LIKE ? OR c.text LIKE ?)")
+                params += [f"%{query}%", f"%{query}%"]
+        if contract_type:
+            where.append("c.contract_type = ?")
+            params.append(contract_type)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        total = conn.execute(f"SELECT COUNT(*) FROM {source} {where_sql}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {CLAUSE_COLUMNS} FROM {source} {where_sql} ORDER BY {order} LIMIT ? OFFSET ?",
+            (*params, per_page, (page - 1) * per_page)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {
+        "items": [_row_to_clause(r) for r in rows],
+        "total": total, "page": page, "per_page": per_page,
+        "pages": (total + per_page - 1) // per_page,
+    }
+
+
+def get_library_clause(clause_id: int, usage_limit: int = 10) -> Optional[Dict]:
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        row = conn.execute(f"SELECT {CLAUSE_COLUMNS} FROM clauses c WHERE c.id = ?", (clause_id,)).fetchone()
+        if not row:
+            return None
+        clause = _row_to_clause(row)
+        clause["used_in"] = [
+            {"contract_id": r[0], "filename": r[1], "match_type": r[2], "score": r[3], "contract_clause_id": r[4]}
+            for r in conn.execute(
+                "SELECT u.contract_id, k.filename, u.match_type, u.score, u.contract_clause_id FROM clause_usages u "
+                "JOIN contracts k ON k.contract_id = u.contract_id WHERE u.clause_id = ? "
+                "ORDER BY k.created_at DESC LIMIT ?", (clause_id, usage_limit)
+            )
+        ]
+    finally:
+        conn.close()
+    return clause
+
+
+def library_stats() -> Dict:
+    """Kennzahlen der Bibliotheksseite aus den gepflegten Zählern."""
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT contract_type), COALESCE(SUM(usage_count), 0), COALESCE(SUM(is_custom), 0) FROM clauses"
+        ).fetchone()
+    finally:
+        conn.close()
+    return {"total": row[0], "contract_types": row[1], "usages": row[2], "custom": row[3]}
+
+
+def create_clause(name: str, text: str, contract_type: str = "general", risk: str = "low",
+                  explanation: str = None, laws: List[str] = None, created_by: str = None) -> int:
+    from .clause_index import text_hash
+
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        cursor = conn.execute(
+            "INSERT INTO clauses (name, contract_type, risk, text, explanation, laws_json, text_hash, is_custom, created_by) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)",
+            (name, contract_type, risk, text, explanation, json.dumps(laws or [], ensure_ascii=False), text_hash(text), created_by)
+        )
+        conn.commit()
+        clause_id = cursor.lastrowid
+    finally:
+        conn.close()
+    reset_matcher()
+    return clause_id
+
+
+# ============================================================================
+# NUTZUNG (Matching gegen analysierte Verträge)
+# ============================================================================
+
+class _Matcher:
+    """Invertierter Index Shingle -> Bibliotheksklauseln, einmal pro Prozess gebaut."""
+
+    def __init__(self, rows):
+        from .clause_index import normalise
+        from .minhash import shingles
+
+        self.by_hash: Dict[str, int] = {}
+        self.postings: Dict[int, List[int]] = defaultdict(list)
+        self.sizes: Dict[int, int] = {}
+        for clause_id, text, hash_ in rows:
+            self.by_hash[hash_] = clause_id
+            grams = shingles(normalise(text).split())
+            self.sizes[clause_id] = len(grams)
+            for gram in grams.tolist():
+                self.postings[gram].append(clause_id)
+
+    def match(self, units) -> Dict[int, tuple]:
+        """{Bibliotheks-ID: (match_type, score, Vertragsklausel-ID)}, beste Klausel je Bibliothekseintrag."""
+        from .clause_index import normalise
+        from .minhash import shingles
+
+        matches: Dict[int, tuple] = {}
+        for clause_id, body, hashes in units:
+            for hash_ in hashes:
+                library_id = self.by_hash.get(hash_)
+                if library_id is not None:
+                    matches[library_id] = ("exact", 1.0, clause_id)
+            hits: Dict[int, int] = defaultdict(int)
+            for gram in shingles(normalise(body).split()).tolist():
+                for candidate in self.postings.get(gram, ()):
+                    hits[candidate] += 1
+            for candidate, count in hits.items():
+                score = round(count / self.sizes[candidate], 3)
+                if score >= LIBRARY_MATCH_THRESHOLD and score > matches.get(candidate, (None, 0.0))[1]:
+                    matches[candidate] = ("similar", score, clause_id)
+        return matches
+
+
+def _get_matcher(conn) -> _Matcher:
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = _Matcher(conn.execute("SELECT id, text, text_hash FROM clauses").fetchall())
+        return _matcher
+
+
+def reset_matcher():
+    global _matcher
+    with _matcher_lock:
+        _matcher = None
+
+
+def record_contract_usage(conn, contract_id: str, clauses, text: str):
+    """
+    Nutzungen eines analysierten Vertrags neu bestimmen und die Zähler um die
+    Differenz zum vorherigen Stand anpassen (kein COUNT über alle Verträge).
+
+    Commit übernimmt der Aufrufer.
+    """
+    from .clause_index import text_hash
+
+    units = []
+    for c in clauses:
+        body = text[c.start:c.end].strip()
+        # Index-Hash enthält die Überschriftszeile, Bibliotheksklauseln sind reiner Fließtext
+        hashes = (c.text_hash, text_hash(body.split("\n", 1)[1])) if "\n" in body else (c.text_hash,)
+        units.append((c.clause_id, body, hashes))
+    matches = _get_matcher(conn).match(units)
+    previous = {row[0] for row in conn.execute("SELECT clause_id FROM clause_usages WHERE contract_id = ?", (contract_id,))}
+
+    removed = previous - matches.keys()
+    added = matches.keys() - previous
+    conn.execute("DELETE FROM clause_usages WHERE contract_id = ?", (contract_id,))
+    conn.executemany(
+        "INSERT INTO clause_usages (clause_id, contract_id, match_type, score, contract_clause_id) VALUES (?, ?, ?, ?, ?)",
+        [(library_id, contract_id, *match) for library_id, match in matches.items()]
+    )
+    conn.executemany("UPDATE clauses SET usage_count = usage_count - 1 WHERE id = ?", [(i,) for i in removed])
+    conn.executemany(
+        "UPDATE clauses SET usage_count = usage_count + 1, last_used_at = CURRENT_TIMESTAMP WHERE id = ?",
+        [(i,) for i in added]
+    )
+    return matches
+
+
+def remove_contract_usage(conn, contract_id: str):
+    """Zähler beim Löschen eines Vertrags zurücknehmen (Commit beim Aufrufer)."""
+    conn.execute(
+        "UPDATE clauses SET usage_count = usage_count - 1 "
+        "WHERE id IN (SELECT clause_id FROM clause_usages WHERE contract_id = ?)", (contract_id,)
+    )
+    conn.execute("DELETE FROM clause_usages WHERE contract_id = ?", (contract_id,))
+
+
+def rebuild_usage(upload_dir) -> Dict:
+    """
+    Alle analysierten Verträge neu matchen (nach Import/Änderung von Bibliotheksklauseln).
+
+    Text und Klausel-Index schreiben über eigene Verbindungen und werden vor
+    der Schreibtransaktion des Vertrags erzeugt; Commit pro Vertrag, am Ende
+    werden die Zähler aus clause_usages nachgezählt.
+    """
+    from .clause_index import build_clause_index
+    from .extractors import load_contract_text
+    from .file_registry import resolve_upload
+
+    reset_matcher()
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    processed, failed = 0, 0
+    try:
+        contract_ids = [r[0] for r in conn.execute("SELECT contract_id FROM contracts WHERE status = 'analyzed'")]
+        for contract_id in contract_ids:
+            path = resolve_upload(conn, contract_id, upload_dir)
+            if not path:
+                continue
+            try:
+                text = load_contract_text(contract_id, path)
+                clauses = build_clause_index(contract_id, path)
+                record_contract_usage(conn, contract_id, clauses, text)
+                conn.commit()
+                processed += 1
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Clause usage rebuild failed for {contract_id}: {e}")
+                failed += 1
+        conn.execute(
+            "DELETE FROM clause_usages WHERE contract_id NOT IN (SELECT contract_id FROM contracts WHERE status = 'analyzed')"
+        )
+        conn.execute("UPDATE clauses SET usage_count = (SELECT COUNT(*) FROM clause_usages u WHERE u.clause_id = clauses.id)")
+        conn.commit()
+    finally:
+        conn.close()
+    return {"processed": processed, "failed": failed}
@@ -0,0 +1,364 @@
+"""
+Compliance-Regeln für die Enterprise-Standards
+- Kleine Regel-DSL über den normalisierten Vertragsfeldern
+- Schwellwerte werden per $-Referenz aus ENTERPRISE_SAAS_STANDARDS bzw.
+  @-Referenz aus VENDOR_COMPLIANCE_MATRIX beim Kompilieren aufgelöst
+- Kompiliert in eine flache Liste von Prädikaten pro Vertragstyp
+- Zähler/Timing pro Regel, Hot Reload bei Änderung der Konfiguration
+"""
+
+import os
+import time
+import logging
+import operator
+import threading
+import importlib
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RELOAD_CHECK_INTERVAL = float(os.getenv("COMPLIANCE_RELOAD_INTERVAL", "2"))
+
+VENDOR_TYPES = ["saas", "vendor", "service"]
+
+# ============================================================================
+# REGEL-DSL
+# ============================================================================
+# Bedingung: (feld, operator, wert)
+#   operator: < <= > >= == != | missing | present | true | not_true | contains | not_contains
+#   wert: Literal, "$pfad.in.standards" oder "@standard.schlüssel" (Vendor-Matrix)
+# Mehrere Bedingungen in "when" sind UND-verknüpft; "scale" multipliziert Referenzwerte.
+
+COMPLIANCE_RULES = [
+    {
+        "id": "sla.uptime_minimum", "types": ["saas"], "severity": "high",
+        "when": [("uptime_sla_percent", "<", "$sla_requirements.uptime.minimum")], "scale": 100,
+        "title": "SLA unter Mindestverfügbarkeit",
+        "policy": "SLA Standards §2.1",
+    },
+    {
+        "id": "sla.uptime_target_without_credits", "types": ["saas"], "severity": "medium",
+        "when": [("uptime_sla_percent", "<", "$sla_requirements.uptime.target"), ("service_credits", "not_true", None)], "scale": 100,
+        "title": "SLA < 99.9% ohne Credits",
+        "policy": "SLA Standards §2.2",
+    },
+    {
+        "id": "financial.price_increase_above_cpi_cap", "types": VENDOR_TYPES + ["rental"], "severity": "medium",
+        "when": [("price_escalation_cap_percent", ">", "$financial_terms.price_protection.cpi_adjustment_max")], "scale": 100,
+        "title": "Preisanpassung über CPI-Limit",
+        "policy": "Financial Risk Management §4.5",
+    },
+    {
+        "id": "financial.price_increase_uncapped", "types": VENDOR_TYPES + ["rental"], "severity": "medium",
+        "when": [("price_escalation", "true", None), ("price_escalation_cap_percent", "missing", None)],
+        "title": "Preisanpassung ohne Cap",
+        "policy": "Financial Risk Management §4.5",
+    },
+    {
+        "id": "liability.cap_above_acv_multiple", "types": VENDOR_TYPES, "severity": "high",
+        "when": [("liability_cap_multiple_acv", ">", "$liability_and_indemnification.cap.multiple_of_acv")],
+        "title": "Haftungscap > 1x ACV",
+        "policy": "Risk Management Framework §7.1",
+    },
+    {
+        "id": "data.location_outside_eu", "types": VENDOR_TYPES, "severity": "high",
+        "when": [("data_outside_eu", "true", None)],
+        "title": "Datenlokation außerhalb EU",
+        "policy": "Data Protection Policy §3.4",
+    },
+    {
+        "id": "data.dp_addendum_missing", "types": ["saas"], "severity": "high",
+        "when": [("dp_addendum_included", "not_true", None)],
+        "requires": "$data_protection.dp_addendum.required",
+        "title": "Kein Auftragsverarbeitungsvertrag",
+        "policy": "Data Protection Policy §2.1",
+    },
+    {
+        "id": "lock_in.no_data_export", "types": ["saas"], "severity": "high",
+        "when": [("data_export_clause", "not_true", None)],
+        "title": "Kein Data-Export-Recht",
+        "policy": "Vendor Lock-in Prevention §2.1",
+    },
+    {
+        "id": "lock_in.notice_period_too_long", "types": VENDOR_TYPES, "severity": "medium",
+        "when": [("termination_notice_days", ">", "$vendor_lock_in_prevention.termination_rights.notice_period_days")],
+        "title": "Kündigungsfrist > 90 Tage",
+        "policy": "Contract Governance Policy §5.3",
+    },
+    {
+        "id": "lock_in.auto_renewal_without_notice", "types": VENDOR_TYPES, "severity": "high",
+        "when": [("auto_renew", "true", None), ("renewal_notice_days", "missing", None)],
+        "title": "Auto-Renewal ohne Kündigungsrecht",
+        "policy": "Vendor Management Policy §4.2",
+    },
+    {
+        "id": "compliance.audit_rights_missing", "types": ["vendor"], "severity": "medium",
+        "when": [("audit_rights", "not_true", None)],
+        "title": "Keine Auditrechte",
+        "policy": "Compliance Standards §3.1",
+    },
+]
+
+# Vendor-Matrix: je Standard eine Haftungs- und Datenlokations-Regel
+MATRIX_LOCATION_RULES = {
+    "EU-only": [("data_outside_eu", "not_true", None)],
+    "Germany-only": [("data_location", "contains", "DEUTSCHLAND")],
+}
+
+CompiledRule = namedtuple("CompiledRule", ["rule_id", "types", "severity", "title", "policy", "predicate", "group"])
+
+_OPERATORS = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "==": operator.eq, "!=": operator.ne,
+}
+
+
+class RuleCompileError(Exception):
+    pass
+
+
+def _resolve(value, standards: Dict, matrix: Dict, scale: float):
+    if isinstance(value, str) and value.startswith("$"):
+        node = standards
+        for key in value[1:].split("."):
+            if key not in node:
+                raise RuleCompileError(f"Unknown standards path: {value}")
+            node = node[key]
+        return node * scale if isinstance(node, (int, float)) and not isinstance(node, bool) else node
+    if isinstance(value, str) and value.startswith("@"):
+        standard, key = value[1:].split(".", 1)
+        return matrix[standard][key]
+    return value
+
+
+def _compile_condition(field: str, op: str, value) -> Callable[[Dict], bool]:
+    """Eine Bedingung -> Closure mit bereits aufgelöstem Schwellwert."""
+    if op in _OPERATORS:
+        compare = _OPERATORS[op]
+        return lambda f: f.get(field) is not None and compare(f[field], value)
+    if op == "missing":
+        return lambda f: f.get(field) is None
+    if op == "present":
+        return lambda f: f.get(field) is not None
+    if op == "true":
+        return lambda f: f.get(field) == 1
+    if op == "not_true":
+        return lambda f: f.get(field) != 1
+    if op == "contains":
+        return lambda f: value in (f.get(field) or "")
+    if op == "not_contains":
+        return lambda f: value not in (f.get(field) or "")
+    raise RuleCompileError(f"Unknown operator: {op}")
+
+
+def _compile_predicate(conditions: List[Callable]) -> Callable[[Dict], bool]:
+    if len(conditions) == 1:
+        return conditions[0]
+    if len(conditions) == 2:
+        first, second = conditions
+        return lambda f: first(f) and second(f)
+    return lambda f: all(c(f) for c in conditions)
+
+
+def compile_rules(standards: Dict, matrix: Dict) -> List[CompiledRule]:
+    """Übersetzt DSL + Vendor-Matrix in eine flache Liste kompilierter Regeln."""
+    specs = list(COMPLIANCE_RULES)
+    for name, standard in matrix.items():
+        specs.append({
+            "id": f"matrix.{name}.liability_cap", "types": VENDOR_TYPES, "severity": "medium", "group": name,
+            "when": [("liability_cap_multiple_acv", ">", f"@{name}.liability_cap")],
+            "title": f"Haftungscap über {name}",
+            "policy": f"Vendor Compliance Matrix ({name})",
+        })
+        location_rule = MATRIX_LOCATION_RULES.get(standard.get("data_location"))
+        if location_rule:
+            # Regel trifft, wenn die Lokationsanforderung NICHT erfüllt ist
+            specs.append({
+                "id": f"matrix.{name}.data_location", "types": VENDOR_TYPES, "severity": "medium", "group": name,
+                "when": location_rule, "negate": True,
+                "title": f"Datenlokation nicht {standard['data_location']}",
+                "policy": f"Vendor Compliance Matrix ({name})",
+            })
+
+    compiled = []
+    for spec in specs:
+        if "requires" in spec and not _resolve(spec["requires"], standards, matrix, 1):
+            continue
+        scale = spec.get("scale", 1)
+        conditions = [
+            _compile_condition(field, op, _resolve(value, standards, matrix, scale))
+            for field, op, value in spec["when"]
+        ]
+        predicate = _compile_predicate(conditions)
+        if spec.get("negate"):
+            inner = predicate
+            predicate = lambda f, inner=inner: not inner(f)
+        compiled.append(CompiledRule(
+            spec["id"], frozenset(spec["types"]), spec["severity"], spec["title"], spec["policy"],
+            predicate, spec.get("group", "enterprise"),
+        ))
+    return compiled
+
+
+def compile_vendor_tiers(standards: Dict) -> List[tuple]:
+    """Vendor-Tiers absteigend nach ACV-Schwelle."""
+    tiers = [
+        (tier["acv_threshold"], tier_id, tier["name"], tuple(tier["requires_approval"]))
+        for tier_id, tier in standards.get("vendor_tiers", {}).items()
+    ]
+    return sorted(tiers, reverse=True)
+
+
+# ============================================================================
+# REGELSATZ + HOT RELOAD
+# ============================================================================
+
+class CompliancePolicy:
+    """Kompilierter Regelsatz mit Statistiken und Hot Reload der Konfiguration."""
+
+    def __init__(self, module_name: str = "enterprise_saas_config"):
+        self.module_name = module_name
+        self._lock = threading.Lock()
+        self._module = None
+        self._mtime = None
+        self._next_check = 0.0
+        self.rules_by_type: Dict[str, tuple] = {}
+        self.tiers: List[tuple] = []
+        self.version = 0
+        # rule_id -> [evaluations, hits, total_ns]
+        self.stats: Dict[str, list] = {}
+
+    def _config_mtime(self) -> Optional[float]:
+        path = getattr(self._module, "__file__", None)
+        try:
+            return os.path.getmtime(path) if path else None
+        except OSError:
+            return None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self.module_name)
+        else:
+            self._module = importlib.reload(self._module)
+        standards = self._module.ENTERPRISE_SAAS_STANDARDS
+        matrix = getattr(self._module, "VENDOR_COMPLIANCE_MATRIX", {})
+
+        rules = compile_rules(standards, matrix)
+        by_type: Dict[str, list] = {}
+        for rule in rules:
+            for contract_type in rule.types:
+                by_type.setdefault(contract_type, []).append(rule)
+            self.stats.setdefault(rule.rule_id, [0, 0, 0])
+
+        self.rules_by_type = {t: tuple(r) for t, r in by_type.items()}
+        self.tiers = compile_vendor_tiers(standards)
+        self._mtime = self._config_mtime()
+        self.version += 1
+        logger.info(f"Compliance rules compiled: {len(rules)} rules (v{self.version})")
+
+    def ensure_current(self):
+        """Kompiliert neu, wenn sich die Konfigurationsdatei geändert hat (max. alle RELOAD_CHECK_INTERVAL s)."""
+        now = time.monotonic()
+        if self._module is not None and now < self._next_check:
+            return
+        with self._lock:
+            if self._module is None:
+                self._load()
+            elif self._config_mtime() != self._mtime:
+                try:
+                    self._load()
+                except Exception as e:
+                    logger.error(f"Compliance reload failed, keeping v{self.version}: {e}")
+                    self._mtime = self._config_mtime()
+            self._next_check = now + RELOAD_CHECK_INTERVAL
+
+    def vendor_tier(self, acv: Optional[float]) -> Optional[Dict]:
+        if acv is None:
+            return None
+        for threshold, tier_id, name, approvals in self.tiers:
+            if acv >= threshold:
+                return {"tier": tier_id, "name": name, "requires_approval": list(approvals)}
+        return None
+
+    def evaluate(self, contract_type: str, fields: Dict) -> List[CompiledRule]:
+        """Wertet alle Regeln des Vertragstyps aus und gibt die Treffer zurück."""
+        self.ensure_current()
+        hits = []
+        stats = self.stats
+        clock = time.perf_counter_ns
+        for rule in self.rules_by_type.get(contract_type, ()):
+            started = clock()
+            matched = rule.predicate(fields)
+            entry = stats[rule.rule_id]
+            entry[0] += 1
+            entry[2] += clock() - started
+            if matched:
+                entry[1] += 1
+                hits.append(rule)
+        return hits
+
+    def get_stats(self) -> List[Dict]:
+        return [
+            {
+                "rule_id": rule_id,
+                "evaluations": evals,
+                "hits": hits,
+                "avg_us": round(total_ns / evals / 1000, 3) if evals else 0.0,
+            }
+            for rule_id, (evals, hits, total_ns) in sorted(self.stats.items())
+        ]
+
+
+_policy = CompliancePolicy()
+
+
+def get_policy() -> CompliancePolicy:
+    return _policy
+
+
+# ============================================================================
+# ÖFFENTLICHE API
+# ============================================================================
+
+def normalise_fields(extracted: Dict) -> Dict:
+    """Vereinheitlicht LLM- und Pre-Screen-Felder (gleiche Normalisierung wie contract_fields)."""
+    from .batch_scoring import FIELD_COLUMNS, promote_fields
+
+    fields = dict(zip(FIELD_COLUMNS, promote_fields(extracted)))
+    fields["data_location"] = str(extracted.get("data_location") or "").upper()
+    acv = extracted.get("annual_contract_value_eur") or extracted.get("contract_value_eur")
+    try:
+        fields["annual_contract_value_eur"] = float(acv) if acv is not None else None
+    except (TypeError, ValueError):
+        fields["annual_contract_value_eur"] = None
+    return fields
+
+
+def evaluate_compliance(contract_type: str, extracted: Dict) -> Dict:
+    """Compliance-Prüfung einer Analyse gegen Enterprise-Standards und Vendor-Matrix."""
+    started = time.perf_counter_ns()
+    policy = get_policy()
+    fields = normalise_fields(extracted or {})
+    hits = policy.evaluate(contract_type, fields)
+
+    violations = [
+        {"rule_id": r.rule_id, "severity": r.severity, "title": r.title, "policy_reference": r.policy}
+        for r in hits if r.group == "enterprise"
+    ]
+    standards = {}
+    for rule in policy.rules_by_type.get(contract_type, ()):
+        if rule.group != "enterprise":
+            standards.setdefault(rule.group, {"compliant": True, "violations": []})
+    for rule in hits:
+        if rule.group != "enterprise":
+            standards[rule.group]["compliant"] = False
+            standards[rule.group]["violations"].append(rule.title)
+
+    return {
+        "violations": violations,
+        "vendor_tier": policy.vendor_tier(fields["annual_contract_value_eur"]) if contract_type in VENDOR_TYPES else None,
+        "standards": standards,
+        "rules_version": policy.version,
+        "eval_us": round((time.perf_counter_ns() - started) / 1000, 1),
+    }
@@ -0,0 +1,426 @@
+"""
+Vertragsvergleich auf Klausel-Ebene
+- Klauseln beider Verträge aus dem Klausel-Index (Text-Store, kein Re-Parsing)
+- Zuordnung über MinHash-Ähnlichkeit der Klauseltexte + Überschriften,
+  identische Klauseln direkt über den Text-Hash
+- Wort-Diff nur für geänderte Paare, dazu Felder und Risiken der Analysen
+- Klauselvergleich wird über das Paar der Datei-Hashes gecacht
+- Optional: ein LLM-Aufruf, der nur die geänderten Klauseln bewertet
+"""
+
+import os
+import re
+import json
+import time
+import bisect
+import sqlite3
+import logging
+import difflib
+from collections import namedtuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen am Ergebnisformat erhöhen – alte Cache-Einträge werden ignoriert
+COMPARE_VERSION = 1
+
+COMPARE_MATCH_THRESHOLD = float(os.getenv("COMPARE_MATCH_THRESHOLD", "0.35"))
+COMPARE_LLM_MAX_CLAUSES = int(os.getenv("COMPARE_LLM_MAX_CLAUSES", "12"))
+
+# Verträge ohne erkennbare Gliederung werden in Blöcke dieser Größe geteilt
+FALLBACK_CHUNK_CHARS = 1200
+
+Unit = namedtuple("Unit", ["clause_id", "number", "heading", "page", "start", "end", "text_hash", "body"])
+
+TOKEN_RE = re.compile(r"\S+\s*")
+SEVERITIES = ("critical_risks", "high_risks", "medium_risks", "low_risks")
+
+
+def init_comparison_tables(conn=None):
+    """Cache für Klauselvergleiche (Paar aus Datei-Hashes)"""
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contract_comparisons (
+            sha_a TEXT NOT NULL,
+            sha_b TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            result_json TEXT NOT NULL,
+            llm_json TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (sha_a, sha_b)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contract_comparisons_b ON contract_comparisons(sha_b)")
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+# ============================================================================
+# KLAUSELN
+# ============================================================================
+
+def load_units(contract_id: str, path: Path) -> List[Unit]:
+    from .extractors import load_contract_text
+    from .clause_index import build_clause_index, text_hash
+
+    text = load_contract_text(contract_id, path)
+    clauses = build_clause_index(contract_id, path)
+    if len(clauses) >= 3 or len(text) <= FALLBACK_CHUNK_CHARS:
+        return [
+            Unit(c.clause_id, c.number, c.heading, c.page, c.start, c.end, c.text_hash, text[c.start:c.end].strip())
+            for c in clauses
+        ]
+
+    # Keine Gliederung erkannt: zeilenweise Blöcke, damit der Diff lokal bleibt
+    units, start, offset = [], 0, 0
+    for line in text.split("\n"):
+        offset += len(line) + 1
+        if offset - start >= FALLBACK_CHUNK_CHARS and line.rstrip().endswith((".", ":", ";")):
+            units.append((start, offset))
+            start = offset
+    if start < len(text):
+        units.append((start, len(text)))
+    return [
+        Unit(f"b{i:03d}", None, f"Abschnitt {i + 1}", None, s, e, text_hash(text[s:e]), text[s:e].strip())
+        for i, (s, e) in enumerate(units)
+    ]
+
+
+def _words(text: str) -> List[str]:
+    from .clause_index import normalise
+    return normalise(text).split()
+
+
+def _heading_matrix(units_a: List[Unit], units_b: List[Unit]) -> np.ndarray:
+    """Jaccard der Überschriften-Wörter (ohne Nummern) für alle Paare."""
+    vocabulary: Dict[str, int] = {}
+
+    def incidence(units):
+        rows = [{vocabulary.setdefault(w, len(vocabulary)) for w in _words(u.heading) if not w.isdigit()} for u in units]
+        return rows
+
+    rows_a, rows_b = incidence(units_a), incidence(units_b)
+    matrix_a = np.zeros((len(rows_a), len(vocabulary)), dtype=np.float32)
+    matrix_b = np.zeros((len(rows_b), len(vocabulary)), dtype=np.float32)
+    for matrix, rows in ((matrix_a, rows_a), (matrix_b, rows_b)):
+        for i, row in enumerate(rows):
+            matrix[i, list(row)] = 1.0
+    shared = matrix_a @ matrix_b.T
+    union = matrix_a.sum(axis=1)[:, None] + matrix_b.sum(axis=1)[None, :] - shared
+    return np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+
+def align(units_a: List[Unit], units_b: List[Unit]) -> List[Tuple[int, int, float]]:
+    """
+    Greedy-Zuordnung nach Ähnlichkeit (höchste zuerst), damit auch
+    verschobene Klauseln gefunden werden. Liefert (i, j, score).
+    """
+    from .minhash import shingles, signatures, similarity_matrix
+
+    if not units_a or not units_b:
+        return []
+    sigs_a = signatures([shingles(_words(u.body)) for u in units_a])
+    sigs_b = signatures([shingles(_words(u.body)) for u in units_b])
+    scores = similarity_matrix(sigs_a, sigs_b) * 0.75
+
+    scores += _heading_matrix(units_a, units_b) * 0.25
+    hashes_b = {}
+    for j, u in enumerate(units_b):
+        hashes_b.setdefault(u.text_hash, []).append(j)
+    for i, u in enumerate(units_a):
+        for j in hashes_b.get(u.text_hash, ()):
+            scores[i, j] = 1.0
+
+    pairs, used_a, used_b = [], set(), set()
+    flat = np.argsort(-scores, axis=None)
+    for index in flat:
+        i, j = divmod(int(index), len(units_b))
+        score = float(scores[i, j])
+        if score < COMPARE_MATCH_THRESHOLD:
+            break
+        if i in used_a or j in used_b:
+            continue
+        used_a.add(i)
+        used_b.add(j)
+        pairs.append((i, j, round(score, 3)))
+        if len(used_a) == len(units_a) or len(used_b) == len(units_b):
+            break
+    return sorted(pairs)
+
+
+def _moved(pairs: List[Tuple[int, int, float]]) -> set:
+    """Paare außerhalb der längsten gemeinsamen Reihenfolge gelten als verschoben."""
+    js = [j for _, j, _ in pairs]
+    tails, tails_idx, prev = [], [], [-1] * len(js)
+    for k, j in enumerate(js):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tails_idx.append(k)
+        else:
+            tails[pos] = j
+            tails_idx[pos] = k
+        prev[k] = tails_idx[pos - 1] if pos else -1
+    keep, k = set(), tails_idx[-1] if tails_idx else -1
+    while k >= 0:
+        keep.add(k)
+        k = prev[k]
+    return {pairs[k][0] for k in range(len(pairs)) if k not in keep}
+
+
+def word_diff(old: str, new: str) -> List[List[str]]:
+    """Wort-Diff als [["=", text], ["-", text], ["+", text], ...]."""
+    tokens_a, tokens_b = TOKEN_RE.findall(old), TOKEN_RE.findall(new)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, tokens_a, tokens_b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", "".join(tokens_a[i1:i2])])
+            continue
+        if i2 > i1:
+            ops.append(["-", "".join(tokens_a[i1:i2])])
+        if j2 > j1:
+            ops.append(["+", "".join(tokens_b[j1:j2])])
+    return ops
+
+
+def _ref(unit: Unit) -> Dict:
+    return {
+        "clause_id": unit.clause_id, "number": unit.number, "heading": unit.heading,
+        "page": unit.page, "start": unit.start, "end": unit.end,
+    }
+
+
+def compare_clauses(units_a: List[Unit], units_b: List[Unit]) -> Dict:
+    pairs = align(units_a, units_b)
+    moved = _moved(pairs)
+    matched_b = {j for _, j, _ in pairs}
+    by_a = {i: (j, score) for i, j, score in pairs}
+
+    entries = []
+    summary = {"clauses_a": len(units_a), "clauses_b": len(units_b), "unchanged": 0, "changed": 0,
+               "added": 0, "removed": 0, "moved": len(moved)}
+    weighted, total_chars = 0.0, 0
+    for i, a in enumerate(units_a):
+        if i not in by_a:
+            entries.append({"status": "removed", "a": _ref(a), "b": None, "similarity": 0.0, "moved": False})
+            summary["removed"] += 1
+            total_chars += len(a.body)
+            continue
+        j, score = by_a[i]
+        b = units_b[j]
+        entry = {"status": "unchanged", "a": _ref(a), "b": _ref(b), "similarity": score, "moved": i in moved}
+        if a.text_hash != b.text_hash:
+            entry["status"] = "changed"
+            entry["diff"] = word_diff(a.body, b.body)
+        else:
+            entry["similarity"] = 1.0
+        summary[entry["status"]] += 1
+        entries.append(entry)
+        chars = max(len(a.body), len(b.body))
+        weighted += entry["similarity"] * chars
+        total_chars += chars
+
+    # Neue Klauseln hinter ihrem Vorgänger in B einsortieren
+    for j, b in enumerate(units_b):
+        if j in matched_b:
+            continue
+        position = len(entries)
+        for k, entry in enumerate(entries):
+            if entry["b"] and entry["b"]["start"] < b.start:
+                position = k + 1
+        entries.insert(position, {"status": "added", "a": None, "b": _ref(b), "similarity": 0.0, "moved": False})
+        summary["added"] += 1
+        total_chars += len(b.body)
+
+    summary["text_similarity"] = round(weighted / total_chars, 3) if total_chars else 1.0
+    return {"summary": summary, "clauses": entries}
+
+
+# ============================================================================
+# FELDER UND RISIKEN
+# ============================================================================
+
+def compare_fields(data_a: Dict, data_b: Dict) -> Dict:
+    changed, unchanged = [], 0
+    for field in sorted(set(data_a) | set(data_b)):
+        value_a, value_b = data_a.get(field), data_b.get(field)
+        if value_a == value_b:
+            unchanged += 1
+        else:
+            changed.append({"field": field, "a": value_a, "b": value_b})
+    return {"changed": changed, "unchanged": unchanged}
+
+
+def _risk_map(analysis: Dict) -> Dict[str, Dict]:
+    from .clause_index import normalise
+    risks = {}
+    for severity in SEVERITIES:
+        for risk in analysis.get("risk_assessment", {}).get(severity, []):
+            title = risk.get("title") or risk.get("issü_title") or ""
+            risks.setdefault(normalise(title), {
+                "title": title, "severity": risk.get("severity") or severity.split("_")[0],
+                "clause_id": risk.get("clause_id"),
+            })
+    return risks
+
+
+def compare_risks(analysis_a: Dict, analysis_b: Dict) -> Dict:
+    risks_a, risks_b = _risk_map(analysis_a), _risk_map(analysis_b)
+    severity_changed = [
+        {"title": risks_b[k]["title"], "a": risks_a[k]["severity"], "b": risks_b[k]["severity"]}
+        for k in risks_a.keys() & risks_b.keys() if risks_a[k]["severity"] != risks_b[k]["severity"]
+    ]
+    assessment_a, assessment_b = analysis_a.get("risk_assessment", {}), analysis_b.get("risk_assessment", {})
+    return {
+        "score_a": assessment_a.get("overall_risk_score"),
+        "score_b": assessment_b.get("overall_risk_score"),
+        "added": [risks_b[k] for k in risks_b.keys() - risks_a.keys()],
+        "removed": [risks_a[k] for k in risks_a.keys() - risks_b.keys()],
+        "severity_changed": severity_changed,
+    }
+
+
+# ============================================================================
+# VERGLEICH
+# ============================================================================
+
+def _contract_meta(conn, contract_id: str) -> Optional[Dict]:
+    row = conn.execute(
+        "SELECT c.filename, c.contract_type, c.risk_level, c.risk_score, c.file_sha256, a.analysis_json "
+        "FROM contracts c LEFT JOIN analysis_results a ON a.contract_id = c.contract_id WHERE c.contract_id = ?",
+        (contract_id,)
+    ).fetchone()
+    if not row:
+        return None
+    return {
+        "contract_id": contract_id, "filename": row[0], "contract_type": row[1],
+        "risk_level": row[2], "risk_score": row[3], "sha256": row[4],
+        "analysis": json.loads(row[5]) if row[5] else None,
+    }
+
+
+def compare_contracts(contract_a: str, contract_b: str, upload_dir: Path, llm: bool = False) -> Optional[Dict]:
+    """
+    Vergleicht zwei Verträge (A = Basis, B = neue Fassung).
+
+    None, wenn einer der Verträge oder seine Datei fehlt.
+    """
+    from .file_registry import resolve_upload
+    from .metrics import record_cache
+    from .tracing import span
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        meta_a, meta_b = _contract_meta(conn, contract_a), _contract_meta(conn, contract_b)
+        if not meta_a or not meta_b:
+            return None
+        path_a = resolve_upload(conn, contract_a, upload_dir)
+        path_b = resolve_upload(conn, contract_b, upload_dir)
+        if not path_a or not path_b:
+            return None
+
+        cacheable = bool(meta_a["sha256"] and meta_b["sha256"])
+        cached = None
+        if cacheable:
+            cached = conn.execute(
+                "SELECT result_json, llm_json FROM contract_comparisons WHERE sha_a = ? AND sha_b = ? AND version = ?",
+                (meta_a["sha256"], meta_b["sha256"], COMPARE_VERSION)
+            ).fetchone()
+            record_cache("comparison", cached is not None)
+
+        if cached:
+            result = json.loads(cached[0])
+            llm_review = json.loads(cached[1]) if cached[1] else None
+        else:
+            with span("compare", contract_a=contract_a, contract_b=contract_b) as s:
+                units_a, units_b = load_units(contract_a, path_a), load_units(contract_b, path_b)
+                result = compare_clauses(units_a, units_b)
+                s.set_attribute("clauses", len(units_a) + len(units_b))
+            llm_review = None
+            if cacheable:
+                conn.execute(
+                    "INSERT OR REPLACE INTO contract_comparisons (sha_a, sha_b, version, result_json) VALUES (?, ?, ?, ?)",
+                    (meta_a["sha256"], meta_b["sha256"], COMPARE_VERSION, json.dumps(result, ensure_ascii=False))
+                )
+                conn.commit()
+
+        if llm and llm_review is None:
+            llm_review = review_changes(result, contract_a, path_a, contract_b, path_b, meta_b["contract_type"])
+            if cacheable and llm_review.get("changes") is not None:
+                conn.execute(
+                    "UPDATE contract_comparisons SET llm_json = ? WHERE sha_a = ? AND sha_b = ?",
+                    (json.dumps(llm_review, ensure_ascii=False), meta_a["sha256"], meta_b["sha256"])
+                )
+                conn.commit()
+    finally:
+        conn.close()
+
+    analysis_a, analysis_b = meta_a.pop("analysis"), meta_b.pop("analysis")
+    meta_a.pop("sha256")
+    meta_b.pop("sha256")
+    result.update({
+        "contract_a": meta_a,
+        "contract_b": meta_b,
+        "fields": compare_fields(analysis_a.get("extracted_data") or {}, analysis_b.get("extracted_data") or {})
+        if analysis_a and analysis_b else None,
+        "risks": compare_risks(analysis_a, analysis_b) if analysis_a and analysis_b else None,
+        "cached": bool(cached),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    if llm:
+        result["llm_review"] = llm_review
+    return result
+
+
+def review_changes(result: Dict, contract_a: str, path_a: Path, contract_b: str, path_b: Path,
+                   contract_type: str) -> Dict:
+    """Ein LLM-Aufruf für die geänderten, hinzugefügten und entfernten Klauseln."""
+    from .extractors import load_contract_text
+    from .llm_client import call_llm_analysis, LLMError
+
+    entries = [e for e in result["clauses"] if e["status"] != "unchanged"][:COMPARE_LLM_MAX_CLAUSES]
+    if not entries:
+        return {"summary": "Keine inhaltlichen Änderungen.", "changes": []}
+
+    text_a, text_b = load_contract_text(contract_a, path_a), load_contract_text(contract_b, path_b)
+    blocks = []
+    for entry in entries:
+        a, b = entry["a"], entry["b"]
+        label = (b or a)["clause_id"] if not (a and b) else f"{a['clause_id']}/{b['clause_id']}"
+        old = text_a[a["start"]:a["end"]].strip()[:1500] if a else "(nicht vorhanden)"
+        new = text_b[b["start"]:b["end"]].strip()[:1500] if b else "(entfernt)"
+        blocks.append(f"[{label}] {(b or a)['heading']}\nALT:\n{old}\nNEU:\n{new}")
+
+    system_prompt = (
+        "Du bist ein erfahrener deutscher Vertragsanwalt. Du bewertest Änderungen zwischen zwei "
+        "Fassungen eines Vertrags aus Sicht des Auftraggebers. Antworte nur mit validem JSON."
+    )
+    user_prompt = (
+        f"Vertragstyp: {contract_type}\n\n" + "\n\n".join(blocks) +
+        '\n\nAntworte als JSON: {"summary": "2-3 Sätze", "changes": [{"clause": "Label in eckigen Klammern", '
+        '"direction": "günstiger oder ungünstiger oder neutral", "assessment": "1-2 Sätze"}]}'
+    )
+    try:
+        review = call_llm_analysis(system_prompt, user_prompt)
+    except LLMError as e:
+        logger.warning(f"Comparison review failed: {e}")
+        return {"summary": None, "changes": None, "error": str(e)}
+    return {"summary": review.get("summary"), "changes": review.get("changes") or []}
+
+
+def invalidate_file(conn, sha256: str):
+    """Vergleiche einer Datei entfernen (wenn kein Vertrag sie mehr referenziert)."""
+    conn.execute(
+        "DELETE FROM contract_comparisons WHERE (sha_a = ? OR sha_b = ?) "
+        "AND NOT EXISTS (SELECT 1 FROM contracts WHERE file_sha256 = ?)",
+        (sha256, sha256, sha256)
+    )
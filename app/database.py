@@ -1,6 +1,7 @@
 """
 SQLite Persistenz für Contract-App (mit datetime-Fix)
 """
+import os
 import sqlite3
 import json
 from pathlib import Path
@@ -13,7 +14,10 @@ import time
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent.parent / "data" / "contracts.db"
-DB_PATH.parent.mkdir(exist_ok=True)
+
+def contracts_db_path() -> str:
+    """Pfad der Haupt-Datenbank (CONTRACTS_DB_PATH), zur Laufzeit gelesen"""
+    return os.getenv("CONTRACTS_DB_PATH", "/var/www/contract-app/data/contracts.db")
 
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSON Encoder für datetime/date/Decimal"""
@@ -30,6 +34,7 @@ def safe_json_dumps(data):
 
 def get_connection():
     """Erstellt DB-Verbindung mit erhöhtem Timeout"""
+    DB_PATH.parent.mkdir(exist_ok=True)
     conn = sqlite3.connect(str(DB_PATH), timeout=30.0, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
@@ -14,7 +14,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict
 import os
 
-DB_PATH = "/var/www/contract-app/data/contracts.db"
+DB_PATH = os.getenv("CONTRACTS_DB_PATH", "/var/www/contract-app/data/contracts.db")
 
 def get_db():
     conn = sqlite3.connect(DB_PATH)
@@ -1,12 +1,11 @@
 """Fristen-Übersicht Seite"""
 
 from .pages_enterprise import PAGE_CSS, get_header, get_footer
-from .deadline_alerts import get_upcoming_deadlines, init_alerts_table
+from .deadline_alerts import get_upcoming_deadlines
 
 def get_deadlines_page(user_name: str = "User"):
     """Generiert die Fristen-Übersicht Seite"""
     
-    init_alerts_table()
     deadlines = get_upcoming_deadlines(days_ahead=90)
     
     header = get_header(user_name, "deadlines")
@@ -7,7 +7,9 @@ from datetime import datetime, timedelta
 from typing import List, Dict
 import secrets
 
-DB_PATH = "/var/www/contract-app/data/contracts.db"
+from .database import contracts_db_path
+
+DB_PATH = contracts_db_path()
 
 def get_db():
     conn = sqlite3.connect(DB_PATH)
@@ -269,7 +271,6 @@ def generate_api_key(email: str) -> str:
     conn.close()
     return api_key
 
-init_enterprise_tables()
 
 def revoke_api_key(email: str) -> dict:
     """Widerruft den API-Key eines Users."""
@@ -0,0 +1,468 @@
+"""
+Export-Jobs für Portfolio-Reports
+- Streamt Vertragszeilen aus SQLite durch Generator-Pipelines
+- Formate: CSV, XLSX, JSONL, ZIP (PDF-Reports)
+- Ausführung im Worker-Pool, Fortschritt in export_jobs
+- Artefakte mit Ablaufdatum im Export-Verzeichnis
+"""
+
+import os
+import csv
+import json
+import uuid
+import sqlite3
+import logging
+import zipfile
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from xml.sax.saxutils import escape
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = contracts_db_path()
+EXPORT_DIR = Path(os.getenv("EXPORT_DIR", "/var/www/contract-app/data/exports"))
+EXPORT_TTL_HOURS = int(os.getenv("EXPORT_TTL_HOURS", "24"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+# Laufende Jobs, die länger als das hängen, gelten beim Start als verwaist (Prozess abgestürzt)
+EXPORT_STALE_MINUTES = int(os.getenv("EXPORT_STALE_MINUTES", "30"))
+
+EXPORT_FORMATS = {
+    "csv": {"extension": "csv", "media_type": "text/csv"},
+    "xlsx": {"extension": "xlsx", "media_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "jsonl": {"extension": "jsonl", "media_type": "application/x-ndjson"},
+    "zip": {"extension": "zip", "media_type": "application/zip"},
+}
+
+# Spalten für tabellarische Formate (CSV/XLSX)
+EXPORT_COLUMNS = [
+    "contract_id", "filename", "contract_type", "created_at", "status",
+    "risk_level", "risk_score", "critical_risks", "high_risks", "medium_risks",
+    "low_risks", "executive_summary", "extracted_data",
+]
+
+BATCH_SIZE = 500
+PROGRESS_EVERY = 200
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_db():
+    conn = sqlite3.connect(DB_PATH, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_export_tables():
+    """Erstellt die Export-Job-Tabelle"""
+    conn = get_db()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS export_jobs (
+            job_id TEXT PRIMARY KEY,
+            user_email TEXT,
+            format TEXT NOT NULL,
+            filters TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            rows_total INTEGER DEFAULT 0,
+            rows_done INTEGER DEFAULT 0,
+            artifact_path TEXT,
+            artifact_size INTEGER,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            expires_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_export_jobs_user ON export_jobs(user_email, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_export_jobs_status ON export_jobs(status, expires_at)")
+    conn.commit()
+    conn.close()
+
+
+# ============================================================================
+# JOB-VERWALTUNG
+# ============================================================================
+
+def create_export_job(user_email: str, fmt: str, contract_type: str = None) -> Dict:
+    """Legt einen Export-Job an und übergibt ihn an den Worker-Pool."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    purge_expired_exports()
+
+    job_id = uuid.uuid4().hex
+    filters = {"contract_type": contract_type} if contract_type else {}
+    conn = get_db()
+    conn.execute(
+        "INSERT INTO export_jobs (job_id, user_email, format, filters, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+        (job_id, user_email, fmt, json.dumps(filters), datetime.utcnow().isoformat())
+    )
+    conn.commit()
+    conn.close()
+
+    _get_executor().submit(run_export_job, job_id)
+    logger.info(f"Export job queued: {job_id} ({fmt})")
+    return get_export_job(job_id)
+
+
+def get_export_job(job_id: str) -> Optional[Dict]:
+    """Holt Status und Fortschritt eines Export-Jobs."""
+    conn = get_db()
+    row = conn.execute("SELECT * FROM export_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    conn.close()
+    return _job_to_dict(row) if row else None
+
+
+def list_export_jobs(user_email: str = None, limit: int = 20) -> List[Dict]:
+    """Letzte Export-Jobs (optional pro User)."""
+    conn = get_db()
+    if user_email:
+        rows = conn.execute(
+            "SELECT * FROM export_jobs WHERE user_email = ? ORDER BY created_at DESC LIMIT ?",
+            (user_email, limit)
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT * FROM export_jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    return [_job_to_dict(r) for r in rows]
+
+
+def get_export_stats(user_email: str = None) -> Dict:
+    """Anzahl Exporte gesamt und pro Format."""
+    conn = get_db()
+    if user_email:
+        rows = conn.execute(
+            "SELECT format, COUNT(*) FROM export_jobs WHERE user_email = ? AND status IN ('done', 'expired') GROUP BY format",
+            (user_email,)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT format, COUNT(*) FROM export_jobs WHERE status IN ('done', 'expired') GROUP BY format"
+        ).fetchall()
+    conn.close()
+    by_format = {r[0]: r[1] for r in rows}
+    return {"total": sum(by_format.values()), "by_format": by_format}
+
+
+def purge_expired_exports() -> int:
+    """Löscht abgelaufene Artefakte und markiert die Jobs als 'expired'."""
+    now = datetime.utcnow().isoformat()
+    conn = get_db()
+    rows = conn.execute(
+        "SELECT job_id, artifact_path FROM export_jobs WHERE status = 'done' AND expires_at < ?", (now,)
+    ).fetchall()
+    for row in rows:
+        if row["artifact_path"]:
+            try:
+                os.remove(row["artifact_path"])
+            except OSError:
+                pass
+    if rows:
+        conn.executemany(
+            "UPDATE export_jobs SET status = 'expired', artifact_path = NULL WHERE job_id = ?",
+            [(r["job_id"],) for r in rows]
+        )
+        conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def resume_queued_exports() -> int:
+    """
+    Übernimmt wartende Jobs (z.B. nach Neustart eines Workers).
+
+    Jobs, die seit mehr als EXPORT_STALE_MINUTES auf 'running' stehen, werden
+    zuvor wieder auf 'queued' gesetzt. Mehrere Worker dürfen das gleichzeitig
+    tun: run_export_job beansprucht jeden Job atomar, die übrigen Worker
+    überspringen ihn.
+    """
+    stale_before = (datetime.utcnow() - timedelta(minutes=EXPORT_STALE_MINUTES)).isoformat()
+    conn = get_db()
+    requeued = conn.execute(
+        "UPDATE export_jobs SET status = 'queued', rows_done = 0, started_at = NULL "
+        "WHERE status = 'running' AND (started_at IS NULL OR started_at < ?)", (stale_before,)
+    ).rowcount
+    conn.commit()
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale running export jobs")
+    rows = conn.execute("SELECT job_id FROM export_jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+    conn.close()
+    for row in rows:
+        _get_executor().submit(run_export_job, row["job_id"])
+    if rows:
+        logger.info(f"Resumed {len(rows)} queued export jobs")
+    return len(rows)
+
+
+def _job_to_dict(row) -> Dict:
+    job = dict(row)
+    job["filters"] = json.loads(job["filters"]) if job.get("filters") else {}
+    total = job.get("rows_total") or 0
+    job["progress_percent"] = round((job.get("rows_done") or 0) / total * 100, 1) if total else (100.0 if job["status"] == "done" else 0.0)
+    job.pop("artifact_path", None)
+    return job
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+    return _executor
+
+
+def get_artifact(job_id: str) -> Optional[Dict]:
+    """Pfad + Metadaten eines fertigen Export-Artefakts."""
+    conn = get_db()
+    row = conn.execute(
+        "SELECT job_id, format, artifact_path, expires_at FROM export_jobs WHERE job_id = ? AND status = 'done'",
+        (job_id,)
+    ).fetchone()
+    conn.close()
+    if not row or not row["artifact_path"] or not os.path.exists(row["artifact_path"]):
+        return None
+    fmt = EXPORT_FORMATS[row["format"]]
+    return {
+        "path": row["artifact_path"],
+        "media_type": fmt["media_type"],
+        "filename": f"portfolio_export_{job_id[:8]}.{fmt['extension']}",
+    }
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+def run_export_job(job_id: str):
+    """Führt einen Export-Job aus (läuft im Worker-Pool)."""
+    conn = get_db()
+    claimed = conn.execute(
+        "UPDATE export_jobs SET status = 'running', started_at = ? WHERE job_id = ? AND status = 'queued'",
+        (datetime.utcnow().isoformat(), job_id)
+    ).rowcount
+    conn.commit()
+    if not claimed:
+        conn.close()
+        return
+
+    job = conn.execute("SELECT format, filters FROM export_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    fmt = job["format"]
+    filters = json.loads(job["filters"]) if job["filters"] else {}
+    contract_type = filters.get("contract_type")
+
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    artifact_path = EXPORT_DIR / f"{job_id}.{EXPORT_FORMATS[fmt]['extension']}"
+    tmp_path = artifact_path.with_suffix(".part")
+
+    try:
+        total = _count_rows(conn, contract_type)
+        conn.execute("UPDATE export_jobs SET rows_total = ? WHERE job_id = ?", (total, job_id))
+        conn.commit()
+
+        def on_progress(done: int):
+            conn.execute("UPDATE export_jobs SET rows_done = ? WHERE job_id = ?", (done, job_id))
+            conn.commit()
+
+        rows = _track_progress(iter_portfolio_rows(contract_type), on_progress)
+        WRITERS[fmt](rows, tmp_path)
+        os.replace(tmp_path, artifact_path)
+
+        now = datetime.utcnow()
+        conn.execute("""
+            UPDATE export_jobs SET status = 'done', rows_done = rows_total, artifact_path = ?,
+                   artifact_size = ?, finished_at = ?, expires_at = ?
+            WHERE job_id = ?
+        """, (str(artifact_path), artifact_path.stat().st_size, now.isoformat(),
+              (now + timedelta(hours=EXPORT_TTL_HOURS)).isoformat(), job_id))
+        conn.commit()
+        logger.info(f"Export job done: {job_id} ({total} rows)")
+    except Exception as e:
+        logger.error(f"Export job failed: {job_id}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        conn.execute(
+            "UPDATE export_jobs SET status = 'failed', error = ?, finished_at = ? WHERE job_id = ?",
+            (str(e), datetime.utcnow().isoformat(), job_id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _count_rows(conn, contract_type: str = None) -> int:
+    if contract_type:
+        return conn.execute("SELECT COUNT(*) FROM contracts WHERE contract_type = ?", (contract_type,)).fetchone()[0]
+    return conn.execute("SELECT COUNT(*) FROM contracts").fetchone()[0]
+
+
+def _track_progress(rows: Iterator[Dict], on_progress) -> Iterator[Dict]:
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_EVERY == 0:
+            on_progress(done)
+
+
+# ============================================================================
+# ROW-PIPELINE
+# ============================================================================
+
+def iter_portfolio_rows(contract_type: str = None, batch_size: int = BATCH_SIZE) -> Iterator[Dict]:
+    """
+    Liefert alle Verträge (inkl. Analyse) zeilenweise.
+
+    Keyset-Pagination über rowid: pro Batch eine kurze Lese-Transaktion,
+    damit parallele Schreiber nicht blockiert werden und der Speicherbedarf
+    unabhängig von der Portfolio-Größe bleibt.
+    """
+    last_rowid = 0
+    type_clause = "AND c.contract_type = ?" if contract_type else ""
+    while True:
+        params = [last_rowid] + ([contract_type] if contract_type else []) + [batch_size]
+        conn = get_db()
+        try:
+            batch = conn.execute(f"""
+                SELECT c.rowid AS rid, c.contract_id, c.filename, c.contract_type, c.created_at,
+                       c.status, c.risk_level, c.risk_score, ar.analysis_json
+                FROM contracts c
+                LEFT JOIN analysis_results ar ON ar.contract_id = c.contract_id
+                WHERE c.rowid > ? {type_clause}
+                ORDER BY c.rowid
+                LIMIT ?
+            """, params).fetchall()
+        finally:
+            conn.close()
+
+        if not batch:
+            return
+        for row in batch:
+            yield dict(row)
+        last_rowid = batch[-1]["rid"]
+
+
+def flatten_row(row: Dict) -> Dict:
+    """Reduziert eine Vertragszeile auf die tabellarischen Export-Spalten."""
+    analysis = json.loads(row["analysis_json"]) if row.get("analysis_json") else {}
+    risk = analysis.get("risk_assessment", {})
+    return {
+        "contract_id": row["contract_id"],
+        "filename": row["filename"],
+        "contract_type": row["contract_type"],
+        "created_at": row["created_at"],
+        "status": row["status"],
+        "risk_level": row["risk_level"] or "",
+        "risk_score": row["risk_score"] if row["risk_score"] is not None else "",
+        "critical_risks": len(risk.get("critical_risks", [])),
+        "high_risks": len(risk.get("high_risks", [])),
+        "medium_risks": len(risk.get("medium_risks", [])),
+        "low_risks": len(risk.get("low_risks", [])),
+        "executive_summary": risk.get("executive_summary", ""),
+        "extracted_data": json.dumps(analysis.get("extracted_data", {}), ensure_ascii=False),
+    }
+
+
+# ============================================================================
+# WRITER
+# ============================================================================
+
+def write_csv(rows: Iterator[Dict], path: Path):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            flat = flatten_row(row)
+            writer.writerow([flat[col] for col in EXPORT_COLUMNS])
+
+
+def write_jsonl(rows: Iterator[Dict], path: Path):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            analysis_json = row.pop("analysis_json", None)
+            row.pop("rid", None)
+            row["analysis"] = json.loads(analysis_json) if analysis_json else None
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+
+
+def write_xlsx(rows: Iterator[Dict], path: Path):
+    """Minimaler Streaming-XLSX-Writer (ein Sheet, Inline-Strings)."""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _XLSX_RELS)
+        zf.writestr("xl/workbook.xml", _XLSX_WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_xlsx_row(1, EXPORT_COLUMNS))
+            for i, row in enumerate(rows, start=2):
+                flat = flatten_row(row)
+                sheet.write(_xlsx_row(i, [flat[col] for col in EXPORT_COLUMNS]))
+            sheet.write(b"</sheetData></worksheet>")
+
+
+def write_report_zip(rows: Iterator[Dict], path: Path):
+    """ZIP mit einem PDF-Report pro analysiertem Vertrag (aus dem Report-Cache)."""
+    from .report_cache import build_report
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for row in rows:
+            if not row.get("analysis_json"):
+                continue
+            report_path = build_report(row["contract_id"], row["analysis_json"])
+            base = (row["filename"] or "contract").rsplit(".", 1)[0]
+            zf.write(report_path, arcname=f"{base}_{row['contract_id'][:8]}_analyse.pdf")
+
+
+WRITERS = {
+    "csv": write_csv,
+    "xlsx": write_xlsx,
+    "jsonl": write_jsonl,
+    "zip": write_report_zip,
+}
+
+
+def _xlsx_row(index: int, values: list) -> bytes:
+    cells = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>')
+    return f'<row r="{index}">{"".join(cells)}</row>'.encode("utf-8")
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Vertraege" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
@@ -0,0 +1,380 @@
+"""
+Text-Extraktion für alle Upload-Formate
+- Registry nach (gesnifftem) MIME-Typ: PDF, DOCX, TXT, RTF, HTML
+- Jedes Backend liefert dieselben Abschnitte (Seite bzw. Überschrift + Text)
+- Text-Store: extrahierter Text pro Datei-Hash in contract_texts, damit
+  Re-Analysen, Prescreen und Duplikate nicht erneut parsen
+"""
+
+import re
+import json
+import sqlite3
+import logging
+from collections import namedtuple
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen an einem Backend erhöhen – invalidiert den Text-Store
+EXTRACTOR_VERSION = 2
+
+# complete=False: Abschnitt unvollständig (z.B. OCR übersprungen) -> nicht speichern
+# headings: Zeilen, die per Layout als Überschrift auffallen (nur PDF, für den Klausel-Index)
+Section = namedtuple("Section", ["index", "label", "text", "complete", "headings"], defaults=(True, ()))
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+_EXTRACTORS: Dict[str, Callable[[Path], Iterator[Section]]] = {}
+_NAMES: Dict[str, str] = {}
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def register_extractor(name: str, *mime_types: str):
+    def decorator(func):
+        for mime in mime_types:
+            _EXTRACTORS[mime] = func
+            _NAMES[mime] = name
+        return func
+    return decorator
+
+
+def supported_mime_types() -> List[str]:
+    return sorted(_EXTRACTORS)
+
+
+def is_supported(mime_type: Optional[str]) -> bool:
+    return mime_type in _EXTRACTORS
+
+
+def sniff_file(path: Path) -> str:
+    from .upload_stream import sniff_mime
+    with open(path, "rb") as f:
+        return sniff_mime(f.read(2048), str(path))
+
+
+def iter_sections(path: Path, mime_type: str = None) -> Iterator[Section]:
+    mime_type = mime_type or sniff_file(path)
+    extractor = _EXTRACTORS.get(mime_type)
+    if extractor is None:
+        if mime_type == "application/msword":
+            raise UnsupportedFormat("Word 97-2003 (.doc) wird nicht unterstützt – bitte als DOCX oder PDF hochladen")
+        raise UnsupportedFormat(f"Dateityp {mime_type} wird nicht unterstützt")
+    return extractor(Path(path))
+
+
+def extract_text(path: Path, mime_type: str = None) -> str:
+    return "\n".join(s.text for s in iter_sections(path, mime_type))
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+@register_extractor("pdf", PDF_MIME)
+def _pdf_sections(path: Path) -> Iterator[Section]:
+    import fitz  # PyMuPDF (lazy: ~70ms Import)
+    from .ocr import ocr_missing_pages
+
+    doc = fitz.open(path)
+    try:
+        # Eine TextPage pro Seite für Text und Layout (der Aufbau ist der teure Teil)
+        texts, lines = [], []
+        for page in doc:
+            textpage = page.get_textpage()
+            texts.append(textpage.extractText())
+            lines.append(_layout_lines(textpage.extractDICT()["blocks"]))
+        stats = ocr_missing_pages(path, doc, texts)
+    finally:
+        doc.close()
+    complete = not (stats["skipped"] or stats["failed"])
+    headings = _layout_headings(lines)
+    for number, text in enumerate(texts):
+        yield Section(number, f"Seite {number + 1}", text, complete, headings[number])
+
+
+def _layout_lines(blocks: List[Dict]) -> List[tuple]:
+    """(Text, Schriftgröße, fett) pro Zeile aus PyMuPDF-Blöcken."""
+    lines = []
+    for block in blocks:
+        for line in block.get("lines", []):
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if spans:
+                bold = all(s["flags"] & 16 or "bold" in s["font"].lower() for s in spans)
+                chars = sum(len(s["text"]) for s in spans)
+                lines.append(("".join(s["text"] for s in spans).strip(), max(s["size"] for s in spans), bold, chars))
+    return lines
+
+
+def _layout_headings(pages: List[List[tuple]]) -> List[List[str]]:
+    """Kurze Zeilen, die fett oder deutlich größer als der Fließtext gesetzt sind."""
+    sizes: Dict[float, int] = {}
+    for lines in pages:
+        for _, size, _, chars in lines:
+            sizes[round(size, 1)] = sizes.get(round(size, 1), 0) + chars
+    if not sizes:
+        return [[] for _ in pages]
+    body_size = max(sizes, key=sizes.get)
+    return [
+        [text for text, size, bold, _ in lines
+         if len(text) <= 100 and (bold or size >= body_size * 1.15) and not text.startswith("(")]
+        for lines in pages
+    ]
+
+
+HEADING_RE = re.compile(r"^\s*(§\s*\d+|Art(ikel|\.)\s*\d+|\d+\.\s+[A-ZÄÖÜ])")
+
+
+@register_extractor("docx", DOCX_MIME)
+def _docx_sections(path: Path) -> Iterator[Section]:
+    import zipfile
+    if not zipfile.is_zipfile(path):
+        raise UnsupportedFormat("ZIP-Datei ist kein Word-Dokument (DOCX)")
+    with zipfile.ZipFile(path) as z:
+        is_docx = "word/document.xml" in z.namelist()
+    if not is_docx:
+        raise UnsupportedFormat("ZIP-Datei ist kein Word-Dokument (DOCX)")
+
+    import docx  # python-docx (lazy)
+    from docx.oxml.ns import qn
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = docx.Document(str(path))
+    label, lines, index = "Einleitung", [], 0
+    # Absätze und Tabellen in Dokument-Reihenfolge
+    for block in document.element.body.iterchildren():
+        if block.tag == qn("w:p"):
+            paragraph = Paragraph(block, document)
+            text = paragraph.text.strip()
+            if not text:
+                continue
+            style = (paragraph.style.name if paragraph.style is not None else "") or ""
+            if style.startswith(("Heading", "Überschrift", "Title", "Titel")) or HEADING_RE.match(text):
+                if lines:
+                    yield Section(index, label, "\n".join(lines))
+                    index += 1
+                label, lines = text[:120], []
+            lines.append(text)
+        elif block.tag == qn("w:tbl"):
+            table = Table(block, document)
+            for row in table.rows:
+                cells = [cell.text.strip() for cell in row.cells]
+                # verbundene Zellen liefert python-docx mehrfach
+                lines.append(" | ".join(c for i, c in enumerate(cells) if c and (i == 0 or c != cells[i - 1])))
+    if lines:
+        yield Section(index, label, "\n".join(lines))
+
+
+def _decode(data: bytes) -> str:
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("latin-1")
+
+
+def _text_sections(text: str) -> Iterator[Section]:
+    """Fließtext an §-/Artikel-Überschriften in Abschnitte teilen."""
+    label, lines, index = "Einleitung", [], 0
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and HEADING_RE.match(stripped):
+            if any(lines):
+                yield Section(index, label, "\n".join(lines).strip())
+                index += 1
+            label, lines = stripped[:120], []
+        lines.append(line.rstrip())
+    if any(lines):
+        yield Section(index, label, "\n".join(lines).strip())
+
+
+@register_extractor("text", "text/plain")
+def _txt_sections(path: Path) -> Iterator[Section]:
+    yield from _text_sections(_decode(path.read_bytes()))
+
+
+RTF_SKIP_DESTINATIONS = {"fonttbl", "colortbl", "stylesheet", "info", "pict", "header", "footer",
+                         "headerl", "headerr", "footerl", "footerr", "listtable", "listoverridetable",
+                         "rsidtbl", "generator", "xmlnstbl", "themedata", "datastore", "latentstyles"}
+RTF_TOKEN_RE = re.compile(r"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-fA-F]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)", re.I)
+
+
+def rtf_to_text(rtf: str) -> str:
+    """Minimaler RTF-Parser: Steuerwörter, Gruppen, \\'xx- und \\uN-Escapes."""
+    out: List[str] = []
+    stack: List[bool] = []
+    skip = False
+    uc_skip = 0
+    for match in RTF_TOKEN_RE.finditer(rtf):
+        word, arg, hex_char, symbol, brace, text = match.groups()
+        if brace == "{":
+            stack.append(skip)
+        elif brace == "}":
+            skip = stack.pop() if stack else False
+        elif skip:
+            continue
+        elif word:
+            word = word.lower()
+            if word in RTF_SKIP_DESTINATIONS:
+                skip = True
+            elif word in ("par", "line", "sect", "page"):
+                out.append("\n")
+            elif word == "tab":
+                out.append("\t")
+            elif word == "u" and arg:
+                out.append(chr(int(arg) % 65536))
+                uc_skip = 1
+        elif hex_char:
+            if uc_skip:
+                uc_skip -= 1
+            else:
+                out.append(bytes([int(hex_char, 16)]).decode("cp1252", "replace"))
+        elif symbol:
+            if symbol == "*":
+                skip = True
+            elif symbol in "\\{}":
+                out.append(symbol)
+            elif symbol == "~":
+                out.append("\u00a0")
+        elif text:
+            if uc_skip:
+                text, uc_skip = text[1:], 0
+            out.append(text)
+    return re.sub(r"\n{3,}", "\n\n", "".join(out))
+
+
+@register_extractor("rtf", "application/rtf")
+def _rtf_sections(path: Path) -> Iterator[Section]:
+    yield from _text_sections(rtf_to_text(path.read_bytes().decode("latin-1")))
+
+
+class _HTMLText(HTMLParser):
+    BLOCKS = {"p", "div", "br", "li", "tr", "table", "section", "article", "h1", "h2", "h3", "h4", "h5", "h6"}
+    SKIP = {"script", "style", "head", "noscript", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections: List[List] = [["Einleitung", []]]
+        self._skip = 0
+        self._heading: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._heading = []
+        if tag in self.BLOCKS:
+            self.sections[-1][1].append("\n")
+        elif tag in ("td", "th"):
+            self.sections[-1][1].append(" | ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag.startswith("h") and tag[1:].isdigit() and self._heading is not None:
+            heading = " ".join("".join(self._heading).split())
+            self._heading = None
+            if heading:
+                self.sections.append([heading[:120], [heading, "\n"]])
+        elif tag in self.BLOCKS:
+            self.sections[-1][1].append("\n")
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._heading is not None:
+            self._heading.append(data)
+        else:
+            self.sections[-1][1].append(data)
+
+
+@register_extractor("html", "text/html")
+def _html_sections(path: Path) -> Iterator[Section]:
+    parser = _HTMLText()
+    parser.feed(_decode(path.read_bytes()))
+    parser.close()
+    index = 0
+    for label, parts in parser.sections:
+        lines = [" ".join(line.split()) for line in "".join(parts).splitlines()]
+        text = "\n".join(line for line in lines if line)
+        if text:
+            yield Section(index, label, text)
+            index += 1
+
+
+# ============================================================================
+# TEXT-STORE
+# ============================================================================
+
+def init_text_store(conn=None):
+    """Extrahierte Texte pro Datei-Hash"""
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contract_texts (
+            file_sha256 TEXT PRIMARY KEY,
+            mime_type TEXT NOT NULL,
+            extractor TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            sections_json TEXT NOT NULL,
+            chars INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def load_sections(contract_id: str, path: Path) -> List[Section]:
+    """
+    Abschnitte eines Vertrags aus dem Text-Store oder frisch extrahiert.
+
+    MIME-Typ und Hash kommen aus der Datei-Registry (contracts); fehlen sie
+    (Altbestand), wird gesnifft und nicht gespeichert.
+    """
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        row = conn.execute("SELECT file_sha256, mime_type FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
+        sha256, mime_type = (row[0], row[1]) if row else (None, None)
+        if not mime_type or mime_type == "application/octet-stream":
+            mime_type = sniff_file(path)
+
+        if sha256:
+            cached = conn.execute(
+                "SELECT sections_json FROM contract_texts WHERE file_sha256 = ? AND version = ?",
+                (sha256, EXTRACTOR_VERSION)
+            ).fetchone()
+            if cached:
+                from .metrics import record_cache
+                record_cache("text_store", True)
+                return [Section(*s) for s in json.loads(cached[0])]
+
+        sections = list(iter_sections(path, mime_type))
+        if sha256:
+            from .metrics import record_cache
+            record_cache("text_store", False)
+            if all(s.complete for s in sections):
+                conn.execute(
+                    "INSERT OR REPLACE INTO contract_texts (file_sha256, mime_type, extractor, version, sections_json, chars) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (sha256, mime_type, _NAMES[mime_type], EXTRACTOR_VERSION,
+                     json.dumps([list(s) for s in sections], ensure_ascii=False), sum(len(s.text) for s in sections))
+                )
+                conn.commit()
+        return sections
+    finally:
+        conn.close()
+
+
+def load_contract_text(contract_id: str, path: Path) -> str:
+    return "\n".join(s.text for s in load_sections(contract_id, path))
@@ -0,0 +1,156 @@
+"""
+Datei-Registry für hochgeladene Verträge
+- Speicherpfad, Größe, Hash und MIME-Typ stehen in der contracts-Zeile
+- Ablage in Unterverzeichnissen nach contract_id (uploads/ab/cd/...)
+- Einmalige Migration für Altbestände im flachen Upload-Verzeichnis
+"""
+
+import os
+import re
+import hashlib
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Dateinamen im flachen Upload-Verzeichnis: {contract_id}__{name} (alt: {contract_id}_{name})
+LEGACY_NAME_RE = re.compile(r"^([0-9a-f]{32})__?(.+)$")
+
+
+REGISTRY_COLUMNS = (
+    ("storage_path", "TEXT"),
+    ("file_sha256", "TEXT"),
+    ("file_size", "INTEGER"),
+    ("mime_type", "TEXT"),
+)
+
+
+def ensure_registry_columns(conn):
+    """Ergänzt die Registry-Spalten in contracts (idempotent)."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(contracts)")}
+    for column, ddl in REGISTRY_COLUMNS:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE contracts ADD COLUMN {column} {ddl}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contracts_sha256 ON contracts(file_sha256)")
+
+
+def contract_upload_dir(upload_dir: str, contract_id: str) -> str:
+    """Shard-Verzeichnis eines Vertrags (zwei Ebenen aus der contract_id)."""
+    return os.path.join(upload_dir, contract_id[:2], contract_id[2:4])
+
+
+def resolve_upload(conn, contract_id: str, upload_dir: str) -> Optional[Path]:
+    """
+    Gespeicherte Datei eines Vertrags.
+
+    Nutzt storage_path aus der DB; für noch nicht migrierte Zeilen wird
+    nur der exakte Altpfad geprüft (kein Verzeichnis-Scan).
+    """
+    row = conn.execute(
+        "SELECT storage_path, filename FROM contracts WHERE contract_id = ?", (contract_id,)
+    ).fetchone()
+    if not row:
+        return None
+
+    storage_path, filename = row[0], row[1]
+    if storage_path:
+        return Path(storage_path) if os.path.exists(storage_path) else None
+
+    for separator in ("__", "_"):
+        legacy = os.path.join(upload_dir, f"{contract_id}{separator}{filename}")
+        if os.path.exists(legacy):
+            return Path(legacy)
+    return None
+
+
+def file_fingerprint(path: str) -> Dict:
+    """Größe, SHA-256 und MIME-Typ einer vorhandenen Datei."""
+    from .upload_stream import sniff_mime, CHUNK_SIZE
+
+    sha256 = hashlib.sha256()
+    size = 0
+    head = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if not head:
+                head = chunk[:512]
+            sha256.update(chunk)
+            size += len(chunk)
+    return {"size": size, "sha256": sha256.hexdigest(), "mime_type": sniff_mime(head, path)}
+
+
+def migrate_flat_uploads(upload_dir: str, db_path: str, dry_run: bool = False) -> Dict:
+    """
+    Verschiebt Dateien aus dem flachen Upload-Verzeichnis in die Shards
+    und trägt Pfad, Größe, Hash und MIME-Typ in contracts nach.
+    """
+    stats = {"moved": 0, "orphaned": 0, "skipped": 0}
+    conn = sqlite3.connect(db_path)
+    try:
+        with os.scandir(upload_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                match = LEGACY_NAME_RE.match(entry.name)
+                if not match:
+                    stats["skipped"] += 1
+                    continue
+
+                contract_id, filename = match.groups()
+                row = conn.execute(
+                    "SELECT storage_path FROM contracts WHERE contract_id = ?", (contract_id,)
+                ).fetchone()
+                if not row:
+                    stats["orphaned"] += 1
+                    continue
+                if row[0]:
+                    stats["skipped"] += 1
+                    continue
+
+                target_dir = contract_upload_dir(upload_dir, contract_id)
+                target = os.path.join(target_dir, f"{contract_id}__{filename}")
+                if dry_run:
+                    logger.info(f"[dry-run] {entry.path} -> {target}")
+                    stats["moved"] += 1
+                    continue
+
+                fingerprint = file_fingerprint(entry.path)
+                os.makedirs(target_dir, exist_ok=True)
+                os.replace(entry.path, target)
+                conn.execute(
+                    "UPDATE contracts SET storage_path = ?, file_size = ?, file_sha256 = ?, mime_type = ? WHERE contract_id = ?",
+                    (target, fingerprint["size"], fingerprint["sha256"], fingerprint["mime_type"], contract_id)
+                )
+                conn.commit()
+                stats["moved"] += 1
+    finally:
+        conn.close()
+
+    logger.info(f"Upload migration: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migriert flache Uploads in die Datei-Registry")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from .database import contracts_db_path
+    db_path = contracts_db_path()
+    upload_dir = os.getenv("UPLOAD_DIR", "/var/www/contract-app/uploads")
+
+    conn = sqlite3.connect(db_path)
+    ensure_registry_columns(conn)
+    conn.commit()
+    conn.close()
+
+    print(migrate_flat_uploads(upload_dir, db_path, dry_run=args.dry_run))
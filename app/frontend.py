@@ -1499,8 +1499,8 @@ def get_upload_page():
             <div class="upload-icon">📄</div>
             <div class="upload-title">Dateien hier ablegen</div>
             <div class="upload-subtitle">ODER</div>
-            <div class="upload-subtitle" style="margin-top: 8px;">Klicken zum Auswählen (PDF, max. 10 MB)</div>
-            <input type="file" id="fileInput" accept=".pdf,.docx" style="display:none">
+            <div class="upload-subtitle" style="margin-top: 8px;">Klicken zum Auswählen (PDF, DOCX, TXT, RTF, HTML, max. 10 MB)</div>
+            <input type="file" id="fileInput" accept=".pdf,.docx,.txt,.rtf,.html,.htm" style="display:none">
           </div>
           
           <!-- File Info -->
@@ -2423,7 +2423,7 @@ def get_help_page():
           <span class="faq-arrow">▼</span>
         </div>
         <div class="faq-answer">
-          <p style="color: var(--sbs-muted); line-height: 1.7;">Aktuell werden PDF-Dateien bis 10 MB unterstützt. DOCX-Support ist in Planung.</p>
+          <p style="color: var(--sbs-muted); line-height: 1.7;">Unterstützt werden PDF (auch gescannt), Word (DOCX), Text, RTF und HTML bis 10 MB.</p>
         </div>
       </div>
       
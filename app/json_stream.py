@@ -0,0 +1,192 @@
+"""
+Inkrementeller JSON-Parser für gestreamte LLM-Antworten
+- feed(chunk) liefert fertige Top-Level-Felder ("field", key, value) und
+  fertige Elemente von Top-Level-Arrays ("item", key, value), z.B. summary
+  und einzelne risk_flags, bevor die Antwort vollständig ist
+- Merkt sich den letzten Punkt, an dem ein Wert vollständig war; repair()
+  schneidet abgebrochene Antworten dort ab und schließt offene Klammern
+- Text vor der ersten "{" (Markdown-Fences, Vorrede) wird übersprungen
+"""
+
+import re
+import json
+from typing import Any, List, Optional, Tuple
+
+CLOSERS = {"{": "}", "[": "]"}
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+class IncrementalJSONParser:
+    """Zustandsautomat über die Zeichen; json.loads nur für fertige Teilstücke."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.started = False
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        # Pro Objekt-Ebene: erwartet Schlüssel? (sonst Wert)
+        self.expect_key: List[bool] = []
+        self.top_key: Optional[str] = None
+        self.value_start: Optional[int] = None
+        self.item_start: Optional[int] = None
+        self.primitive_open = False
+        self.safe_point: Tuple[int, Tuple[str, ...]] = (0, ())
+
+    def feed(self, chunk: str) -> List[tuple]:
+        self.buffer += chunk
+        events = []
+        text = self.buffer
+        for i in range(self.position, len(text)):
+            events.extend(self._step(text, i, text[i]))
+        self.position = len(text)
+        return events
+
+    def _value_done(self, end: int) -> List[tuple]:
+        """Wert endet vor end; Ereignisse für Top-Level-Felder und Array-Elemente."""
+        self.safe_point = (end, tuple(self.stack))
+        depth = len(self.stack)
+        events = []
+        if depth == 1 and self.value_start is not None and self.top_key is not None:
+            value = self._load(self.buffer[self.value_start:end])
+            if value is not _INVALID:
+                events.append(("field", self.top_key, value))
+            self.value_start = None
+        elif depth == 2 and self.stack[1] == "[" and self.item_start is not None:
+            value = self._load(self.buffer[self.item_start:end])
+            if value is not _INVALID:
+                events.append(("item", self.top_key, value))
+            self.item_start = None
+        return events
+
+    @staticmethod
+    def _load(fragment: str) -> Any:
+        try:
+            return json.loads(fragment)
+        except ValueError:
+            return _INVALID
+
+    def _begin_value(self, i: int):
+        depth = len(self.stack)
+        if depth == 1:
+            self.value_start = i
+        elif depth == 2 and self.stack[1] == "[":
+            self.item_start = i
+
+    def _step(self, text: str, i: int, ch: str) -> List[tuple]:
+        if not self.started:
+            if ch != "{":
+                return []
+            self.started = True
+
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif ch == "\\":
+                self.escape = True
+            elif ch == '"':
+                self.in_string = False
+                if self.stack and self.stack[-1] == "{" and self.expect_key[-1]:
+                    if len(self.stack) == 1:
+                        self.top_key = json.loads(text[self.string_start:i + 1])
+                    return []
+                return self._value_done(i + 1)
+            return []
+
+        if ch == '"':
+            self.in_string = True
+            self.string_start = i
+            if not (self.stack and self.stack[-1] == "{" and self.expect_key[-1]):
+                self._begin_value(i)
+        elif ch in "{[":
+            if self.stack:
+                self._begin_value(i)
+            self.stack.append(ch)
+            self.expect_key.append(ch == "{")
+        elif ch in "}]":
+            events = self._primitive_done(text, i)
+            if self.stack:
+                self.stack.pop()
+                self.expect_key.pop()
+            if self.stack:
+                events.extend(self._value_done(i + 1))
+            else:
+                self.safe_point = (i + 1, ())
+            return events
+        elif ch == ":":
+            self.expect_key[-1] = False
+        elif ch == ",":
+            events = self._primitive_done(text, i)
+            if self.stack and self.stack[-1] == "{":
+                self.expect_key[-1] = True
+            return events
+        elif not ch.isspace() and self.stack:
+            # Zahl, true/false/null: Anfang merken, Ende erst bei , } ]
+            depth = len(self.stack)
+            if depth == 1 and self.value_start is None:
+                self.value_start = i
+            elif depth == 2 and self.stack[1] == "[" and self.item_start is None:
+                self.item_start = i
+            self.primitive_open = True
+        return []
+
+    def _primitive_done(self, text: str, i: int) -> List[tuple]:
+        if not self.primitive_open:
+            return []
+        self.primitive_open = False
+        end = i
+        while end > 0 and text[end - 1].isspace():
+            end -= 1
+        return self._value_done(end)
+
+    def repair(self) -> Optional[str]:
+        """Abgeschnittene Antwort am letzten vollständigen Wert kürzen und schließen."""
+        if not self.started:
+            return None
+        end, stack = self.safe_point
+        start = self.buffer.index("{")
+        head = self.buffer[start:end].rstrip().rstrip(",")
+        if not stack:
+            return head
+        return head + "".join(CLOSERS[c] for c in reversed(stack))
+
+
+_INVALID = object()
+
+
+def parse_json_response(text: str) -> Tuple[Any, bool]:
+    """
+    (Ergebnis, repariert). Erst direkt, dann ohne Fences, ohne
+    Trailing-Commas, zuletzt am letzten vollständigen Wert abgeschnitten.
+
+    Raises:
+        json.JSONDecodeError, wenn nichts davon valides JSON ergibt
+    """
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError as error:
+        first_error = error
+
+    # Markdown-Fences/Vorrede sind keine Reparatur
+    cleaned = FENCE_RE.sub("", text.strip())
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start != -1 and end > start:
+        for candidate, repaired in ((cleaned[start:end + 1], False),
+                                    (TRAILING_COMMA_RE.sub(r"\1", cleaned[start:end + 1]), True)):
+            try:
+                return json.loads(candidate), repaired
+            except json.JSONDecodeError:
+                pass
+
+    parser = IncrementalJSONParser()
+    parser.feed(TRAILING_COMMA_RE.sub(r"\1", cleaned))
+    repaired = parser.repair()
+    if repaired:
+        try:
+            return json.loads(repaired), True
+        except json.JSONDecodeError:
+            pass
+    raise first_error
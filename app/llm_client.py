@@ -7,28 +7,71 @@ Unterstützt alle 8 Vertragstypen mit spezifischen Prompts.
 import os
 import json
 import logging
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
 
 class LLMError(Exception):
     """Custom Exception für LLM-Fehler."""
     pass
 
 
-def call_llm_analysis(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+class LLMTimeout(LLMError):
+    """Zeitlimit überschritten – der Aufrufer kann auf ein schnelleres Modell ausweichen."""
+    pass
+
+
+def get_client():
+    """Gemeinsamer OpenAI-Client (Connection-Pool wird wiederverwendet)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return _client
+
+
+def get_async_client():
+    """Gemeinsamer AsyncOpenAI-Client für Aufrufe aus Route-Handlern."""
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            from openai import AsyncOpenAI
+            _async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return _async_client
+
+
+def call_llm_analysis(system_prompt: str, user_prompt: str, prompt=None, on_partial=None, model: str = "gpt-4o-mini",
+                      max_tokens: int = 4000, timeout: Optional[float] = None,
+                      stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Ruft das LLM für Vertragsanalyse auf.
     
+    Die Antwort wird gestreamt (bei Registry-Prompts im Structured-Output-Modus
+    mit JSON-Schema, sonst JSON-Modus) und inkrementell geparst.
+    
     Args:
         system_prompt: Der System-Prompt für den Vertragstyp
         user_prompt: Der User-Prompt mit dem Vertragstext
+        prompt: PromptVersion aus der Registry (Latenz/Tokens werden pro Version erfasst)
+        on_partial: Optionaler Callback (kind, key, value) für fertige Top-Level-Felder
+            ("field") und Array-Elemente ("item"), z.B. summary und einzelne risk_flags
+        model: Modellname (Routing siehe model_router)
+        max_tokens: Obergrenze für die Antwort
+        timeout: Zeitlimit in Sekunden für den gesamten Aufruf (ohne Retries)
+        stats: Optionales Dict, wird mit Status und Token-Zahlen befüllt
     
     Returns:
         Dict mit Analyse-Ergebnis
     
     Raises:
+        LLMTimeout: Bei Überschreitung von timeout
         LLMError: Bei Fehlern in der API-Kommunikation
     """
     dummy_mode = os.getenv("CONTRACT_ANALYZER_DUMMY", "true").lower() == "true"
@@ -37,50 +80,146 @@ def call_llm_analysis(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
         logger.info("Dummy mode: Returning mock analysis")
         return _get_dummy_response()
     
+    import time
+    from .json_stream import IncrementalJSONParser, parse_json_response
+    from .metrics import stage_timer, record_llm_usage
+    usage = None
+    started = time.perf_counter()
+    
+    def record_prompt(status):
+        details = getattr(usage, "prompt_tokens_details", None)
+        if stats is not None:
+            stats.update(
+                status=status, input_tokens=getattr(usage, "prompt_tokens", None),
+                cached_tokens=getattr(details, "cached_tokens", None), output_tokens=getattr(usage, "completion_tokens", None),
+            )
+        if prompt is not None:
+            from .prompt_registry import record_run
+            record_run(
+                prompt, status, int((time.perf_counter() - started) * 1000),
+                getattr(usage, "prompt_tokens", None), getattr(details, "cached_tokens", None),
+                getattr(usage, "completion_tokens", None),
+            )
+    
+    if prompt is not None:
+        from .prompt_registry import response_schema
+        response_format = {"type": "json_schema", "json_schema": response_schema(prompt.contract_type)}
+    else:
+        response_format = {"type": "json_object"}
+    
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=4000,
-        )
+        # Beim Routing mit Fallback keine Retries: das Ausweichmodell ist schneller als ein zweiter Versuch
+        client = get_client() if timeout is None else get_client().with_options(timeout=timeout, max_retries=0)
+        parser = IncrementalJSONParser()
+        parts = []
         
-        result_text = response.choices[0].message.content.strip()
+        with stage_timer("llm_call", model=model, prompt_version=getattr(prompt, "version", None)) as s:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=max_tokens,
+                response_format=response_format,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                # Das HTTP-Timeout gilt pro Lesevorgang, nicht für den ganzen Stream
+                if timeout is not None and time.perf_counter() - started > timeout:
+                    stream.close()
+                    raise LLMTimeout(f"{model} exceeded {timeout:.0f}s")
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if not parts:
+                    s.set_attribute("first_token_ms", int((time.perf_counter() - started) * 1000))
+                parts.append(delta)
+                events = parser.feed(delta)
+                if on_partial:
+                    for event in events:
+                        on_partial(*event)
         
-        # JSON extrahieren
-        result = _parse_llm_response(result_text)
+        result_text = "".join(parts)
+        status = "success"
+        with stage_timer("json_parse"):
+            try:
+                result, repaired = parse_json_response(result_text)
+                if repaired:
+                    status = "repaired"
+            except json.JSONDecodeError as e:
+                logger.warning(f"Local JSON repair failed ({e}), asking model to repair its output")
+                result = _repair_with_llm(client, model, result_text, response_format)
+                status = "repaired_llm"
         
-        logger.info(f"LLM analysis completed: {len(result.get('risk_flags', []))} risks found")
+        if not isinstance(result, dict):
+            raise json.JSONDecodeError("Top-level value is not an object", result_text, 0)
+        record_llm_usage(model, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None), status=status)
+        record_prompt(status)
+        logger.info(f"LLM analysis completed: {len(result.get('risk_flags', []))} risks found ({status})")
         return result
         
     except json.JSONDecodeError as e:
         logger.error(f"JSON parse error: {e}")
+        record_llm_usage(
+            model, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None), status="invalid_json"
+        )
+        record_prompt("invalid_json")
         raise LLMError(f"Invalid JSON response from LLM: {e}")
     except Exception as e:
+        from openai import APITimeoutError
+        if isinstance(e, (LLMTimeout, APITimeoutError)):
+            logger.warning(f"LLM timeout ({model}): {e}")
+            record_llm_usage(model, None, None, status="timeout")
+            record_prompt("timeout")
+            raise e if isinstance(e, LLMTimeout) else LLMTimeout(f"{model} timed out: {e}")
         logger.error(f"LLM API error: {e}")
+        record_llm_usage(model, None, None, status="error")
+        record_prompt("error")
         raise LLMError(f"LLM API call failed: {e}")
 
 
-def _parse_llm_response(response_text: str) -> Dict[str, Any]:
-    """Parst die LLM-Antwort und extrahiert JSON."""
-    # Entferne Markdown-Backticks falls vorhanden
-    if "```" in response_text:
-        parts = response_text.split("```")
-        for part in parts:
-            part = part.strip()
-            if part.startswith("json"):
-                part = part[4:].strip()
-            if part.startswith("{") and part.endswith("}"):
-                response_text = part
-                break
+REPAIR_SYSTEM_PROMPT = (
+    "Du reparierst fehlerhaftes oder abgeschnittenes JSON. Behalte alle vollständigen Inhalte unverändert, "
+    "entferne unvollständige Einträge am Ende und antworte nur mit validem JSON."
+)
+
+
+def _repair_with_llm(client, model: str, broken: str, response_format: Dict) -> Dict[str, Any]:
+    """
+    Gezielte Reparatur: nur die kaputte Antwort geht erneut ans Modell, nicht
+    der Vertragstext – deutlich günstiger als eine komplette Neu-Analyse.
+    """
+    from .json_stream import parse_json_response
+    from .metrics import stage_timer, record_llm_usage
     
-    return json.loads(response_text)
+    with stage_timer("llm_repair", model=model):
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+                {"role": "user", "content": broken}
+            ],
+            temperature=0,
+            max_tokens=4000,
+            response_format=response_format,
+        )
+    usage = getattr(response, "usage", None)
+    record_llm_usage(model, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None), status="repair")
+    result, _ = parse_json_response(response.choices[0].message.content or "")
+    return result
+
+
+def _parse_llm_response(response_text: str) -> Dict[str, Any]:
+    """Parst die LLM-Antwort und extrahiert JSON (Fences, Trailing-Commas, Abbrüche)."""
+    from .json_stream import parse_json_response
+    return parse_json_response(response_text)[0]
 
 
 def _get_dummy_response() -> Dict[str, Any]:
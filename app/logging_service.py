@@ -12,6 +12,8 @@ Speichert in SQLite:
 import sqlite3
 import logging
 import os
+import json
+import hashlib
 from datetime import datetime
 from pathlib import Path
 from contextlib import contextmanager
@@ -88,6 +90,23 @@ def setup_logging():
         )
         """)
         
+        # Normalisierte Risiko-Flags (eine Zeile pro Flag) für Aggregationen
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS risk_flag_facts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            contract_id TEXT NOT NULL,
+            tenant_id TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            severity TEXT NOT NULL,
+            title_hash TEXT NOT NULL,
+            title TEXT NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rff_created_severity ON risk_flag_facts(created_at, severity)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rff_created_title ON risk_flag_facts(created_at, title_hash, severity)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rff_tenant_created ON risk_flag_facts(tenant_id, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rff_contract ON risk_flag_facts(contract_id)")
+        
         conn.commit()
         logger.info("✓ Database initialized")
 
@@ -123,6 +142,7 @@ def log_analysis_event(
     llm_output_tokens: int = None,
     num_risk_flags: int = 0,
     error_message: str = None,
+    risk_flags: list = None,
 ):
     """
     Logged einen einzelnen Analyse-Event.
@@ -139,22 +159,30 @@ def log_analysis_event(
         llm_output_tokens: Output-Tokens (optional)
         num_risk_flags: Anzahl erkannter Risiken
         error_message: Falls Status=error
+        risk_flags: Liste der Risiko-Flags (severity, title, ...), optional
     """
+    if risk_flags and not num_risk_flags:
+        num_risk_flags = len(risk_flags)
+    
     try:
         with get_db() as conn:
             conn.execute("""
             INSERT INTO analysis_log (
                 contract_id, tenant_id, contract_type, language,
                 status, duration_ms, llm_model, llm_input_tokens,
-                llm_output_tokens, num_risk_flags, error_message
+                llm_output_tokens, num_risk_flags, error_message, risk_flags
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 contract_id, tenant_id, contract_type, language,
                 status, duration_ms, llm_model, llm_input_tokens,
                 llm_output_tokens, num_risk_flags, error_message,
+                json.dumps(risk_flags, ensure_ascii=False) if risk_flags else None,
             ))
             
+            if status == "success":
+                record_risk_flag_facts(conn, contract_id, tenant_id, risk_flags or [])
+            
             # Update tenant_usage
             total_tokens = (llm_input_tokens or 0) + (llm_output_tokens or 0)
             conn.execute("""
@@ -191,6 +219,117 @@ def log_feedback(contract_id: str, tenant_id: str, feedback_text: str, rating: i
         logger.error(f"Failed to log feedback: {e}")
 
 
+# ============================================================================
+# RISK-FLAG FACTS
+# ============================================================================
+
+def risk_title_hash(title: str) -> str:
+    """Stabiler Hash eines Risiko-Titels (case- und whitespace-normalisiert)."""
+    normalized = " ".join((title or "").lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def record_risk_flag_facts(conn, contract_id: str, tenant_id: str, risk_flags: list, created_at: str = None):
+    """
+    Schreibt die Risiko-Flags einer Analyse als Fakten-Zeilen.
+    
+    Bestehende Fakten des Vertrags werden ersetzt (Re-Analyse). Commit
+    erfolgt durch den Aufrufer.
+    """
+    conn.execute("DELETE FROM risk_flag_facts WHERE contract_id = ?", (contract_id,))
+    
+    rows = []
+    for flag in risk_flags:
+        if not isinstance(flag, dict):
+            continue
+        title = (flag.get("title") or "Risiko").strip()
+        severity = (flag.get("severity") or "medium").lower()
+        rows.append((contract_id, tenant_id, severity, risk_title_hash(title), title))
+    
+    if not rows:
+        return
+    
+    if created_at:
+        conn.executemany("""
+        INSERT INTO risk_flag_facts (contract_id, tenant_id, severity, title_hash, title, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """, [row + (created_at,) for row in rows])
+    else:
+        conn.executemany("""
+        INSERT INTO risk_flag_facts (contract_id, tenant_id, severity, title_hash, title)
+        VALUES (?, ?, ?, ?, ?)
+        """, rows)
+
+
+def delete_risk_flag_facts(contract_id: str):
+    """Risiko-Fakten eines gelöschten Vertrags entfernen."""
+    with get_db() as conn:
+        conn.execute("DELETE FROM risk_flag_facts WHERE contract_id = ?", (contract_id,))
+        conn.commit()
+
+
+def backfill_risk_flag_facts() -> int:
+    """
+    Einmalige Migration: überträgt Risiko-Flags bestehender analysis_log-Einträge
+    in risk_flag_facts. Gibt die Anzahl migrierter Analysen zurück.
+    """
+    migrated = 0
+    with get_db() as conn:
+        rows = conn.execute("""
+        SELECT contract_id, tenant_id, created_at, risk_flags
+        FROM analysis_log
+        WHERE status = 'success' AND risk_flags IS NOT NULL AND risk_flags != ''
+          AND contract_id NOT IN (SELECT DISTINCT contract_id FROM risk_flag_facts)
+        ORDER BY id
+        """).fetchall()
+        
+        for row in rows:
+            try:
+                flags = json.loads(row["risk_flags"])
+            except (TypeError, ValueError):
+                logger.warning(f"Skipping unparsable risk_flags for {row['contract_id']}")
+                continue
+            if isinstance(flags, list):
+                record_risk_flag_facts(conn, row["contract_id"], row["tenant_id"], flags, row["created_at"])
+                migrated += 1
+        
+        conn.commit()
+    
+    logger.info(f"✓ Backfilled risk flag facts for {migrated} analyses")
+    return migrated
+
+
+def get_severity_histogram(days: int = 30) -> dict:
+    """Anzahl Risiko-Flags pro Schweregrad der letzten N Tage."""
+    with get_db() as conn:
+        rows = conn.execute("""
+        SELECT severity, COUNT(*) as count
+        FROM risk_flag_facts
+        WHERE created_at > datetime('now', ?)
+        GROUP BY severity
+        """, (f"-{int(days)} days",)).fetchall()
+        
+        return {row[0]: row[1] for row in rows}
+
+
+def get_top_risks(days: int = 30, limit: int = 10) -> list:
+    """Häufigste Risiko-Titel (pro Schweregrad) der letzten N Tage."""
+    with get_db() as conn:
+        rows = conn.execute("""
+        SELECT MAX(title) as title, severity, COUNT(*) as count
+        FROM risk_flag_facts
+        WHERE created_at > datetime('now', ?)
+        GROUP BY title_hash, severity
+        ORDER BY count DESC
+        LIMIT ?
+        """, (f"-{int(days)} days", limit)).fetchall()
+        
+        return [
+            {'title': row[0], 'severity': row[1], 'count': row[2]}
+            for row in rows
+        ]
+
+
 # ============================================================================
 # CFO-ABFRAGEN (für Dashboards & Reports)
 # ============================================================================
@@ -421,6 +560,10 @@ def cleanup_old_logs(days: int = 90):
             WHERE datetime(created_at) < datetime('now', '-{days} days')
             """)
             deleted = conn.total_changes
+            conn.execute("""
+            DELETE FROM risk_flag_facts
+            WHERE created_at < datetime('now', ?)
+            """, (f"-{int(days)} days",))
             conn.commit()
             logger.info(f"✓ Cleaned up {deleted} old log entries (>{days} days)")
     except Exception as e:
@@ -437,33 +580,21 @@ def get_cfo_dashboard_summary() -> dict:
     """
     metrics = get_analysis_metrics(days=30)
     
-    with get_db() as conn:
-        # Top-Risiken
-        risk_rows = conn.execute("""
-        SELECT title, severity, COUNT(*) as count
-        FROM analysis_log, json_each(risk_flags)
-        WHERE datetime(created_at) > datetime('now', '-30 days')
-        GROUP BY title, severity
-        ORDER BY count DESC
-        LIMIT 10
-        """).fetchall()
-        
-        # Kosten-Schätzung (bei $0.0015 pro 1K Tokens)
-        estimated_cost_usd = (metrics['total_tokens'] / 1000) * 0.0015
-        
-        return {
-            'kpi': metrics,
-            'estimated_monthly_cost_usd': round(estimated_cost_usd, 2),
-            'top_risks': [
-                {'title': row[0], 'severity': row[1], 'count': row[2]}
-                for row in risk_rows
-            ]
-        }
+    # Kosten-Schätzung (bei $0.0015 pro 1K Tokens)
+    estimated_cost_usd = (metrics['total_tokens'] / 1000) * 0.0015
+    
+    return {
+        'kpi': metrics,
+        'estimated_monthly_cost_usd': round(estimated_cost_usd, 2),
+        'severity_distribution': get_severity_histogram(days=30),
+        'top_risks': get_top_risks(days=30, limit=10),
+    }
 
 
 if __name__ == "__main__":
     # CLI für Testing & Reporting
     setup_logging()
+    backfill_risk_flag_facts()
     
     print("\n=== CONTRACT ANALYZER – METRICS DASHBOARD ===\n")
     
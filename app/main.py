@@ -10,21 +10,26 @@ import io
 import time
 import logging
 import json
-import glob
-import shutil
+import hashlib
 import uuid
 import sqlite3
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Callable, Optional, List
+from contextvars import ContextVar
 from uuid import uuid4
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Header, Depends, Request, Cookie
+from .startup_profile import mark as mark_startup, log_startup_profile
+mark_startup("stdlib")
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Header, Depends, Request, Cookie, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, RedirectResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, RedirectResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
+mark_startup("fastapi")
+
 # Frontend Module
 from app.frontend import (
     get_upload_page, 
@@ -35,10 +40,10 @@ from app.frontend import (
 )
 
 # Lokale Module
-from .pdf_utils import extract_text_from_pdf
+from .database import contracts_db_path as _get_db_path
 from .llm_client import call_employment_contract_model, call_saas_contract_model, LLMError
 from .prompts import get_employment_contract_prompt, get_saas_contract_prompt
-from .logging_service import setup_logging, log_analysis_event
+from .logging_service import log_analysis_event
 
 # Dashboard
 try:
@@ -71,18 +76,26 @@ except ImportError:
 # ============================================================================
 
 logger = logging.getLogger(__name__)
-setup_logging()
+mark_startup("app_imports")
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-# API-Keys
+# API-Keys (Startwerte; zur Laufzeit im Shared State, siehe app/shared_state.py)
 API_KEYS = {
     "demo-key-123": "demo-tenant-1",
     "pilot-key-456": "kanzlei-mueller",
     "web-upload-key": "web-frontend",
 }
 
+# Rate-Limits pro Minute (0 = aus); im Multi-Worker-Betrieb über alle Worker.
+# Upload/Analyse der Web-Oberfläche sind opt-in und zählen getrennt.
+API_RATE_LIMIT_PER_MINUTE = int(os.getenv("API_RATE_LIMIT_PER_MINUTE", "120"))
+UPLOAD_RATE_LIMIT_PER_MINUTE = int(os.getenv("UPLOAD_RATE_LIMIT_PER_MINUTE", "0"))
+ANALYZE_RATE_LIMIT_PER_MINUTE = int(os.getenv("ANALYZE_RATE_LIMIT_PER_MINUTE", "0"))
+# Load Balancer / Reverse Proxies, deren X-Forwarded-For vertraut wird (kommagetrennte IPs)
+TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip()}
+
 # ============================================================================
 # APP INITIALIZATION
 # ============================================================================
@@ -107,6 +120,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latenz-Histogramme pro Route (reine ASGI-Middleware)
+from .metrics import MetricsMiddleware, stage_timer
+from .tracing import traced, current_span, current_trace_id
+app.add_middleware(MetricsMiddleware)
+
 # ============================================================================
 # AUTH HELPERS
 # ============================================================================
@@ -124,11 +142,40 @@ async def verify_api_key(x_api_key: Optional[str] = Header(None)) -> str:
     """Verifiziert API-Key und gibt Tenant-ID zurück."""
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing X-API-Key header")
-    tenant_id = API_KEYS.get(x_api_key)
+    from .shared_state import resolve_api_key
+    tenant_id = resolve_api_key(x_api_key)
     if not tenant_id:
         raise HTTPException(status_code=403, detail="Invalid API key")
+    enforce_rate_limit(f"tenant:{tenant_id}", API_RATE_LIMIT_PER_MINUTE)
     return tenant_id
 
+def enforce_rate_limit(bucket: str, limit: int):
+    """Wirft 429, wenn das Limit im aktuellen Minutenfenster überschritten ist."""
+    from .shared_state import check_rate_limit
+    allowed, retry_after = check_rate_limit(bucket, limit)
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Zu viele Anfragen – bitte kurz warten",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+def _client_ip(request: Request) -> str:
+    """Client-IP; hinter einem vertrauten Proxy der letzte fremde Eintrag in X-Forwarded-For."""
+    host = request.client.host if request.client else "unknown"
+    if host not in TRUSTED_PROXIES:
+        return host
+    forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+    for ip in reversed(forwarded):
+        if ip not in TRUSTED_PROXIES:
+            return ip
+    return host
+
+def _client_bucket(request: Request, user: dict, action: str) -> str:
+    if user.get("email"):
+        return f"{action}:user:{user['email']}"
+    return f"{action}:ip:{_client_ip(request)}"
+
 def check_contract_usage(user_id: int) -> dict:
     """Prüft ob User Verträge analysieren darf"""
     access = has_product_access(user_id, "contract")
@@ -146,36 +193,16 @@ def check_contract_usage(user_id: int) -> dict:
 # DATABASE HELPERS
 # ============================================================================
 
-def _get_db_path() -> str:
-    return os.getenv("CONTRACTS_DB_PATH", "/var/www/contract-app/data/contracts.db")
-
 def _get_upload_dir() -> str:
     return os.getenv("UPLOAD_DIR", "/var/www/contract-app/uploads")
 
 def _init_db():
+    """DB-Verbindung; beim ersten Aufruf im Prozess wird das Schema sichergestellt."""
     db_path = _get_db_path()
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS contracts (
-            contract_id TEXT PRIMARY KEY,
-            filename TEXT NOT NULL,
-            contract_type TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            status TEXT NOT NULL,
-            risk_level TEXT,
-            risk_score INTEGER
-        )
-    """)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS analysis_results (
-            contract_id TEXT PRIMARY KEY,
-            analysis_json TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    return conn
+    from .migrations import run_migrations
+    run_migrations()
+    return sqlite3.connect(db_path)
 
 # ============================================================================
 # PYDANTIC SCHEMAS
@@ -574,19 +601,30 @@ def get_user_info(request: Request):
     return {"name": "Gast", "email": "", "is_admin": False}
 
 @app.get("/compare", response_class=HTMLResponse)
-async def compare_page(request: Request):
+async def compare_page(request: Request, a: Optional[str] = None, b: Optional[str] = None):
     user = get_user_info(request)
-    return get_compare_page(user["name"])
+    conn = _init_db()
+    try:
+        contracts = conn.execute(
+            "SELECT contract_id, filename, contract_type FROM contracts ORDER BY created_at DESC LIMIT 200"
+        ).fetchall()
+    finally:
+        conn.close()
+    return get_compare_page(user["name"], contracts, a, b)
 
 @app.get("/library", response_class=HTMLResponse)
-async def library_page(request: Request):
+async def library_page(request: Request, q: str = "", type: str = "", page: int = 1):
     user = get_user_info(request)
-    return get_library_page(user["name"])
+    from .clause_library import list_clauses, library_stats, CATEGORIES
+    clauses = list_clauses(q or None, type or None, page, per_page=20)
+    return get_library_page(user["name"], clauses, library_stats(), CATEGORIES, q, type)
 
 @app.get("/exports", response_class=HTMLResponse)
 async def exports_page(request: Request):
     user = get_user_info(request)
-    return get_exports_page(user["name"])
+    from .export_jobs import list_export_jobs, get_export_stats
+    email = user["email"] or None
+    return get_exports_page(user["name"], list_export_jobs(email), get_export_stats(email))
 
 @app.get("/settings", response_class=HTMLResponse)
 async def settings_page(request: Request):
@@ -617,29 +655,25 @@ async def contract_detail_page(contract_id: str, request: Request):
     """Einzelne Vertragsdetailseite"""
     user = get_user_info(request)
     
-    # Vertrag aus DB laden
-    conn = _init_db()
-    try:
-        meta = conn.execute(
-            "SELECT contract_id, filename, contract_type, created_at, status, risk_level, risk_score "
-            "FROM contracts WHERE contract_id = ?", (contract_id,)
-        ).fetchone()
-        
-        analysis = conn.execute(
-            "SELECT analysis_json FROM analysis_results WHERE contract_id = ?", (contract_id,)
-        ).fetchone()
-    finally:
-        conn.close()
-    
-    if not meta:
+    # Vertrag aus dem Analyse-Cache laden (LRU -> Shared -> DB)
+    from .analysis_cache import get_contract_view, etag_matches
+    entry = get_contract_view(contract_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Vertrag nicht gefunden")
     
-    contract_id, filename, ctype, created_at, status, risk_level, risk_score = meta
+    # Seite enthält den Benutzernamen -> ETag pro Benutzer
+    user_hash = hashlib.sha256(user["name"].encode("utf-8")).hexdigest()[:8]
+    etag = f'{entry.etag[:-1]}-{user_hash}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
     
-    # Analyse-Daten parsen
-    analysis_data = {}
-    if analysis and analysis[0]:
-        analysis_data = json.loads(analysis[0])
+    meta = entry.meta
+    filename, ctype, created_at = meta["filename"], meta["contract_type"], meta["created_at"]
+    risk_level, risk_score = meta["risk_level"], meta["risk_score"]
+    
+    # Analyse ist gecacht und wird von mehreren Requests geteilt -> nur lesen
+    analysis_data = entry.analysis or {}
     
     # Vertragstyp-Labels
     type_labels = {
@@ -698,8 +732,7 @@ async def contract_detail_page(contract_id: str, request: Request):
     all_risks = []
     for level in ["critical_risks", "high_risks", "medium_risks", "low_risks"]:
         for risk in risk_assessment.get(level, []):
-            risk["level"] = level.replace("_risks", "")
-            all_risks.append(risk)
+            all_risks.append({**risk, "level": level.replace("_risks", "")})
     
     for risk in all_risks:
         level = risk.get("level", "medium")
@@ -723,9 +756,10 @@ async def contract_detail_page(contract_id: str, request: Request):
     if not risks_html:
         risks_html = '<p style="color:var(--sbs-muted);text-align:center;padding:40px;">✅ Keine Risiken identifiziert</p>'
     
-    return get_contract_detail_page(user["name"], contract_id, filename, type_label, date_str, 
-                                     risk_level, risk_label, risk_score or 0, risk_color, 
-                                     summary, fields_html, risks_html)
+    html = get_contract_detail_page(user["name"], contract_id, filename, type_label, date_str, 
+                                    risk_level, risk_label, risk_score or 0, risk_color, 
+                                    summary, fields_html, risks_html)
+    return HTMLResponse(html, headers=cache_headers)
 
 
 def get_contract_detail_page(user_name, contract_id, filename, type_label, date_str, 
@@ -815,55 +849,30 @@ async def clause_detail_page(clause_id: int, request: Request):
     """Klausel-Detailseite."""
     user = get_user_info(request)
     
-    # Klausel-Daten (später aus DB)
-    clauses = {
-        1: {"name": "Kündigungsklausel Standard", "type": "Allgemein", "risk": "low", "usage": 47,
-            "text": "Der Vertrag kann von beiden Parteien mit einer Frist von 30 Tagen zum Monatsende gekündigt werden. Die Kündigung bedarf der Schriftform.",
-            "explanation": "Diese Standard-Kündigungsklausel entspricht den üblichen Gepflogenheiten im deutschen Vertragsrecht. Die 30-Tage-Frist ist ausgewogen und gibt beiden Parteien ausreichend Zeit für die Neuorganisation.",
-            "laws": ["BGB § 621", "BGB § 622"]},
-        2: {"name": "Haftungsbegrenzung 1x ACV", "type": "SaaS", "risk": "medium", "usage": 32,
-            "text": "Die Haftung des Anbieters ist auf den jährlichen Vertragswert (Annual Contract Valü) begrenzt. Dies gilt nicht für Vorsatz und grobe Fahrlässigkeit.",
-            "explanation": "Eine Haftungsbegrenzung auf 1x ACV ist marktüblich für SaaS-Verträge. Bei kritischen Anwendungen sollte eine höhere Grenze (2-3x ACV) verhandelt werden.",
-            "laws": ["BGB § 276", "BGB § 307"]},
-        3: {"name": "Geheimhaltung 5 Jahre", "type": "NDA", "risk": "low", "usage": 28,
-            "text": "Die empfangende Partei verpflichtet sich, alle vertraulichen Informationen für einen Zeitraum von 5 Jahren nach Beendigung des Vertrags geheim zu halten.",
-            "explanation": "Eine 5-jährige Geheimhaltungsfrist ist Standard für die meisten Geschäftsbeziehungen. Bei technischen Informationen kann eine längere Frist angemessen sein.",
-            "laws": ["GeschGehG § 2", "BGB § 823"]},
-        4: {"name": "Auto-Renewal 30 Tage", "type": "SaaS", "risk": "low", "usage": 25,
-            "text": "Der Vertrag verlängert sich automatisch um jeweils 12 Monate, sofern er nicht mit einer Frist von 30 Tagen vor Ablauf gekündigt wird.",
-            "explanation": "30 Tage Kündigungsfrist bei Auto-Renewal ist kundenfreundlich. Kritisch sind Klauseln mit weniger als 14 Tagen oder automatischer Verlängerung um mehr als 12 Monate.",
-            "laws": ["BGB § 309 Nr. 9"]},
-        5: {"name": "Datenlokation EU", "type": "SaaS", "risk": "low", "usage": 21,
-            "text": "Sämtliche Kundendaten werden ausschließlich auf Servern innerhalb der Europäischen Union verarbeitet und gespeichert.",
-            "explanation": "EU-Datenlokation ist optimal für DSGVO-Compliance. Vermeiden Sie Klauseln, die USA-Server erlauben, ohne explizite Nennung von EU-US Data Privacy Framework.",
-            "laws": ["DSGVO Art. 44-49", "BDSG § 80"]},
-        6: {"name": "Eigentumsübergang bei Zahlung", "type": "Kaufvertrag", "risk": "low", "usage": 19,
-            "text": "Das Eigentum an der Ware geht erst mit vollständiger Bezahlung des Kaufpreises auf den Käufer über (Eigentumsvorbehalt).",
-            "explanation": "Ein einfacher Eigentumsvorbehalt ist Standard und schützt den Verkäufer. Bei größeren Geschäften kann ein verlängerter oder erweiterter Eigentumsvorbehalt sinnvoll sein.",
-            "laws": ["BGB § 449", "BGB § 929"]},
-        7: {"name": "Vertragsstrafe 10%", "type": "Lieferant", "risk": "medium", "usage": 15,
-            "text": "Bei Verzug mit der Lieferung ist der Lieferant verpflichtet, eine Vertragsstrafe in Höhe von 10% des Auftragswertes zu zahlen, maximal jedoch 50% des Gesamtauftragswertes.",
-            "explanation": "10% Vertragsstrafe ist im oberen Bereich des Üblichen. Die Deckelung auf 50% schützt vor unverhältnismäßigen Forderungen. Achten Sie auf klare Definition des Verzugsbeginns.",
-            "laws": ["BGB § 339-345", "BGB § 307"]},
-        8: {"name": "Indexmiete jährlich", "type": "Mietvertrag", "risk": "medium", "usage": 12,
-            "text": "Die Miete wird jährlich entsprechend der Veränderung des Verbraucherpreisindex angepasst. Eine Anpassung erfolgt nur, wenn der Index um mindestens 3% gestiegen ist.",
-            "explanation": "Indexmieten sind bei Gewerbemietverträgen üblich. Die 3%-Schwelle schützt vor häufigen Anpassungen. Achten Sie auf den Basismonat und die Berechnungsmethode.",
-            "laws": ["BGB § 557b"]},
-    }
-    
-    clause = clauses.get(clause_id)
+    from .clause_library import get_library_clause
+    clause = get_library_clause(clause_id)
     if not clause:
         raise HTTPException(status_code=404, detail="Klausel nicht gefunden")
     
     risk_colors = {"low": "#16a34a", "medium": "#d97706", "high": "#ea580c", "critical": "#dc2626"}
     risk_labels = {"low": "Niedrig", "medium": "Mittel", "high": "Hoch", "critical": "Kritisch"}
     
-    laws_html = "".join([f'<span class="badge badge-info" style="margin-right:8px;margin-bottom:8px;">{law}</span>' for law in clause["laws"]])
+    from html import escape
+    clause = {**clause, "name": escape(clause["name"]), "text": escape(clause["text"]), "explanation": escape(clause["explanation"] or "")}
+    laws_html = "".join([f'<span class="badge badge-info" style="margin-right:8px;margin-bottom:8px;">{escape(law)}</span>' for law in clause["laws"]])
+    
+    def usage_row(u):
+        match = "exakt" if u["match_type"] == "exact" else f'{u["score"]:.0%} ähnlich'
+        return (f'<div style="padding:8px 0;border-bottom:1px solid var(--sbs-border);"><a href="/contracts/{u["contract_id"]}">{escape(u["filename"] or u["contract_id"])}</a>'
+                f' <span class="badge badge-{"success" if u["match_type"] == "exact" else "info"}">{match}</span></div>')
     
-    return get_clause_detail_page(user["name"], clause, risk_colors[clause["risk"]], risk_labels[clause["risk"]], laws_html)
+    used_in_html = "".join(usage_row(u) for u in clause["used_in"])
+    used_in_html = used_in_html or '<p style="color:var(--sbs-muted);">Noch in keinem analysierten Vertrag gefunden.</p>'
+    
+    return get_clause_detail_page(user["name"], clause, risk_colors[clause["risk"]], risk_labels[clause["risk"]], laws_html, used_in_html)
 
 
-def get_clause_detail_page(user_name, clause, risk_color, risk_label, laws_html):
+def get_clause_detail_page(user_name, clause, risk_color, risk_label, laws_html, used_in_html=""):
     """Generiert Klausel-Detailseite."""
     from .pages_enterprise import PAGE_CSS, get_header, get_footer
     
@@ -884,9 +893,9 @@ def get_clause_detail_page(user_name, clause, risk_color, risk_label, laws_html)
     <div style="display:flex;align-items:center;gap:12px;margin-bottom:16px;">
       <a href="/library" style="color:#fff;opacity:0.7;text-decoration:none;">← Zurück zur Bibliothek</a>
     </div>
-    <div class="hero-badge"><span class="dot"></span> {clause["type"].upper()}</div>
+    <div class="hero-badge"><span class="dot"></span> {clause["category"].upper()}</div>
     <h1>📜 {clause["name"]}</h1>
-    <p>{clause["usage"]}x in Verträgen verwendet</p>
+    <p>{clause["usage_count"]}x in Verträgen verwendet</p>
   </div>
 </div>
 <div class="page-container">
@@ -901,7 +910,7 @@ def get_clause_detail_page(user_name, clause, risk_color, risk_label, laws_html)
   <div class="content-card" style="margin-bottom:24px;">
     <div class="content-card-header"><h3 class="content-card-title">📄 Klauseltext</h3></div>
     <div class="content-card-body">
-      <p style="font-size:1.1rem;line-height:1.8;background:#f8fafc;padding:24px;border-radius:12px;border-left:4px solid var(--sbs-blue);">
+      <p id="clause-text" style="font-size:1.1rem;line-height:1.8;background:#f8fafc;padding:24px;border-radius:12px;border-left:4px solid var(--sbs-blue);">
         „{clause["text"]}"
       </p>
     </div>
@@ -923,9 +932,17 @@ def get_clause_detail_page(user_name, clause, risk_color, risk_label, laws_html)
     </div>
   </div>
   
+  <!-- Verwendung -->
+  <div class="content-card" style="margin-top:24px;">
+    <div class="content-card-header"><h3 class="content-card-title">📂 Verwendet in</h3></div>
+    <div class="content-card-body">
+      {used_in_html}
+    </div>
+  </div>
+  
   <!-- Aktionen -->
   <div style="margin-top:32px;display:flex;gap:16px;">
-    <button class="btn btn-primary" onclick="navigator.clipboard.writeText(`{clause["text"]}`)">📋 Klausel kopieren</button>
+    <button class="btn btn-primary" onclick="navigator.clipboard.writeText(document.getElementById('clause-text').innerText.trim())">📋 Klausel kopieren</button>
     <a href="/library" class="btn btn-secondary">← Zurück</a>
   </div>
 </div>
@@ -985,10 +1002,11 @@ async def api_list_contracts(limit: int = 50):
 
 
 @app.post("/api/v3/contracts/upload")
-async def api_upload_contract(request: Request):
+async def api_upload_contract(request: Request, background_tasks: BackgroundTasks):
     # LIMIT CHECK - Added by CFO Audit
     user = get_user_info(request)
     user_email = user.get("email")
+    enforce_rate_limit(_client_bucket(request, user, "upload"), UPLOAD_RATE_LIMIT_PER_MINUTE)
     if user_email:
         from .usage_tracking import check_limit
         limit_check = check_limit(user_email, "analysis")
@@ -1001,39 +1019,42 @@ async def api_upload_contract(request: Request):
                     "upgrade_url": "/billing"
                 }
             )
-    """Upload Vertrag - Frontend Compatible"""
-    form = await request.form()
-    
-    # Contract Type extrahieren
-    contract_type = form.get("contract_type") or form.get("type") or "general"
-    
-    # File finden
-    uploaded_file = None
-    for key, value in form.multi_items():
-        if hasattr(value, "filename") and hasattr(value, "file"):
-            uploaded_file = value
-            break
-    
-    if not uploaded_file:
-        raise HTTPException(status_code=400, detail="No file provided")
-    
-    # Speichern
-    upload_dir = _get_upload_dir()
-    os.makedirs(upload_dir, exist_ok=True)
+    """Upload Vertrag - Frontend Compatible (streamt direkt auf Disk)"""
+    from .upload_stream import stream_upload, UploadTooLarge, UploadError, MAX_UPLOAD_BYTES
+    from .file_registry import contract_upload_dir
     
     contract_id = uuid.uuid4().hex
-    safe_filename = os.path.basename(uploaded_file.filename or "upload.pdf").replace(" ", "_")
-    file_path = os.path.join(upload_dir, f"{contract_id}__{safe_filename}")
+    try:
+        upload = await stream_upload(request, contract_upload_dir(_get_upload_dir(), contract_id), contract_id)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"File too large (max {MAX_UPLOAD_BYTES / (1024 * 1024):g} MB)")
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    from .extractors import is_supported
+    if not is_supported(upload["mime_type"]):
+        try:
+            os.remove(upload["path"])
+        except OSError:
+            pass
+        raise HTTPException(status_code=415, detail=f"Dateityp {upload['mime_type']} nicht unterstützt (PDF, DOCX, TXT, RTF, HTML)")
     
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(uploaded_file.file, f)
+    # Contract Type extrahieren
+    fields = upload["fields"]
+    contract_type = fields.get("contract_type") or fields.get("type") or "general"
+    safe_filename = upload["filename"]
     
     # In DB speichern
     conn = _init_db()
     try:
+        duplicates = conn.execute(
+            "SELECT contract_id, filename, status, risk_level FROM contracts WHERE file_sha256 = ? ORDER BY created_at",
+            (upload["sha256"],)
+        ).fetchall()
         conn.execute(
-            "INSERT INTO contracts (contract_id, filename, contract_type, created_at, status) VALUES (?, ?, ?, ?, ?)",
-            (contract_id, safe_filename, str(contract_type), datetime.utcnow().isoformat(), "uploaded")
+            "INSERT INTO contracts (contract_id, filename, contract_type, created_at, status, storage_path, file_sha256, file_size, mime_type, owner_email) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (contract_id, safe_filename, str(contract_type), datetime.utcnow().isoformat(), "uploaded",
+             upload["path"], upload["sha256"], upload["size"], upload["mime_type"], user_email or None)
         )
         conn.commit()
         # Audit-Log
@@ -1045,7 +1066,13 @@ async def api_upload_contract(request: Request):
     finally:
         conn.close()
     
-    logger.info(f"Contract uploaded: {contract_id} - {safe_filename}")
+    logger.info(f"Contract uploaded: {contract_id} - {safe_filename} ({upload['size']} bytes, {upload['mime_type']})")
+    from .metrics import CONTRACTS_UPLOADED
+    CONTRACTS_UPLOADED.inc()
+    
+    # Near-Duplicate-Index inkrementell nachziehen (extrahiert dabei den Text vorab)
+    from .near_duplicates import index_contract
+    background_tasks.add_task(index_contract, contract_id, Path(upload["path"]))
     
     return {
         "contract_id": contract_id,
@@ -1053,15 +1080,85 @@ async def api_upload_contract(request: Request):
         "filename": safe_filename,
         "contract_type": str(contract_type),
         "status": "uploaded",
+        "sha256": upload["sha256"],
+        "size": upload["size"],
+        "mime_type": upload["mime_type"],
+        "duplicate_of": [
+            {"contract_id": d[0], "filename": d[1], "status": d[2], "risk_level": d[3]} for d in duplicates
+        ],
         "message": "Upload successful"
     }
 
+# Callback (kind, key, value) für Teilergebnisse der laufenden Analyse, gesetzt vom Stream-Endpunkt
+_analysis_events: ContextVar[Optional[Callable]] = ContextVar("analysis_events", default=None)
+
+STREAM_EVENTS = {
+    ("field", "summary"): "summary",
+    ("item", "risk_flags"): "risk_flag",
+    ("field", "extracted_fields"): "extracted_fields",
+    # Fallback auf ein anderes Modell: bisherige Teilergebnisse verwerfen
+    ("reset", None): "reset",
+}
+
+
+@app.post("/api/v3/contracts/{contract_id}/analyze/stream")
+async def api_analyze_contract_stream(contract_id: str, request: Request, background_tasks: BackgroundTasks):
+    """
+    Analyse als Server-Sent Events: summary, risk_flag (je Risiko) und
+    extracted_fields, sobald das LLM sie geliefert hat; danach result bzw. error.
+    reset: alle bisherigen Teilergebnisse verwerfen (Modell-Fallback nach Timeout).
+    """
+    import asyncio
+    
+    await request.body()  # Body vorab lesen, die Analyse läuft in einem eigenen Task
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def emit(kind, key, value):
+        event = STREAM_EVENTS.get((kind, key))
+        if event:
+            loop.call_soon_threadsafe(queue.put_nowait, (event, value if value is not None else {}))
+    
+    async def run():
+        _analysis_events.set(emit)
+        try:
+            result = await api_analyze_contract(contract_id, request, background_tasks)
+            queue.put_nowait(("result", result))
+        except HTTPException as e:
+            queue.put_nowait(("error", {"status": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            logger.error(f"Streaming analysis failed: {e}")
+            queue.put_nowait(("error", {"status": 500, "detail": str(e)}))
+        finally:
+            # Nach allen call_soon_threadsafe-Events einreihen
+            loop.call_soon(queue.put_nowait, (None, None))
+    
+    task = asyncio.create_task(run())
+    
+    async def events():
+        try:
+            while True:
+                event, data = await queue.get()
+                if event is None:
+                    break
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        finally:
+            await task
+    
+    return StreamingResponse(
+        events(), media_type="text/event-stream", background=background_tasks,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/v3/contracts/{contract_id}/analyze")
-async def api_analyze_contract(contract_id: str, request: Request):
+@traced("analyze")
+async def api_analyze_contract(contract_id: str, request: Request, background_tasks: BackgroundTasks):
     """Analysiert Vertrag - mit echter LLM-Analyse"""
     # LIMIT CHECK - Added by CFO Audit
     user = get_user_info(request)
     user_email = user.get("email")
+    enforce_rate_limit(_client_bucket(request, user, "analyze"), ANALYZE_RATE_LIMIT_PER_MINUTE)
     if user_email:
         from .usage_tracking import check_limit, track_event
         limit_check = check_limit(user_email, "analysis")
@@ -1075,55 +1172,121 @@ async def api_analyze_contract(contract_id: str, request: Request):
                 }
             )
     
-    # File finden
-    upload_dir = _get_upload_dir()
-    files = glob.glob(os.path.join(upload_dir, f"{contract_id}__*"))
-    
-    if not files:
-        # Auch altes Format prüfen
-        files = glob.glob(os.path.join(upload_dir, f"{contract_id}_*"))
+    # File aus der Registry
+    from .file_registry import resolve_upload
+    conn = _init_db()
+    file_path = resolve_upload(conn, contract_id, _get_upload_dir())
     
-    if not files:
+    if not file_path:
+        conn.close()
         raise HTTPException(status_code=404, detail="Contract not found")
     
-    file_path = Path(files[0])
-    
     # Contract Type aus DB oder Request
-    conn = _init_db()
     row = conn.execute("SELECT contract_type FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
     contract_type = row[0] if row else "general"
     
     # Body parsen falls vorhanden
+    premium = False
+    allow_reuse = True
     try:
         body = await request.json()
         if body.get("contract_type"):
             contract_type = body.get("contract_type")
+        premium = body.get("mode") == "premium"
+        allow_reuse = body.get("reuse", True) is not False
     except:
         pass
     
-    # Text extrahieren
+    from .metrics import current_tenant, ANALYSES_TOTAL
+    current_tenant.set(user_email or "web-frontend")
+    current_span().set_attribute("contract_id", contract_id)
+    current_span().set_attribute("contract_type", contract_type)
+    
+    # Text extrahieren (PDF, DOCX, TXT/RTF, HTML; Text-Store nach Datei-Hash)
+    from .extractors import load_sections, UnsupportedFormat
     try:
-        if file_path.suffix.lower() == ".pdf":
-            contract_text = extract_text_from_pdf(file_path)
-        else:
-            raise HTTPException(status_code=400, detail="Only PDF supported currently")
+        from starlette.concurrency import run_in_threadpool
+        with stage_timer("text_extract") as s:
+            # Thread statt Event-Loop: OCR-Fallback kann Sekunden dauern
+            sections = await run_in_threadpool(load_sections, contract_id, file_path)
+            contract_text = "\n".join(sec.text for sec in sections)
+            s.set_attribute("chars", len(contract_text))
         
         if not contract_text or len(contract_text.strip()) < 20:
             raise HTTPException(status_code=400, detail="Contract text too short or empty")
+    except HTTPException:
+        raise
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
     except Exception as e:
         logger.error(f"Text extraction failed: {e}")
         raise HTTPException(status_code=500, detail=f"Text extraction failed: {e}")
     
-    # LLM Analyse
+    # Klausel-Index (IDs + Offsets für Explain, Copilot und Highlighting)
+    from .clause_index import build_clause_index, locate_clause
+    try:
+        with stage_timer("clause_index") as s:
+            clauses = await run_in_threadpool(build_clause_index, contract_id, file_path, sections)
+            s.set_attribute("clauses", len(clauses))
+    except Exception as e:
+        logger.warning(f"Clause index failed for {contract_id}: {e}")
+        clauses = []
+    
+    # Nahezu gleiche, bereits per LLM analysierte Fassung: nur abweichende Klauseln prüfen
+    # (Premium verlangt ausdrücklich eine vollständige LLM-Analyse)
+    reuse = None
+    if allow_reuse and not premium:
+        from .near_duplicates import find_reusable_analysis, merge_analysis
+        try:
+            with stage_timer("near_duplicate") as s:
+                reuse = await run_in_threadpool(find_reusable_analysis, contract_id, contract_type, file_path, _get_upload_dir())
+                s.set_attribute("reused", bool(reuse))
+        except Exception as e:
+            logger.warning(f"Near-duplicate lookup failed for {contract_id}: {e}")
+    analysis_text = contract_text
+    if reuse:
+        analysis_text = reuse["recheck_text"]
+        if analysis_text:
+            analysis_text = "[Auszug: nur die gegenüber einer bereits geprüften Fassung geänderten Klauseln]\n\n" + analysis_text
+    
+    # Regelbasiertes Pre-Screening, LLM nur bei Premium oder geringer Confidence
     start_time = time.time()
     
     try:
-        # Alle 8 Vertragstypen mit spezifischen Prompts
-        from .prompts import get_prompt_for_type
-        from .llm_client import call_llm_analysis
+        from .prescreen import prescreen_contract, needs_llm
+        prescreen = None
+        prompt_version = None
+        model_route = None
+        if analysis_text:
+            try:
+                with stage_timer("prescreen"):
+                    prescreen = prescreen_contract(contract_type, analysis_text)
+            except Exception as e:
+                logger.warning(f"Prescreen failed: {e}")
+        
+        if not analysis_text:
+            raw_result = None
+            analysis_source = "near_duplicate"
+        elif reuse or needs_llm(prescreen, premium):
+            # Teil-Prüfung einer LLM-Quelle ebenfalls per LLM, damit das Ergebnis einheitlich bleibt
+            # Modell, max_tokens und Aufteilung nach Länge, Vertragstyp und Plan
+            from .model_router import analyze_routed
+            
+            # Thread statt Event-Loop: die Antwort wird gestreamt, Teilergebnisse gehen an den SSE-Endpunkt
+            raw_result, model_route = await run_in_threadpool(
+                analyze_routed, contract_type, analysis_text, contract_id, user_email, _analysis_events.get()
+            )
+            prompt_version = model_route["prompt_version"]
+            analysis_source = "llm"
+        else:
+            raw_result = prescreen
+            analysis_source = "prescreen"
         
-        system_prompt, user_prompt = get_prompt_for_type(contract_type, contract_text)
-        raw_result = call_llm_analysis(system_prompt, user_prompt)
+        # Herkunft der Quelle bleibt erhalten; near_duplicate_of zeigt auf die Ursprungsfassung
+        metric_source = analysis_source if not reuse else "near_duplicate"
+        if reuse:
+            raw_result = merge_analysis(reuse, raw_result)
+            analysis_source = reuse["source_type"]
         
         processing_time = time.time() - start_time
         
@@ -1137,6 +1300,17 @@ async def api_analyze_contract(contract_id: str, request: Request):
             "fields_extracted": len([v for v in raw_result.get("extracted_fields", {}).values() if v is not None]),
             "fields_total": len(raw_result.get("extracted_fields", {})) or 14,
             "extracted_data": raw_result.get("extracted_fields", {}),
+            "analysis_source": analysis_source,
+            "near_duplicate_of": reuse["origin_id"] if reuse else None,
+            "prompt_version": prompt_version,
+            "model_route": {k: v for k, v in model_route.items() if k != "prompt_version"} if model_route else None,
+            "prescreen_confidence": prescreen["confidence"] if prescreen else None,
+            "reused_from": {
+                "contract_id": reuse["source_id"],
+                "source_type": reuse["source_type"],
+                "similarity": reuse["similarity"],
+                "rechecked_clauses": reuse["rechecked_clauses"],
+            } if reuse else None,
             "risk_assessment": {
                 "overall_risk_level": raw_result.get("overall_risk_level", "medium"),
                 "overall_risk_score": raw_result.get("overall_risk_score", 50),
@@ -1149,75 +1323,193 @@ async def api_analyze_contract(contract_id: str, request: Request):
         }
         
         # Transform risk_flags to expected format
-        for risk_list in ["critical_risks", "high_risks", "medium_risks", "low_risks"]:
-            for risk in result["risk_assessment"].get(risk_list, []):
-                risk["issü_title"] = risk.get("title", "Risiko")
-                risk["issü_description"] = risk.get("description", "")
-                risk["risk_level"] = risk.get("severity", "medium")
-                risk["legal_basis"] = risk.get("policy_reference", "BGB")
-                risk["clause_text"] = risk.get("clause_snippet", "")
-                risk["recommendation"] = "Bitte prüfen Sie diese Klausel."
+        with stage_timer("risk_transform"):
+            for risk_list in ["critical_risks", "high_risks", "medium_risks", "low_risks"]:
+                for risk in result["risk_assessment"].get(risk_list, []):
+                    risk["issü_title"] = risk.get("title", "Risiko")
+                    risk["issü_description"] = risk.get("description", "")
+                    risk["risk_level"] = risk.get("severity", "medium")
+                    risk["legal_basis"] = risk.get("policy_reference", "BGB")
+                    risk["clause_text"] = risk.get("clause_snippet", "")
+                    risk["clause_id"] = locate_clause(clauses, contract_text, risk["clause_text"])
+                    risk["recommendation"] = "Bitte prüfen Sie diese Klausel."
+        
+        # Compliance gegen Enterprise-Standards (kompilierte Regeln)
+        from .compliance_rules import evaluate_compliance
+        with stage_timer("compliance"):
+            result["compliance"] = evaluate_compliance(contract_type, result["extracted_data"])
         
         # In DB speichern
+        analysis_json = json.dumps(result, ensure_ascii=False)
         try:
-            conn.execute(
-                "UPDATE contracts SET status = ?, risk_level = ?, risk_score = ? WHERE contract_id = ?",
-                ("analyzed", result["risk_assessment"]["overall_risk_level"], result["risk_assessment"]["overall_risk_score"], contract_id)
-            )
-            conn.execute(
-                "INSERT OR REPLACE INTO analysis_results (contract_id, analysis_json, created_at) VALUES (?, ?, ?)",
-                (contract_id, json.dumps(result, ensure_ascii=False), datetime.utcnow().isoformat())
-            )
-            conn.commit()
+            with stage_timer("db_write"):
+                conn.execute(
+                    "UPDATE contracts SET status = ?, risk_level = ?, risk_score = ? WHERE contract_id = ?",
+                    ("analyzed", result["risk_assessment"]["overall_risk_level"], result["risk_assessment"]["overall_risk_score"], contract_id)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_results (contract_id, analysis_json, created_at) VALUES (?, ?, ?)",
+                    (contract_id, analysis_json, datetime.utcnow().isoformat())
+                )
+                # Typisierte Felder für das Batch-Scoring
+                from .batch_scoring import upsert_contract_fields
+                upsert_contract_fields(conn, contract_id, contract_type, result["extracted_data"])
+                # Nutzungszähler der Klausel-Bibliothek (Delta zur vorherigen Analyse)
+                if clauses:
+                    from .clause_library import record_contract_usage
+                    try:
+                        record_contract_usage(conn, contract_id, clauses, contract_text)
+                    except Exception as e:
+                        logger.warning(f"Clause library matching failed for {contract_id}: {e}")
+                conn.commit()
         finally:
             conn.close()
         
-        logger.info(f"Analysis completed: {contract_id} in {processing_time:.2f}s")
+        from .analysis_cache import invalidate_contract
+        invalidate_contract(contract_id)
+
+        # PDF-Report vorrendern, damit der erste Download aus dem Cache kommt
+        from .report_cache import prewarm_report
+        background_tasks.add_task(prewarm_report, contract_id, analysis_json)
+
+        # Analyse-Log + Risiko-Fakten für Dashboard-Aggregationen
+        log_analysis_event(
+            contract_id=contract_id,
+            tenant_id=user_email or "web-frontend",
+            contract_type=contract_type,
+            status="success",
+            duration_ms=int(processing_time * 1000),
+            llm_model=model_route["model"] if model_route else "prescreen",
+            risk_flags=raw_result.get("risk_flags", []),
+        )
+
+        current_span().set_attribute("analysis_source", metric_source)
+        logger.info(f"Analysis completed: {contract_id} in {processing_time:.2f}s ({metric_source}, trace {current_trace_id()})")
+        ANALYSES_TOTAL.inc(contract_type=contract_type, source=metric_source, status="success")
         
         return result
         
     except LLMError as e:
         logger.error(f"LLM error: {e}")
+        ANALYSES_TOTAL.inc(contract_type=contract_type, source="llm", status="llm_error")
         raise HTTPException(status_code=502, detail=f"Analysis failed: {e}")
     except Exception as e:
         logger.error(f"Analysis error: {e}")
+        ANALYSES_TOTAL.inc(contract_type=contract_type, source="unknown", status="error")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {e}")
 
-@app.get("/api/v3/contracts/{contract_id}")
-async def api_get_contract(contract_id: str):
-    """Einzelnen Vertrag abrufen"""
+@app.post("/api/v3/contracts/{contract_id}/prescreen")
+async def api_prescreen_contract(contract_id: str):
+    """Sofortige regelbasierte Vorab-Analyse (ohne LLM, wird nicht gespeichert)"""
+    from .file_registry import resolve_upload
+    from .prescreen import prescreen_contract, needs_llm
+    
     conn = _init_db()
     try:
-        meta = conn.execute(
-            "SELECT contract_id, filename, contract_type, created_at, status, risk_level, risk_score FROM contracts WHERE contract_id = ?",
-            (contract_id,)
-        ).fetchone()
-        
-        analysis = conn.execute(
-            "SELECT analysis_json FROM analysis_results WHERE contract_id = ?",
-            (contract_id,)
-        ).fetchone()
+        file_path = resolve_upload(conn, contract_id, _get_upload_dir())
+        row = conn.execute("SELECT contract_type FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
     finally:
         conn.close()
     
-    if not meta:
+    if not file_path:
+        raise HTTPException(status_code=404, detail="Contract not found")
+    
+    from .extractors import load_contract_text, UnsupportedFormat
+    from starlette.concurrency import run_in_threadpool
+    contract_type = row[0] if row else "general"
+    try:
+        contract_text = await run_in_threadpool(load_contract_text, contract_id, file_path)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    prescreen = prescreen_contract(contract_type, contract_text)
+    
+    return {
+        "contract_id": contract_id,
+        "contract_type": contract_type,
+        "status": "preliminary",
+        "llm_recommended": needs_llm(prescreen),
+        **prescreen,
+    }
+
+@app.get("/api/v3/contracts/{contract_id}")
+async def api_get_contract(contract_id: str, request: Request):
+    """Einzelnen Vertrag abrufen (gecacht, mit ETag)"""
+    from .analysis_cache import get_contract_view, etag_matches
+    entry = get_contract_view(contract_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Contract not found")
     
+    cache_headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=cache_headers)
+    
+    meta = entry.meta
     result = {
-        "contract_id": meta[0],
-        "id": meta[0],
-        "filename": meta[1],
-        "contract_type": meta[2],
-        "created_at": meta[3],
-        "status": meta[4],
-        "risk_level": meta[5],
-        "risk_score": meta[6],
+        "contract_id": meta["contract_id"],
+        "id": meta["contract_id"],
+        "filename": meta["filename"],
+        "contract_type": meta["contract_type"],
+        "created_at": meta["created_at"],
+        "status": meta["status"],
+        "risk_level": meta["risk_level"],
+        "risk_score": meta["risk_score"],
     }
     
-    if analysis and analysis[0]:
-        result["analysis"] = json.loads(analysis[0])
+    if entry.analysis is not None:
+        result["analysis"] = entry.analysis
     
-    return result
+    return JSONResponse(result, headers=cache_headers)
+
+@app.delete("/api/v3/contracts/{contract_id}")
+async def api_delete_contract(contract_id: str, request: Request):
+    """Vertrag inkl. Analyse, Datei und Caches löschen (Admins oder Eigentümer)"""
+    from .file_registry import resolve_upload
+    from .report_cache import invalidate_reports
+    from .analysis_cache import invalidate_contract
+    
+    user = get_user_info(request)
+    conn = _init_db()
+    try:
+        row = conn.execute("SELECT file_sha256, owner_email FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Contract not found")
+        if not user.get("is_admin") and not (user.get("email") and user["email"] == row[1]):
+            raise HTTPException(status_code=403, detail="Nur für Admins oder den Eigentümer")
+        file_path = resolve_upload(conn, contract_id, _get_upload_dir())
+        sha256 = row[0]
+        conn.execute("DELETE FROM contracts WHERE contract_id = ?", (contract_id,))
+        conn.execute("DELETE FROM analysis_results WHERE contract_id = ?", (contract_id,))
+        # Extrahierter Text und Klausel-Index nur, wenn kein anderer Vertrag dieselbe Datei hat
+        if sha256:
+            for table in ("contract_texts", "contract_clauses"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE file_sha256 = ? "
+                    "AND NOT EXISTS (SELECT 1 FROM contracts WHERE file_sha256 = ?)",
+                    (sha256, sha256)
+                )
+            from .contract_compare import invalidate_file
+            from .near_duplicates import remove_file
+            invalidate_file(conn, sha256)
+            remove_file(conn, sha256)
+        from .clause_library import remove_contract_usage
+        remove_contract_usage(conn, contract_id)
+        conn.execute("DELETE FROM contract_fields WHERE contract_id = ?", (contract_id,))
+        # Risiko-Fakten liegen in der Log-DB (analysis.sqlite); vor dem Commit, damit ein Fehler nichts halb löscht
+        from .logging_service import delete_risk_flag_facts
+        delete_risk_flag_facts(contract_id)
+        conn.commit()
+    finally:
+        conn.close()
+    
+    invalidate_contract(contract_id)
+    invalidate_reports(contract_id)
+    if file_path:
+        try:
+            file_path.unlink()
+        except OSError as e:
+            logger.warning(f"Could not remove upload {file_path}: {e}")
+    
+    return {"contract_id": contract_id, "deleted": True}
 
 @app.get("/api/v3/contracts/{contract_id}/export/json")
 async def api_export_json(contract_id: str):
@@ -1238,36 +1530,101 @@ async def api_export_json(contract_id: str):
     )
 
 @app.get("/api/v3/contracts/{contract_id}/export/pdf")
-async def api_export_pdf(contract_id: str):
-    """Export als professionelles PDF mit SBS-Branding"""
-    from .pdf_report import generate_contract_pdf
+async def api_export_pdf(contract_id: str, request: Request):
+    """Export als professionelles PDF mit SBS-Branding (aus dem Report-Cache)"""
+    from .report_cache import report_etag, get_cached_report, build_report
+    from .analysis_cache import etag_matches
     
     conn = _init_db()
     try:
-        row = conn.execute("SELECT analysis_json FROM analysis_results WHERE contract_id = ?", (contract_id,)).fetchone()
+        row = conn.execute(
+            "SELECT ar.analysis_json, c.filename FROM analysis_results ar "
+            "LEFT JOIN contracts c ON c.contract_id = ar.contract_id WHERE ar.contract_id = ?",
+            (contract_id,)
+        ).fetchone()
     finally:
         conn.close()
     
     if not row:
         raise HTTPException(status_code=404, detail="No analysis found")
     
-    analysis = json.loads(row[0])
+    analysis_json, filename = row
+    etag = report_etag(contract_id, analysis_json)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
     
     try:
-        pdf_bytes = generate_contract_pdf(analysis)
-        
-        filename = analysis.get("source_filename", "contract")
-        if filename.endswith(".pdf"):
-            filename = filename[:-4]
-        
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}_analyse.pdf"}
-        )
+        report_path = get_cached_report(contract_id, analysis_json)
+        from .metrics import record_cache
+        record_cache("report", report_path is not None)
+        if report_path is None:
+            from starlette.concurrency import run_in_threadpool
+            report_path = await run_in_threadpool(build_report, contract_id, analysis_json)
     except Exception as e:
         logger.error(f"PDF generation failed: {e}")
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {e}")
+    
+    filename = filename or "contract"
+    if filename.endswith(".pdf"):
+        filename = filename[:-4]
+    
+    return FileResponse(
+        report_path,
+        media_type="application/pdf",
+        filename=f"{filename}_analyse.pdf",
+        headers={"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"},
+    )
+
+# ============================================================================
+# PORTFOLIO EXPORT JOBS
+# ============================================================================
+
+@app.post("/api/v3/exports")
+async def api_create_export(request: Request):
+    """Startet einen Portfolio-Export (csv, xlsx, jsonl, zip) im Hintergrund"""
+    from .export_jobs import create_export_job, EXPORT_FORMATS
+    
+    data = await request.json()
+    fmt = data.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    
+    user = get_user_info(request)
+    user_email = user["email"] or "web-frontend"
+    job = create_export_job(user_email, fmt, contract_type=data.get("contract_type"))
+    
+    try:
+        from .usage_tracking import track_event
+        track_event(user_email, "export", job["job_id"], {"format": fmt})
+    except Exception as e:
+        logger.warning(f"Usage tracking failed: {e}")
+    
+    return JSONResponse(job, status_code=202)
+
+@app.get("/api/v3/exports")
+async def api_list_exports(request: Request, limit: int = 20):
+    """Export-Jobs des aktuellen Users"""
+    from .export_jobs import list_export_jobs
+    user = get_user_info(request)
+    return {"jobs": list_export_jobs(user["email"] or None, limit=min(limit, 100))}
+
+@app.get("/api/v3/exports/{job_id}")
+async def api_get_export(job_id: str):
+    """Status und Fortschritt eines Export-Jobs"""
+    from .export_jobs import get_export_job
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+@app.get("/api/v3/exports/{job_id}/download")
+async def api_download_export(job_id: str):
+    """Download eines fertigen Export-Artefakts"""
+    from .export_jobs import get_artifact
+    artifact = get_artifact(job_id)
+    if not artifact:
+        raise HTTPException(status_code=404, detail="Export not available (not finished or expired)")
+    return FileResponse(artifact["path"], media_type=artifact["media_type"], filename=artifact["filename"])
 
 @app.get("/api/v3/dashboard/summary")
 async def api_dashboard_summary():
@@ -1288,89 +1645,215 @@ async def api_dashboard_summary():
         "avg_risk_score": round(avg_score or 0),
     }
 
+async def _contract_clauses(contract_id: str):
+    """Klausel-Index + Vertragstext; baut den Index bei Altbeständen nach."""
+    from starlette.concurrency import run_in_threadpool
+    from .file_registry import resolve_upload
+    from .extractors import load_contract_text, UnsupportedFormat
+    from .clause_index import build_clause_index
+    
+    conn = _init_db()
+    try:
+        file_path = resolve_upload(conn, contract_id, _get_upload_dir())
+    finally:
+        conn.close()
+    if not file_path:
+        raise HTTPException(status_code=404, detail="Contract not found")
+    try:
+        text = await run_in_threadpool(load_contract_text, contract_id, file_path)
+        clauses = await run_in_threadpool(build_clause_index, contract_id, file_path)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return clauses, text
+
+
+async def _load_indexed_clause(contract_id: str, clause_id: str) -> dict:
+    from .clause_index import clause_to_dict
+    clauses, text = await _contract_clauses(contract_id)
+    for clause in clauses:
+        if clause.clause_id == clause_id:
+            return clause_to_dict(clause, text)
+    raise HTTPException(status_code=404, detail="Clause not found")
+
+
+@app.get("/api/v3/contracts/{contract_id}/clauses")
+async def api_contract_clauses(contract_id: str):
+    """Klausel-Index eines Vertrags (ohne Text; Offsets beziehen sich auf den extrahierten Text)"""
+    from .clause_index import clause_to_dict
+    clauses, _ = await _contract_clauses(contract_id)
+    return {"contract_id": contract_id, "clauses": [clause_to_dict(c) for c in clauses]}
+
+
+@app.get("/api/v3/contracts/{contract_id}/clauses/{clause_id}")
+async def api_contract_clause(contract_id: str, clause_id: str):
+    """Einzelne Klausel inkl. Text"""
+    return {"contract_id": contract_id, **await _load_indexed_clause(contract_id, clause_id)}
+
+
+@app.get("/api/v3/contracts/{contract_id}/similar")
+async def api_similar_contracts(contract_id: str, threshold: float = 0.5, limit: int = 20):
+    """Nahezu gleiche Verträge (MinHash-LSH über den Vertragstext)"""
+    from starlette.concurrency import run_in_threadpool
+    from .near_duplicates import find_similar, index_contract
+    from .file_registry import resolve_upload
+    
+    result = find_similar(contract_id, threshold, limit)
+    if result is None:
+        # Noch nicht indexiert (Altbestand oder Upload-Task läuft noch)
+        conn = _init_db()
+        try:
+            file_path = resolve_upload(conn, contract_id, _get_upload_dir())
+        finally:
+            conn.close()
+        if not file_path:
+            raise HTTPException(status_code=404, detail="Contract not found")
+        await run_in_threadpool(index_contract, contract_id, file_path)
+        result = find_similar(contract_id, threshold, limit)
+        if result is None:
+            raise HTTPException(status_code=422, detail="Kein auswertbarer Text für den Ähnlichkeitsvergleich")
+    return result
+
+
+@app.get("/api/v3/near-duplicates/groups")
+async def api_near_duplicate_groups(threshold: float = 0.8):
+    """Gruppen nahezu gleicher Verträge im Portfolio"""
+    from starlette.concurrency import run_in_threadpool
+    from .near_duplicates import near_duplicate_groups
+    groups = await run_in_threadpool(near_duplicate_groups, threshold)
+    return {"groups": groups, "total": len(groups)}
+
+
+@app.get("/api/v3/library/clauses")
+async def api_list_library_clauses(q: str = "", type: str = "", page: int = 1, per_page: int = 20):
+    """Klausel-Bibliothek durchsuchen (FTS, paginiert, nach Nutzung sortiert)"""
+    from starlette.concurrency import run_in_threadpool
+    from .clause_library import list_clauses
+    return await run_in_threadpool(list_clauses, q or None, type or None, page, per_page)
+
+
+@app.get("/api/v3/library/clauses/{clause_id}")
+async def api_get_library_clause(clause_id: int):
+    """Bibliotheksklausel inkl. Verträgen, in denen sie vorkommt"""
+    from .clause_library import get_library_clause
+    clause = get_library_clause(clause_id)
+    if not clause:
+        raise HTTPException(status_code=404, detail="Klausel nicht gefunden")
+    return clause
+
+
+@app.post("/api/v3/library/clauses")
+async def api_create_library_clause(request: Request):
+    """Eigene Klausel anlegen"""
+    from .clause_library import create_clause, CATEGORIES
+    user = get_user_info(request)
+    body = await request.json()
+    name, text = (body.get("name") or "").strip(), (body.get("text") or "").strip()
+    if not name or not text:
+        raise HTTPException(status_code=400, detail="name und text sind erforderlich")
+    contract_type = body.get("contract_type") or "general"
+    if contract_type not in CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"Unbekannter Vertragstyp: {contract_type}")
+    risk = body.get("risk") or "low"
+    if risk not in ("low", "medium", "high", "critical"):
+        raise HTTPException(status_code=400, detail=f"Unbekannte Risikostufe: {risk}")
+    clause_id = create_clause(
+        name, text, contract_type, risk, body.get("explanation"), body.get("laws") or [], user.get("email")
+    )
+    return {"id": clause_id, "name": name}
+
+
+@app.get("/api/v3/compare")
+async def api_compare_contracts(a: str, b: str, llm: bool = False):
+    """Klausel-, Feld- und Risikovergleich zweier Verträge (A = Basis, B = neue Fassung)"""
+    from starlette.concurrency import run_in_threadpool
+    from .contract_compare import compare_contracts
+    from .extractors import UnsupportedFormat
+    
+    if a == b:
+        raise HTTPException(status_code=400, detail="Bitte zwei verschiedene Verträge wählen")
+    try:
+        result = await run_in_threadpool(compare_contracts, a, b, _get_upload_dir(), llm)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Contract not found")
+    return result
+
+
 @app.post("/api/v3/clause/explain")
 async def api_explain_clause(request: Request):
-    """Erklärt eine Vertragsklausel mit echtem LLM"""
+    """Erklärt eine Vertragsklausel mit echtem LLM (Cache pro Klausel-Hash und Vertragstyp)"""
     try:
         body = await request.json()
         clause_text = body.get("clause_text", "")
-        contract_type = body.get("contract_type", "general")
+        contract_type = body.get("contract_type")
     except:
         raise HTTPException(status_code=400, detail="Invalid request body")
     
+    # Alternativ per Index: contract_id + clause_id statt Freitext
+    if not clause_text and body.get("contract_id") and body.get("clause_id"):
+        clause = await _load_indexed_clause(body["contract_id"], body["clause_id"])
+        clause_text = clause["text"]
+        contract_type = contract_type or _contract_type_of(body["contract_id"])
+    
     if not clause_text:
         raise HTTPException(status_code=400, detail="clause_text required")
     
-    # Echte LLM-Analyse
+    from .clause_explain import explain_clauses
+    return (await explain_clauses([clause_text], contract_type or "general"))[0]
+
+
+def _contract_type_of(contract_id: str) -> Optional[str]:
+    conn = _init_db()
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        type_names = {
-            "employment": "Arbeitsvertrag",
-            "saas": "SaaS-Vertrag", 
-            "vendor": "Lieferantenvertrag",
-            "nda": "Geheimhaltungsvereinbarung",
-            "service": "Dienstleistungsvertrag",
-            "rental": "Mietvertrag",
-            "purchase": "Kaufvertrag",
-            "general": "Vertrag"
-        }
-        type_name = type_names.get(contract_type, "Vertrag")
-        
-        prompt = f"""Analysiere diese Vertragsklausel aus einem {type_name} nach deutschem Recht.
+        row = conn.execute("SELECT contract_type FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
 
-KLAUSEL:
-"{clause_text}"
 
-Antworte NUR mit validem JSON ohne Markdown-Formatierung:
-{{"risk_level": "low oder medium oder high oder critical", "explanation": "Was bedeutet diese Klausel konkret für den Vertragspartner? (2-3 Saetze, verstaendlich)", "legal_assessment": "Rechtliche Einschaetzung nach deutschem Recht - ist die Klausel wirksam? Gibt es Risiken? (2-3 Saetze)", "related_laws": ["Liste der relevanten Paragraphen, z.B. BGB 307, ArbZG 3"], "recommendations": ["Konkrete Handlungsempfehlung 1", "Konkrete Handlungsempfehlung 2"]}}"""
+@app.post("/api/v3/clause/explain/batch")
+async def api_explain_clauses_batch(request: Request):
+    """
+    Mehrere Klauseln in einem Aufruf erklären.
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Du bist ein erfahrener deutscher Rechtsanwalt. Antworte nur mit validem JSON, keine Markdown-Backticks."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # JSON extrahieren falls mit Backticks
-        if "```" in result_text:
-            parts = result_text.split("```")
-            for part in parts:
-                if "{" in part and "}" in part:
-                    result_text = part.strip()
-                    if result_text.startswith("json"):
-                        result_text = result_text[4:].strip()
-                    break
-        
-        result = json.loads(result_text)
-        result["clause_text"] = clause_text
-        return result
-        
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON parse error in clause explain: {e}")
-        return {
-            "clause_text": clause_text,
-            "risk_level": "medium",
-            "explanation": "Die automatische Analyse konnte das Ergebnis nicht verarbeiten.",
-            "legal_assessment": "Bitte lassen Sie diese Klausel von einem Rechtsanwalt pruefen.",
-            "related_laws": ["BGB"],
-            "recommendations": ["Rechtliche Beratung einholen"]
-        }
-    except Exception as e:
-        logger.error(f"Clause explain error: {e}")
-        return {
-            "clause_text": clause_text,
-            "risk_level": "medium",
-            "explanation": "Die automatische Analyse ist fehlgeschlagen.",
-            "legal_assessment": "Bitte lassen Sie diese Klausel von einem Rechtsanwalt pruefen.",
-            "related_laws": ["BGB"],
-            "recommendations": ["Rechtliche Beratung einholen"]
-        }
+    Body: {"clauses": [...], "contract_type": ...} oder
+    {"contract_id": ..., "clause_ids": [...]} (ohne clause_ids: alle Klauseln des Vertrags)
+    """
+    from .clause_explain import explain_clauses, EXPLAIN_MAX_CLAUSES
+    try:
+        body = await request.json()
+    except:
+        raise HTTPException(status_code=400, detail="Invalid request body")
+    
+    contract_type = body.get("contract_type")
+    clause_ids = None
+    if body.get("contract_id"):
+        clauses, text = await _contract_clauses(body["contract_id"])
+        by_id = {c.clause_id: c for c in clauses}
+        clause_ids = body.get("clause_ids") or list(by_id)
+        unknown = [cid for cid in clause_ids if cid not in by_id]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Clause not found: {', '.join(unknown[:5])}")
+        texts = [text[by_id[cid].start:by_id[cid].end].strip() for cid in clause_ids]
+        contract_type = contract_type or _contract_type_of(body["contract_id"])
+    else:
+        texts = [t for t in body.get("clauses") or [] if isinstance(t, str) and t.strip()]
+    
+    if not texts:
+        raise HTTPException(status_code=400, detail="clauses or contract_id required")
+    if len(texts) > EXPLAIN_MAX_CLAUSES:
+        raise HTTPException(status_code=413, detail=f"Maximal {EXPLAIN_MAX_CLAUSES} Klauseln pro Anfrage")
+    
+    explanations = await explain_clauses(texts, contract_type or "general")
+    if clause_ids:
+        for clause_id, explanation in zip(clause_ids, explanations):
+            explanation["clause_id"] = clause_id
+    return {
+        "contract_type": contract_type or "general",
+        "explanations": explanations,
+        "cached": sum(1 for e in explanations if e["cached"]),
+    }
 
 # ============================================================================
 # HEALTH & MISC
@@ -1401,7 +1884,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "error": exc.detail,
             "status_code": exc.status_code,
             "timestamp": datetime.utcnow().isoformat()
-        }
+        },
+        headers=getattr(exc, "headers", None),
     )
 
 # ============================================================================
@@ -1413,8 +1897,10 @@ async def startup():
     logger.info("Contract Intelligence API v0.3.1 starting...")
     logger.info(f"Upload directory: {UPLOAD_DIR.absolute()}")
     
-    # DB initialisieren
-    _init_db()
+    # Schema in einem Schritt (übersprungen, wenn der Fingerprint passt)
+    from .migrations import run_migrations
+    migration = run_migrations()
+    mark_startup(f"migrations ({migration['status']})")
     
     dummy_mode = os.getenv("CONTRACT_ANALYZER_DUMMY", "true").lower() == "true"
     if dummy_mode:
@@ -1425,12 +1911,23 @@ async def startup():
         else:
             logger.error("OPENAI_API_KEY not set")
     
-    logger.info(f"{len(API_KEYS)} API keys configured")
+    from .shared_state import seed_api_keys, DEPLOYMENT_MODE
+    seed_api_keys(API_KEYS)
+    logger.info(f"{len(API_KEYS)} API keys configured (deployment mode: {DEPLOYMENT_MODE})")
+    
+    # Wartende Export-Jobs übernehmen (atomarer Claim, daher in jedem Worker sicher)
+    from .export_jobs import resume_queued_exports
+    resume_queued_exports()
     logger.info("Enterprise Frontend loaded")
+    
+    mark_startup("startup_complete")
+    log_startup_profile()
 
 @app.on_event("shutdown")
 async def shutdown():
     logger.info("Contract Intelligence API shutting down...")
+    from .ocr import shutdown_pool
+    shutdown_pool()
 
 # ============================================================================
 # MAIN
@@ -1662,6 +2159,18 @@ EXTRAHIERTE DATEN:
 RISIKEN:
 {json.dumps(analysis.get('risk_assessment', {}).get('critical_risks', []) + analysis.get('risk_assessment', {}).get('high_risks', []), indent=2, ensure_ascii=False)}
 """
+            # Zur Frage passende Klauseln aus dem Index (ohne PDF neu zu parsen)
+            try:
+                from .clause_index import search_clauses
+                clauses, text = await _contract_clauses(contract_id)
+                relevant = search_clauses(clauses, text, message)
+            except Exception as e:
+                logger.warning(f"Copilot clause retrieval failed for {contract_id}: {e}")
+                relevant = []
+            if relevant:
+                context += "\nRELEVANTE KLAUSELN:\n" + "\n\n".join(
+                    f"[{c['clause_id']}] {c['heading']}\n{c['text'][:1500]}" for c in relevant
+                ) + "\n"
     
     # Alle Verträge als Übersicht wenn kein spezifischer ausgewählt
     if not contract_id:
@@ -1705,8 +2214,9 @@ Wenn du Risiken oder problematische Klauseln findest, weise klar darauf hin.
     
     try:
         async with httpx.AsyncClient(timeout=60) as client:
+            base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
             response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
+                f"{base_url}/chat/completions",
                 headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
                 json={"model": "gpt-4o-mini", "messages": messages, "temperature": 0.7, "max_tokens": 1500}
             )
@@ -1754,8 +2264,7 @@ async def copilot_contracts(request: Request):
 @app.get("/api/deadlines")
 async def get_deadlines(request: Request):
     """Holt kommende Vertragsfristen"""
-    from .deadline_alerts import get_upcoming_deadlines, init_alerts_table
-    init_alerts_table()
+    from .deadline_alerts import get_upcoming_deadlines
     deadlines = get_upcoming_deadlines(days_ahead=60)
     return {"deadlines": deadlines, "count": len(deadlines)}
 
@@ -1778,6 +2287,141 @@ async def run_alert_check(request: Request):
     run_daily_check()
     return {"success": True, "message": "Fristen-Check durchgeführt"}
 
+@app.post("/api/v3/admin/rescore")
+async def api_rescore_portfolio(request: Request, dry_run: bool = False):
+    """Portfolio-weites Re-Scoring nach Änderung der Schwellwerte (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from starlette.concurrency import run_in_threadpool
+    from .batch_scoring import rescore_portfolio
+    return await run_in_threadpool(rescore_portfolio, dry_run)
+
+@app.post("/api/v3/admin/library/rebuild-usage")
+async def api_rebuild_library_usage(request: Request):
+    """Klausel-Nutzung aller analysierten Verträge neu berechnen (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from starlette.concurrency import run_in_threadpool
+    from .clause_library import rebuild_usage
+    return await run_in_threadpool(rebuild_usage, _get_upload_dir())
+
+@app.get("/api/v3/admin/prompts")
+async def api_prompt_versions(request: Request, days: int = 30):
+    """Prompt-Versionen mit statischer Token-Zahl und Latenz/Kosten pro Version (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from .prompt_registry import registry_overview, version_stats, PROMPT_AB_PERCENT, PROMPT_AB_VARIANT
+    return {
+        "ab_test": {"variant": PROMPT_AB_VARIANT, "percent": PROMPT_AB_PERCENT},
+        "versions": registry_overview(),
+        "stats": version_stats(days),
+    }
+
+@app.get("/api/v3/admin/model-routes")
+async def api_model_routes(request: Request, days: int = 30):
+    """Routen-Konfiguration mit Aufrufen, Timeouts, Latenz und Kosten pro Route/Modell (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from .model_router import route_overview, route_stats, PLAN_MAX_CHUNKS
+    return {
+        "routes": route_overview(),
+        "plan_max_chunks": PLAN_MAX_CHUNKS,
+        "stats": route_stats(days),
+    }
+
+@app.get("/api/v3/admin/api-keys")
+async def api_list_api_keys(request: Request):
+    """API-Keys (maskiert) auflisten (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from .shared_state import list_api_keys
+    return {"api_keys": list_api_keys()}
+
+@app.post("/api/v3/admin/api-keys")
+async def api_create_api_key(request: Request):
+    """Neuen API-Key für einen Tenant erzeugen (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    body = await request.json()
+    tenant_id = (body.get("tenant_id") or "").strip()
+    if not tenant_id:
+        raise HTTPException(status_code=400, detail="tenant_id fehlt")
+    
+    import secrets
+    from .shared_state import register_api_key
+    api_key = f"sbs_{secrets.token_urlsafe(24)}"
+    register_api_key(api_key, tenant_id)
+    return {"api_key": api_key, "tenant_id": tenant_id}
+
+@app.delete("/api/v3/admin/api-keys/{api_key}")
+async def api_revoke_api_key(api_key: str, request: Request):
+    """API-Key widerrufen (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from .shared_state import revoke_api_key
+    if not revoke_api_key(api_key):
+        raise HTTPException(status_code=404, detail="API key not found")
+    return {"revoked": True}
+
+@app.get("/api/v3/admin/startup-profile")
+async def api_startup_profile(request: Request):
+    """Startphasen dieses Workers (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from .startup_profile import get_startup_profile
+    return get_startup_profile()
+
+@app.get("/api/v3/admin/traces")
+async def api_list_traces(request: Request, limit: int = 50, name: Optional[str] = None, min_ms: float = 0.0):
+    """Letzte Traces dieses Workers aus dem Ringpuffer (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from .tracing import list_traces
+    return {"traces": list_traces(limit=limit, name=name, min_ms=min_ms)}
+
+@app.get("/api/v3/admin/traces/{trace_id}")
+async def api_get_trace(trace_id: str, request: Request):
+    """Einzelner Trace mit allen Spans (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from .tracing import get_trace
+    trace = get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (evicted or other worker)")
+    return trace
+
+@app.get("/api/v3/admin/compliance/stats")
+async def api_compliance_stats(request: Request):
+    """Trefferzahlen und Laufzeit pro Compliance-Regel (Admin only)"""
+    user = get_user_info(request)
+    if not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Nur für Admins")
+    
+    from .compliance_rules import get_policy
+    policy = get_policy()
+    policy.ensure_current()
+    return {"rules_version": policy.version, "rules": policy.get_stats()}
+
 @app.get("/deadlines", response_class=HTMLResponse)
 async def deadlines_page(request: Request):
     """Fristen-Übersicht Seite"""
@@ -1796,8 +2440,7 @@ async def get_usage(request: Request):
     user = get_user_info(request)
     email = user.get("email", "anonymous")
     
-    from .usage_tracking import get_usage_with_limits, init_usage_tables
-    init_usage_tables()
+    from .usage_tracking import get_usage_with_limits
     
     data = get_usage_with_limits(email)
     return data
@@ -2136,42 +2779,9 @@ async def get_audit_logs(request: Request, limit: int = 50, offset: int = 0):
 
 @app.get("/metrics")
 async def prometheus_metrics():
-    """Prometheus-style metrics für Monitoring"""
-    import sqlite3
-    
-    conn = sqlite3.connect("/var/www/contract-app/data/contracts.db")
-    
-    # Zähle Verträge
-    contracts_total = conn.execute("SELECT COUNT(*) FROM contracts").fetchone()[0]
-    contracts_today = conn.execute(
-        "SELECT COUNT(*) FROM contracts WHERE date(created_at) = date('now')"
-    ).fetchone()[0]
-    
-    # Zähle User
-    users_total = conn.execute("SELECT COUNT(DISTINCT user_email) FROM user_settings").fetchone()[0]
-    
-    # Usage Stats
-    analyses_today = conn.execute(
-        "SELECT COUNT(*) FROM usage_events WHERE event_type='analysis' AND date(created_at) = date('now')"
-    ).fetchone()[0]
-    
-    conn.close()
-    
-    metrics_text = f"""# HELP sbs_contracts_total Total contracts analyzed
-# TYPE sbs_contracts_total counter
-sbs_contracts_total {contracts_total}
-
-# HELP sbs_contracts_today Contracts analyzed today
-# TYPE sbs_contracts_today gauge
-sbs_contracts_today {contracts_today}
-
-# HELP sbs_users_total Total registered users
-# TYPE sbs_users_total counter
-sbs_users_total {users_total}
-
-# HELP sbs_analyses_today Analyses performed today
-# TYPE sbs_analyses_today gauge
-sbs_analyses_today {analyses_today}
-"""
+    """Prometheus-Metriken aus den In-Memory-Registries (kein SQL)"""
     from fastapi.responses import PlainTextResponse
-    return PlainTextResponse(metrics_text, media_type="text/plain")
+    from .metrics import render_metrics
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+mark_startup("routes")
@@ -0,0 +1,379 @@
+"""
+Prometheus-Metriken aus In-Memory-Registries
+- Counter, Gauge, Histogram mit Labels (Text-Exposition 0.0.4, ohne SQL)
+- ASGI-Middleware: Latenz-Histogramm pro Route, In-Flight-Gauge
+- Stage-Timer für den Analyse-Pfad, Cache-Hit-Ratios, LLM-Token je Modell/Tenant
+- DEPLOYMENT_MODE=multi: Worker schreiben Snapshots nach METRICS_DIR,
+  /metrics summiert alle Worker
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from .tracing import span
+from .database import contracts_db_path
+
+DB_PATH = contracts_db_path()
+
+METRICS_MULTIPROCESS = os.getenv("DEPLOYMENT_MODE", "single").lower() == "multi"
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(os.path.dirname(DB_PATH), "metrics"))
+SNAPSHOT_INTERVAL = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "5"))
+# Snapshots beendeter Worker werden nach dieser Zeit ignoriert (Sekunden)
+SNAPSHOT_MAX_AGE = 3600
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Tenant der laufenden Anfrage (für LLM-Token-Zähler)
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default="unknown")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# ============================================================================
+# METRIK-TYPEN
+# ============================================================================
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"\x1f".join(k): self._copy(v) for k, v in self._values.items()}
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self, values: Dict[Tuple[str, ...], float]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in sorted(values.items())]
+
+    @staticmethod
+    def merge(a, b):
+        return a + b
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    render = Counter.render
+    merge = Counter.merge
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [Zähler je Bucket (nicht kumuliert) + Überlauf, Summe, Anzahl]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1], value[2]]
+
+    @staticmethod
+    def merge(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def render(self, values: Dict[Tuple[str, ...], list]) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._next_snapshot = 0.0
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    # -- Multi-Worker ---------------------------------------------------------
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(METRICS_DIR, f"worker_{pid}.json")
+
+    def write_snapshot(self):
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def maybe_write_snapshot(self):
+        """Schreibt höchstens alle SNAPSHOT_INTERVAL Sekunden (nur im Multi-Modus)."""
+        if not METRICS_MULTIPROCESS:
+            return
+        now = time.monotonic()
+        if now < self._next_snapshot:
+            return
+        self._next_snapshot = now + SNAPSHOT_INTERVAL
+        try:
+            self.write_snapshot()
+        except OSError:
+            pass
+
+    def _collect(self) -> Dict[str, Dict[Tuple[str, ...], object]]:
+        snapshots = [self.snapshot()]
+        if METRICS_MULTIPROCESS and os.path.isdir(METRICS_DIR):
+            own = os.path.basename(self._snapshot_path(os.getpid()))
+            cutoff = time.time() - SNAPSHOT_MAX_AGE
+            for entry in os.scandir(METRICS_DIR):
+                if entry.name == own or not entry.name.endswith(".json") or entry.stat().st_mtime < cutoff:
+                    continue
+                try:
+                    with open(entry.path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+
+        merged: Dict[str, Dict[Tuple[str, ...], object]] = {}
+        for snap in snapshots:
+            for name, values in snap.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                target = merged.setdefault(name, {})
+                for raw_key, value in values.items():
+                    key = tuple(raw_key.split("\x1f")) if metric.labelnames else ()
+                    target[key] = metric.merge(target[key], value) if key in target else value
+        return merged
+
+    def render(self) -> str:
+        merged = self._collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(merged.get(name, {})))
+        lines.extend(_render_cache_ratios(merged.get(CACHE_REQUESTS.name, {})))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "sbs_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "sbs_http_requests_in_flight", "HTTP requests currently being served", ("method",))
+STAGE_DURATION = REGISTRY.histogram(
+    "sbs_stage_duration_seconds", "Duration of analysis pipeline stages", ("stage",))
+ANALYSES_TOTAL = REGISTRY.counter(
+    "sbs_analyses_total", "Completed analyses", ("contract_type", "source", "status"))
+CONTRACTS_UPLOADED = REGISTRY.counter(
+    "sbs_contracts_uploaded_total", "Uploaded contracts")
+CACHE_REQUESTS = REGISTRY.counter(
+    "sbs_cache_requests_total", "Cache lookups by result", ("cache", "result"))
+LLM_TOKENS = REGISTRY.counter(
+    "sbs_llm_tokens_total", "LLM tokens by model, tenant and direction", ("model", "tenant", "direction"))
+LLM_REQUESTS = REGISTRY.counter(
+    "sbs_llm_requests_total", "LLM requests by model and outcome", ("model", "status"))
+PROMPT_LATENCY = REGISTRY.histogram(
+    "sbs_prompt_latency_seconds", "LLM latency by prompt version", ("prompt_version", "variant"))
+PROMPT_TOKENS = REGISTRY.counter(
+    "sbs_prompt_tokens_total", "LLM tokens by prompt version and direction", ("prompt_version", "variant", "direction"))
+ROUTE_LATENCY = REGISTRY.histogram(
+    "sbs_llm_route_latency_seconds", "Analysis latency by model route and model", ("route", "model"))
+ROUTE_COST = REGISTRY.counter(
+    "sbs_llm_route_cost_usd_total", "Estimated LLM cost in USD by model route and model", ("route", "model"))
+OCR_PAGES = REGISTRY.counter(
+    "sbs_ocr_pages_total", "Image-only pages by OCR outcome", ("result",))
+
+
+def _render_cache_ratios(values: Dict[Tuple[str, ...], float]) -> List[str]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), count in values.items():
+        entry = totals.setdefault(cache, [0.0, 0.0])
+        entry[0 if result == "hit" else 1] += count
+    lines = ["# HELP sbs_cache_hit_ratio Cache hit ratio since worker start",
+             "# TYPE sbs_cache_hit_ratio gauge"]
+    for cache, (hits, misses) in sorted(totals.items()):
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'sbs_cache_hit_ratio{{cache="{_escape(cache)}"}} {round(ratio, 4)}')
+    return lines
+
+
+# ============================================================================
+# HELFER
+# ============================================================================
+
+@contextmanager
+def stage_timer(stage: str, **attributes):
+    """
+    Histogramm + Tracing-Span für eine Pipeline-Stufe.
+
+        with stage_timer("llm_call", model="gpt-4o-mini") as s: ...
+    """
+    started = time.perf_counter()
+    with span(stage, **attributes) as s:
+        try:
+            yield s
+        finally:
+            STAGE_DURATION.observe(time.perf_counter() - started, stage=stage)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_llm_usage(model: str, input_tokens: Optional[int], output_tokens: Optional[int], status: str = "success"):
+    tenant = current_tenant.get()
+    LLM_REQUESTS.inc(model=model, status=status)
+    if input_tokens:
+        LLM_TOKENS.inc(input_tokens, model=model, tenant=tenant, direction="input")
+    if output_tokens:
+        LLM_TOKENS.inc(output_tokens, model=model, tenant=tenant, direction="output")
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+# ============================================================================
+# ASGI-MIDDLEWARE
+# ============================================================================
+
+class MetricsMiddleware:
+    """
+    Reine ASGI-Middleware (kein BaseHTTPMiddleware, kein Overhead durch Tasks).
+
+    Das Route-Label ist das Pfad-Template (z.B. /api/v3/contracts/{contract_id}),
+    unbekannte Pfade landen gesammelt unter "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, method=method, route=_route_template(scope), status=str(status["code"])
+            )
+            REGISTRY.maybe_write_snapshot()
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    path = scope.get("path", "")
+    if path.startswith("/static/"):
+        return "/static"
+    return "unmatched"
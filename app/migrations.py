@@ -0,0 +1,211 @@
+"""
+Schema-Setup in einem Schritt
+- Alle CREATE TABLE / ALTER TABLE der Module laufen hier statt beim Import
+- Stempel in schema_migrations: Fingerprint der Quelldateien aller Schritte;
+  ist er unverändert, laufen beim Worker-Start nur die EVERY_BOOT_STEPS
+- Dateisperre, damit bei mehreren Workern nur einer migriert
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import logging
+import importlib
+import importlib.util
+import threading
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# (Modul, Funktion, optional) – optionale Schritte dürfen fehlen (externe Module)
+MIGRATION_STEPS = [
+    ("app.migrations", "ensure_core_schema", False),
+    ("app.batch_scoring", "init_field_tables", False),
+    ("app.export_jobs", "init_export_tables", False),
+    ("app.extractors", "init_text_store", False),
+    ("app.clause_index", "init_clause_tables", False),
+    ("app.clause_library", "init_clause_library", False),
+    ("app.clause_explain", "init_explanation_tables", False),
+    ("app.prompt_registry", "init_prompt_tables", False),
+    ("app.model_router", "init_route_tables", False),
+    ("app.contract_compare", "init_comparison_tables", False),
+    ("app.near_duplicates", "init_signature_tables", False),
+    ("app.enterprise_features", "init_enterprise_tables", False),
+    ("app.usage_tracking", "init_usage_tables", False),
+    ("app.two_factor_auth", "init_2fa_tables", True),
+    ("app.deadline_alerts", "init_alerts_table", False),
+    ("multi_product_subscriptions", "init_product_subscriptions_table", True),
+]
+
+# Schritte außerhalb von contracts.db (CWD-relative analysis.sqlite): der Stempel
+# sagt über diese DB nichts aus, daher bei jedem Start (idempotent, billig)
+EVERY_BOOT_STEPS = [
+    ("app.logging_service", "setup_logging", False),
+]
+
+# Module, deren Schema-Code ein Schritt aufruft (ensure_core_schema ->
+# ensure_registry_columns); gehen mit in den Fingerprint
+FINGERPRINT_MODULES = [
+    "app.file_registry",
+]
+
+_done = False
+_lock = threading.Lock()
+
+
+def ensure_core_schema(conn=None):
+    """contracts + analysis_results inkl. Datei-Registry-Spalten und Eigentümer"""
+    own_conn = conn is None
+    if own_conn:
+        from app.database import contracts_db_path
+        conn = sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contracts (
+            contract_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            contract_type TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            status TEXT NOT NULL,
+            risk_level TEXT,
+            risk_score INTEGER
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_results (
+            contract_id TEXT PRIMARY KEY,
+            analysis_json TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    from .file_registry import ensure_registry_columns
+    ensure_registry_columns(conn)
+    # SSO-E-Mail des Hochladenden (Löschen nur durch Eigentümer oder Admins)
+    if "owner_email" not in {row[1] for row in conn.execute("PRAGMA table_info(contracts)")}:
+        conn.execute("ALTER TABLE contracts ADD COLUMN owner_email TEXT")
+    conn.commit()
+    if own_conn:
+        conn.close()
+
+
+def schema_fingerprint() -> str:
+    """Hash über die Quelltexte aller Schritte und FINGERPRINT_MODULES (ohne Import)."""
+    digest = hashlib.sha256()
+    entries = [(module, function) for module, function, _ in MIGRATION_STEPS]
+    entries += [(module, "") for module in FINGERPRINT_MODULES]
+    for module, function in entries:
+        try:
+            spec = importlib.util.find_spec(module)
+        except (ImportError, ValueError):
+            spec = None
+        digest.update(f"{module}.{function}".encode())
+        if spec and spec.origin and os.path.exists(spec.origin):
+            with open(spec.origin, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _read_stamp(conn) -> str:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            fingerprint TEXT NOT NULL,
+            applied_at TEXT NOT NULL,
+            duration_ms INTEGER
+        )
+    """)
+    row = conn.execute("SELECT fingerprint FROM schema_migrations WHERE id = 1").fetchone()
+    return row[0] if row else ""
+
+
+def _file_lock(path: str):
+    """Exklusive Sperre über eine Lock-Datei (No-op ohne fcntl)."""
+    handle = open(path, "a+")
+    try:
+        import fcntl
+        fcntl.flock(handle, fcntl.LOCK_EX)
+    except ImportError:
+        pass
+    return handle
+
+
+def run_migrations(force: bool = False) -> Dict:
+    """
+    Führt alle Schema-Schritte aus, falls sich der Fingerprint geändert hat.
+
+    Idempotent und pro Prozess nur einmal wirksam; MIGRATIONS_FORCE=true
+    erzwingt einen vollständigen Lauf.
+    """
+    global _done
+    if _done and not force:
+        return {"status": "cached"}
+
+    with _lock:
+        if _done and not force:
+            return {"status": "cached"}
+
+        force = force or os.getenv("MIGRATIONS_FORCE", "false").lower() == "true"
+        from app.database import contracts_db_path
+        db_path = contracts_db_path()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        fingerprint = schema_fingerprint()
+
+        lock = _file_lock(db_path + ".migrate.lock")
+        try:
+            conn = sqlite3.connect(db_path, timeout=30.0)
+            try:
+                boot_steps = _apply_steps(EVERY_BOOT_STEPS)
+                if not force and _read_stamp(conn) == fingerprint:
+                    _done = True
+                    return {"status": "up_to_date", "fingerprint": fingerprint, "steps": boot_steps}
+
+                started = time.perf_counter()
+                steps = boot_steps + _apply_steps(MIGRATION_STEPS)
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                conn.execute(
+                    "INSERT OR REPLACE INTO schema_migrations (id, fingerprint, applied_at, duration_ms) "
+                    "VALUES (1, ?, datetime('now'), ?)",
+                    (fingerprint, duration_ms)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        finally:
+            lock.close()
+
+        _done = True
+        logger.info(f"Schema migrated ({fingerprint}) in {duration_ms}ms")
+        return {"status": "migrated", "fingerprint": fingerprint, "duration_ms": duration_ms, "steps": steps}
+
+
+def _apply_steps(step_list) -> List[Dict]:
+    steps = []
+    for module_name, function, optional in step_list:
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+            getattr(module, function)()
+            status = "ok"
+        except ImportError as e:
+            if not optional:
+                raise
+            status = f"skipped ({e})"
+        except Exception as e:
+            if not optional:
+                raise
+            logger.warning(f"Optional migration {module_name}.{function} failed: {e}")
+            status = f"failed ({e})"
+        steps.append({
+            "step": f"{module_name}.{function}",
+            "status": status,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    return steps
+
+
+if __name__ == "__main__":
+    import json
+    logging.basicConfig(level=logging.INFO)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    print(json.dumps(run_migrations(force="--force" in sys.argv), indent=2))
@@ -0,0 +1,67 @@
+"""
+MinHash über Wort-Shingles
+- Shingles: k aufeinanderfolgende Wörter, CRC32 pro Wort zu einem k-Gramm-Hash kombiniert
+- Signatur: NUM_PERM Hashfunktionen (a*x + b) mod P, je Minimum über alle Shingles
+- Anteil gleicher Signatur-Positionen schätzt die Jaccard-Ähnlichkeit
+"""
+
+import zlib
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+NUM_PERM = 64
+SHINGLE_WORDS = 3
+
+# Primzahl knapp über 2^32; a < 2^31 hält a*x + b unter 2^64
+_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(20240601)  # fest: Signaturen müssen prozessübergreifend gleich sein
+_A = _rng.randint(1, 2**31 - 1, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_B = _rng.randint(0, 2**31 - 1, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+_GRAM_MULTIPLIER = np.uint64(1000003)
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+EMPTY_SIGNATURE = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+
+
+@lru_cache(maxsize=65536)
+def _word_hash(word: str) -> int:
+    return zlib.crc32(word.encode("utf-8"))
+
+
+def shingles(words: List[str], k: int = SHINGLE_WORDS) -> np.ndarray:
+    """32-Bit-Hashes der Wort-k-Gramme (kurze Texte: ein Shingle aus allen Wörtern)."""
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.fromiter((_word_hash(w) for w in words), dtype=np.uint64, count=len(words))
+    k = min(k, len(words))
+    # Polynom über die Wort-Hashes statt Hash pro Gramm-String (uint64 läuft bewusst über)
+    grams = hashes[:len(words) - k + 1].copy()
+    for offset in range(1, k):
+        grams = grams * _GRAM_MULTIPLIER + hashes[offset:len(words) - k + 1 + offset]
+    return np.unique(grams & _MASK32)
+
+
+def signature(hashes: np.ndarray) -> np.ndarray:
+    if not len(hashes):
+        return EMPTY_SIGNATURE.copy()
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def signatures(hash_sets: List[np.ndarray]) -> np.ndarray:
+    """Signatur-Matrix (len(hash_sets) x NUM_PERM)."""
+    if not hash_sets:
+        return np.empty((0, NUM_PERM), dtype=np.uint64)
+    return np.vstack([signature(h) for h in hash_sets])
+
+
+def similarity_matrix(sigs_a: np.ndarray, sigs_b: np.ndarray) -> np.ndarray:
+    """Geschätzte Jaccard-Ähnlichkeit aller Paare (len(a) x len(b))."""
+    result = np.zeros((len(sigs_a), len(sigs_b)))
+    # Blockweise, damit die Vergleichsmatrix bei langen Verträgen klein bleibt
+    for start in range(0, len(sigs_a), 128):
+        block = sigs_a[start:start + 128]
+        result[start:start + len(block)] = (block[:, None, :] == sigs_b[None, :, :]).mean(axis=2)
+    return result
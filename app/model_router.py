@@ -0,0 +1,384 @@
+"""
+Modell-Routing für die Vertragsanalyse
+- Route aus Token-Schätzung, Vertragstyp und Plan (usage_tracking.PLAN_LIMITS):
+  kurze NDAs/Kaufverträge und Free-Plan → "fast", Enterprise → "thorough",
+  sonst "standard"; pro Route Modell, max_tokens, Input-Budget und Zeitlimit
+- Längere Verträge: bei Plänen mit mehreren Abschnitten an Absatzgrenzen
+  geteilt, parallel analysiert und zusammengeführt, sonst gekürzt
+- Bei Timeout Ausweichen auf das nächste (günstigere/schnellere) Modell der Route
+- Latenz, Tokens und Kosten pro Aufruf in model_route_runs (Admin-Auswertung
+  pro Route und Modell)
+"""
+
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+import contextvars
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+Route = namedtuple("Route", ["name", "models", "max_tokens", "input_budget", "timeout"])
+RouteDecision = namedtuple("RouteDecision", ["route", "plan_id", "input_tokens", "chunking", "chunks"])
+
+FALLBACK_MODEL = os.getenv("ROUTER_FALLBACK_MODEL", "gpt-4.1-nano")
+
+# models: Primärmodell zuerst, danach die Ausweichmodelle bei Timeout
+ROUTES = {
+    "fast": Route(
+        "fast", (os.getenv("ROUTER_FAST_MODEL", "gpt-4o-mini"), FALLBACK_MODEL),
+        int(os.getenv("ROUTER_FAST_MAX_TOKENS", "1500")), 2500, float(os.getenv("ROUTER_FAST_TIMEOUT", "20")),
+    ),
+    "standard": Route(
+        "standard", (os.getenv("ROUTER_STANDARD_MODEL", "gpt-4o-mini"), FALLBACK_MODEL),
+        int(os.getenv("ROUTER_STANDARD_MAX_TOKENS", "3000")), 5000, float(os.getenv("ROUTER_STANDARD_TIMEOUT", "45")),
+    ),
+    "thorough": Route(
+        "thorough", (os.getenv("ROUTER_THOROUGH_MODEL", "gpt-4o"), "gpt-4o-mini"),
+        int(os.getenv("ROUTER_THOROUGH_MAX_TOKENS", "4000")), 12000, float(os.getenv("ROUTER_THOROUGH_TIMEOUT", "90")),
+    ),
+}
+
+# Kurze Verträge dieser Typen brauchen kein großes Modell
+FAST_TYPES = {"nda", "purchase", "general"}
+FAST_MAX_INPUT_TOKENS = int(os.getenv("ROUTER_FAST_MAX_INPUT_TOKENS", "2500"))
+
+# Maximale Anzahl Abschnitte pro Analyse; 1 = Text wird auf das Budget gekürzt
+PLAN_MAX_CHUNKS = {"free": 1, "starter": 2, "professional": 3, "enterprise": 6}
+CHUNK_CONCURRENCY = int(os.getenv("ROUTER_CHUNK_CONCURRENCY", "4"))
+
+# USD pro 1 Mio. Tokens: (Input, gecachter Input, Output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+
+SEVERITY_ORDER = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+
+
+def init_route_tables(conn=None):
+    """Messwerte pro LLM-Aufruf mit Route und Modell"""
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS model_route_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            route TEXT NOT NULL,
+            model TEXT NOT NULL,
+            plan_id TEXT,
+            contract_type TEXT,
+            chunk_index INTEGER DEFAULT 0,
+            fallback INTEGER DEFAULT 0,
+            status TEXT NOT NULL,
+            latency_ms INTEGER,
+            input_tokens INTEGER,
+            cached_tokens INTEGER,
+            output_tokens INTEGER,
+            cost_usd REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_model_route_runs_created ON model_route_runs(created_at)")
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def cost_usd(model: str, input_tokens: Optional[int], cached_tokens: Optional[int], output_tokens: Optional[int]) -> float:
+    price_in, price_cached, price_out = MODEL_PRICES.get(model, MODEL_PRICES["gpt-4o-mini"])
+    cached = cached_tokens or 0
+    uncached = max(0, (input_tokens or 0) - cached)
+    return (uncached * price_in + cached * price_cached + (output_tokens or 0) * price_out) / 1_000_000
+
+
+# ============================================================================
+# ROUTING
+# ============================================================================
+
+def plan_for(user_email: Optional[str]) -> str:
+    if not user_email:
+        return "free"
+    try:
+        from .usage_tracking import get_user_plan
+        return get_user_plan(user_email).get("plan_id", "free")
+    except Exception as e:
+        logger.warning(f"Plan lookup failed for {user_email}: {e}")
+        return "free"
+
+
+def choose_route(contract_type: str, text: str, plan_id: str = "free") -> RouteDecision:
+    from .prompt_registry import count_tokens
+
+    input_tokens, _ = count_tokens(text)
+    if input_tokens <= FAST_MAX_INPUT_TOKENS and (contract_type in FAST_TYPES or plan_id == "free"):
+        route = ROUTES["fast"]
+    elif plan_id == "enterprise":
+        route = ROUTES["thorough"]
+    elif plan_id == "free":
+        route = ROUTES["fast"]
+    else:
+        route = ROUTES["standard"]
+
+    needed = math.ceil(input_tokens / route.input_budget) if input_tokens else 1
+    max_chunks = PLAN_MAX_CHUNKS.get(plan_id, 1)
+    if needed <= 1:
+        return RouteDecision(route, plan_id, input_tokens, "single", 1)
+    if max_chunks > 1:
+        return RouteDecision(route, plan_id, input_tokens, "chunked", min(needed, max_chunks))
+    return RouteDecision(route, plan_id, input_tokens, "truncate", 1)
+
+
+def split_chunks(text: str, chunks: int, max_chars: int) -> List[str]:
+    """Teilt an Absatzgrenzen in höchstens chunks Abschnitte à max_chars; Überhang entfällt."""
+    target = min(max_chars, math.ceil(len(text) / chunks * 1.1))
+    parts, current = [], ""
+    for paragraph in text.split("\n\n"):
+        while len(paragraph) > max_chars:
+            parts.extend([current, paragraph[:max_chars]])
+            current = ""
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > target:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        parts.append(current)
+    return [p for p in parts if p.strip()][:chunks]
+
+
+def merge_results(results: List[Dict]) -> Dict:
+    """Felder: erster gefundener Wert; Risiken vereinigt; Score/Level: das höchste."""
+    merged = dict(results[0])
+    fields = dict(results[0].get("extracted_fields") or {})
+    flags, seen = [], set()
+    for result in results:
+        for key, value in (result.get("extracted_fields") or {}).items():
+            if fields.get(key) is None and value is not None:
+                fields[key] = value
+        for flag in result.get("risk_flags") or []:
+            key = (str(flag.get("title", "")).strip().lower(), flag.get("severity"))
+            if key not in seen:
+                seen.add(key)
+                flags.append(flag)
+    merged["extracted_fields"] = fields
+    merged["risk_flags"] = flags
+    scores = [r["overall_risk_score"] for r in results if isinstance(r.get("overall_risk_score"), (int, float))]
+    if scores:
+        merged["overall_risk_score"] = max(scores)
+    levels = [r.get("overall_risk_level") for r in results if r.get("overall_risk_level") in SEVERITY_ORDER]
+    if levels:
+        merged["overall_risk_level"] = max(levels, key=SEVERITY_ORDER.get)
+    return merged
+
+
+# ============================================================================
+# AUSFÜHRUNG
+# ============================================================================
+
+def _record(decision: RouteDecision, model: str, contract_type: str, chunk_index: int, fallback: bool,
+            latency_ms: int, stats: Dict):
+    from .metrics import ROUTE_LATENCY, ROUTE_COST
+
+    route = decision.route.name
+    cost = cost_usd(model, stats.get("input_tokens"), stats.get("cached_tokens"), stats.get("output_tokens"))
+    ROUTE_LATENCY.observe(latency_ms / 1000, route=route, model=model)
+    if cost:
+        ROUTE_COST.inc(cost, route=route, model=model)
+    try:
+        conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+        try:
+            conn.execute(
+                "INSERT INTO model_route_runs (route, model, plan_id, contract_type, chunk_index, fallback, status, "
+                "latency_ms, input_tokens, cached_tokens, output_tokens, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (route, model, decision.plan_id, contract_type, chunk_index, int(fallback), stats.get("status", "error"),
+                 latency_ms, stats.get("input_tokens"), stats.get("cached_tokens"), stats.get("output_tokens"), cost)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"Could not record route run: {e}")
+
+
+class _PartialRelay:
+    """
+    Leitet Teilergebnisse der Abschnitte weiter und merkt sich, was gesendet
+    wurde. Fällt ein Abschnitt auf ein anderes Modell zurück, geht "reset"
+    raus und die Ereignisse der übrigen Abschnitte werden erneut gesendet –
+    so sieht der Client keine doppelten Risiken aus dem abgebrochenen Versuch.
+    """
+
+    def __init__(self, on_partial: Callable):
+        self.on_partial = on_partial
+        self.sent: Dict[int, list] = {}
+        self.lock = threading.Lock()
+
+    def callback(self, index: int) -> Callable:
+        def forward(kind, key, value):
+            # Zusammenfassung und Felder nur aus dem ersten Abschnitt, Risiken aus allen
+            if index > 0 and kind != "item":
+                return
+            with self.lock:
+                self.sent.setdefault(index, []).append((kind, key, value))
+                self.on_partial(kind, key, value)
+        return forward
+
+    def reset(self, index: int):
+        with self.lock:
+            if not self.sent.pop(index, None):
+                return
+            self.on_partial("reset", None, None)
+            for events in self.sent.values():
+                for event in events:
+                    self.on_partial(*event)
+
+
+def _call_with_fallback(decision: RouteDecision, contract_type: str, prompt, system_prompt: str, user_prompt: str,
+                        chunk_index: int, relay: Optional[_PartialRelay]) -> Tuple[Dict, str]:
+    """(Ergebnis, verwendetes Modell); nur Timeouts führen zum nächsten Modell."""
+    from .llm_client import call_llm_analysis, LLMError, LLMTimeout
+
+    route = decision.route
+    on_partial = relay.callback(chunk_index) if relay else None
+    for position, model in enumerate(route.models):
+        last = position == len(route.models) - 1
+        stats: Dict = {}
+        started = time.perf_counter()
+        try:
+            result = call_llm_analysis(
+                system_prompt, user_prompt, prompt, on_partial, model=model, max_tokens=route.max_tokens,
+                timeout=None if last else route.timeout, stats=stats,
+            )
+            return result, model
+        except LLMTimeout:
+            stats.setdefault("status", "timeout")
+            if last:
+                raise
+            logger.warning(f"Route {route.name}: {model} timed out, falling back to {route.models[position + 1]}")
+            if relay:
+                relay.reset(chunk_index)
+        except LLMError:
+            stats.setdefault("status", "error")
+            raise
+        finally:
+            if stats:
+                _record(decision, model, contract_type, chunk_index, position > 0,
+                        int((time.perf_counter() - started) * 1000), stats)
+    raise LLMError(f"No model available for route {route.name}")
+
+
+def analyze_routed(contract_type: str, text: str, routing_key: Optional[str] = None, user_email: Optional[str] = None,
+                   on_partial: Optional[Callable] = None) -> Tuple[Dict, Dict]:
+    """
+    Analyse über die passende Route (blockierend, für run_in_threadpool).
+
+    Returns:
+        (Ergebnis, Routing-Info mit route, model, chunking, chunks, prompt_version)
+    """
+    from .prompt_registry import build_messages
+    from .metrics import stage_timer
+
+    decision = choose_route(contract_type, text, plan_for(user_email))
+    route = decision.route
+    # Zeichen-Budget aus dem Verhältnis Zeichen/Token dieses Textes
+    chars_per_token = len(text) / decision.input_tokens if decision.input_tokens else 4
+    max_chars = int(route.input_budget * chars_per_token)
+
+    with stage_timer("prompt_build", route=route.name, chunking=decision.chunking):
+        if decision.chunking == "chunked":
+            sections = split_chunks(text, decision.chunks, max_chars)
+            total = len(sections)
+            messages = [
+                build_messages(contract_type, f"[Teil {i + 1}/{total} des Vertrags]\n\n{section}", routing_key,
+                               max_chars=max_chars + 100)
+                for i, section in enumerate(sections)
+            ]
+        else:
+            messages = [build_messages(contract_type, text, routing_key, max_chars=max_chars)]
+
+    relay = _PartialRelay(on_partial) if on_partial else None
+    if len(messages) == 1:
+        prompt, system_prompt, user_prompt = messages[0]
+        outcomes = [_call_with_fallback(decision, contract_type, prompt, system_prompt, user_prompt, 0, relay)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(messages), CHUNK_CONCURRENCY)) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, _call_with_fallback, decision, contract_type,
+                            prompt, system_prompt, user_prompt, i, relay)
+                for i, (prompt, system_prompt, user_prompt) in enumerate(messages)
+            ]
+            outcomes = [f.result() for f in futures]
+
+    result = outcomes[0][0] if len(outcomes) == 1 else merge_results([r for r, _ in outcomes])
+    models = [m for _, m in outcomes]
+    return result, {
+        "route": route.name,
+        "model": max(set(models), key=models.count),
+        "fallback_used": any(m != route.models[0] for m in models),
+        "plan": decision.plan_id,
+        "input_tokens": decision.input_tokens,
+        "chunking": decision.chunking,
+        "chunks": len(outcomes),
+        "prompt_version": messages[0][0].version,
+    }
+
+
+# ============================================================================
+# AUSWERTUNG
+# ============================================================================
+
+def route_overview() -> List[Dict]:
+    return [
+        {"route": r.name, "model": r.models[0], "fallbacks": list(r.models[1:]), "max_tokens": r.max_tokens,
+         "input_budget_tokens": r.input_budget, "timeout_s": r.timeout}
+        for r in ROUTES.values()
+    ]
+
+
+def route_stats(days: int = 30) -> List[Dict]:
+    """Aufrufe, Timeouts, Latenz und Kosten pro Route und Modell."""
+    since = f"-{int(days)} days"
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        rows = conn.execute(
+            "SELECT route, model, COUNT(*), SUM(status IN ('success', 'repaired', 'repaired_llm')), "
+            "SUM(status = 'timeout'), SUM(fallback), AVG(latency_ms), AVG(input_tokens), AVG(output_tokens), "
+            "SUM(cost_usd) FROM model_route_runs WHERE created_at >= datetime('now', ?) "
+            "GROUP BY route, model ORDER BY route, model", (since,)
+        ).fetchall()
+        latencies: Dict[tuple, List[int]] = {}
+        for route, model, latency in conn.execute(
+            "SELECT route, model, latency_ms FROM model_route_runs WHERE status != 'timeout' "
+            "AND created_at >= datetime('now', ?) ORDER BY latency_ms", (since,)
+        ):
+            latencies.setdefault((route, model), []).append(latency)
+    finally:
+        conn.close()
+
+    stats = []
+    for route, model, calls, ok, timeouts, fallbacks, avg_latency, avg_in, avg_out, total_cost in rows:
+        values = latencies.get((route, model), [])
+        stats.append({
+            "route": route,
+            "model": model,
+            "calls": calls,
+            "success_rate": round((ok or 0) / calls, 3),
+            "timeouts": timeouts or 0,
+            "fallback_calls": fallbacks or 0,
+            "avg_latency_ms": round(avg_latency or 0),
+            "p95_latency_ms": values[min(len(values) - 1, int(len(values) * 0.95))] if values else None,
+            "avg_input_tokens": round(avg_in or 0),
+            "avg_output_tokens": round(avg_out or 0),
+            "avg_cost_usd": round((total_cost or 0) / calls, 6),
+            "total_cost_usd": round(total_cost or 0, 4),
+        })
+    return stats
@@ -0,0 +1,395 @@
+"""
+Near-Duplicate-Index über das Vertragsportfolio
+- MinHash-Signatur pro Datei-Hash über Wort-5-Gramme des normalisierten Texts
+- LSH: 16 Bänder à 4 Zeilen, Buckets im Speicher; Kandidaten werden über die
+  Signatur-Ähnlichkeit verifiziert
+- Signaturen persistiert in contract_signatures, jeder Worker lädt sie einmal
+  und liest danach nur neue Zeilen nach (rowid)
+- Wiederverwendung: Analyse einer nahezu gleichen Fassung übernehmen und nur
+  die abweichenden Klauseln neu prüfen
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.5"))
+NEAR_DUP_REUSE_THRESHOLD = float(os.getenv("NEAR_DUP_REUSE_THRESHOLD", "0.85"))
+# Anteil geänderter Zeichen, ab dem statt Teil-Prüfung voll analysiert wird
+NEAR_DUP_MAX_RECHECK_RATIO = float(os.getenv("NEAR_DUP_MAX_RECHECK_RATIO", "0.3"))
+
+DOCUMENT_SHINGLE_WORDS = 5
+LSH_BANDS = 16
+LSH_ROWS = 4  # LSH_BANDS * LSH_ROWS == NUM_PERM
+
+
+def init_signature_tables(conn=None):
+    """MinHash-Signaturen pro Datei-Hash"""
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contract_signatures (
+            file_sha256 TEXT PRIMARY KEY,
+            signature BLOB NOT NULL,
+            shingles INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def document_signature(text: str) -> tuple:
+    """(Signatur, Anzahl Shingles) des normalisierten Vertragstexts."""
+    from .clause_index import normalise
+    from .minhash import shingles, signature
+
+    hashes = shingles(normalise(text).split(), DOCUMENT_SHINGLE_WORDS)
+    return signature(hashes), len(hashes)
+
+
+# ============================================================================
+# LSH-INDEX (pro Prozess)
+# ============================================================================
+
+class LSHIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = [defaultdict(set) for _ in range(LSH_BANDS)]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._last_rowid = 0
+
+    def _bands(self, sig: np.ndarray):
+        raw = sig.tobytes()
+        width = LSH_ROWS * sig.itemsize
+        return [raw[band * width:(band + 1) * width] for band in range(LSH_BANDS)]
+
+    def _insert(self, sha256: str, sig: np.ndarray):
+        if sha256 in self._signatures:
+            return
+        self._signatures[sha256] = sig
+        for band, key in enumerate(self._bands(sig)):
+            self._buckets[band][key].add(sha256)
+
+    def remove(self, sha256: str):
+        with self._lock:
+            sig = self._signatures.pop(sha256, None)
+            if sig is None:
+                return
+            for band, key in enumerate(self._bands(sig)):
+                bucket = self._buckets[band].get(key)
+                if bucket:
+                    bucket.discard(sha256)
+                    if not bucket:
+                        del self._buckets[band][key]
+
+    def add(self, sha256: str, sig: np.ndarray):
+        with self._lock:
+            self._insert(sha256, sig)
+
+    def refresh(self, conn):
+        """Neue Signaturen anderer Worker nachladen (nur rowid > zuletzt gesehen)."""
+        rows = conn.execute(
+            "SELECT rowid, file_sha256, signature FROM contract_signatures WHERE rowid > ? ORDER BY rowid",
+            (self._last_rowid,)
+        ).fetchall()
+        if not rows:
+            return
+        with self._lock:
+            for rowid, sha256, blob in rows:
+                self._insert(sha256, np.frombuffer(blob, dtype=np.uint64))
+                self._last_rowid = max(self._last_rowid, rowid)
+
+    def signature_of(self, sha256: str) -> Optional[np.ndarray]:
+        return self._signatures.get(sha256)
+
+    def query(self, sig: np.ndarray, threshold: float = NEAR_DUP_THRESHOLD, exclude: str = None) -> List[tuple]:
+        """[(sha256, geschätzte Jaccard-Ähnlichkeit)], absteigend."""
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._bands(sig)):
+                candidates |= self._buckets[band].get(key, set())
+            candidates.discard(exclude)
+            if not candidates:
+                return []
+            shas = list(candidates)
+            matrix = np.vstack([self._signatures[s] for s in shas])
+        scores = (matrix == sig).mean(axis=1)
+        hits = [(sha, round(float(score), 3)) for sha, score in zip(shas, scores) if score >= threshold]
+        return sorted(hits, key=lambda x: -x[1])
+
+    def shas(self) -> List[str]:
+        with self._lock:
+            return list(self._signatures)
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+_index = LSHIndex()
+
+
+def get_index(conn=None) -> LSHIndex:
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        _index.refresh(conn)
+    finally:
+        if own_conn:
+            conn.close()
+    return _index
+
+
+def index_contract(contract_id: str, path: Path) -> Optional[str]:
+    """
+    Signatur eines Vertrags berechnen und eintragen (idempotent pro Datei-Hash).
+
+    Läuft nach dem Upload als Hintergrund-Task; wärmt dabei den Text-Store.
+    """
+    from .extractors import load_contract_text
+
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        row = conn.execute("SELECT file_sha256 FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
+        if not row or not row[0]:
+            return None
+        sha256 = row[0]
+        index = get_index(conn)
+        if index.signature_of(sha256) is not None:
+            return sha256
+        try:
+            text = load_contract_text(contract_id, path)
+        except Exception as e:
+            logger.warning(f"Near-duplicate indexing failed for {contract_id}: {e}")
+            return None
+        sig, count = document_signature(text)
+        if not count:
+            return None
+        conn.execute(
+            "INSERT OR IGNORE INTO contract_signatures (file_sha256, signature, shingles) VALUES (?, ?, ?)",
+            (sha256, sig.tobytes(), count)
+        )
+        conn.commit()
+        index.add(sha256, sig)
+        return sha256
+    finally:
+        conn.close()
+
+
+def remove_file(conn, sha256: str):
+    """Signatur entfernen, wenn kein Vertrag die Datei mehr referenziert."""
+    deleted = conn.execute(
+        "DELETE FROM contract_signatures WHERE file_sha256 = ? "
+        "AND NOT EXISTS (SELECT 1 FROM contracts WHERE file_sha256 = ?)",
+        (sha256, sha256)
+    ).rowcount
+    if deleted:
+        _index.remove(sha256)
+
+
+# ============================================================================
+# ABFRAGEN
+# ============================================================================
+
+def find_similar(contract_id: str, threshold: float = NEAR_DUP_THRESHOLD, limit: int = 20) -> Optional[Dict]:
+    """
+    Nahezu gleiche Verträge inkl. exakter Duplikate (gleicher Datei-Hash).
+
+    None, wenn der Vertrag (noch) nicht im Index ist.
+    """
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        row = conn.execute("SELECT file_sha256 FROM contracts WHERE contract_id = ?", (contract_id,)).fetchone()
+        index = get_index(conn)
+        sig = index.signature_of(row[0]) if row and row[0] else None
+        if sig is None:
+            return None
+
+        started = time.perf_counter()
+        hits = index.query(sig, threshold, exclude=row[0])
+        lookup_ms = (time.perf_counter() - started) * 1000
+
+        similarity = {row[0]: 1.0, **dict(hits[:limit])}
+        placeholders = ",".join("?" * len(similarity))
+        contracts = conn.execute(
+            f"SELECT contract_id, filename, contract_type, status, risk_level, file_sha256 FROM contracts "
+            f"WHERE file_sha256 IN ({placeholders}) AND contract_id != ?",
+            (*similarity, contract_id)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    results = [
+        {"contract_id": c[0], "filename": c[1], "contract_type": c[2], "status": c[3], "risk_level": c[4],
+         "similarity": similarity[c[5]], "exact_duplicate": c[5] == row[0]}
+        for c in contracts
+    ]
+    # Exakte Duplikate vor gleich ähnlichen Varianten
+    results.sort(key=lambda r: (-r["similarity"], not r["exact_duplicate"]))
+    return {"contract_id": contract_id, "similar": results[:limit], "lookup_ms": round(lookup_ms, 3), "indexed": len(index)}
+
+
+def near_duplicate_groups(threshold: float = 0.8) -> List[List[Dict]]:
+    """Gruppen von Verträgen, die über Near-Duplicate-Kanten verbunden sind (Union-Find)."""
+    index = get_index()
+    parent = {sha256: sha256 for sha256 in index.shas()}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for sha256 in list(parent):
+        for other, _ in index.query(index.signature_of(sha256), threshold, exclude=sha256):
+            if other not in parent:
+                continue  # erst nach dem Snapshot indexiert
+            root_a, root_b = find(sha256), find(other)
+            if root_a != root_b:
+                parent[root_a] = root_b
+    if not parent:
+        return []
+
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        placeholders = ",".join("?" * len(parent))
+        rows = conn.execute(
+            f"SELECT contract_id, filename, contract_type, file_sha256 FROM contracts "
+            f"WHERE file_sha256 IN ({placeholders}) ORDER BY created_at",
+            tuple(parent)
+        ).fetchall()
+    finally:
+        conn.close()
+    groups = defaultdict(list)
+    for contract_id, filename, contract_type, sha256 in rows:
+        groups[find(sha256)].append({"contract_id": contract_id, "filename": filename, "contract_type": contract_type})
+    return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+
+# ============================================================================
+# WIEDERVERWENDUNG IN DER ANALYSE
+# ============================================================================
+
+def find_reusable_analysis(contract_id: str, contract_type: str, path: Path, upload_dir: Path) -> Optional[Dict]:
+    """
+    Analysierte, nahezu gleiche Fassung desselben Vertragstyps suchen und die
+    abweichenden Klauseln bestimmen.
+
+    Nur LLM-Ergebnisse kommen als Quelle in Frage; Analysen, die selbst aus
+    contract_id abgeleitet wurden (near_duplicate_of), werden übersprungen,
+    damit eine Neu-Analyse die Duplikate nicht aus sich selbst speist.
+
+    Liefert source_id, origin_id (ursprünglich analysierte Fassung),
+    source_type, similarity, analysis (gespeichertes Ergebnis), recheck_text
+    (nur geänderte/neue Klauseln) sowie stale_clause_ids und stale_texts
+    (Klauseln der Quelle, deren Risiken nicht mehr gelten) – oder None.
+    """
+    import json
+    from .contract_compare import load_units, compare_clauses
+    from .file_registry import resolve_upload
+
+    index_contract(contract_id, path)
+    similar = find_similar(contract_id, NEAR_DUP_REUSE_THRESHOLD)
+    if not similar:
+        return None
+
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        for candidate in similar["similar"]:
+            if candidate["contract_type"] != contract_type or candidate["status"] != "analyzed":
+                continue
+            row = conn.execute(
+                "SELECT analysis_json FROM analysis_results WHERE contract_id = ?", (candidate["contract_id"],)
+            ).fetchone()
+            if not row:
+                continue
+            analysis = json.loads(row[0])
+            if analysis.get("analysis_source") != "llm" or analysis.get("near_duplicate_of") == contract_id:
+                continue
+            source_path = resolve_upload(conn, candidate["contract_id"], upload_dir)
+            if source_path:
+                break
+        else:
+            return None
+    finally:
+        conn.close()
+
+    units_source, units_new = load_units(candidate["contract_id"], source_path), load_units(contract_id, path)
+    comparison = compare_clauses(units_source, units_new)
+    from .clause_index import normalise
+    new_by_id = {u.clause_id: u for u in units_new}
+    source_by_id = {u.clause_id: u for u in units_source}
+    recheck, stale = [], set()
+    for entry in comparison["clauses"]:
+        if entry["status"] in ("changed", "removed"):
+            stale.add(entry["a"]["clause_id"])
+        if entry["status"] in ("changed", "added"):
+            recheck.append(new_by_id[entry["b"]["clause_id"]])
+
+    total = sum(len(u.body) for u in units_new) or 1
+    changed = sum(len(u.body) for u in recheck)
+    if changed / total > NEAR_DUP_MAX_RECHECK_RATIO:
+        return None
+
+    return {
+        "source_id": candidate["contract_id"],
+        "origin_id": analysis.get("near_duplicate_of") or candidate["contract_id"],
+        "source_type": analysis["analysis_source"],
+        "similarity": candidate["similarity"],
+        "analysis": analysis,
+        "recheck_text": "\n\n".join(u.body for u in recheck),
+        "rechecked_clauses": len(recheck),
+        "stale_clause_ids": stale,
+        # Für ältere Analysen ohne clause_id: Zuordnung über den zitierten Ausschnitt
+        "stale_texts": [normalise(source_by_id[c].body) for c in stale],
+    }
+
+
+def merge_analysis(reuse: Dict, partial: Optional[Dict]) -> Dict:
+    """
+    Ergebnis im Format von call_llm_analysis(): Risiken und Felder der Quelle,
+    ohne Risiken aus geänderten Klauseln, plus Ergebnis der Teil-Prüfung;
+    Score und Level werden aus den verbleibenden Risiken neu berechnet.
+    """
+    source = reuse["analysis"]
+    assessment = source.get("risk_assessment", {})
+    from .clause_index import normalise
+
+    def stale(risk):
+        if risk.get("clause_id"):
+            return risk["clause_id"] in reuse["stale_clause_ids"]
+        snippet = normalise(risk.get("clause_snippet") or risk.get("clause_text") or "")
+        return bool(snippet) and any(snippet in text for text in reuse["stale_texts"])
+
+    risk_flags = [
+        {k: v for k, v in risk.items() if k != "clause_id"}
+        for bucket in ("critical_risks", "high_risks", "medium_risks", "low_risks")
+        for risk in assessment.get(bucket, [])
+        if not stale(risk)
+    ]
+    fields = dict(source.get("extracted_data") or {})
+    if partial:
+        fields.update({k: v for k, v in (partial.get("extracted_fields") or {}).items() if v is not None})
+        risk_flags.extend(partial.get("risk_flags") or [])
+    # Score/Level der Quelle gelten nicht mehr, wenn deren Risiken entfallen sind
+    from .batch_scoring import score_risk_flags
+    score, level = score_risk_flags(risk_flags)
+    return {
+        "summary": assessment.get("executive_summary", "Vertrag wurde analysiert."),
+        "extracted_fields": fields,
+        "risk_flags": risk_flags,
+        "overall_risk_level": level,
+        "overall_risk_score": score,
+    }
@@ -0,0 +1,206 @@
+"""
+OCR-Fallback für gescannte Verträge
+- Seiten ohne Textlayer, aber mit Bildern, werden als Bildseiten erkannt
+- Rendern (PyMuPDF) + Tesseract laufen im Prozess-Pool, eine Seite pro Task
+- Seitenbudget pro Dokument (OCR_MAX_PAGES), Rest wird übersprungen
+- Cache auf Disk über den Hash der eingebetteten Bilddaten + DPI + Sprache
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OCR_ENABLED = os.getenv("OCR_ENABLED", "true").lower() == "true"
+OCR_TESSERACT_CMD = os.getenv("OCR_TESSERACT_CMD", "tesseract")
+OCR_LANG = os.getenv("OCR_LANG", "deu")
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "50"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or max(1, (os.cpu_count() or 2) - 1)
+OCR_PAGE_TIMEOUT = int(os.getenv("OCR_PAGE_TIMEOUT", "120"))
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", "25"))
+OCR_CACHE_DIR = Path(os.getenv("OCR_CACHE_DIR", "/var/www/contract-app/data/ocr_cache"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_engine_checked = False
+_engine_available = False
+
+
+def engine_available() -> bool:
+    """Tesseract installiert? (einmal pro Prozess geprüft)"""
+    global _engine_checked, _engine_available
+    if not _engine_checked:
+        _engine_available = shutil.which(OCR_TESSERACT_CMD) is not None
+        _engine_checked = True
+        if not _engine_available:
+            logger.warning(f"OCR disabled: '{OCR_TESSERACT_CMD}' not found")
+    return _engine_available
+
+
+def needs_ocr(page, text: str = None) -> bool:
+    """Bildseite: (fast) kein Textlayer, aber mindestens ein Bild."""
+    if text is None:
+        text = page.get_text()
+    if len(text.strip()) >= OCR_MIN_TEXT_CHARS:
+        return False
+    return bool(page.get_images(full=False))
+
+
+def page_hash(doc, page) -> str:
+    """Inhalts-Hash der Seite über die eingebetteten Bilder (ohne zu rendern)."""
+    digest = hashlib.sha256(f"{OCR_DPI}:{OCR_LANG}:{page.rotation}".encode())
+    for image in page.get_images(full=False):
+        digest.update(doc.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+
+def _cache_path(key: str) -> Path:
+    return OCR_CACHE_DIR / key[:2] / f"{key}.txt"
+
+
+def _cache_get(key: str) -> Optional[str]:
+    try:
+        return _cache_path(key).read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def _cache_put(key: str, text: str):
+    path = _cache_path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"OCR cache write failed: {e}")
+
+
+# ============================================================================
+# WORKER (läuft im Pool-Prozess)
+# ============================================================================
+
+def _ocr_page(pdf_path: str, page_number: int, dpi: int, lang: str, command: str, timeout: int) -> str:
+    import fitz
+
+    doc = fitz.open(pdf_path)
+    try:
+        # Graustufen reichen für Tesseract und halbieren die PNG-Größe
+        pixmap = doc[page_number].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        png = pixmap.tobytes("png")
+    finally:
+        doc.close()
+    result = subprocess.run(
+        [command, "stdin", "stdout", "-l", lang, "--psm", "3"],
+        input=png, capture_output=True, timeout=timeout,
+        env={**os.environ, "OMP_THREAD_LIMIT": "1"},  # Parallelität kommt vom Pool
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", "replace").strip()[:200])
+    return result.stdout.decode("utf-8", "replace")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+            # spawn: kein Fork eines Prozesses mit Event-Loop und offenen DB-Verbindungen
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# ============================================================================
+# FALLBACK
+# ============================================================================
+
+def ocr_missing_pages(path: Path, doc, texts: List[str]) -> Dict:
+    """
+    Ergänzt texts (Seitentexte des Textlayers) um OCR-Text für Bildseiten.
+
+    Arbeitet in-place und liefert Statistik: erkannte Bildseiten, aus dem
+    Cache, per OCR, übersprungen (Budget) und fehlgeschlagen.
+    """
+    from .metrics import OCR_PAGES, record_cache
+
+    stats = {"image_pages": 0, "cached": 0, "ocr": 0, "skipped": 0, "failed": 0}
+    if not OCR_ENABLED:
+        return stats
+
+    pending = []
+    for number, page in enumerate(doc):
+        if not needs_ocr(page, texts[number]):
+            continue
+        stats["image_pages"] += 1
+        key = page_hash(doc, page)
+        cached = _cache_get(key)
+        record_cache("ocr", cached is not None)
+        if cached is not None:
+            texts[number] = cached
+            stats["cached"] += 1
+        elif len(pending) >= OCR_MAX_PAGES:
+            stats["skipped"] += 1
+        else:
+            pending.append((number, key))
+
+    if pending and not engine_available():
+        stats["skipped"] += len(pending)
+        pending = []
+
+    if pending:
+        from .tracing import span
+        with span("ocr", pages=len(pending)):
+            _run_pool(path, pending, texts, stats)
+
+    for result in ("cached", "ocr", "skipped", "failed"):
+        if stats[result]:
+            OCR_PAGES.inc(stats[result], result=result)
+    if stats["image_pages"]:
+        logger.info(f"OCR {path.name}: {stats}")
+    return stats
+
+
+def _run_pool(path: Path, pending: List, texts: List[str], stats: Dict):
+    """Eine Seite pro Task; Ergebnisse landen in texts und im Cache."""
+    try:
+        pool = _get_pool()
+        futures = [
+            (number, key, pool.submit(_ocr_page, str(path), number, OCR_DPI, OCR_LANG, OCR_TESSERACT_CMD, OCR_PAGE_TIMEOUT))
+            for number, key in pending
+        ]
+    except BrokenProcessPool:
+        futures = []
+    broken = len(futures) < len(pending)
+    stats["failed"] += len(pending) - len(futures)
+    for number, key, future in futures:
+        try:
+            text = future.result(timeout=OCR_PAGE_TIMEOUT + 30)
+        except Exception as e:
+            logger.warning(f"OCR failed for {path.name} page {number + 1}: {e}")
+            broken = broken or isinstance(e, BrokenProcessPool)
+            stats["failed"] += 1
+            continue
+        texts[number] = text
+        _cache_put(key, text)
+        stats["ocr"] += 1
+    if broken:
+        # Abgestürzter Worker: Pool beim nächsten Dokument neu aufbauen
+        shutdown_pool()
+
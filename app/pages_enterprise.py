@@ -537,8 +537,31 @@ def page_wrapper(title: str, content: str, user_name: str = "User", active: str
 # TOOL PAGES
 # ============================================================================
 
-def get_compare_page(user_name: str = "User"):
-    content = '''
+def get_compare_page(user_name: str = "User", contracts: list = None, selected_a: str = None, selected_b: str = None):
+    from html import escape
+    contracts = contracts or []
+    
+    def options(selected):
+        return '<option value="">-- Vertrag auswählen --</option>' + "".join(
+            f'<option value="{c[0]}"{" selected" if c[0] == selected else ""}>{escape(c[1] or c[0])} ({c[2] or "general"})</option>'
+            for c in contracts
+        )
+    
+    def picker(label, name, selected):
+        return f'''
+    <div class="content-card">
+      <div class="content-card-header"><h3 class="content-card-title">📄 {label}</h3></div>
+      <div class="content-card-body">
+        <div class="empty-state" style="padding:40px;">
+          <div class="empty-icon">📤</div>
+          <p style="font-weight:600;margin-bottom:16px;">Vertrag auswählen</p>
+          <select id="{name}" class="form-input" style="max-width:280px;margin:0 auto;">{options(selected)}</select>
+        </div>
+      </div>
+    </div>'''
+    
+    autorun = "runCompare();" if selected_a and selected_b else ""
+    content = f'''
 <div class="hero">
   <div class="container">
     <div class="hero-badge"><span class="dot"></span> VERTRAGSVERGLEICH</div>
@@ -547,45 +570,106 @@ def get_compare_page(user_name: str = "User"):
   </div>
 </div>
 <div class="page-container">
-  <div class="grid-2">
-    <div class="content-card">
-      <div class="content-card-header"><h3 class="content-card-title">📄 Vertrag A</h3></div>
-      <div class="content-card-body">
-        <div class="empty-state" style="padding:40px;">
-          <div class="empty-icon">📤</div>
-          <p style="font-weight:600;margin-bottom:16px;">Vertrag auswählen</p>
-          <select class="form-input" style="max-width:280px;margin:0 auto;"><option>-- Vertrag auswählen --</option></select>
-        </div>
-      </div>
-    </div>
-    <div class="content-card">
-      <div class="content-card-header"><h3 class="content-card-title">📄 Vertrag B</h3></div>
-      <div class="content-card-body">
-        <div class="empty-state" style="padding:40px;">
-          <div class="empty-icon">📤</div>
-          <p style="font-weight:600;margin-bottom:16px;">Vertrag auswählen</p>
-          <select class="form-input" style="max-width:280px;margin:0 auto;"><option>-- Vertrag auswählen --</option></select>
-        </div>
-      </div>
-    </div>
+  <div class="grid-2">{picker("Vertrag A (Basis)", "contractA", selected_a)}{picker("Vertrag B (neue Fassung)", "contractB", selected_b)}
+  </div>
+  <div style="text-align:center;margin-top:24px;">
+    <label style="margin-right:16px;"><input type="checkbox" id="llmReview"> KI-Bewertung der Änderungen</label>
+    <button class="btn btn-primary" id="compareBtn" onclick="runCompare()">⚖️ Vergleich starten</button>
   </div>
-  <div style="text-align:center;margin-top:24px;"><button class="btn btn-primary" disabled style="opacity:0.5;">⚖️ Vergleich starten</button></div>
-</div>'''
+  <div id="compareResult" style="margin-top:32px;"></div>
+</div>
+<style>
+.diff-del {{ background:#fee2e2; color:#991b1b; text-decoration:line-through; }}
+.diff-ins {{ background:#dcfce7; color:#166534; }}
+.clause-diff {{ white-space:pre-wrap; font-size:0.9rem; line-height:1.6; }}
+</style>
+<script>
+const STATUS = {{unchanged: ['success', 'Unverändert'], changed: ['warning', 'Geändert'], added: ['info', 'Neu'], removed: ['danger', 'Entfernt']}};
+function esc(v) {{ return String(v ?? '–').replace(/[&<>"]/g, c => ({{'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'}})[c]); }}
+function stat(value, label) {{ return '<div class="stat-card"><div class="stat-value">' + value + '</div><div class="stat-label">' + label + '</div></div>'; }}
+function ref(r) {{ return r ? esc((r.number ? r.number + ' ' : '') + r.heading) + (r.page ? ' <small>(S. ' + r.page + ')</small>' : '') : '–'; }}
+function card(title, body) {{ return '<div class="content-card" style="margin-bottom:24px;"><div class="content-card-header"><h3 class="content-card-title">' + title + '</h3></div><div class="content-card-body">' + body + '</div></div>'; }}
+
+function render(r) {{
+  const s = r.summary;
+  let html = '<div class="stats-grid">' + stat(Math.round(s.text_similarity * 100) + '%', 'Textähnlichkeit') +
+    stat(s.changed, 'Geänderte Klauseln') + stat(s.added, 'Neue Klauseln') + stat(s.removed, 'Entfernte Klauseln') + '</div>';
+  if (r.llm_review && r.llm_review.summary) {{
+    html += card('🤖 KI-Bewertung', '<p>' + esc(r.llm_review.summary) + '</p>' + (r.llm_review.changes || []).map(c =>
+      '<p><strong>' + esc(c.clause) + '</strong> <span class="badge badge-' + (c.direction === 'ungünstiger' ? 'danger' : c.direction === 'günstiger' ? 'success' : 'info') + '">' + esc(c.direction) + '</span> ' + esc(c.assessment) + '</p>').join(''));
+  }}
+  if (r.fields) {{
+    const rows = r.fields.changed.map(f => '<tr><td><strong>' + esc(f.field) + '</strong></td><td>' + esc(JSON.stringify(f.a)) + '</td><td>' + esc(JSON.stringify(f.b)) + '</td></tr>').join('');
+    html += card('📋 Felder (' + r.fields.changed.length + ' geändert, ' + r.fields.unchanged + ' gleich)',
+      rows ? '<table class="data-table"><thead><tr><th>Feld</th><th>A</th><th>B</th></tr></thead><tbody>' + rows + '</tbody></table>' : '<p>Keine Unterschiede in den extrahierten Feldern.</p>');
+    const rk = r.risks;
+    html += card('⚠️ Risiken (Score ' + esc(rk.score_a) + ' → ' + esc(rk.score_b) + ')',
+      (rk.added.map(x => '<p><span class="badge badge-danger">Neu</span> ' + esc(x.title) + ' (' + esc(x.severity) + ')</p>').join('') +
+       rk.removed.map(x => '<p><span class="badge badge-success">Entfallen</span> ' + esc(x.title) + '</p>').join('') +
+       rk.severity_changed.map(x => '<p><span class="badge badge-warning">Schwere</span> ' + esc(x.title) + ': ' + esc(x.a) + ' → ' + esc(x.b) + '</p>').join('')) || '<p>Keine Unterschiede bei den Risiken.</p>');
+  }} else {{
+    html += card('📋 Felder und Risiken', '<p>Beide Verträge müssen analysiert sein, um Felder und Risiken zu vergleichen.</p>');
+  }}
+  const clauses = r.clauses.map(c => {{
+    const [badge, label] = STATUS[c.status];
+    const body = c.diff ? '<div class="clause-diff">' + c.diff.map(([op, t]) => op === '=' ? esc(t) : '<span class="diff-' + (op === '+' ? 'ins' : 'del') + '">' + esc(t) + '</span>').join('') + '</div>' : '';
+    return '<tr><td><span class="badge badge-' + badge + '">' + label + '</span>' + (c.moved ? ' <span class="badge badge-info">verschoben</span>' : '') +
+      '</td><td>' + ref(c.a) + '</td><td>' + ref(c.b) + '</td><td>' + Math.round(c.similarity * 100) + '%</td></tr>' +
+      (body ? '<tr><td colspan="4">' + body + '</td></tr>' : '');
+  }}).join('');
+  html += card('📑 Klauseln (' + s.clauses_a + ' / ' + s.clauses_b + ')',
+    '<table class="data-table"><thead><tr><th>Status</th><th>Vertrag A</th><th>Vertrag B</th><th>Ähnlichkeit</th></tr></thead><tbody>' + clauses + '</tbody></table>');
+  document.getElementById('compareResult').innerHTML = html;
+}}
+
+async function runCompare() {{
+  const a = document.getElementById('contractA').value, b = document.getElementById('contractB').value;
+  const out = document.getElementById('compareResult'), btn = document.getElementById('compareBtn');
+  if (!a || !b) {{ out.innerHTML = '<p style="text-align:center;">Bitte zwei Verträge auswählen.</p>'; return; }}
+  btn.disabled = true; btn.textContent = 'Vergleiche...';
+  try {{
+    const llm = document.getElementById('llmReview').checked;
+    const res = await fetch('/api/v3/compare?a=' + encodeURIComponent(a) + '&b=' + encodeURIComponent(b) + (llm ? '&llm=true' : ''));
+    const data = await res.json();
+    if (!res.ok) out.innerHTML = '<p style="text-align:center;">❌ ' + esc(data.detail) + '</p>'; else render(data);
+    history.replaceState(null, '', '/compare?a=' + encodeURIComponent(a) + '&b=' + encodeURIComponent(b));
+  }} finally {{
+    btn.disabled = false; btn.textContent = '⚖️ Vergleich starten';
+  }}
+}}
+{autorun}
+</script>'''
     return page_wrapper("Vertragsvergleich", content, user_name, "tools")
 
 
-def get_library_page(user_name: str = "User"):
-    clauses = [
-        (1, "Kündigungsklausel Standard", "Allgemein", "success", "Niedrig", 47),
-        (2, "Haftungsbegrenzung 1x ACV", "SaaS", "warning", "Mittel", 32),
-        (3, "Geheimhaltung 5 Jahre", "NDA", "success", "Niedrig", 28),
-        (4, "Auto-Renewal 30 Tage", "SaaS", "success", "Niedrig", 25),
-        (5, "Datenlokation EU", "SaaS", "success", "Niedrig", 21),
-        (6, "Eigentumsübergang", "Kaufvertrag", "success", "Niedrig", 19),
-        (7, "Vertragsstrafe 10%", "Lieferant", "warning", "Mittel", 15),
-        (8, "Indexmiete jährlich", "Mietvertrag", "warning", "Mittel", 12),
-    ]
-    rows = "".join([f'<tr><td><strong>{c[1]}</strong></td><td><span class="badge badge-info">{c[2]}</span></td><td><span class="badge badge-{c[3]}">{c[4]}</span></td><td>{c[5]}x</td><td><a href="/library/clause/{c[0]}" class="btn btn-secondary" style="padding:6px 14px;font-size:0.8rem;">Ansehen</a></td></tr>' for c in clauses])
+def get_library_page(user_name: str = "User", clauses: dict = None, stats: dict = None,
+                     categories: dict = None, query: str = "", contract_type: str = ""):
+    from html import escape
+    from urllib.parse import urlencode
+    clauses = clauses or {"items": [], "total": 0, "page": 1, "pages": 0}
+    stats = stats or {"total": 0, "contract_types": 0, "usages": 0, "custom": 0}
+    categories = categories or {}
+    risk_badges = {"low": ("success", "Niedrig"), "medium": ("warning", "Mittel"), "high": ("danger", "Hoch"), "critical": ("danger", "Kritisch")}
+    
+    def clause_row(c):
+        badge, label = risk_badges.get(c["risk"], ("info", c["risk"]))
+        custom = ' <span class="badge badge-info">Eigene</span>' if c["is_custom"] else ''
+        return f'<tr><td><strong>{escape(c["name"])}</strong>{custom}</td><td><span class="badge badge-info">{escape(c["category"])}</span></td><td><span class="badge badge-{badge}">{label}</span></td><td>{c["usage_count"]}x</td><td><a href="/library/clause/{c["id"]}" class="btn btn-secondary" style="padding:6px 14px;font-size:0.8rem;">Ansehen</a></td></tr>'
+    
+    rows = "".join(clause_row(c) for c in clauses["items"]) or '<tr><td colspan="5" style="text-align:center;color:var(--sbs-muted);">Keine Klauseln gefunden.</td></tr>'
+    type_options = "".join(
+        f'<option value="{key}"{" selected" if key == contract_type else ""}>{label}</option>' for key, label in categories.items()
+    )
+    
+    def page_link(page, label):
+        params = urlencode({k: v for k, v in (("q", query), ("type", contract_type), ("page", page)) if v})
+        return f'<a href="/library?{params}" class="btn btn-secondary" style="padding:6px 14px;font-size:0.8rem;">{label}</a>'
+    
+    pager = ""
+    if clauses["pages"] > 1:
+        prev_link = page_link(clauses["page"] - 1, "← Zurück") if clauses["page"] > 1 else ""
+        next_link = page_link(clauses["page"] + 1, "Weiter →") if clauses["page"] < clauses["pages"] else ""
+        pager = f'<div style="display:flex;gap:12px;align-items:center;justify-content:flex-end;padding:16px;">{prev_link}<span>Seite {clauses["page"]} von {clauses["pages"]}</span>{next_link}</div>'
     
     content = f'''
 <div class="hero">
@@ -597,56 +681,115 @@ def get_library_page(user_name: str = "User"):
 </div>
 <div class="page-container">
   <div class="stats-grid">
-    <div class="stat-card"><div class="stat-value">48</div><div class="stat-label">Klauseln gesamt</div></div>
-    <div class="stat-card"><div class="stat-value">8</div><div class="stat-label">Vertragstypen</div></div>
-    <div class="stat-card"><div class="stat-value">234</div><div class="stat-label">Verwendungen</div></div>
-    <div class="stat-card"><div class="stat-value">12</div><div class="stat-label">Eigene Klauseln</div></div>
+    <div class="stat-card"><div class="stat-value">{stats["total"]}</div><div class="stat-label">Klauseln gesamt</div></div>
+    <div class="stat-card"><div class="stat-value">{stats["contract_types"]}</div><div class="stat-label">Vertragstypen</div></div>
+    <div class="stat-card"><div class="stat-value">{stats["usages"]}</div><div class="stat-label">Verwendungen</div></div>
+    <div class="stat-card"><div class="stat-value">{stats["custom"]}</div><div class="stat-label">Eigene Klauseln</div></div>
   </div>
   <div class="content-card">
-    <div class="content-card-header"><h3 class="content-card-title">Klauseln</h3><button class="btn btn-primary">+ Neü Klausel</button></div>
+    <div class="content-card-header"><h3 class="content-card-title">Klauseln ({clauses["total"]})</h3><button class="btn btn-primary" onclick="document.getElementById('newClause').style.display='block'">+ Neue Klausel</button></div>
+    <div class="content-card-body" style="display:flex;gap:12px;flex-wrap:wrap;">
+      <form method="get" action="/library" style="display:flex;gap:12px;flex-wrap:wrap;width:100%;">
+        <input type="search" name="q" value="{escape(query)}" placeholder="Klauseln durchsuchen…" style="flex:1;min-width:220px;padding:10px;border:1px solid var(--sbs-border);border-radius:8px;">
+        <select name="type" style="padding:10px;border:1px solid var(--sbs-border);border-radius:8px;"><option value="">Alle Typen</option>{type_options}</select>
+        <button class="btn btn-secondary" type="submit">Suchen</button>
+      </form>
+    </div>
+    <div id="newClause" class="content-card-body" style="display:none;border-top:1px solid var(--sbs-border);">
+      <div style="display:grid;gap:12px;">
+        <input id="ncName" placeholder="Name" style="padding:10px;border:1px solid var(--sbs-border);border-radius:8px;">
+        <select id="ncType" style="padding:10px;border:1px solid var(--sbs-border);border-radius:8px;">{type_options}</select>
+        <select id="ncRisk" style="padding:10px;border:1px solid var(--sbs-border);border-radius:8px;"><option value="low">Niedrig</option><option value="medium">Mittel</option><option value="high">Hoch</option></select>
+        <textarea id="ncText" rows="4" placeholder="Klauseltext" style="padding:10px;border:1px solid var(--sbs-border);border-radius:8px;"></textarea>
+        <textarea id="ncExplanation" rows="3" placeholder="Rechtliche Einschätzung (optional)" style="padding:10px;border:1px solid var(--sbs-border);border-radius:8px;"></textarea>
+        <div><button class="btn btn-primary" onclick="createClause()">Speichern</button></div>
+      </div>
+    </div>
     <div class="content-card-body" style="padding:0;">
       <table class="data-table">
         <thead><tr><th>Klausel</th><th>Typ</th><th>Risiko</th><th>Nutzung</th><th>Aktion</th></tr></thead>
         <tbody>{rows}</tbody>
       </table>
+      {pager}
     </div>
   </div>
-</div>'''
+</div>
+<script>
+async function createClause() {{
+  const body = {{
+    name: document.getElementById('ncName').value, contract_type: document.getElementById('ncType').value,
+    risk: document.getElementById('ncRisk').value, text: document.getElementById('ncText').value,
+    explanation: document.getElementById('ncExplanation').value || null
+  }};
+  const res = await fetch('/api/v3/library/clauses', {{method: 'POST', headers: {{'Content-Type': 'application/json'}}, body: JSON.stringify(body)}});
+  if (res.ok) {{ const data = await res.json(); location.href = '/library/clause/' + data.id; }}
+  else alert('Klausel konnte nicht gespeichert werden');
+}}
+</script>'''
     return page_wrapper("Klausel-Bibliothek", content, user_name, "tools")
 
 
-def get_exports_page(user_name: str = "User"):
-    exports = [
-        ("22.12.2025 14:32", "test_nda_analyse.pdf", "PDF", "danger", "124 KB"),
-        ("22.12.2025 14:30", "test_nda_analyse.json", "JSON", "info", "8 KB"),
-        ("18.12.2025 12:45", "saas_vertrag.pdf", "PDF", "danger", "156 KB"),
-    ]
-    rows = "".join([f'<tr><td>{e[0]}</td><td><strong>{e[1]}</strong></td><td><span class="badge badge-{e[3]}">{e[2]}</span></td><td>{e[4]}</td><td><button class="btn btn-secondary" style="padding:6px 14px;font-size:0.8rem;">⬇️ Download</button></td></tr>' for e in exports])
+def get_exports_page(user_name: str = "User", jobs: list = None, stats: dict = None):
+    jobs = jobs or []
+    stats = stats or {"total": 0, "by_format": {}}
+    status_badges = {"done": "success", "running": "info", "queued": "info", "failed": "danger", "expired": "warning"}
+    
+    def job_row(j):
+        created = j["created_at"][:16].replace("T", " ")
+        size = f'{round((j.get("artifact_size") or 0) / 1024)} KB' if j.get("artifact_size") else "–"
+        scope = j["filters"].get("contract_type") or "Alle Verträge"
+        if j["status"] == "done":
+            action = f'<a href="/api/v3/exports/{j["job_id"]}/download" class="btn btn-secondary" style="padding:6px 14px;font-size:0.8rem;">⬇️ Download</a>'
+        elif j["status"] in ("queued", "running"):
+            action = f'<span style="color:var(--sbs-muted);">{j["progress_percent"]}% ({j["rows_done"]}/{j["rows_total"]})</span>'
+        else:
+            action = f'<span style="color:var(--sbs-muted);">{j.get("error") or "Abgelaufen"}</span>'
+        return f'<tr><td>{created}</td><td><strong>{scope}</strong></td><td><span class="badge badge-info">{j["format"].upper()}</span></td><td><span class="badge badge-{status_badges.get(j["status"], "info")}">{j["status"]}</span></td><td>{size}</td><td>{action}</td></tr>'
+    
+    rows = "".join(job_row(j) for j in jobs) or '<tr><td colspan="6" style="text-align:center;color:var(--sbs-muted);">Noch keine Exporte.</td></tr>'
+    by_format = stats.get("by_format", {})
+    refresh = '<script>setTimeout(() => location.reload(), 3000);</script>' if any(j["status"] in ("queued", "running") for j in jobs) else ''
     
     content = f'''
 <div class="hero">
   <div class="container">
     <div class="hero-badge"><span class="dot"></span> EXPORT-HISTORIE</div>
     <h1>📥 Export-Historie</h1>
-    <p>Übersicht aller exportierten Analysen und Reports.</p>
+    <p>Portfolio-Exporte aller Verträge als CSV, Excel, JSONL oder PDF-Archiv.</p>
   </div>
 </div>
 <div class="page-container">
   <div class="stats-grid" style="grid-template-columns:repeat(3,1fr);">
-    <div class="stat-card"><div class="stat-value">127</div><div class="stat-label">Exporte gesamt</div></div>
-    <div class="stat-card"><div class="stat-value">89</div><div class="stat-label">PDF Reports</div></div>
-    <div class="stat-card"><div class="stat-value">38</div><div class="stat-label">JSON Exporte</div></div>
+    <div class="stat-card"><div class="stat-value">{stats.get("total", 0)}</div><div class="stat-label">Exporte gesamt</div></div>
+    <div class="stat-card"><div class="stat-value">{by_format.get("zip", 0)}</div><div class="stat-label">PDF Archive</div></div>
+    <div class="stat-card"><div class="stat-value">{by_format.get("csv", 0) + by_format.get("xlsx", 0) + by_format.get("jsonl", 0)}</div><div class="stat-label">Daten-Exporte</div></div>
+  </div>
+  <div class="content-card">
+    <div class="content-card-header"><h3 class="content-card-title">Neuer Portfolio-Export</h3></div>
+    <div class="content-card-body" style="display:flex;gap:12px;flex-wrap:wrap;">
+      <button class="btn btn-primary" onclick="startExport('xlsx')">📊 Excel</button>
+      <button class="btn btn-secondary" onclick="startExport('csv')">📄 CSV</button>
+      <button class="btn btn-secondary" onclick="startExport('jsonl')">📋 JSONL</button>
+      <button class="btn btn-secondary" onclick="startExport('zip')">🗂️ PDF-Archiv (ZIP)</button>
+    </div>
   </div>
   <div class="content-card">
     <div class="content-card-header"><h3 class="content-card-title">Letzte Exporte</h3></div>
     <div class="content-card-body" style="padding:0;">
       <table class="data-table">
-        <thead><tr><th>Datum</th><th>Datei</th><th>Format</th><th>Größe</th><th>Aktion</th></tr></thead>
+        <thead><tr><th>Datum</th><th>Umfang</th><th>Format</th><th>Status</th><th>Größe</th><th>Aktion</th></tr></thead>
         <tbody>{rows}</tbody>
       </table>
     </div>
   </div>
-</div>'''
+</div>
+<script>
+async function startExport(format) {{
+  const res = await fetch('/api/v3/exports', {{method: 'POST', headers: {{'Content-Type': 'application/json'}}, body: JSON.stringify({{format}})}});
+  if (res.ok) location.reload(); else alert('Export konnte nicht gestartet werden');
+}}
+</script>
+{refresh}'''
     return page_wrapper("Export-Historie", content, user_name, "tools")
 
 
@@ -28,6 +28,9 @@ SBS_RED = colors.HexColor("#dc2626")
 SBS_ORANGE = colors.HexColor("#ea580c")
 SBS_GRAY = colors.HexColor("#6b7280")
 
+# Bei Layout-Änderungen erhöhen – invalidiert gecachte Reports (siehe report_cache)
+REPORT_TEMPLATE_VERSION = "1"
+
 
 def get_risk_color(level: str) -> colors.Color:
     """Gibt die Farbe für ein Risiko-Level zurück."""
@@ -126,6 +129,21 @@ def create_styles() -> Dict[str, ParagraphStyle]:
     return custom_styles
 
 
+# Styles werden einmal pro Prozess erstellt und für alle Reports wiederverwendet
+STYLES = create_styles()
+
+CLAUSE_STYLE = ParagraphStyle(
+    "Clause",
+    parent=STYLES["Normal"],
+    fontSize=9,
+    textColor=SBS_GRAY,
+    leftIndent=10,
+    borderLeftWidth=2,
+    borderLeftColor=SBS_GRAY,
+    borderPadding=5,
+)
+
+
 def generate_contract_pdf(analysis: Dict[str, Any]) -> bytes:
     """
     Generiert ein PDF-Report für eine Vertragsanalyse.
@@ -147,7 +165,7 @@ def generate_contract_pdf(analysis: Dict[str, Any]) -> bytes:
         bottomMargin=2*cm,
     )
     
-    styles = create_styles()
+    styles = STYLES
     story = []
     
     # === HEADER ===
@@ -362,17 +380,7 @@ def generate_contract_pdf(analysis: Dict[str, Any]) -> bytes:
             
             # Klausel-Zitat
             if clause:
-                clause_style = ParagraphStyle(
-                    "Clause",
-                    parent=styles["Normal"],
-                    fontSize=9,
-                    textColor=SBS_GRAY,
-                    leftIndent=10,
-                    borderLeftWidth=2,
-                    borderLeftColor=SBS_GRAY,
-                    borderPadding=5,
-                )
-                story.append(Paragraph(f'„{clause}"', clause_style))
+                story.append(Paragraph(f'„{clause}"', CLAUSE_STYLE))
             
             # Referenz
             if reference:
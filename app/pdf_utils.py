@@ -1,12 +1,15 @@
 from pathlib import Path
-import fitz  # PyMuPDF
 
 
-def extract_text_from_pdf(path: Path) -> str:
+def extract_text_from_pdf(path: Path, ocr: bool = True) -> str:
+    """Textlayer aller Seiten; Bildseiten (Scans) gehen über den OCR-Fallback."""
+    import fitz  # PyMuPDF (lazy: ~70ms Import)
     doc = fitz.open(path)
-    texts = []
-    for page in doc:
-        texts.append(page.get_text())
-    doc.close()
+    try:
+        texts = [page.get_text() for page in doc]
+        if ocr:
+            from .ocr import ocr_missing_pages
+            ocr_missing_pages(Path(path), doc, texts)
+    finally:
+        doc.close()
     return "\n".join(texts)
-
@@ -0,0 +1,376 @@
+"""
+Regelbasiertes Pre-Screening für alle 8 Vertragstypen
+- Vorkompilierte Regex-/Keyword-Extraktoren für die Kernfelder
+- Risk Engines aus risk_engine.py auf den extrahierten Feldern
+- Confidence-Score entscheidet, ob ein LLM-Call nötig ist
+"""
+
+import os
+import re
+import logging
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRESCREEN_ENABLED = os.getenv("PRESCREEN_ENABLED", "true").lower() == "true"
+PRESCREEN_MIN_CONFIDENCE = float(os.getenv("PRESCREEN_MIN_CONFIDENCE", "0.75"))
+
+# Typen ohne eigene Risk Engine erreichen nie die Schwelle und gehen immer ans LLM
+ENGINE_TYPES = {"employment", "saas", "nda", "vendor"}
+
+FieldRule = namedtuple("FieldRule", ["name", "pattern", "kind"])
+
+_AMOUNT = r"(\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:,\d{1,2})?)"
+_EUR = rf"(?:(?:EUR|€|Euro)\s*{_AMOUNT}|{_AMOUNT}\s*(?:EUR|€|Euro))"
+_DATE = r"(\d{1,2}\.\d{1,2}\.\d{4})"
+_NUM = r"(\d+(?:,\d+)?)"
+_UNIT = r"(?P<unit>Tag|Woche|Monat|Jahr)\w*"
+_GAP = r"[^.;§]{0,80}?"
+
+NUMBER_WORDS = {
+    "ein": 1, "eine": 1, "einen": 1, "eines": 1, "zwei": 2, "drei": 3, "vier": 4, "fünf": 5, "sechs": 6,
+    "sieben": 7, "acht": 8, "neun": 9, "zehn": 10, "elf": 11, "zwölf": 12, "vierzehn": 14, "dreißig": 30,
+}
+_WORD_WITH_DIGIT = re.compile(r"\b(?:" + "|".join(NUMBER_WORDS) + r")\s*\((\d+)\)", re.IGNORECASE)
+_WORD_BEFORE_UNIT = re.compile(
+    r"\b(" + "|".join(NUMBER_WORDS) + r")\s+(?=(?:Kalender|Werk|Arbeits)?(?:tag|woche|monat|jahr))", re.IGNORECASE
+)
+_NEGATION = re.compile(r"\b(?:nicht|kein\w*|ausgeschlossen|entfällt)\b", re.IGNORECASE)
+
+
+def _rules(*rules) -> List[FieldRule]:
+    return [FieldRule(name, re.compile(pattern, re.IGNORECASE), kind) for name, pattern, kind in rules]
+
+
+COMMON_RULES = _rules(
+    ("contract_start_date", rf"(?:beginnt am|beginnt mit dem|Beginn am|Vertragsbeginn{_GAP}|mit Wirkung (?:zum|ab))\s*{_DATE}", "date"),
+    ("contract_end_date", rf"(?:endet am|bis zum|befristet bis)\s*{_DATE}", "date"),
+    ("governing_law", r"(deutsche[sm]? Recht|Recht der Bundesrepublik Deutschland)", "text"),
+    ("jurisdiction", r"Gerichtsstand\s+(?:ist|für[^.]{0,40}?ist)\s+([A-ZÄÖÜ][\wäöüß\-]+)", "text"),
+)
+
+EXTRACTION_RULES: Dict[str, List[FieldRule]] = {
+    "employment": _rules(
+        ("start_date", rf"(?:Arbeitsverhältnis|Vertrag)\s+beginnt\s+am\s*{_DATE}", "date"),
+        ("end_date", rf"bis\s+zum\s*{_DATE}\s*befristet", "date"),
+        ("fixed_term", r"\bbefristet", "flag"),
+        ("probation_period_months", rf"(?:Probezeit{_GAP}{_NUM}\s*Monat|{_NUM}\s*Monat\w*{_GAP}Probezeit)", "float"),
+        ("weekly_hours", rf"(?:wöchentliche\w* Arbeitszeit{_GAP}{_NUM}\s*Stunden|{_NUM}\s*Stunden\s*(?:pro|je|in der|/)\s*Woche)", "float"),
+        ("base_salary_eur", rf"(?:gehalt|Vergütung|Entgelt){_GAP}{_EUR}", "amount"),
+        ("vacation_days_per_year", rf"(?:{_NUM}\s*(?:Arbeits|Werk)?tag\w*\s*(?:bezahlten\s*)?(?:Erholungs)?urlaub|Urlaub{_GAP}{_NUM}\s*(?:Arbeits|Werk)?tag)", "int"),
+        ("overtime_included", r"Überstunden[^.;]{0,60}?abgegolten", "flag"),
+        ("overtime_cap_hours", rf"(?:bis zu|maximal|höchstens)\s*{_NUM}\s*Überstunden", "float"),
+        ("post_contract_non_compete", r"nachvertragliche\w*\s+Wettbewerbsverbot", "flag"),
+        ("non_compete_compensation", r"Karenzentschädigung", "flag"),
+        ("notice_period_employer", rf"Kündigungsfrist\w*{_GAP}(\d+\s*(?:Wochen|Monate?))", "text"),
+    ),
+    "saas": _rules(
+        ("auto_renew", r"verlängert sich[^.;]{0,40}?(?:automatisch|stillschweigend|jeweils)", "flag_plain"),
+        ("renewal_notice_days", rf"{_NUM}\s*{_UNIT}\s*(?:vor|zum)\s*(?:Ablauf|Ende|Laufzeitende)", "days"),
+        ("min_term_months", rf"(?:Mindestlaufzeit|Laufzeit){_GAP}{_NUM}\s*{_UNIT}", "months"),
+        ("annual_contract_value_eur", rf"(?:jährlich|Jahresgebühr|pro Jahr|p\.\s?a\.){_GAP}{_EUR}", "amount"),
+        ("dp_addendum_included", r"(?:Auftragsverarbeitung|\bAVV\b|Art\.?\s*28 DSGVO|Data Processing (?:Agreement|Addendum)|\bDPA\b)", "flag_plain"),
+        ("data_location", r"(?:Rechenzentren|Server|Daten)[^.;]{0,60}?\b(EU|EWR|Europäischen Union|Deutschland|USA|Vereinigten Staaten)\b", "text"),
+        ("uptime_sla_percent", r"(9\d(?:[.,]\d+)?)\s*%[^.;]{0,30}?(?:Verfügbarkeit|Uptime)|(?:Verfügbarkeit|Uptime)[^.;]{0,40}?(9\d(?:[.,]\d+)?)\s*%", "float"),
+        ("service_credits", r"(?:Service[- ]?Credits?|Gutschrift)", "flag_plain"),
+        ("liability_cap_multiple_acv", rf"{_NUM}[- ]?fache\w*\s+(?:der\s+)?(?:jährlichen|Jahres)", "float"),
+        ("data_export_clause", r"(?:Datenexport|Export der Daten|Herausgabe der (?:Kunden)?daten|Datenportabilität)", "flag_plain"),
+        ("price_escalation_clause", r"(?:Preisanpassung|Preiserhöhung|Preise?[^.;]{0,30}?(?:anzupassen|zu erhöhen))[^.;]{0,120}", "text"),
+        ("price_escalation_cap", rf"(?:höchstens|maximal|max\.|bis zu)\s*{_NUM}\s*%\s*(?:pro Jahr|p\.\s?a\.|jährlich)", "float"),
+    ),
+    "nda": _rules(
+        ("nda_type", r"\b(gegenseitig|wechselseitig|beiderseitig|einseitig)", "text"),
+        ("term_years", rf"(?:Geheimhaltung|Vertraulichkeit|Laufzeit){_GAP}{_NUM}\s*Jahre", "float"),
+        ("duration_indefinite", r"(?:zeitlich unbe(?:grenzt|fristet)|unbefristet)", "flag_plain"),
+        ("confidential_info_definition", r"(alle(?:n)?\s+(?:\w+\s+){0,3}Informationen[^.;]{0,120})", "text"),
+        ("penalty_amount_eur", rf"Vertragsstrafe{_GAP}{_EUR}", "amount"),
+        ("penalty_per_violation", r"(?:für jeden (?:einzelnen )?Fall|je Verstoß|pro Verstoß|jeder Zuwiderhandlung)", "flag_plain"),
+        ("exclusion_public", r"(?:öffentlich bekannt|allgemein bekannt|offenkundig)", "flag_plain"),
+        ("exclusion_lawful", r"rechtmäßig[^.;]{0,40}?(?:erhalten|erlangt)", "flag_plain"),
+        ("exclusion_independent", r"(?:eigenständig|unabhängig)[^.;]{0,20}?entwickelt", "flag_plain"),
+        ("return_of_information", r"(?:zurückzugeben|Rückgabe)", "flag_plain"),
+        ("destruction_clause", r"(?:zu vernichten|Vernichtung|zu löschen)", "flag_plain"),
+    ),
+    "vendor": _rules(
+        ("warranty_months", rf"(?:Gewährleistung|Gewaehrleistung|Mängelansprüche|Verjährungsfrist){_GAP}{_NUM}\s*{_UNIT}", "months"),
+        ("liability_excluded", r"Haftung[^.;]{0,40}?(?:ist|wird)\s+(?:vollständig\s+|vollstaendig\s+)?ausgeschlossen", "flag_plain"),
+        ("liability_cap_eur", rf"Haftung{_GAP}(?:begrenzt|beschränkt)\w*{_GAP}{_EUR}", "amount"),
+        ("payment_terms_days", rf"(?:Zahlungsziel{_GAP}{_NUM}\s*Tag|{_NUM}\s*Tag\w*\s*(?:nach|ab)\s*(?:Rechnung|Erhalt|Lieferung|Zugang))", "int"),
+        ("audit_rights", r"(?:Audit|Prüfungsrecht|Betriebsbesichtigung)", "flag_plain"),
+        ("price_adjustment_clause", r"(?:Preisanpassung|Preiserhöhung|Preisgleitklausel)[^.;]{0,120}", "text"),
+        ("price_adjustment_index", r"(?:Index|Erzeugerpreis|Verbraucherpreis|Rohstoffpreis)", "flag_plain"),
+        ("penalty_for_delay", r"Vertragsstrafe[^.;]{0,60}?Verzug|Verzug[^.;]{0,60}?Vertragsstrafe", "flag_plain"),
+        ("exclusivity", r"(?:exklusiv|Exklusivität|ausschließlich)", "flag"),
+    ),
+    "service": _rules(
+        ("contract_value_eur", rf"(?:Festpreis|Gesamtvergütung|Pauschale|Auftragswert){_GAP}{_EUR}", "amount"),
+        ("hourly_rate_eur", rf"(?:Stundensatz|pro Stunde|je Stunde){_GAP}{_EUR}|{_EUR}\s*(?:pro|je)\s*Stunde", "amount"),
+        ("payment_terms_days", rf"{_NUM}\s*Tag\w*\s*(?:nach|ab)\s*(?:Rechnung|Erhalt|Zugang)", "int"),
+        ("sla_response_hours", rf"Reaktionszeit{_GAP}{_NUM}\s*Stunden", "float"),
+        ("liability_cap_eur", rf"Haftung{_GAP}(?:begrenzt|beschränkt)\w*{_GAP}{_EUR}", "amount"),
+        ("ip_ownership", r"(?:Nutzungsrechte|Urheberrechte|Arbeitsergebnisse)[^.;]{0,80}?(Auftraggeber|Auftragnehmer)", "text"),
+        ("confidentiality_clause", r"(?:Vertraulichkeit|Verschwiegenheit|Geheimhaltung)", "flag_plain"),
+        ("termination_notice_days", rf"(?:Frist von|Kündigungsfrist{_GAP}){_NUM}\s*{_UNIT}", "days"),
+        ("subcontracting_allowed", r"(?:Subunternehmer|Unterauftragnehmer|Dritte[^.;]{0,30}?beauftragen)", "flag"),
+    ),
+    "rental": _rules(
+        ("monthly_rent_eur", rf"(?:Nettokaltmiete|Grundmiete|Miete|Mietzins){_GAP}{_EUR}", "amount"),
+        ("monthly_utilities_eur", rf"(?:Nebenkosten|Betriebskosten)\w*{_GAP}{_EUR}", "amount"),
+        ("area_sqm", r"(\d+(?:[.,]\d+)?)\s*(?:m²|qm|m2|Quadratmeter)", "float"),
+        ("deposit_months", rf"(?:Kaution|Mietsicherheit){_GAP}{_NUM}\s*(?:Monats|Brutto|Netto|Kalt)", "float"),
+        ("fixed_term_years", rf"(?:fest|Festlaufzeit|Laufzeit){_GAP}{_NUM}\s*Jahre", "float"),
+        ("index_clause", r"(?:Indexmiete|Verbraucherpreisindex|Wertsicherung)", "flag_plain"),
+        ("escalation_percent_per_year", rf"(?:Staffelmiete|erhöht sich){_GAP}{_NUM}\s*%", "float"),
+        ("termination_notice_months", rf"Kündigungsfrist{_GAP}{_NUM}\s*Monat", "float"),
+        ("renewal_option", r"(?:Verlängerungsoption|Option auf Verlängerung|Optionsrecht)", "flag_plain"),
+        ("subletting_allowed", r"Untervermietung", "flag"),
+    ),
+    "purchase": _rules(
+        ("purchase_price_eur", rf"Kaufpreis{_GAP}{_EUR}", "amount"),
+        ("payment_terms", r"(zahlbar[^.;]{0,80})", "text"),
+        ("delivery_date", rf"(?:Lieferung|geliefert|Übergabe){_GAP}{_DATE}", "date"),
+        ("warranty_months", rf"(?:Gewährleistung|Mängelansprüche|Verjährungsfrist){_GAP}{_NUM}\s*{_UNIT}", "months"),
+        ("liability_exclusions", r"(Haftung[^.;]{0,40}?ausgeschlossen[^.;]{0,80})", "text"),
+        ("retention_of_title", r"Eigentumsvorbehalt", "flag_plain"),
+        ("defect_notification_days", rf"(?:Mängel\w*{_GAP}{_NUM}\s*(?:Werk|Arbeits|Kalender)?tag|{_NUM}\s*(?:Werk|Arbeits|Kalender)?tag\w*{_GAP}Mängel)", "int"),
+        ("arbitration_clause", r"(?:Schiedsgericht|Schiedsverfahren|Schiedsklausel)", "flag_plain"),
+    ),
+    "general": _rules(
+        ("contract_value_eur", rf"(?:Vergütung|Preis|Gesamtwert|Entgelt){_GAP}{_EUR}", "amount"),
+        ("payment_terms", r"(zahlbar[^.;]{0,80})", "text"),
+        ("termination_notice_days", rf"(?:Frist von|Kündigungsfrist{_GAP}){_NUM}\s*{_UNIT}", "days"),
+        ("liability_provisions", r"(Haftung[^.;]{0,120})", "text"),
+        ("confidentiality_clause", r"(?:Vertraulichkeit|Verschwiegenheit|Geheimhaltung)", "flag_plain"),
+    ),
+}
+
+UNIT_DAYS = {"tag": 1, "woche": 7, "monat": 30, "jahr": 365}
+UNIT_MONTHS = {"tag": 1 / 30, "woche": 7 / 30, "monat": 1, "jahr": 12}
+
+
+# ============================================================================
+# EXTRAKTION
+# ============================================================================
+
+def normalise_text(text: str) -> str:
+    """Whitespace glätten und Zahlwörter ('sechs (6)', 'drei Monate') in Ziffern umwandeln."""
+    text = re.sub(r"\s+", " ", text)
+    text = _WORD_WITH_DIGIT.sub(r"\1", text)
+    return _WORD_BEFORE_UNIT.sub(lambda m: f"{NUMBER_WORDS[m.group(1).lower()]} ", text)
+
+
+def _to_float(value: str) -> float:
+    return float(value.replace(".", "").replace(",", ".")) if "," in value or re.search(r"\.\d{3}\b", value) else float(value)
+
+
+def _sentence(text: str, start: int, end: int) -> str:
+    left = max(text.rfind(". ", 0, start), text.rfind("; ", 0, start), text.rfind("§", 0, start)) + 1
+    right_candidates = [i for i in (text.find(". ", end), text.find("; ", end)) if i != -1]
+    right = min(right_candidates) if right_candidates else len(text)
+    return text[left:right].strip()
+
+
+def _convert(rule: FieldRule, match, text: str):
+    groups = [g for g in match.groups() if g is not None]
+    value = groups[0] if groups else match.group(0)
+
+    if rule.kind == "flag":
+        return _NEGATION.search(_sentence(text, match.start(), match.end())) is None
+    if rule.kind == "flag_plain":
+        return True
+    if rule.kind == "text":
+        return value.strip()
+    if rule.kind == "date":
+        return datetime.strptime(value, "%d.%m.%Y").date().isoformat()
+    if rule.kind == "int":
+        return int(_to_float(value))
+    if rule.kind in ("float", "amount"):
+        return _to_float(value)
+    if rule.kind in ("days", "months"):
+        unit = match.group("unit").lower()
+        factor = UNIT_DAYS[unit] if rule.kind == "days" else UNIT_MONTHS[unit]
+        return round(_to_float(value) * factor, 1)
+    return value
+
+
+def extract_fields(contract_type: str, text: str) -> Dict:
+    """
+    Extrahiert die Kernfelder eines Vertragstyps.
+
+    Gibt {"fields": {...}, "evidence": {...}} zurück; nicht gefundene
+    Felder sind None.
+    """
+    text = normalise_text(text)
+    rules = EXTRACTION_RULES.get(contract_type, EXTRACTION_RULES["general"]) + COMMON_RULES
+    fields, evidence = {}, {}
+    for rule in rules:
+        if rule.name in fields and fields[rule.name] is not None:
+            continue
+        match = rule.pattern.search(text)
+        if not match:
+            fields[rule.name] = None
+            continue
+        try:
+            fields[rule.name] = _convert(rule, match, text)
+            evidence[rule.name] = match.group(0)[:160]
+        except (ValueError, KeyError):
+            fields[rule.name] = None
+    return {"fields": fields, "evidence": evidence}
+
+
+# ============================================================================
+# RISK ENGINES
+# ============================================================================
+
+def _assess_employment(f: Dict):
+    from .risk_engine import RiskScoringEngine
+    from .models import EmploymentContractData, ProbationTerms, WorkingConditions, VacationTerms, NonCompeteTerms
+
+    data = EmploymentContractData(
+        probation=ProbationTerms(duration_months=f.get("probation_period_months")),
+        working_conditions=WorkingConditions(
+            weekly_hours=f.get("weekly_hours"),
+            overtime_included_in_salary=bool(f.get("overtime_included")),
+            overtime_cap_hours=f.get("overtime_cap_hours"),
+        ),
+        vacation=VacationTerms(days_per_year=f.get("vacation_days_per_year")),
+        non_compete=NonCompeteTerms(
+            post_employment=bool(f.get("post_contract_non_compete")),
+            has_adequate_compensation=bool(f.get("non_compete_compensation")),
+            missing_compensation=not f.get("non_compete_compensation"),
+        ),
+    )
+    return RiskScoringEngine().assess_employment_contract(data)
+
+
+def _assess_saas(f: Dict):
+    from .risk_engine import SaaSRiskScoringEngine
+
+    location = f.get("data_location") or ""
+    data = {
+        "contract_term": {"auto_renewal": f.get("auto_renew"), "notice_period_days": f.get("renewal_notice_days")},
+        "data_protection": {
+            "dpa_included": f.get("dp_addendum_included"),
+            "data_location": "EU" if location in ("EU", "EWR", "Europäischen Union", "Deutschland") else location,
+            "data_export_format": "vereinbart" if f.get("data_export_clause") else None,
+        },
+        "sla": {"uptime_percentage": f.get("uptime_sla_percent"), "credit_mechanism": f.get("service_credits")},
+        "liability": {"cap_multiple_annual_fee": f.get("liability_cap_multiple_acv")},
+        "pricing": {"price_escalation_clause": f.get("price_escalation_clause"), "price_escalation_cap": f.get("price_escalation_cap")},
+    }
+    return SaaSRiskScoringEngine().assess_saas_contract(data)
+
+
+def _assess_nda(f: Dict):
+    from .risk_engine import NDARiskScoringEngine
+
+    exclusions = [name for name in ("exclusion_public", "exclusion_lawful", "exclusion_independent") if f.get(name)]
+    nda_type = (f.get("nda_type") or "").lower()
+    data = {
+        "duration_indefinite": f.get("duration_indefinite"),
+        "duration_years": f.get("term_years"),
+        "definition_confidential": f.get("confidential_info_definition") or "",
+        "penalty_amount": f.get("penalty_amount_eur"),
+        "penalty_per_violation": f.get("penalty_per_violation"),
+        "exclusions": exclusions,
+        "return_of_information": f.get("return_of_information"),
+        "destruction_of_information": f.get("destruction_clause"),
+        "nda_type": "unilateral" if nda_type == "einseitig" else ("mutual" if nda_type else "unbekannt"),
+    }
+    return NDARiskScoringEngine().assess_nda_contract(data)
+
+
+def _assess_vendor(f: Dict):
+    from .risk_engine import VendorRiskScoringEngine
+
+    data = {
+        "warranty": {"duration_months": f.get("warranty_months")},
+        "liability": {"cap_type": "excluded" if f.get("liability_excluded") else ""},
+        "payment": {"payment_days": f.get("payment_terms_days")},
+        "quality": {"audit_rights": f.get("audit_rights")},
+        "pricing": {"price_adjustment_clause": f.get("price_adjustment_clause"), "price_adjustment_index": f.get("price_adjustment_index")},
+    }
+    return VendorRiskScoringEngine().assess_vendor_contract(data)
+
+
+ENGINES = {
+    "employment": _assess_employment,
+    "saas": _assess_saas,
+    "nda": _assess_nda,
+    "vendor": _assess_vendor,
+}
+
+
+def _risk_to_flag(risk) -> Dict:
+    level = risk.risk_level.value
+    return {
+        "severity": "low" if level == "minimal" else level,
+        "title": risk.issü_title,
+        "description": risk.issü_description,
+        "clause_snippet": risk.clause_text,
+        "policy_reference": risk.legal_basis,
+    }
+
+
+# ============================================================================
+# PRE-SCREEN
+# ============================================================================
+
+def confidence_score(contract_type: str, fields: Dict, text_length: int) -> float:
+    """Anteil gefundener Kernfelder, gewichtet nach Engine-Abdeckung und Textlänge."""
+    if not fields:
+        return 0.0
+    coverage = sum(1 for v in fields.values() if v is not None) / len(fields)
+    engine_factor = 1.0 if contract_type in ENGINE_TYPES else 0.6
+    length_factor = 1.0 if text_length >= 1500 else 0.8
+    return round(min(0.95, (0.2 + 0.8 * coverage) * engine_factor * length_factor), 2)
+
+
+def prescreen_contract(contract_type: str, text: str) -> Dict:
+    """
+    Schnelle lokale Vorab-Analyse ohne LLM.
+
+    Liefert ein Ergebnis im Format von call_llm_analysis() plus
+    confidence, evidence und missing_clauses.
+    """
+    extraction = extract_fields(contract_type, text)
+    fields = extraction["fields"]
+    confidence = confidence_score(contract_type, fields, len(text))
+
+    risk_flags, missing_clauses = [], []
+    score, level = 0, "low"
+    summary = "Vorab-Analyse (regelbasiert): keine automatisch prüfbaren Risiken gefunden."
+
+    engine = ENGINES.get(contract_type)
+    if engine:
+        try:
+            assessment = engine(fields)
+            for bucket in (assessment.critical_risks, assessment.high_risks, assessment.medium_risks, assessment.low_risks):
+                risk_flags.extend(_risk_to_flag(r) for r in bucket)
+            missing_clauses = assessment.missing_clauses
+            score = assessment.overall_risk_score
+            level = "low" if assessment.overall_risk_level.value == "minimal" else assessment.overall_risk_level.value
+            summary = f"Vorab-Analyse (regelbasiert): {assessment.executive_summary}"
+        except Exception as e:
+            logger.warning(f"Prescreen engine failed for {contract_type}: {e}")
+            confidence = 0.0
+
+    return {
+        "summary": summary,
+        "extracted_fields": fields,
+        "risk_flags": risk_flags,
+        "overall_risk_level": level,
+        "overall_risk_score": score,
+        "missing_clauses": missing_clauses,
+        "evidence": extraction["evidence"],
+        "confidence": confidence,
+    }
+
+
+def needs_llm(prescreen: Optional[Dict], premium: bool = False) -> bool:
+    """LLM nur bei Premium-Analysen oder zu geringer Pre-Screen-Confidence."""
+    if premium or not PRESCREEN_ENABLED or prescreen is None:
+        return True
+    return prescreen["confidence"] < PRESCREEN_MIN_CONFIDENCE
@@ -0,0 +1,340 @@
+"""
+Prompt-Registry für die Vertragsanalyse
+- Pro Vertragstyp Varianten ("standard", "compact"); Version = Hash über
+  den statischen Teil, ändert sich automatisch mit dem Prompt-Text
+- Layout für Provider-Prompt-Caching: Rolle, Anweisungen und JSON-Schema
+  als statischer System-Prompt zuerst, nur der Vertragstext in der
+  User-Nachricht. Einschränkung: OpenAI cacht erst ab 1024 Prefix-Tokens
+  (PROMPT_CACHE_MIN_TOKENS); die statischen Prefixe haben gemessen 316-482
+  Tokens (o200k_base, prompt_tokens.json), vertragsübergreifende
+  Cache-Treffer gibt es daher nicht. Gecachte Tokens entstehen nur bei
+  erneuter Analyse desselben Textes (Prefix inkl. Vertragstext > 1024 Tokens).
+  Auffüllen auf 1024 lohnt nicht: gecachte Tokens kosten die Hälfte, 1024
+  gecachte sind teurer als ~450 ungecachte
+- A/B-Routing: PROMPT_AB_PERCENT % der Verträge (stabil per contract_id)
+  laufen über PROMPT_AB_VARIANT
+- Pro Version werden Latenz und Tokens (inkl. gecachter Input-Tokens)
+  protokolliert; Token-Zahlen der statischen Prefixe werden offline
+  gemessen (python -m app.prompt_registry, benötigt tiktoken) und in
+  prompt_tokens.json abgelegt
+"""
+
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import logging
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import prompts
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANT = "standard"
+PROMPT_AB_VARIANT = os.getenv("PROMPT_AB_VARIANT", "compact")
+PROMPT_AB_PERCENT = float(os.getenv("PROMPT_AB_PERCENT", "0"))
+
+# USD pro 1 Mio. Tokens (gpt-4o-mini); gecachte Input-Tokens kosten die Hälfte
+PRICE_INPUT_PER_M = float(os.getenv("LLM_PRICE_INPUT_PER_M", "0.15"))
+PRICE_CACHED_INPUT_PER_M = float(os.getenv("LLM_PRICE_CACHED_INPUT_PER_M", "0.075"))
+PRICE_OUTPUT_PER_M = float(os.getenv("LLM_PRICE_OUTPUT_PER_M", "0.60"))
+
+TOKEN_FILE = Path(__file__).resolve().parent / "prompt_tokens.json"
+
+# Provider-Prompt-Caching (OpenAI) greift erst ab so vielen identischen Prefix-Tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+CONTRACT_MARKER = "VERTRAGSTEXT:"
+ESTIMATE_TOKEN_RE = re.compile(r"\w+|[^\w\s]|\n\s*")
+
+PromptVersion = namedtuple("PromptVersion", ["contract_type", "variant", "version", "system", "static_tokens"])
+
+
+def init_prompt_tables(conn=None):
+    """Messwerte pro Prompt-Version"""
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(contracts_db_path())
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS prompt_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            prompt_version TEXT NOT NULL,
+            variant TEXT NOT NULL,
+            contract_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            latency_ms INTEGER,
+            input_tokens INTEGER,
+            cached_tokens INTEGER,
+            output_tokens INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prompt_runs_version ON prompt_runs(prompt_version)")
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+# ============================================================================
+# VARIANTEN
+# ============================================================================
+
+def _instructions(contract_type: str) -> str:
+    """Anweisungen + JSON-Schema des User-Templates (alles vor dem Vertragstext)."""
+    template = getattr(prompts, f"{contract_type.upper()}_CONTRACT_USER_PROMPT_TEMPLATE")
+    return template.split(CONTRACT_MARKER)[0].strip().replace("{{", "{").replace("}}", "}")
+
+
+COMPACT_PLACEHOLDERS = [
+    (re.compile(r'"<String\|null>"'), "str"),
+    (re.compile(r"<Number\|null>"), "num"),
+    (re.compile(r"<true\|false(\|null)?>"), "bool"),
+    (re.compile(r'"<YYYY-MM-DD\|null>"'), "date"),
+]
+
+
+def _compact(instructions: str) -> str:
+    """Gleiche Felder, Schema einzeilig mit Kurz-Typen statt Platzhaltertexten."""
+    head, brace, schema = instructions.partition("{")
+    schema = re.sub(r"\s*\n\s*", "", brace + schema)
+    for pattern, short in COMPACT_PLACEHOLDERS:
+        schema = pattern.sub(short, schema)
+    return f"{head.strip()}\n{schema}\nTypen: str, num, bool, date (YYYY-MM-DD), jeweils oder null."
+
+
+VARIANT_BUILDERS = {
+    "standard": lambda instructions: instructions,
+    "compact": _compact,
+}
+
+
+PLACEHOLDER_RE = re.compile(r'"<([^>"]*)>"|<([^>"]*)>')
+ENUM_OPTION_RE = re.compile(r"^[a-z_]+$")
+
+
+def _schema_of(value) -> Dict:
+    """JSON-Schema (Strict Mode) aus dem Beispielwert des Templates."""
+    if isinstance(value, dict):
+        return {
+            "type": "object",
+            "properties": {k: _schema_of(v) for k, v in value.items()},
+            "required": list(value),
+            "additionalProperties": False,
+        }
+    if isinstance(value, list):
+        return {"type": "array", "items": _schema_of(value[0]) if value else {"type": "string"}}
+    if not isinstance(value, str) or not value.startswith(("S:", "R:")):
+        return {"type": "string"}
+    kind, options = value[:2], value[2:].split("|")
+    nullable = "null" in options
+    options = [o for o in options if o != "null"]
+    if kind == "R:":
+        json_type = {"true": "boolean", "Number": "number", "0-100": "integer"}.get(options[0], "string")
+        return {"type": [json_type, "null"] if nullable else json_type}
+    if len(options) > 1 and all(ENUM_OPTION_RE.match(o) for o in options):
+        return {"type": ["string", "null"] if nullable else "string", "enum": options + ([None] if nullable else [])}
+    return {"type": ["string", "null"] if nullable else "string"}
+
+
+def response_schema(contract_type: str) -> Dict:
+    """Structured-Output-Schema aus dem JSON-Beispiel des Standard-Templates."""
+    if contract_type not in prompts.SYSTEM_PROMPTS:
+        contract_type = "general"
+    if contract_type not in _schemas:
+        example = _instructions(contract_type)
+        example = example[example.index("{"):example.rindex("}") + 1]
+        # "<...>" -> "S:...", unquotiertes <...> -> "R:...", damit das Beispiel valides JSON ist
+        example = PLACEHOLDER_RE.sub(lambda m: json.dumps(f"S:{m.group(1)}" if m.group(1) is not None else f"R:{m.group(2)}"), example)
+        _schemas[contract_type] = {
+            "name": f"{contract_type}_contract_analysis",
+            "strict": True,
+            "schema": _schema_of(json.loads(example)),
+        }
+    return _schemas[contract_type]
+
+
+_schemas: Dict[str, Dict] = {}
+
+
+def _version(system: str) -> str:
+    return hashlib.sha256(system.encode("utf-8")).hexdigest()[:12]
+
+
+def _load_token_counts() -> Dict[str, int]:
+    """Nur echte Tokenizer-Messungen; Schätzungen gelten nicht als Messwert."""
+    try:
+        data = json.loads(TOKEN_FILE.read_text())
+        if data.get("tokenizer") in (None, "estimate"):
+            return {}
+        return dict(data["versions"])
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _build_registry() -> Dict[tuple, PromptVersion]:
+    token_counts = _load_token_counts()
+    registry = {}
+    for contract_type, role in prompts.SYSTEM_PROMPTS.items():
+        instructions = _instructions(contract_type)
+        for variant, build in VARIANT_BUILDERS.items():
+            # Statischer Teil komplett im System-Prompt -> identischer Prefix über alle Verträge eines Typs
+            system = f"{role}\n\n{build(instructions)}"
+            version = _version(system)
+            registry[(contract_type, variant)] = PromptVersion(
+                contract_type, variant, version, system, token_counts.get(version)
+            )
+    return registry
+
+
+REGISTRY = _build_registry()
+
+
+def get_version(contract_type: str, variant: str = DEFAULT_VARIANT) -> PromptVersion:
+    if contract_type not in prompts.SYSTEM_PROMPTS:
+        contract_type = "general"
+    return REGISTRY[(contract_type, variant if variant in VARIANT_BUILDERS else DEFAULT_VARIANT)]
+
+
+def select_variant(routing_key: Optional[str]) -> str:
+    """A/B-Zuteilung, stabil pro Schlüssel (gleicher Vertrag -> gleiche Variante)."""
+    if PROMPT_AB_PERCENT <= 0 or not routing_key:
+        return DEFAULT_VARIANT
+    bucket = int(hashlib.sha256(routing_key.encode("utf-8")).hexdigest()[:8], 16) % 10000
+    return PROMPT_AB_VARIANT if bucket < PROMPT_AB_PERCENT * 100 else DEFAULT_VARIANT
+
+
+def build_messages(contract_type: str, contract_text: str, routing_key: Optional[str] = None,
+                   max_chars: int = 7000) -> tuple:
+    """(PromptVersion, system_prompt, user_prompt); der Vertragstext steht ausschließlich am Ende."""
+    prompt = get_version(contract_type, select_variant(routing_key))
+    text = prompts.truncate_contract_text(contract_text, max_chars)
+    return prompt, prompt.system, f'{CONTRACT_MARKER}\n"""{text}"""'
+
+
+# ============================================================================
+# MESSWERTE
+# ============================================================================
+
+def record_run(prompt: PromptVersion, status: str, latency_ms: int, input_tokens: Optional[int] = None,
+               cached_tokens: Optional[int] = None, output_tokens: Optional[int] = None):
+    from .metrics import PROMPT_LATENCY, PROMPT_TOKENS
+
+    PROMPT_LATENCY.observe(latency_ms / 1000, prompt_version=prompt.version, variant=prompt.variant)
+    for direction, count in (("input", input_tokens), ("cached_input", cached_tokens), ("output", output_tokens)):
+        if count:
+            PROMPT_TOKENS.inc(count, prompt_version=prompt.version, variant=prompt.variant, direction=direction)
+    try:
+        conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+        try:
+            conn.execute(
+                "INSERT INTO prompt_runs (prompt_version, variant, contract_type, status, latency_ms, input_tokens, "
+                "cached_tokens, output_tokens) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (prompt.version, prompt.variant, prompt.contract_type, status, latency_ms,
+                 input_tokens, cached_tokens, output_tokens)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"Could not record prompt run: {e}")
+
+
+def _cost_usd(input_tokens: float, cached_tokens: float, output_tokens: float) -> float:
+    uncached = max(0.0, input_tokens - cached_tokens)
+    return (uncached * PRICE_INPUT_PER_M + cached_tokens * PRICE_CACHED_INPUT_PER_M
+            + output_tokens * PRICE_OUTPUT_PER_M) / 1_000_000
+
+
+def version_stats(days: int = 30) -> List[Dict]:
+    """Latenz, Tokens und Kosten pro Prompt-Version (für den A/B-Vergleich)."""
+    by_version = {p.version: p for p in REGISTRY.values()}
+    conn = sqlite3.connect(contracts_db_path(), timeout=30.0)
+    try:
+        rows = conn.execute(
+            "SELECT prompt_version, variant, contract_type, COUNT(*), SUM(status = 'success'), AVG(latency_ms), "
+            "AVG(input_tokens), AVG(COALESCE(cached_tokens, 0)), AVG(output_tokens) FROM prompt_runs "
+            "WHERE created_at >= datetime('now', ?) GROUP BY prompt_version, variant, contract_type "
+            "ORDER BY contract_type, variant", (f"-{int(days)} days",)
+        ).fetchall()
+        latencies: Dict[str, List[int]] = {}
+        for version, latency in conn.execute(
+            "SELECT prompt_version, latency_ms FROM prompt_runs WHERE status = 'success' "
+            "AND created_at >= datetime('now', ?) ORDER BY prompt_version, latency_ms", (f"-{int(days)} days",)
+        ):
+            latencies.setdefault(version, []).append(latency)
+    finally:
+        conn.close()
+
+    stats = []
+    for version, variant, contract_type, runs, ok, avg_latency, avg_in, avg_cached, avg_out in rows:
+        values = latencies.get(version, [])
+        stats.append({
+            "prompt_version": version,
+            "variant": variant,
+            "contract_type": contract_type,
+            "current": version in by_version,
+            "runs": runs,
+            "success_rate": round((ok or 0) / runs, 3),
+            "avg_latency_ms": round(avg_latency or 0),
+            "p95_latency_ms": values[min(len(values) - 1, int(len(values) * 0.95))] if values else None,
+            "avg_input_tokens": round(avg_in or 0),
+            "avg_cached_tokens": round(avg_cached or 0),
+            "avg_output_tokens": round(avg_out or 0),
+            "avg_cost_usd": round(_cost_usd(avg_in or 0, avg_cached or 0, avg_out or 0), 6),
+        })
+    return stats
+
+
+def registry_overview() -> List[Dict]:
+    return [
+        {"contract_type": p.contract_type, "variant": p.variant, "version": p.version,
+         "static_chars": len(p.system), "static_tokens": p.static_tokens,
+         "cacheable": p.static_tokens >= PROMPT_CACHE_MIN_TOKENS if p.static_tokens is not None else None}
+        for p in REGISTRY.values()
+    ]
+
+
+# ============================================================================
+# OFFLINE-TOKENZÄHLUNG
+# ============================================================================
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """o200k_base (gpt-4o-Familie) oder None, falls tiktoken bzw. die Encoding-Datei fehlt."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encoding wird beim ersten Aufruf heruntergeladen (bzw. aus TIKTOKEN_CACHE_DIR gelesen)
+        logger.warning(f"tiktoken encoding o200k_base unavailable, falling back to estimate: {e}")
+        return None
+
+
+def count_tokens(text: str) -> tuple:
+    """(Tokens, Tokenizer); ohne tiktoken Schätzung über Wörter und Satzzeichen."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text)), "o200k_base"
+    # Lange deutsche Komposita zerfallen in mehrere Tokens
+    return sum(1 + len(t) // 8 for t in ESTIMATE_TOKEN_RE.findall(text)), "estimate"
+
+
+if __name__ == "__main__":
+    import sys
+
+    if _encoding() is None:
+        sys.exit("tiktoken mit o200k_base wird benötigt (pip install -r requirements.txt, Netzzugang oder TIKTOKEN_CACHE_DIR)")
+    versions = {}
+    for prompt in REGISTRY.values():
+        versions[prompt.version], tokenizer = count_tokens(prompt.system)
+        note = "" if versions[prompt.version] >= PROMPT_CACHE_MIN_TOKENS else "  (unter Cache-Minimum)"
+        print(f"{prompt.contract_type:<11} {prompt.variant:<9} {prompt.version}  {versions[prompt.version]:>5} tokens{note}")
+    TOKEN_FILE.write_text(json.dumps({"tokenizer": tokenizer, "versions": versions}, indent=2) + "\n")
+    print(f"-> {TOKEN_FILE} ({tokenizer})")
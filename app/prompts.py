@@ -519,11 +519,16 @@ VERTRAGSTEXT:
 # PROMPT-FUNKTIONEN
 # ============================================================================
 
-def _prepare_contract_text(contract_text: str, max_chars: int = 7000) -> str:
-    """Bereitet Vertragstext für LLM vor (kürzen, escapen)."""
+def truncate_contract_text(contract_text: str, max_chars: int = 7000) -> str:
+    """Kürzt den Vertragstext auf das Prompt-Budget."""
     if len(contract_text) > max_chars:
         contract_text = contract_text[:max_chars] + "\n\n[... Text gekürzt ...]"
-    return contract_text.replace("{", "{{").replace("}", "}}")
+    return contract_text
+
+
+def _prepare_contract_text(contract_text: str, max_chars: int = 7000) -> str:
+    """Bereitet Vertragstext für LLM vor (kürzen, escapen)."""
+    return truncate_contract_text(contract_text, max_chars).replace("{", "{{").replace("}", "}}")
 
 
 def get_employment_contract_prompt(contract_text: str) -> str:
@@ -608,12 +613,10 @@ def get_prompt_for_type(contract_type: str, contract_text: str) -> tuple:
     
     Returns:
         Tuple (system_prompt, user_prompt)
-    """
-    # Fallback auf general wenn Typ unbekannt
-    if contract_type not in PROMPT_FUNCTIONS:
-        contract_type = "general"
-    
-    system_prompt = SYSTEM_PROMPTS[contract_type]
-    user_prompt = PROMPT_FUNCTIONS[contract_type](contract_text)
     
+    Layout aus der Prompt-Registry: Anweisungen und Schema im System-Prompt,
+    der Vertragstext allein in der User-Nachricht.
+    """
+    from .prompt_registry import build_messages
+    _, system_prompt, user_prompt = build_messages(contract_type, contract_text)
     return system_prompt, user_prompt
@@ -0,0 +1,120 @@
+"""
+Report-Cache für PDF-Exporte.
+- Reports werden einmal pro Analyse-Stand gerendert und auf Disk abgelegt
+- Schlüssel: contract_id + Hash des Analyse-JSON + Template-Version
+- Prewarm direkt nach Abschluss der Analyse
+"""
+
+import os
+import glob
+import json
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+REPORT_CACHE_DIR = Path(os.getenv("REPORT_CACHE_DIR", "/var/www/contract-app/data/report_cache"))
+
+
+def _template_version() -> str:
+    from .pdf_report import REPORT_TEMPLATE_VERSION
+    return REPORT_TEMPLATE_VERSION
+
+
+def report_etag(contract_id: str, analysis_json: str) -> str:
+    """ETag eines Reports (ändert sich mit Analyse-Inhalt oder Template)."""
+    payload_hash = hashlib.sha256(analysis_json.encode("utf-8")).hexdigest()[:20]
+    return f'"{contract_id[:12]}-{payload_hash}-v{_template_version()}"'
+
+
+def _report_path(contract_id: str, analysis_json: str) -> Path:
+    """Cache-Pfad, nach contract_id-Präfix in Unterverzeichnisse verteilt."""
+    payload_hash = hashlib.sha256(analysis_json.encode("utf-8")).hexdigest()[:20]
+    return REPORT_CACHE_DIR / contract_id[:2] / f"{contract_id}_{payload_hash}_v{_template_version()}.pdf"
+
+
+def get_cached_report(contract_id: str, analysis_json: str) -> Optional[Path]:
+    """Gibt den Pfad zurück, falls der Report bereits gerendert wurde."""
+    path = _report_path(contract_id, analysis_json)
+    return path if path.exists() else None
+
+
+def build_report(contract_id: str, analysis_json: str) -> Path:
+    """
+    Rendert den Report (falls nicht gecacht) und gibt den Pfad zurück.
+
+    Schreibt atomar über eine temporäre Datei, damit parallele Requests
+    nie einen halb geschriebenen Report ausliefern.
+    """
+    path = _report_path(contract_id, analysis_json)
+    if path.exists():
+        return path
+
+    from .pdf_report import generate_contract_pdf
+
+    pdf_bytes = generate_contract_pdf(json.loads(analysis_json))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Eindeutig pro Aufruf: Prewarm und Export können im selben Prozess parallel schreiben
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    _remove_stale_reports(contract_id, keep=path)
+    logger.info(f"Report cached: {contract_id} ({len(pdf_bytes)} bytes)")
+    return path
+
+
+def prewarm_report(contract_id: str, analysis_json: str):
+    """Rendert den Report im Hintergrund vor (Fehler werden nur geloggt)."""
+    try:
+        build_report(contract_id, analysis_json)
+    except Exception as e:
+        logger.warning(f"Report prewarm failed for {contract_id}: {e}")
+
+
+def invalidate_reports(contract_id: str):
+    """Entfernt alle gecachten Reports eines Vertrags."""
+    _remove_stale_reports(contract_id, keep=None)
+
+
+def invalidate_reports_many(contract_ids):
+    """Wie invalidate_reports, aber ein Verzeichnis-Listing pro Präfix statt eines Globs pro Vertrag."""
+    by_prefix = {}
+    for contract_id in contract_ids:
+        by_prefix.setdefault(contract_id[:2], set()).add(contract_id)
+    for prefix, ids in by_prefix.items():
+        directory = REPORT_CACHE_DIR / prefix
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            if name.endswith(".pdf") and name.rsplit("_", 2)[0] in ids:
+                try:
+                    os.remove(directory / name)
+                except OSError:
+                    pass
+
+
+def _remove_stale_reports(contract_id: str, keep: Optional[Path]):
+    """Löscht ältere Report-Versionen eines Vertrags."""
+    pattern = str(REPORT_CACHE_DIR / contract_id[:2] / f"{contract_id}_*.pdf")
+    for old in glob.glob(pattern):
+        if keep is not None and Path(old) == keep:
+            continue
+        try:
+            os.remove(old)
+        except OSError:
+            pass
@@ -0,0 +1,288 @@
+"""
+Gemeinsamer Zustand für den Multi-Worker-Betrieb
+- DEPLOYMENT_MODE=single: In-Memory-Backend (ein Prozess, kein I/O)
+- DEPLOYMENT_MODE=multi: SQLite-Key-Value-Store (WAL) für alle Worker eines Hosts
+- Atomares incr mit TTL (Rate-Limits), set_nx (Locks), API-Keys
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .database import contracts_db_path
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = contracts_db_path()
+
+DEPLOYMENT_MODE = os.getenv("DEPLOYMENT_MODE", "single").lower()
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", os.path.join(os.path.dirname(DB_PATH), "shared_state.db"))
+
+API_KEY_PREFIX = "apikey:"
+# Tombstones widerrufener Keys, damit seed_api_keys sie nicht wiederherstellt
+REVOKED_KEY_PREFIX = "apikey-revoked:"
+RATE_LIMIT_PREFIX = "rl:"
+# Abgelaufene Keys (alte Rate-Limit-Fenster, Locks) spätestens nach so vielen Sekunden entfernen
+PURGE_INTERVAL = float(os.getenv("SHARED_STATE_PURGE_INTERVAL", "60"))
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class MemoryBackend:
+    """Prozesslokaler Store (Standard bei einem Worker)."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            item = self._live(key, time.time())
+            return default if item is None else item[0]
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def set_nx(self, key: str, value, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            now = time.time()
+            if self._live(key, now) is not None:
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            now = time.time()
+            item = self._live(key, now)
+            if item is None:
+                self._data[key] = (amount, now + ttl if ttl else None)
+                return amount
+            value = int(item[0]) + amount
+            self._data[key] = (value, item[1])
+            return value
+
+    def scan(self, prefix: str) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            result = {}
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                item = self._live(key, now)
+                if item is not None:
+                    result[key] = item[0]
+            return result
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            now = time.time()
+            expired = [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]
+            for k in expired:
+                del self._data[k]
+            return len(expired)
+
+
+class SQLiteBackend:
+    """Host-weiter Store für mehrere Worker (eine Verbindung pro Thread)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS kv_store (
+                key TEXT PRIMARY KEY,
+                value,
+                expires_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv_store(expires_at) WHERE expires_at IS NOT NULL")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit: jede Anweisung ist eine eigene (atomare) Transaktion
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _decode(value):
+        return json.loads(value) if isinstance(value, str) else value
+
+    def get(self, key: str, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM kv_store WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv_store (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+
+    def set_nx(self, key: str, value, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        row = self._conn().execute("""
+            INSERT INTO kv_store (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+            WHERE kv_store.expires_at IS NOT NULL AND kv_store.expires_at <= ?
+            RETURNING key
+        """, (key, json.dumps(value), now + ttl if ttl else None, now)).fetchone()
+        return row is not None
+
+    def delete(self, key: str) -> bool:
+        return self._conn().execute("DELETE FROM kv_store WHERE key = ?", (key,)).rowcount > 0
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomares Hochzählen; abgelaufene Zähler starten neu."""
+        now = time.time()
+        row = self._conn().execute("""
+            INSERT INTO kv_store (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = CASE WHEN kv_store.expires_at IS NOT NULL AND kv_store.expires_at <= ?
+                             THEN excluded.value ELSE CAST(kv_store.value AS INTEGER) + excluded.value END,
+                expires_at = CASE WHEN kv_store.expires_at IS NOT NULL AND kv_store.expires_at <= ?
+                                  THEN excluded.expires_at ELSE kv_store.expires_at END
+            RETURNING value
+        """, (key, amount, now + ttl if ttl else None, now, now)).fetchone()
+        return int(row[0])
+
+    def scan(self, prefix: str) -> Dict[str, Any]:
+        rows = self._conn().execute(
+            "SELECT key, value FROM kv_store WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time())
+        ).fetchall()
+        return {key: self._decode(value) for key, value in rows}
+
+    def purge_expired(self) -> int:
+        return self._conn().execute(
+            "DELETE FROM kv_store WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_state():
+    """Backend passend zum DEPLOYMENT_MODE (lazy, einmal pro Prozess)."""
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                if DEPLOYMENT_MODE == "multi":
+                    _state = SQLiteBackend(SHARED_STATE_DB)
+                    logger.info(f"Shared state: SQLite ({SHARED_STATE_DB})")
+                else:
+                    _state = MemoryBackend()
+    return _state
+
+
+def is_multi_worker() -> bool:
+    return DEPLOYMENT_MODE == "multi"
+
+
+# ============================================================================
+# API-KEYS
+# ============================================================================
+
+def seed_api_keys(keys: Dict[str, str]):
+    """Übernimmt die statisch konfigurierten Keys (bestehende und widerrufene bleiben unverändert)."""
+    state = get_state()
+    for api_key, tenant_id in keys.items():
+        if state.get(REVOKED_KEY_PREFIX + api_key) is None:
+            state.set_nx(API_KEY_PREFIX + api_key, tenant_id)
+
+
+def resolve_api_key(api_key: str) -> Optional[str]:
+    return get_state().get(API_KEY_PREFIX + api_key)
+
+
+def register_api_key(api_key: str, tenant_id: str):
+    state = get_state()
+    state.delete(REVOKED_KEY_PREFIX + api_key)
+    state.set(API_KEY_PREFIX + api_key, tenant_id)
+
+
+def revoke_api_key(api_key: str) -> bool:
+    """Löscht den Key und hinterlegt einen Tombstone (gilt über Neustarts, sofern der Store persistent ist)."""
+    state = get_state()
+    deleted = state.delete(API_KEY_PREFIX + api_key)
+    if deleted:
+        state.set(REVOKED_KEY_PREFIX + api_key, int(time.time()))
+    return deleted
+
+
+def list_api_keys() -> Dict[str, str]:
+    """Key (maskiert) -> Tenant"""
+    keys = get_state().scan(API_KEY_PREFIX)
+    return {
+        f"{key[len(API_KEY_PREFIX):][:4]}…{key[-3:]}": tenant
+        for key, tenant in keys.items()
+    }
+
+
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+_last_purge = time.time()
+
+
+def _maybe_purge(now: float):
+    """
+    Alte Fenster werden nie wieder gelesen und laufen daher nicht von selbst
+    aus dem Store; höchstens einmal pro PURGE_INTERVAL aufräumen.
+    """
+    global _last_purge
+    if now - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = now
+    try:
+        purged = get_state().purge_expired()
+        if purged:
+            logger.debug(f"Shared state: {purged} abgelaufene Keys entfernt")
+    except sqlite3.Error as e:
+        logger.warning(f"Shared state purge failed: {e}")
+
+
+def check_rate_limit(bucket: str, limit: int, window_seconds: int = 60) -> Tuple[bool, int]:
+    """
+    Fixed-Window-Limit über alle Worker.
+
+    Gibt (erlaubt, Sekunden bis zum nächsten Fenster) zurück; limit <= 0
+    deaktiviert die Prüfung.
+    """
+    if limit <= 0:
+        return True, 0
+    now = time.time()
+    _maybe_purge(now)
+    window = int(now // window_seconds)
+    count = get_state().incr(f"{RATE_LIMIT_PREFIX}{bucket}:{window}", ttl=window_seconds * 2)
+    retry_after = int((window + 1) * window_seconds - now) + 1
+    return count <= limit, retry_after
@@ -0,0 +1,101 @@
+"""
+Startzeit-Profil der App
+- Phasen-Marken (Imports, App-Aufbau, Migrationen, Startup) ab Prozessstart
+- CLI: Import-Zeiten je Modul über `python -X importtime`, gruppiert nach Paket
+
+    python -m app.startup_profile [--top 25]
+"""
+
+import os
+import sys
+import time
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+
+_t0 = time.perf_counter()
+_marks: List[Dict] = []
+
+
+def mark(phase: str):
+    """Zeitpunkt einer Startphase (ms seit Import dieses Moduls)."""
+    _marks.append({"phase": phase, "ms": round((time.perf_counter() - _t0) * 1000, 1)})
+
+
+def get_startup_profile() -> Dict:
+    phases = []
+    previous = 0.0
+    for m in _marks:
+        phases.append({**m, "delta_ms": round(m["ms"] - previous, 1)})
+        previous = m["ms"]
+    return {"enabled": STARTUP_PROFILE, "total_ms": previous, "phases": phases}
+
+
+def log_startup_profile():
+    if not STARTUP_PROFILE:
+        return
+    for p in get_startup_profile()["phases"]:
+        logger.info(f"startup | {p['phase']:<24} +{p['delta_ms']:>7.1f}ms  ({p['ms']:.1f}ms)")
+
+
+# ============================================================================
+# IMPORT-PROFIL (CLI)
+# ============================================================================
+
+def parse_importtime(output: str) -> List[Dict]:
+    """Parst die stderr-Ausgabe von `-X importtime`."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": depth,
+        })
+    return rows
+
+
+def profile_imports(target: str = "app.main") -> List[Dict]:
+    import subprocess
+
+    env = dict(os.environ, STARTUP_PROFILE="true")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=env,
+    )
+    return parse_importtime(result.stderr)
+
+
+def summarise(rows: List[Dict], top: int = 25) -> str:
+    by_package: Dict[str, float] = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        by_package[package] = by_package.get(package, 0.0) + row["self_ms"]
+
+    total = sum(by_package.values())
+    lines = [f"Import gesamt: {total:.1f}ms", "", "Pakete (self, summiert):"]
+    for package, ms in sorted(by_package.items(), key=lambda x: -x[1])[:top]:
+        lines.append(f"  {ms:8.1f}ms  {package}")
+
+    lines += ["", "App-Module (kumuliert):"]
+    app_rows = [r for r in rows if r["module"].startswith("app.")]
+    for row in sorted(app_rows, key=lambda r: -r["cumulative_ms"])[:top]:
+        lines.append(f"  {row['cumulative_ms']:8.1f}ms  {row['module']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import-Zeiten der App")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--target", default="app.main")
+    args = parser.parse_args()
+    print(summarise(profile_imports(args.target), args.top))
@@ -0,0 +1,219 @@
+"""
+Leichtgewichtiges In-Process-Tracing
+- Spans als Context-Manager mit Parent/Child-Verknüpfung über contextvars
+- Abgeschlossene Traces landen in einem Ringpuffer (Debug-Endpoint)
+- Optional: OTLP/JSON-kompatible Ausgabe als JSON-Lines (TRACE_OTLP_FILE)
+"""
+
+import os
+import json
+import time
+import secrets
+import logging
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_OTLP_FILE = os.getenv("TRACE_OTLP_FILE", "")
+SERVICE_NAME = "contract-analyzer-backend"
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns",
+                 "attributes", "status", "children")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict):
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.children: List["Span"] = []
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return round((end - self.start_ns) / 1e6, 3)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+            "children": [c.to_dict() for c in self.children],
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_traces: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    with span("llm_call", model="gpt-4o-mini") as s:
+        s.set_attribute("tokens", 123)
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP
+        return
+
+    parent = _current.get()
+    current = Span(name, parent, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(token)
+        if parent is not None:
+            parent.children.append(current)
+        else:
+            _finish_trace(current)
+
+
+def traced(name: str):
+    """Decorator für async Route-Handler: der ganze Aufruf wird ein Root-Span."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    return _current.get() or _NOOP
+
+
+def current_trace_id() -> Optional[str]:
+    s = _current.get()
+    return s.trace_id if s else None
+
+
+def _finish_trace(root: Span):
+    with _lock:
+        _traces.append(root)
+    if TRACE_OTLP_FILE:
+        try:
+            _write_otlp(root)
+        except OSError as e:
+            logger.warning(f"Trace export failed: {e}")
+
+
+# ============================================================================
+# ABFRAGE
+# ============================================================================
+
+def _summary(root: Span) -> Dict:
+    return {
+        "trace_id": root.trace_id,
+        "name": root.name,
+        "start": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(root.start_ns / 1e9)),
+        "duration_ms": root.duration_ms,
+        "status": root.status,
+        "attributes": root.attributes,
+        "stages": {c.name: c.duration_ms for c in root.children},
+    }
+
+
+def list_traces(limit: int = 50, name: str = None, min_ms: float = 0.0) -> List[Dict]:
+    """Neueste Traces zuerst, optional gefiltert nach Root-Name und Mindestdauer."""
+    with _lock:
+        roots = list(_traces)
+    result = []
+    for root in reversed(roots):
+        if name and root.name != name:
+            continue
+        if root.duration_ms < min_ms:
+            continue
+        result.append(_summary(root))
+        if len(result) >= limit:
+            break
+    return result
+
+
+def get_trace(trace_id: str) -> Optional[Dict]:
+    with _lock:
+        roots = list(_traces)
+    for root in roots:
+        if root.trace_id == trace_id:
+            return {"trace_id": trace_id, **root.to_dict()}
+    return None
+
+
+# ============================================================================
+# OTLP/JSON-EXPORT
+# ============================================================================
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_spans(s: Span) -> List[Dict]:
+    spans = [{
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "parentSpanId": s.parent_id or "",
+        "name": s.name,
+        "kind": 1,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+        "status": {"code": 2 if s.status == "error" else 1},
+    }]
+    for child in s.children:
+        spans.extend(_otlp_spans(child))
+    return spans
+
+
+def to_otlp(root: Span) -> Dict:
+    """Ein Trace als OTLP/JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": _otlp_spans(root)}],
+        }]
+    }
+
+
+def _write_otlp(root: Span):
+    line = json.dumps(to_otlp(root), separators=(",", ":"))
+    with _lock:
+        with open(TRACE_OTLP_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
@@ -15,7 +15,9 @@ import hashlib
 from typing import Dict, Optional, List
 from datetime import datetime
 
-DB_PATH = "/var/www/contract-app/data/contracts.db"
+from .database import contracts_db_path
+
+DB_PATH = contracts_db_path()
 
 def get_db():
     conn = sqlite3.connect(DB_PATH)
@@ -276,7 +278,3 @@ def get_recent_attempts(user_email: str, limit: int = 10) -> List[Dict]:
     conn.close()
     
     return [dict(row) for row in rows]
-
-# Init tables
-init_2fa_tables()
-print("2FA Module geladen")
@@ -0,0 +1,242 @@
+"""
+Streaming-Upload für Vertragsdateien
+- Request-Body wird in festen Chunks direkt an den Zielort geschrieben
+- SHA-256 und MIME-Erkennung (Magic Bytes) während des Streamings
+- Größenlimit wird früh geprüft (Content-Length) und beim Streamen erzwungen
+"""
+
+import os
+import codecs
+import hashlib
+import logging
+import zipfile
+from typing import Dict, Optional
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+# Multipart-Overhead (Boundary, Header, Formularfelder) für die Content-Length-Prüfung
+MULTIPART_OVERHEAD = 16 * 1024
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+MAGIC_BYTES = [
+    (b"%PDF-", "application/pdf"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/msword"),
+    (b"{\\rtf", "application/rtf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+]
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadError(Exception):
+    pass
+
+
+def _is_docx(path: Optional[str]) -> bool:
+    """Ein ZIP ist nur dann DOCX, wenn es word/document.xml enthält."""
+    if not path:
+        return False
+    try:
+        with zipfile.ZipFile(path) as z:
+            return "word/document.xml" in z.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def _is_text(text: str) -> bool:
+    return not any(ord(c) < 0x20 and c not in "\t\r\n" for c in text)
+
+
+def sniff_mime(head: bytes, path: Optional[str] = None) -> str:
+    """
+    Erkennt den Dateityp anhand der ersten Bytes.
+
+    Für ZIP-Container wird die vollständige Datei (path) benötigt –
+    ohne path oder ohne word/document.xml gilt er als application/zip.
+    """
+    for magic, mime in MAGIC_BYTES:
+        if head.startswith(magic):
+            return mime
+    if head.startswith(b"PK\x03\x04"):
+        return DOCX_MIME if _is_docx(path) else "application/zip"
+    stripped = head.lstrip()[:64].lower()
+    if stripped.startswith(b"<!doctype html") or stripped.startswith(b"<html"):
+        return "text/html"
+    try:
+        # final=False: ein am Kopf-Ende abgeschnittenes UTF-8-Zeichen ist kein Fehler
+        text = codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "text/plain" if head and _is_text(text) else "application/octet-stream"
+    except UnicodeDecodeError:
+        pass
+    # Legacy-Encodings (cp1252/latin-1): keine Steuerzeichen außer Tab/Zeilenumbruch
+    if head and not any(b < 0x09 or 0x0e <= b < 0x20 for b in head):
+        return "text/plain"
+    return "application/octet-stream"
+
+
+def safe_filename(filename: Optional[str]) -> str:
+    return os.path.basename(filename or "upload.pdf").replace(" ", "_") or "upload.pdf"
+
+
+class _FileSink:
+    """Schreibt Chunks auf Disk und berechnet Hash, Größe und MIME-Typ mit."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.head = b""
+        self._fh = open(path, "wb", buffering=CHUNK_SIZE)
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"File exceeds limit of {self.max_bytes} bytes")
+        if len(self.head) < 512:
+            self.head += data[:512 - len(self.head)]
+        self.sha256.update(data)
+        self._fh.write(data)
+
+    def close(self):
+        self._fh.close()
+
+    def discard(self):
+        self._fh.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def result(self) -> Dict:
+        return {
+            "path": self.path,
+            "size": self.size,
+            "sha256": self.sha256.hexdigest(),
+            "mime_type": sniff_mime(self.head, self.path),
+        }
+
+
+async def stream_upload(request, upload_dir: str, contract_id: str, max_bytes: int = MAX_UPLOAD_BYTES) -> Dict:
+    """
+    Streamt einen Upload nach upload_dir/{contract_id}__{filename}.
+
+    Unterstützt multipart/form-data (erstes Datei-Feld) und rohe Bodies
+    (Dateiname via ?filename= oder X-Filename). Gibt Dateiinfos, Hash,
+    MIME-Typ und die übrigen Formularfelder zurück.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(f"File exceeds limit of {max_bytes} bytes")
+
+    os.makedirs(upload_dir, exist_ok=True)
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+
+    if content_type == b"multipart/form-data":
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise UploadError("Missing multipart boundary")
+        return await _stream_multipart(request, boundary, upload_dir, contract_id, max_bytes)
+
+    if content_type == b"application/x-www-form-urlencoded":
+        raise UploadError("No file provided")
+
+    filename = safe_filename(request.query_params.get("filename") or request.headers.get("x-filename"))
+    sink = _FileSink(os.path.join(upload_dir, f"{contract_id}__{filename}"), max_bytes)
+    try:
+        async for chunk in request.stream():
+            sink.write(chunk)
+    except BaseException:
+        sink.discard()
+        raise
+    sink.close()
+    if sink.size == 0:
+        sink.discard()
+        raise UploadError("No file provided")
+    return {"filename": filename, "fields": dict(request.query_params), **sink.result()}
+
+
+async def _stream_multipart(request, boundary: bytes, upload_dir: str, contract_id: str, max_bytes: int) -> Dict:
+    state = {"header_field": b"", "headers": {}, "sink": None, "field_name": None, "field_value": b"", "filename": None}
+    fields: Dict[str, str] = {}
+    upload: Dict = {}
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["field_name"] = None
+        state["field_value"] = b""
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        key = state["header_field"].lower()
+        state["headers"][key] = state["headers"].get(key, b"") + data[start:end]
+
+    def on_header_end():
+        state["header_field"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        state["field_name"] = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options and not upload and state["sink"] is None:
+            filename = safe_filename(options[b"filename"].decode("utf-8", "replace"))
+            state["filename"] = filename
+            state["sink"] = _FileSink(os.path.join(upload_dir, f"{contract_id}__{filename}"), max_bytes)
+
+    def on_part_data(data, start, end):
+        if state["sink"] is not None:
+            state["sink"].write(data[start:end])
+        elif len(state["field_value"]) < MULTIPART_OVERHEAD:
+            state["field_value"] += data[start:end]
+
+    def on_part_end():
+        sink = state["sink"]
+        if sink is not None:
+            sink.close()
+            upload.update(filename=state["filename"], **sink.result())
+            state["sink"] = None
+        elif state["field_name"]:
+            fields[state["field_name"]] = state["field_value"].decode("utf-8", "replace")
+
+    parser = MultipartParser(boundary, callbacks={
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+            parser.finalize()
+        except MultipartParseError as e:
+            raise UploadError(f"Malformed multipart body: {e}")
+    except BaseException:
+        if state["sink"] is not None:
+            state["sink"].discard()
+        if upload:
+            try:
+                os.remove(upload["path"])
+            except OSError:
+                pass
+        raise
+
+    if not upload:
+        raise UploadError("No file provided")
+    upload["fields"] = fields
+    return upload
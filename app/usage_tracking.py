@@ -10,7 +10,9 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional
 import json
 
-DB_PATH = "/var/www/contract-app/data/contracts.db"
+from .database import contracts_db_path
+
+DB_PATH = contracts_db_path()
 
 # Plan-Limits
 PLAN_LIMITS = {
@@ -297,5 +299,3 @@ def get_usage_history(user_email: str, months: int = 6) -> list:
     
     return [dict(row) for row in rows]
 
-# Initialisierung
-init_usage_tables()
@@ -0,0 +1,75 @@
+"""
+Vergleich zweier Benchmark-Ergebnisse (benchmarks/run.py)
+
+    python -m benchmarks.compare alt.json neu.json [--threshold 10]
+
+Exit-Code 1, wenn eine Kennzahl um mehr als --threshold Prozent schlechter ist.
+"""
+
+import sys
+import json
+from typing import Dict, List, Tuple
+
+# Kennzahl -> True, wenn höher besser ist
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+    "errors": False,
+    "peak_rss_mb": False,
+}
+
+
+def load(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def diff(old: Dict, new: Dict, threshold_pct: float) -> Tuple[List[Dict], List[str]]:
+    rows, regressions = [], []
+    for scenario in sorted(set(old["scenarios"]) | set(new["scenarios"])):
+        before = old["scenarios"].get(scenario)
+        after = new["scenarios"].get(scenario)
+        if not before or not after:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            a, b = before.get(metric, 0), after.get(metric, 0)
+            change = ((b - a) / a * 100) if a else (100.0 if b else 0.0)
+            worse = -change if higher_is_better else change
+            row = {"scenario": scenario, "metric": metric, "old": a, "new": b, "change_pct": round(change, 1)}
+            rows.append(row)
+            if worse > threshold_pct:
+                regressions.append(f"{scenario}.{metric}: {a} -> {b} ({change:+.1f}%)")
+    return rows, regressions
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark-Ergebnisse vergleichen")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Toleranz in Prozent")
+    args = parser.parse_args(argv)
+
+    old, new = load(args.old), load(args.new)
+    if old.get("config") != new.get("config"):
+        print("Warnung: unterschiedliche Konfiguration, Werte nur bedingt vergleichbar")
+    print(f"{old['git'].get('commit', '')[:8]} -> {new['git'].get('commit', '')[:8]}")
+
+    rows, regressions = diff(old, new, args.threshold)
+    for row in rows:
+        print(f"  {row['scenario']:<10} {row['metric']:<15} {row['old']:>10} -> {row['new']:>10}  {row['change_pct']:+7.1f}%")
+
+    if regressions:
+        print(f"\n{len(regressions)} Regression(en) > {args.threshold:g}%:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nKeine Regressionen")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
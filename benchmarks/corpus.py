@@ -0,0 +1,726 @@
+"""
+Synthetischer Vertragskorpus für Last- und Skalierungstests
+- Deutsche Verträge aller 8 Analyse-Typen (siehe prompts.py) mit variabler Länge
+- Passende extracted_data (Enddaten, ACV, Kündigungsfristen) und Risiko-Flags
+- Vertrag i ist aus (seed, i) reproduzierbar: PDF und DB-Zeile passen zusammen
+
+    python -m benchmarks.corpus pdfs --out /tmp/corpus --count 40
+    python -m benchmarks.corpus seed --db /tmp/bench.db --count 100000 [--files 500 --upload-dir /tmp/uploads]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import sqlite3
+import textwrap
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+CONTRACT_TYPES = ["employment", "saas", "nda", "vendor", "service", "rental", "purchase", "general"]
+
+# Verteilung grob nach Portfolio-Realität: viele SaaS/Dienstleistung, wenige Kaufverträge
+TYPE_WEIGHTS = [12, 26, 14, 14, 14, 8, 5, 7]
+
+COMPANY_STEMS = ["Müller", "Schmidt", "Nordlicht", "Alpen", "Rhein", "Hansa", "Bergmann", "Kessler",
+                 "Weber", "Schwarzwald", "Elbtal", "Brandt", "Lindner", "Sonnenberg", "Falk", "Wagner"]
+COMPANY_BRANCHES = ["Software", "Logistik", "Consulting", "Systems", "Immobilien", "Industrie",
+                    "Handel", "Digital", "Maschinenbau", "Medien", "Cloud", "Facility Services"]
+COMPANY_FORMS = ["GmbH", "AG", "GmbH & Co. KG", "SE", "KG"]
+US_VENDORS = ["Cloudbase Inc.", "Stackline LLC", "Datawave Corp.", "Brightdesk Inc."]
+FIRST_NAMES = ["Anna", "Lukas", "Sophie", "Jonas", "Marie", "Felix", "Laura", "Paul", "Lena", "Tim"]
+LAST_NAMES = ["Becker", "Hoffmann", "Schulz", "Koch", "Richter", "Klein", "Wolf", "Neumann", "Zimmermann"]
+CITIES = ["Berlin", "Hamburg", "München", "Köln", "Frankfurt am Main", "Stuttgart", "Düsseldorf", "Leipzig"]
+STREETS = ["Hauptstraße", "Bahnhofstraße", "Industriestraße", "Am Hafen", "Lindenallee", "Marktplatz"]
+
+# Allgemeine Vertragsprosa; wird pro Abschnitt gemischt, um die Länge zu variieren
+BOILERPLATE = [
+    "Die Parteien verpflichten sich, bei der Durchführung dieses Vertrages vertrauensvoll zusammenzuarbeiten.",
+    "Änderungen und Ergänzungen dieses Vertrages bedürfen zu ihrer Wirksamkeit der Textform.",
+    "Mündliche Nebenabreden bestehen nicht.",
+    "Sollte eine Bestimmung dieses Vertrages unwirksam sein oder werden, bleibt die Wirksamkeit der übrigen Bestimmungen unberührt.",
+    "An die Stelle der unwirksamen Bestimmung tritt eine Regelung, die dem wirtschaftlichen Zweck am nächsten kommt.",
+    "Die Parteien benennen jeweils einen verantwortlichen Ansprechpartner für alle Fragen der Vertragsdurchführung.",
+    "Mitteilungen nach diesem Vertrag erfolgen an die im Rubrum genannten Anschriften oder an eine zuletzt mitgeteilte Adresse.",
+    "Rechte und Pflichten aus diesem Vertrag können nur mit vorheriger Zustimmung der anderen Partei übertragen werden.",
+    "Die Zustimmung darf nicht unbillig verweigert werden.",
+    "Leistungen, die über den vereinbarten Umfang hinausgehen, werden gesondert beauftragt und vergütet.",
+    "Jede Partei trägt die ihr im Zusammenhang mit dem Abschluss dieses Vertrages entstehenden Kosten selbst.",
+    "Die Anlagen sind Bestandteil dieses Vertrages; bei Widersprüchen gehen die Regelungen des Hauptvertrages vor.",
+    "Die Parteien werden sich bei Streitigkeiten zunächst um eine gütliche Einigung bemühen.",
+    "Soweit dieser Vertrag keine Regelung enthält, gelten die gesetzlichen Bestimmungen.",
+    "Zurückbehaltungsrechte stehen den Parteien nur wegen unbestrittener oder rechtskräftig festgestellter Forderungen zu.",
+    "Die Parteien sichern zu, dass sie zum Abschluss dieses Vertrages berechtigt sind.",
+]
+
+
+def _company(rng: random.Random) -> str:
+    return f"{rng.choice(COMPANY_STEMS)} {rng.choice(COMPANY_BRANCHES)} {rng.choice(COMPANY_FORMS)}"
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _address(rng: random.Random) -> str:
+    return f"{rng.choice(STREETS)} {rng.randint(1, 180)}, {rng.randint(10000, 99999)} {rng.choice(CITIES)}"
+
+
+def _de(value) -> str:
+    """Formatierung wie in deutschen Vertragstexten."""
+    if isinstance(value, bool):
+        return "ja" if value else "nein"
+    if isinstance(value, float) and not value.is_integer():
+        return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    if isinstance(value, (int, float)):
+        return f"{int(value):,}".replace(",", ".")
+    if isinstance(value, str) and len(value) == 10 and value[4] == "-":
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%d.%m.%Y")
+    return str(value)
+
+
+# ============================================================================
+# FELDER JE VERTRAGSTYP (Schlüssel wie in den Prompts)
+# ============================================================================
+
+def _term(rng: random.Random, anchor: date) -> Dict:
+    """Laufzeit: Start in den letzten 3 Jahren, Ende von -60 bis +720 Tagen um anchor."""
+    end = anchor + timedelta(days=rng.randint(-60, 720))
+    start = end - timedelta(days=365 * rng.choice([1, 2, 3]))
+    return {"contract_start_date": start.isoformat(), "contract_end_date": end.isoformat()}
+
+
+def _employment(rng, anchor) -> Dict:
+    employer, employee = _company(rng), _person(rng)
+    fixed = rng.random() < 0.3
+    term = _term(rng, anchor)
+    post_nc = rng.random() < 0.35
+    return {
+        "parties": [{"name": employer, "role": "Arbeitgeber"}, {"name": employee, "role": "Arbeitnehmer"}],
+        "vendor_name": employer,
+        "start_date": term["contract_start_date"],
+        "fixed_term": fixed,
+        "end_date": term["contract_end_date"] if fixed else None,
+        "contract_end_date": term["contract_end_date"] if fixed else None,
+        "probation_period_months": rng.choice([3, 6, 6, 6, 9]),
+        "weekly_hours": rng.choice([40, 40, 38.5, 35, 30]),
+        "base_salary_eur": rng.randrange(38000, 125000, 500),
+        "vacation_days_per_year": rng.choice([20, 24, 26, 28, 30, 30]),
+        "notice_period_employee": rng.choice(["4 Wochen zum 15. oder zum Monatsende", "3 Monate zum Quartalsende"]),
+        "notice_period_employer": rng.choice(["gesetzlich (§ 622 BGB)", "3 Monate zum Quartalsende"]),
+        "non_compete_during_term": True,
+        "post_contract_non_compete": post_nc,
+        "non_compete_compensation": post_nc and rng.random() < 0.6,
+        "overtime_included": rng.random() < 0.4,
+        "overtime_cap_hours": rng.choice([None, 10, 20]),
+        "overtime_regulation": rng.choice(["Freizeitausgleich", "Mit dem Gehalt abgegolten", "Vergütung mit 25 % Zuschlag"]),
+        "bonus_provisions": rng.choice([None, "Zielvereinbarung bis 10 % des Jahresgehalts"]),
+    }
+
+
+def _saas(rng, anchor) -> Dict:
+    us = rng.random() < 0.25
+    vendor = rng.choice(US_VENDORS) if us else _company(rng)
+    return {
+        "customer_name": _company(rng),
+        "vendor_name": vendor,
+        "product_name": rng.choice(["CRM Suite", "HR Cloud", "Analytics Pro", "Ticketing", "DMS Online"]),
+        **_term(rng, anchor),
+        "auto_renew": rng.random() < 0.7,
+        "renewal_notice_days": rng.choice([30, 60, 90, 90, 180]),
+        "annual_contract_value_eur": rng.randrange(3000, 400000, 250),
+        "billing_interval": rng.choice(["monatlich", "jährlich", "jährlich im Voraus"]),
+        "min_term_months": rng.choice([12, 24, 36]),
+        "termination_for_convenience": rng.random() < 0.2,
+        "data_location": rng.choice(["USA", "EU/USA"]) if us else rng.choice(["EU (Frankfurt)", "Deutschland", "EWR"]),
+        "dp_addendum_included": rng.random() < 0.8,
+        "liability_cap_multiple_acv": rng.choice([None, 0.5, 1, 1, 2]),
+        "uptime_sla_percent": rng.choice([99.0, 99.5, 99.9, 99.95]),
+        "service_credits": rng.random() < 0.5,
+        "support_level": rng.choice(["Standard (8x5)", "Premium (24x7)", "Basic (E-Mail)"]),
+        "data_export_clause": rng.random() < 0.6,
+        "price_escalation_clause": rng.random() < 0.5,
+        "price_escalation_cap": rng.choice([None, 3, 5, 8]),
+    }
+
+
+def _nda(rng, anchor) -> Dict:
+    penalty = rng.random() < 0.5
+    return {
+        "disclosing_party": _company(rng),
+        "receiving_party": _company(rng),
+        "vendor_name": None,
+        "nda_type": rng.choice(["einseitig", "gegenseitig"]),
+        "purpose": rng.choice(["Prüfung einer Kooperation", "Due Diligence", "Gemeinsames Entwicklungsprojekt"]),
+        **_term(rng, anchor),
+        "term_years": rng.choice([1, 2, 3, 5]),
+        "survival_period_years": rng.choice([2, 3, 5, 10]),
+        "return_of_information": True,
+        "destruction_clause": rng.random() < 0.7,
+        "penalty_clause": penalty,
+        "penalty_amount_eur": rng.choice([10000, 25000, 50000, 250000]) if penalty else None,
+        "jurisdiction": rng.choice(CITIES),
+        "governing_law": "deutsches Recht",
+    }
+
+
+def _vendor(rng, anchor) -> Dict:
+    supplier = _company(rng)
+    return {
+        "buyer_name": _company(rng),
+        "supplier_name": supplier,
+        "vendor_name": supplier,
+        "goods_or_services": rng.choice(["Elektronische Baugruppen", "Verpackungsmaterial", "Ersatzteile", "Rohstoffe"]),
+        **_term(rng, anchor),
+        "auto_renew": rng.random() < 0.5,
+        "annual_contract_value_eur": rng.randrange(20000, 2000000, 1000),
+        "min_order_value_eur": rng.choice([500, 1000, 5000]),
+        "payment_terms_days": rng.choice([14, 30, 30, 60, 90]),
+        "incoterms": rng.choice(["DAP", "DDP", "FCA", "EXW"]),
+        "warranty_months": rng.choice([6, 12, 24, 24]),
+        "liability_cap_eur": rng.choice([None, 100000, 500000, 1000000]),
+        "penalty_for_delay": rng.random() < 0.6,
+        "penalty_percent_per_week": rng.choice([0.5, 1.0]),
+        "audit_rights": rng.random() < 0.5,
+        "termination_notice_days": rng.choice([30, 90, 180]),
+        "exclusivity": rng.random() < 0.2,
+    }
+
+
+def _service(rng, anchor) -> Dict:
+    provider = _company(rng)
+    value = rng.randrange(10000, 600000, 500)
+    return {
+        "client_name": _company(rng),
+        "provider_name": provider,
+        "vendor_name": provider,
+        "service_description": rng.choice(["IT-Betrieb und Wartung", "Gebäudereinigung", "Lohnbuchhaltung", "Softwareentwicklung"]),
+        **_term(rng, anchor),
+        "auto_renew": rng.random() < 0.55,
+        "renewal_notice_days": rng.choice([30, 90, 90, 180]),
+        "contract_value_eur": value,
+        "annual_contract_value_eur": value,
+        "billing_model": rng.choice(["Festpreis", "Time & Material", "monatliche Pauschale"]),
+        "hourly_rate_eur": rng.choice([85, 110, 140, 165]),
+        "payment_terms_days": rng.choice([14, 30, 45, 60]),
+        "sla_response_hours": rng.choice([2, 4, 8, 24]),
+        "sla_resolution_hours": rng.choice([8, 24, 48]),
+        "liability_cap_multiple": rng.choice([None, 0.5, 1, 2]),
+        "ip_ownership": rng.choice(["Auftraggeber", "Auftragnehmer", "gemeinsam"]),
+        "confidentiality_clause": True,
+        "termination_notice_days": rng.choice([30, 90, 180]),
+        "termination_for_convenience": rng.random() < 0.3,
+        "subcontracting_allowed": rng.random() < 0.5,
+    }
+
+
+def _rental(rng, anchor) -> Dict:
+    landlord = _company(rng)
+    rent = rng.randrange(1500, 45000, 50)
+    escalation = rng.random() < 0.6
+    return {
+        "landlord_name": landlord,
+        "tenant_name": _company(rng),
+        "vendor_name": landlord,
+        "property_address": _address(rng),
+        "property_type": rng.choice(["Büro", "Lager", "Einzelhandel", "Praxis"]),
+        "area_sqm": rng.randrange(80, 4000, 10),
+        **_term(rng, anchor),
+        "fixed_term_years": rng.choice([3, 5, 10]),
+        "monthly_rent_eur": rent,
+        "annual_contract_value_eur": rent * 12,
+        "monthly_utilities_eur": round(rent * 0.2),
+        "deposit_months": rng.choice([2, 3, 3, 6]),
+        "rent_escalation_clause": escalation,
+        "escalation_percent_per_year": rng.choice([1.5, 2.0, 3.0, 4.5]) if escalation else None,
+        "index_clause": rng.random() < 0.4,
+        "termination_notice_months": rng.choice([3, 6, 12]),
+        "renewal_option": rng.random() < 0.5,
+        "maintenance_responsibility": rng.choice(["Mieter", "Vermieter", "geteilt"]),
+        "subletting_allowed": rng.random() < 0.3,
+        "fit_out_contribution_eur": rng.choice([None, 20000, 75000]),
+    }
+
+
+def _purchase(rng, anchor) -> Dict:
+    seller = _company(rng)
+    delivery = anchor + timedelta(days=rng.randint(-90, 180))
+    return {
+        "seller_name": seller,
+        "buyer_name": _company(rng),
+        "vendor_name": seller,
+        "purchase_object": rng.choice(["CNC-Fräsmaschine", "Fahrzeugflotte (12 Fahrzeuge)", "Serverinfrastruktur", "Gabelstapler"]),
+        "purchase_price_eur": rng.randrange(15000, 1500000, 500),
+        "payment_terms": rng.choice(["30 Tage netto", "50 % bei Bestellung, 50 % bei Lieferung", "14 Tage 2 % Skonto"]),
+        "payment_terms_days": rng.choice([14, 30, 60]),
+        "delivery_date": delivery.isoformat(),
+        "delivery_terms": rng.choice(["frei Haus", "ab Werk", "DAP Lager des Käufers"]),
+        "warranty_months": rng.choice([6, 12, 24]),
+        "warranty_scope": rng.choice(["Material- und Verarbeitungsfehler", "gesetzliche Gewährleistung"]),
+        "liability_exclusions": rng.choice([None, "Folgeschäden und entgangener Gewinn"]),
+        "retention_of_title": rng.random() < 0.8,
+        "acceptance_procedure": rng.choice(["Abnahmeprotokoll innerhalb 10 Werktagen", "keine förmliche Abnahme"]),
+        "defect_notification_days": rng.choice([7, 14, 30]),
+        "governing_law": "deutsches Recht",
+        "jurisdiction": rng.choice(CITIES),
+        "arbitration_clause": rng.random() < 0.15,
+    }
+
+
+def _general(rng, anchor) -> Dict:
+    party_b = _company(rng)
+    value = rng.choice([None, rng.randrange(5000, 300000, 500)])
+    return {
+        "party_a_name": _company(rng),
+        "party_a_role": "Auftraggeber",
+        "party_b_name": party_b,
+        "party_b_role": "Auftragnehmer",
+        "vendor_name": party_b,
+        "contract_subject": rng.choice(["Kooperationsvereinbarung", "Beratungsleistungen", "Sponsoring", "Rahmenvereinbarung"]),
+        **_term(rng, anchor),
+        "contract_value_eur": value,
+        "annual_contract_value_eur": value,
+        "payment_terms": "30 Tage netto",
+        "termination_notice_days": rng.choice([30, 90, 180]),
+        "liability_provisions": rng.choice(["gesetzlich", "begrenzt auf den Auftragswert", "keine Regelung"]),
+        "confidentiality_clause": rng.random() < 0.7,
+        "governing_law": "deutsches Recht",
+        "jurisdiction": rng.choice(CITIES),
+        "special_provisions": None,
+    }
+
+
+FIELD_GENERATORS: Dict[str, Callable] = {
+    "employment": _employment, "saas": _saas, "nda": _nda, "vendor": _vendor,
+    "service": _service, "rental": _rental, "purchase": _purchase, "general": _general,
+}
+
+
+# ============================================================================
+# VERTRAGSTEXT
+# ============================================================================
+
+TITLES = {
+    "employment": "Arbeitsvertrag", "saas": "Software-as-a-Service-Vertrag",
+    "nda": "Geheimhaltungsvereinbarung", "vendor": "Rahmenliefervertrag",
+    "service": "Dienstleistungsvertrag", "rental": "Gewerbemietvertrag",
+    "purchase": "Kaufvertrag", "general": "Vertrag",
+}
+
+# (Überschrift, Sätze mit {feld}-Platzhaltern); Sätze mit fehlenden Feldern entfallen
+SECTIONS = {
+    "employment": [
+        ("Beginn des Arbeitsverhältnisses", ["Das Arbeitsverhältnis beginnt am {start_date}.",
+                                             "Die ersten {probation_period_months} Monate gelten als Probezeit."]),
+        ("Arbeitszeit", ["Die regelmäßige wöchentliche Arbeitszeit beträgt {weekly_hours} Stunden.",
+                         "Überstunden: {overtime_regulation}."]),
+        ("Vergütung", ["Der Arbeitnehmer erhält ein Bruttojahresgehalt von {base_salary_eur} EUR.",
+                       "Variable Vergütung: {bonus_provisions}."]),
+        ("Urlaub", ["Der Arbeitnehmer hat Anspruch auf {vacation_days_per_year} Arbeitstage Erholungsurlaub."]),
+        ("Kündigung", ["Kündigungsfrist Arbeitnehmer: {notice_period_employee}.",
+                       "Kündigungsfrist Arbeitgeber: {notice_period_employer}.",
+                       "Das Arbeitsverhältnis ist befristet bis zum {end_date}."]),
+        ("Wettbewerbsverbot", ["Nachvertragliches Wettbewerbsverbot: {post_contract_non_compete}.",
+                               "Karenzentschädigung: {non_compete_compensation}."]),
+    ],
+    "saas": [
+        ("Vertragsgegenstand", ["Der Anbieter {vendor_name} stellt dem Kunden {customer_name} die Software {product_name} als Cloud-Dienst bereit."]),
+        ("Verfügbarkeit", ["Die Verfügbarkeit beträgt {uptime_sla_percent} % im Monatsmittel.",
+                           "Support-Level: {support_level}."]),
+        ("Vergütung", ["Die jährliche Vergütung beträgt {annual_contract_value_eur} EUR, Abrechnung {billing_interval}.",
+                       "Preisanpassungen sind auf {price_escalation_cap} % pro Jahr begrenzt."]),
+        ("Laufzeit und Kündigung", ["Der Vertrag beginnt am {contract_start_date} und endet am {contract_end_date}.",
+                                    "Mindestlaufzeit: {min_term_months} Monate.",
+                                    "Automatische Verlängerung: {auto_renew}; Kündigungsfrist {renewal_notice_days} Tage zum Laufzeitende."]),
+        ("Datenschutz", ["Die Daten werden gespeichert in: {data_location}.",
+                         "Auftragsverarbeitungsvertrag nach Art. 28 DSGVO beigefügt: {dp_addendum_included}."]),
+        ("Haftung", ["Die Haftung ist auf das {liability_cap_multiple_acv}-fache der jährlichen Vergütung begrenzt."]),
+        ("Datenexport", ["Datenexport bei Vertragsende in einem gängigen Format: {data_export_clause}."]),
+    ],
+    "nda": [
+        ("Zweck", ["Die Vereinbarung ({nda_type}) zwischen {disclosing_party} und {receiving_party} dient folgendem Zweck: {purpose}."]),
+        ("Vertrauliche Informationen", ["Vertraulich sind alle Informationen, die als solche gekennzeichnet oder erkennbar sind."]),
+        ("Laufzeit", ["Die Vereinbarung gilt {term_years} Jahre ab dem {contract_start_date}.",
+                      "Die Geheimhaltungspflicht besteht {survival_period_years} Jahre über das Vertragsende hinaus."]),
+        ("Rückgabe", ["Unterlagen sind auf Verlangen zurückzugeben; Vernichtung zulässig: {destruction_clause}."]),
+        ("Vertragsstrafe", ["Für jeden Fall der Zuwiderhandlung wird eine Vertragsstrafe von {penalty_amount_eur} EUR fällig."]),
+        ("Gerichtsstand", ["Es gilt {governing_law}. Gerichtsstand ist {jurisdiction}."]),
+    ],
+    "vendor": [
+        ("Vertragsgegenstand", ["{supplier_name} liefert an {buyer_name}: {goods_or_services}.",
+                                "Mindestbestellwert: {min_order_value_eur} EUR."]),
+        ("Lieferung", ["Lieferbedingung nach Incoterms 2020: {incoterms}.",
+                       "Bei Lieferverzug beträgt die Vertragsstrafe {penalty_percent_per_week} % pro Woche."]),
+        ("Zahlung", ["Rechnungen sind innerhalb von {payment_terms_days} Tagen zahlbar.",
+                     "Das erwartete Jahresvolumen beträgt {annual_contract_value_eur} EUR."]),
+        ("Gewährleistung und Haftung", ["Die Gewährleistungsfrist beträgt {warranty_months} Monate.",
+                                        "Die Haftung ist auf {liability_cap_eur} EUR begrenzt."]),
+        ("Audit", ["Auditrechte des Käufers: {audit_rights}."]),
+        ("Laufzeit", ["Der Vertrag läuft vom {contract_start_date} bis {contract_end_date}.",
+                      "Automatische Verlängerung: {auto_renew}; Kündigungsfrist {termination_notice_days} Tage.",
+                      "Exklusivität: {exclusivity}."]),
+    ],
+    "service": [
+        ("Leistungen", ["{provider_name} erbringt für {client_name}: {service_description}.",
+                        "Unterbeauftragung zulässig: {subcontracting_allowed}."]),
+        ("Service Level", ["Reaktionszeit {sla_response_hours} Stunden, Lösungszeit {sla_resolution_hours} Stunden."]),
+        ("Vergütung", ["Vergütungsmodell: {billing_model}; Stundensatz {hourly_rate_eur} EUR.",
+                       "Das Auftragsvolumen beträgt {contract_value_eur} EUR pro Jahr; Zahlungsziel {payment_terms_days} Tage."]),
+        ("Nutzungsrechte", ["Rechte an Arbeitsergebnissen stehen zu: {ip_ownership}."]),
+        ("Haftung", ["Die Haftung ist auf das {liability_cap_multiple}-fache des Jahresauftragswerts begrenzt."]),
+        ("Laufzeit und Kündigung", ["Der Vertrag läuft vom {contract_start_date} bis {contract_end_date}.",
+                                    "Automatische Verlängerung: {auto_renew}; Kündigungsfrist {renewal_notice_days} Tage.",
+                                    "Ordentliche Kündigung mit {termination_notice_days} Tagen Frist."]),
+    ],
+    "rental": [
+        ("Mietobjekt", ["{landlord_name} vermietet an {tenant_name} die Flächen ({property_type}) in {property_address} mit {area_sqm} m²."]),
+        ("Mietzeit", ["Das Mietverhältnis beginnt am {contract_start_date} und endet am {contract_end_date} ({fixed_term_years} Jahre fest).",
+                      "Kündigungsfrist: {termination_notice_months} Monate. Verlängerungsoption: {renewal_option}."]),
+        ("Miete und Nebenkosten", ["Die monatliche Nettomiete beträgt {monthly_rent_eur} EUR zuzüglich {monthly_utilities_eur} EUR Nebenkostenvorauszahlung.",
+                                   "Die Miete erhöht sich jährlich um {escalation_percent_per_year} %."]),
+        ("Kaution", ["Der Mieter leistet eine Kaution in Höhe von {deposit_months} Monatsmieten."]),
+        ("Instandhaltung", ["Instandhaltung obliegt: {maintenance_responsibility}. Untervermietung zulässig: {subletting_allowed}."]),
+    ],
+    "purchase": [
+        ("Kaufgegenstand", ["{seller_name} verkauft an {buyer_name}: {purchase_object}."]),
+        ("Kaufpreis", ["Der Kaufpreis beträgt {purchase_price_eur} EUR. Zahlungsbedingungen: {payment_terms}."]),
+        ("Lieferung", ["Liefertermin ist der {delivery_date}, Lieferung {delivery_terms}.",
+                       "Abnahme: {acceptance_procedure}."]),
+        ("Gewährleistung", ["Gewährleistung {warranty_months} Monate ({warranty_scope}).",
+                            "Mängel sind innerhalb von {defect_notification_days} Tagen anzuzeigen.",
+                            "Ausgeschlossen sind: {liability_exclusions}."]),
+        ("Eigentumsvorbehalt", ["Eigentumsvorbehalt bis zur vollständigen Zahlung: {retention_of_title}."]),
+        ("Schlussbestimmungen", ["Es gilt {governing_law}; Gerichtsstand {jurisdiction}. Schiedsklausel: {arbitration_clause}."]),
+    ],
+    "general": [
+        ("Vertragsgegenstand", ["{party_a_name} ({party_a_role}) und {party_b_name} ({party_b_role}) schließen eine {contract_subject}."]),
+        ("Vergütung", ["Der Vertragswert beträgt {contract_value_eur} EUR. Zahlung: {payment_terms}."]),
+        ("Laufzeit", ["Der Vertrag läuft vom {contract_start_date} bis {contract_end_date}.",
+                      "Kündigungsfrist: {termination_notice_days} Tage."]),
+        ("Haftung und Vertraulichkeit", ["Haftung: {liability_provisions}. Vertraulichkeitsklausel: {confidentiality_clause}."]),
+        ("Schlussbestimmungen", ["Es gilt {governing_law}; Gerichtsstand ist {jurisdiction}."]),
+    ],
+}
+
+
+def _fill(template: str, fields: Dict) -> Optional[str]:
+    values = {}
+    for key in [part.split("}")[0] for part in template.split("{")[1:]]:
+        if fields.get(key) is None:
+            return None
+        values[key] = _de(fields[key])
+    return template.format(**values)
+
+
+def build_text(contract_type: str, fields: Dict, rng: random.Random, length: int) -> List[Dict]:
+    """Abschnitte (§-Nummer, Überschrift, Absätze); length = Füllabsätze je Abschnitt."""
+    sections = []
+    for heading, templates in SECTIONS[contract_type]:
+        sentences = [s for s in (_fill(t, fields) for t in templates) if s]
+        paragraphs = [" ".join(sentences)] if sentences else []
+        for _ in range(rng.randint(max(0, length - 1), length + 1)):
+            paragraphs.append(" ".join(rng.sample(BOILERPLATE, rng.randint(2, 4))))
+        sections.append({"heading": heading, "paragraphs": paragraphs})
+    sections.append({"heading": "Schlussbestimmungen" if contract_type != "purchase" else "Sonstiges",
+                     "paragraphs": [" ".join(rng.sample(BOILERPLATE, 3))]})
+    for number, section in enumerate(sections, 1):
+        section["number"] = number
+    return sections
+
+
+def render_text(contract: Dict) -> str:
+    lines = [TITLES[contract["contract_type"]], ""]
+    for section in contract["sections"]:
+        lines += [f"§ {section['number']} {section['heading']}", ""]
+        for number, paragraph in enumerate(section["paragraphs"], 1):
+            lines += [f"({number}) {paragraph}", ""]
+    return "\n".join(lines)
+
+
+# ============================================================================
+# RISIKEN (aus den Feldern abgeleitet, Format wie LLM-Antwort)
+# ============================================================================
+
+SEVERITY_WEIGHTS = {"critical": 25, "high": 15, "medium": 8, "low": 2}
+
+RISK_CHECKS = [
+    (lambda f: f.get("auto_renew") and (f.get("renewal_notice_days") or 0) >= 90, "high",
+     "Automatische Verlängerung mit langer Kündigungsfrist", "Laufzeit und Kündigung", "§ 309 Nr. 9 BGB"),
+    (lambda f: "USA" in str(f.get("data_location") or ""), "high",
+     "Datenverarbeitung außerhalb der EU", "Datenschutz", "Art. 44 DSGVO"),
+    (lambda f: f.get("dp_addendum_included") is False, "critical",
+     "Kein Auftragsverarbeitungsvertrag", "Datenschutz", "Art. 28 DSGVO"),
+    (lambda f: (f.get("liability_cap_multiple_acv") or f.get("liability_cap_multiple") or 9) < 1, "medium",
+     "Haftungsbegrenzung unter Jahresvertragswert", "Haftung", "§ 307 BGB"),
+    (lambda f: f.get("post_contract_non_compete") and not f.get("non_compete_compensation"), "critical",
+     "Wettbewerbsverbot ohne Karenzentschädigung", "Wettbewerbsverbot", "§ 74 HGB"),
+    (lambda f: (f.get("probation_period_months") or 0) > 6, "high",
+     "Probezeit über 6 Monate", "Beginn des Arbeitsverhältnisses", "§ 622 Abs. 3 BGB"),
+    (lambda f: (f.get("warranty_months") or 99) < 12, "high",
+     "Verkürzte Gewährleistung", "Gewährleistung", "§ 438 BGB"),
+    (lambda f: (f.get("payment_terms_days") or 0) >= 60, "medium",
+     "Langes Zahlungsziel", "Zahlung", "§ 271a BGB"),
+    (lambda f: (f.get("penalty_amount_eur") or 0) > 100000, "high",
+     "Unverhältnismäßige Vertragsstrafe", "Vertragsstrafe", "§ 343 BGB"),
+    (lambda f: (f.get("escalation_percent_per_year") or 0) > 3, "medium",
+     "Hohe jährliche Mietsteigerung", "Miete und Nebenkosten", "§ 557 BGB"),
+    (lambda f: (f.get("termination_notice_days") or 0) >= 180, "medium",
+     "Lange Kündigungsfrist", "Laufzeit", "BGB"),
+    (lambda f: f.get("exclusivity"), "medium",
+     "Exklusivbindung an Lieferanten", "Laufzeit", "GWB"),
+    (lambda f: f.get("arbitration_clause"), "low",
+     "Schiedsklausel", "Schlussbestimmungen", "§ 1029 ZPO"),
+]
+
+
+def derive_risks(fields: Dict) -> List[Dict]:
+    flags = []
+    for check, severity, title, heading, reference in RISK_CHECKS:
+        if check(fields):
+            flags.append({
+                "severity": severity,
+                "title": title,
+                "description": f"{title} – bitte Abschnitt „{heading}“ prüfen.",
+                "clause_snippet": heading,
+                "policy_reference": reference,
+            })
+    return flags
+
+
+def score_risks(flags: List[Dict]) -> (int, str):
+    score = min(100, 20 + sum(SEVERITY_WEIGHTS[f["severity"]] for f in flags))
+    level = "critical" if score >= 70 else "high" if score >= 55 else "medium" if score >= 40 else "low"
+    return score, level
+
+
+# ============================================================================
+# KORPUS
+# ============================================================================
+
+def generate_contract(index: int, seed: int = 42, anchor: date = None, length: int = None,
+                      with_text: bool = True) -> Dict:
+    """Vertrag Nr. index; identische Argumente liefern identische Verträge (Text wird zuletzt gewürfelt)."""
+    rng = random.Random(f"{seed}:{index}")
+    anchor = anchor or date.today()
+    contract_type = rng.choices(CONTRACT_TYPES, TYPE_WEIGHTS)[0]
+    fields = FIELD_GENERATORS[contract_type](rng, anchor)
+    # Längenverteilung: meist kurz, einige sehr lange Verträge
+    length = length if length is not None else min(40, int(rng.paretovariate(1.6)) + 1)
+    flags = derive_risks(fields)
+    score, level = score_risks(flags)
+    created = datetime.combine(anchor, datetime.min.time()) - timedelta(minutes=rng.randint(0, 730 * 24 * 60))
+    party = (fields.get("vendor_name") or fields.get("disclosing_party") or "Vertrag").split(" ")[0]
+    contract_id = hashlib.sha256(f"corpus:{seed}:{index}".encode()).hexdigest()[:32]
+    return {
+        "contract_id": contract_id,
+        "contract_type": contract_type,
+        "filename": f"{TITLES[contract_type].replace(' ', '_')}_{party}_{index:07d}.pdf",
+        "created_at": created.isoformat(),
+        "fields": fields,
+        "risk_flags": flags,
+        "risk_score": score,
+        "risk_level": level,
+        "sections": build_text(contract_type, fields, rng, length) if with_text else None,
+    }
+
+
+def iter_contracts(count: int, seed: int = 42, anchor: date = None, start: int = 0,
+                   with_text: bool = True) -> Iterator[Dict]:
+    for index in range(start, start + count):
+        yield generate_contract(index, seed, anchor, with_text=with_text)
+
+
+def render_pdf(contract: Dict) -> bytes:
+    """A4-PDF mit Textlayer (PyMuPDF, Helvetica); Umbruch wie im Rest der App zeichenbasiert."""
+    import fitz
+
+    doc = fitz.open()
+    lines = []
+    for raw in render_text(contract).split("\n"):
+        lines.extend(textwrap.wrap(raw, 92) or [""])
+    per_page = 58
+    for offset in range(0, len(lines), per_page):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((56, 64), "\n".join(lines[offset:offset + per_page]), fontsize=9.5, fontname="helv")
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return data
+
+
+def analysis_json(contract: Dict) -> Dict:
+    """analysis_results.analysis_json im Format von api_analyze_contract."""
+    flags = contract["risk_flags"]
+    fields = contract["fields"]
+    risk = {
+        "overall_risk_level": contract["risk_level"],
+        "overall_risk_score": contract["risk_score"],
+        "executive_summary": f"{TITLES[contract['contract_type']]} mit {len(flags)} auffälligen Klauseln.",
+    }
+    for severity in ("critical", "high", "medium", "low"):
+        risk[f"{severity}_risks"] = [
+            {**f, "issü_title": f["title"], "issü_description": f["description"], "risk_level": severity,
+             "legal_basis": f["policy_reference"], "clause_text": f["clause_snippet"],
+             "recommendation": "Bitte prüfen Sie diese Klausel."}
+            for f in flags if f["severity"] == severity
+        ]
+    return {
+        "contract_id": contract["contract_id"],
+        "source_filename": contract["filename"],
+        "contract_type": contract["contract_type"],
+        "status": "analyzed",
+        "processing_time_seconds": 0.0,
+        "fields_extracted": len([v for v in fields.values() if v is not None]),
+        "fields_total": len(fields),
+        "extracted_data": fields,
+        "analysis_source": "corpus",
+        "prescreen_confidence": None,
+        "risk_assessment": risk,
+    }
+
+
+def write_pdfs(out_dir: str, count: int, seed: int = 42, anchor: date = None) -> List[Path]:
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for contract in iter_contracts(count, seed, anchor):
+        path = out / contract["filename"]
+        path.write_bytes(render_pdf(contract))
+        paths.append(path)
+    return paths
+
+
+def seed_database(db_path: str, count: int, seed: int = 42, anchor: date = None, files: int = 0,
+                  upload_dir: str = None, batch_size: int = 5000, analyzed_ratio: float = 0.9,
+                  log_db: str = None, start: int = 0) -> Dict:
+    """
+    Schreibt count Verträge in contracts/analysis_results/contract_fields.
+
+    Die ersten `files` Verträge bekommen ein echtes PDF im Upload-Verzeichnis
+    (Registry-Spalten gesetzt), der Rest nur DB-Zeilen. Mit log_db werden
+    zusätzlich analysis_log und risk_flag_facts für die Dashboards gefüllt.
+    """
+    os.environ["CONTRACTS_DB_PATH"] = db_path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from app.migrations import ensure_core_schema
+    from app.batch_scoring import init_field_tables, promote_fields, FIELD_COLUMNS
+    from app.file_registry import contract_upload_dir
+
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    ensure_core_schema(conn)
+    init_field_tables(conn)
+
+    log_conn = None
+    if log_db:
+        from app import logging_service
+        logging_service.LOG_DB = Path(log_db)
+        logging_service.setup_logging()
+        log_conn = sqlite3.connect(log_db)
+        log_conn.execute("PRAGMA synchronous=OFF")
+
+    rng = random.Random(seed)
+    field_sql = (f"INSERT OR REPLACE INTO contract_fields (contract_id, contract_type, {', '.join(FIELD_COLUMNS)}) "
+                 f"VALUES ({', '.join('?' for _ in range(len(FIELD_COLUMNS) + 2))})")
+    started = time.perf_counter()
+    written = 0
+    contracts, results, field_rows, log_rows, fact_rows = [], [], [], [], []
+
+    def flush():
+        conn.executemany(
+            "INSERT OR REPLACE INTO contracts (contract_id, filename, contract_type, created_at, status, risk_level, "
+            "risk_score, storage_path, file_sha256, file_size, mime_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            contracts)
+        conn.executemany("INSERT OR REPLACE INTO analysis_results (contract_id, analysis_json, created_at) VALUES (?, ?, ?)", results)
+        conn.executemany(field_sql, field_rows)
+        conn.commit()
+        if log_conn is not None:
+            log_conn.executemany(
+                "INSERT INTO analysis_log (created_at, contract_id, tenant_id, contract_type, status, duration_ms, "
+                "llm_model, num_risk_flags, risk_flags) VALUES (?, ?, ?, ?, 'success', ?, 'gpt-4o-mini', ?, ?)", log_rows)
+            log_conn.executemany(
+                "INSERT INTO risk_flag_facts (contract_id, tenant_id, severity, title_hash, title, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", fact_rows)
+            log_conn.commit()
+        for rows in (contracts, results, field_rows, log_rows, fact_rows):
+            rows.clear()
+
+    for i, contract in enumerate(iter_contracts(count, seed, anchor, start, with_text=False)):
+        cid = contract["contract_id"]
+        analyzed = rng.random() < analyzed_ratio
+        storage = sha = size = mime = None
+        if i < files and upload_dir:
+            data = render_pdf(generate_contract(start + i, seed, anchor))
+            directory = contract_upload_dir(upload_dir, cid)
+            os.makedirs(directory, exist_ok=True)
+            storage = os.path.join(directory, f"{cid}__{contract['filename']}")
+            with open(storage, "wb") as f:
+                f.write(data)
+            sha, size, mime = hashlib.sha256(data).hexdigest(), len(data), "application/pdf"
+
+        contracts.append((cid, contract["filename"], contract["contract_type"], contract["created_at"],
+                          "analyzed" if analyzed else "uploaded",
+                          contract["risk_level"] if analyzed else None,
+                          contract["risk_score"] if analyzed else None, storage, sha, size, mime))
+        if analyzed:
+            results.append((cid, json.dumps(analysis_json(contract), ensure_ascii=False), contract["created_at"]))
+            field_rows.append([cid, contract["contract_type"]] + promote_fields(contract["fields"]))
+            if log_conn is not None:
+                tenant = f"tenant-{rng.randint(1, 25):02d}"
+                created = contract["created_at"].replace("T", " ")[:19]
+                log_rows.append((created, cid, tenant, contract["contract_type"], rng.randint(4000, 45000),
+                                 len(contract["risk_flags"]), json.dumps(contract["risk_flags"], ensure_ascii=False)))
+                fact_rows.extend((cid, tenant, f["severity"], logging_service.risk_title_hash(f["title"]), f["title"], created)
+                                 for f in contract["risk_flags"])
+        written += 1
+        if len(contracts) >= batch_size:
+            flush()
+            print(f"  {written:>9,} Verträge ({written / (time.perf_counter() - started):,.0f}/s)", flush=True)
+    flush()
+    conn.close()
+    if log_conn is not None:
+        log_conn.close()
+
+    return {"contracts": written, "files": min(files, written) if upload_dir else 0,
+            "seconds": round(time.perf_counter() - started, 2), "db_path": db_path}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Synthetischer Vertragskorpus")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pdfs = sub.add_parser("pdfs", help="PDF-Dateien erzeugen")
+    pdfs.add_argument("--out", required=True)
+    pdfs.add_argument("--count", type=int, default=40)
+
+    seed_cmd = sub.add_parser("seed", help="Datenbank befüllen")
+    seed_cmd.add_argument("--db", required=True)
+    seed_cmd.add_argument("--count", type=int, default=10000)
+    seed_cmd.add_argument("--files", type=int, default=0, help="Anzahl Verträge mit echtem PDF")
+    seed_cmd.add_argument("--upload-dir", default=None)
+    seed_cmd.add_argument("--log-db", default=None, help="analysis.sqlite für analysis_log/risk_flag_facts")
+    seed_cmd.add_argument("--batch-size", type=int, default=5000)
+    seed_cmd.add_argument("--analyzed-ratio", type=float, default=0.9)
+    seed_cmd.add_argument("--start", type=int, default=0, help="Erster Index (zum Erweitern bestehender Korpora)")
+
+    for p in (pdfs, seed_cmd):
+        p.add_argument("--seed", type=int, default=42)
+        p.add_argument("--anchor", default=None, help="Stichtag YYYY-MM-DD (Default: heute)")
+
+    args = parser.parse_args()
+    anchor = date.fromisoformat(args.anchor) if args.anchor else None
+
+    if args.command == "pdfs":
+        paths = write_pdfs(args.out, args.count, args.seed, anchor)
+        print(f"{len(paths)} PDFs in {args.out}")
+    else:
+        if args.files and not args.upload_dir:
+            parser.error("--files benötigt --upload-dir")
+        print(json.dumps(seed_database(args.db, args.count, args.seed, anchor, args.files, args.upload_dir,
+                                       args.batch_size, args.analyzed_ratio, args.log_db, args.start), indent=2))
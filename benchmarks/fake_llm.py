@@ -0,0 +1,171 @@
+"""
+Deterministischer Fake-LLM-Server (OpenAI-kompatibel)
+- POST /v1/chat/completions mit konfigurierbarer Latenz und Jitter, optional
+  gestreamt (stream=True) und mit einem Anteil abgebrochener Antworten
+- Antworten im Format von _get_dummy_response, Risiken abhängig vom Prompt-Hash
+- Läuft als Thread im Benchmark-Prozess; App nutzt ihn über OPENAI_BASE_URL
+"""
+
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+RISK_TEMPLATES = [
+    ("critical", "Unbegrenzte Haftung", "Die Haftung ist nicht begrenzt."),
+    ("high", "Automatische Verlängerung", "Vertrag verlängert sich ohne Kündigung um 12 Monate."),
+    ("high", "Datenlokation außerhalb EU", "Daten werden in den USA verarbeitet."),
+    ("medium", "Lange Kündigungsfrist", "Kündigungsfrist von 6 Monaten zum Jahresende."),
+    ("medium", "Preisanpassung ohne Cap", "Preise können jährlich angepasst werden."),
+    ("low", "Gerichtsstand", "Gerichtsstand ist der Sitz des Anbieters."),
+]
+
+
+def build_analysis(seed: int) -> Dict:
+    """Analyse-Payload wie _get_dummy_response, aber mit reproduzierbaren Risiken."""
+    rng = random.Random(seed)
+    flags = [
+        {"severity": sev, "title": title, "description": desc, "clause_snippet": desc, "policy_reference": "BGB"}
+        for sev, title, desc in rng.sample(RISK_TEMPLATES, rng.randint(0, 4))
+    ]
+    weights = {"critical": 25, "high": 15, "medium": 8, "low": 0}
+    score = min(100, sum(weights[f["severity"]] for f in flags))
+    level = "critical" if score >= 70 else "high" if score >= 55 else "medium" if score >= 40 else "low"
+    return {
+        "summary": "Benchmark-Analyse: deterministische Antwort des Fake-LLM.",
+        "extracted_fields": {
+            "auto_renew": rng.random() < 0.5,
+            "renewal_notice_days": rng.choice([30, 60, 90, None]),
+            "termination_notice_days": rng.choice([30, 90, 180]),
+            "annual_contract_value_eur": rng.choice([8000, 45000, 120000]),
+        },
+        "risk_flags": flags,
+        "overall_risk_level": level,
+        "overall_risk_score": score,
+    }
+
+
+def build_explanations(count: int) -> List[Dict]:
+    """Antwort auf einen Batch-Prompt der Klausel-Erklärung (ein Eintrag je Klausel)."""
+    return [
+        {"index": i, "risk_level": "low", "explanation": f"Benchmark-Erklärung zu Klausel {i}.",
+         "legal_assessment": "Die Klausel ist wirksam.", "related_laws": ["BGB 307"], "recommendations": ["Keine"]}
+        for i in range(count)
+    ]
+
+
+class FakeLLMServer:
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 200.0, seed: int = 42,
+                 host: str = "127.0.0.1", port: int = 0, truncate_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.truncate_rate = truncate_rate
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+        self.requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _delay(self, digest: bytes) -> float:
+        # Jitter aus dem Prompt-Hash -> gleiche Anfrage, gleiche Latenz
+        rng = random.Random(self.seed ^ int.from_bytes(digest[:8], "big"))
+        return max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("content-length") or 0))
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                server.requests += 1
+                request = json.loads(body or b"{}")
+                messages = request.get("messages", [])
+                digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).digest()
+                delay = server._delay(digest)
+                streaming = bool(request.get("stream"))
+                # Beim Streaming kommt das erste Token nach ~30 % der Latenz, der Rest verteilt
+                time.sleep(delay * 0.3 if streaming else delay)
+
+                system = messages[0]["content"] if messages else ""
+                prompt = messages[-1]["content"] if messages else ""
+                if "Copilot" in system:
+                    content = "Benchmark-Antwort des Copilot: Die Kündigungsfrist beträgt 3 Monate."
+                elif "KLAUSEL 0:" in prompt:
+                    content = json.dumps({"explanations": build_explanations(prompt.count("\nKLAUSEL "))}, ensure_ascii=False)
+                else:
+                    content = json.dumps(build_analysis(int.from_bytes(digest[:4], "big")), ensure_ascii=False)
+                    if not request.get("response_format"):
+                        content = "```json\n" + content + "\n```"
+                    if digest[4] < server.truncate_rate * 256:
+                        # Abgebrochene Ausgabe (wie bei max_tokens) für den Reparaturpfad
+                        content = content[:int(len(content) * 0.8)]
+
+                prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+                if streaming:
+                    self._stream(request, content, prompt_tokens, delay * 0.7)
+                    return
+                payload = json.dumps({
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "gpt-4o-mini"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                              "total_tokens": prompt_tokens + len(content) // 4},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, request, content, prompt_tokens, remaining_delay):
+                """Antwort als SSE-Chunks im Format von chat.completion.chunk."""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                pieces = [content[i:i + 24] for i in range(0, len(content), 24)] or [""]
+
+                def send(choices, usage=None):
+                    chunk = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": request.get("model", "gpt-4o-mini"), "choices": choices}
+                    if usage:
+                        chunk["usage"] = usage
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+
+                for piece in pieces:
+                    send([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+                    time.sleep(remaining_delay / len(pieces))
+                send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    send([], {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                              "total_tokens": prompt_tokens + len(content) // 4})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,270 @@
+"""
+Benchmark für den Analyse-Hot-Path
+- App läuft in-process (httpx ASGITransport), LLM über den deterministischen Fake-Server
+- Szenarien: upload, analyze, history, analytics, export, copilot, explain
+- Optional synthetischer Korpus (benchmarks/corpus.py) als Upload-Dateien und DB-Bestand
+- Ergebnis: p50/p95/p99, Durchsatz, Fehler und Peak-RSS je Szenario als JSON
+
+    python -m benchmarks.run --requests 50 --concurrency 8 --llm-latency-ms 800
+    python -m benchmarks.run --corpus 40 --seed-contracts 100000
+    python -m benchmarks.compare benchmarks/results/<alt>.json benchmarks/results/<neu>.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+SCENARIOS = ["upload", "analyze", "history", "analytics", "export", "copilot", "explain"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss: Linux in KB, macOS in Bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_revision() -> Dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "HEAD"), "subject": git("log", "-1", "--format=%s"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def prepare_environment(workdir: Path, llm_base_url: str):
+    """Isolierte Daten-Verzeichnisse; muss vor dem Import von app.main laufen."""
+    os.environ.update({
+        "CONTRACTS_DB_PATH": str(workdir / "contracts.db"),
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        "EXPORT_DIR": str(workdir / "exports"),
+        "REPORT_CACHE_DIR": str(workdir / "report_cache"),
+        "OCR_CACHE_DIR": str(workdir / "ocr_cache"),
+        "METRICS_DIR": str(workdir / "metrics"),
+        "CONTRACT_ANALYZER_DUMMY": "false",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": llm_base_url,
+        "API_RATE_LIMIT_PER_MINUTE": "0",
+        "UPLOAD_RATE_LIMIT_PER_MINUTE": "0",
+        "ANALYZE_RATE_LIMIT_PER_MINUTE": "0",
+        "DEPLOYMENT_MODE": "single",
+    })
+    # logging_service schreibt analysis.sqlite und logs/ relativ zum Arbeitsverzeichnis
+    (workdir / "static").symlink_to(ROOT / "static")
+    os.chdir(workdir)
+
+
+class Scenario:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.wall_s = 0.0
+
+    def record(self, status: int, seconds: float):
+        self.latencies.append(seconds * 1000)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def to_dict(self) -> Dict:
+        n = len(self.latencies)
+        return {
+            "requests": n,
+            "errors": self.errors,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "wall_s": round(self.wall_s, 3),
+            "throughput_rps": round(n / self.wall_s, 2) if self.wall_s else 0.0,
+            "mean_ms": round(sum(self.latencies) / n, 2) if n else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50), 2),
+            "p95_ms": round(percentile(self.latencies, 95), 2),
+            "p99_ms": round(percentile(self.latencies, 99), 2),
+            "max_ms": round(max(self.latencies), 2) if n else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+async def drive(name: str, requests: int, concurrency: int, make_request) -> Scenario:
+    """make_request(i) -> awaitable httpx.Response; läuft mit begrenzter Parallelität."""
+    scenario = Scenario(name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await make_request(i)
+                status = response.status_code
+            except Exception:
+                status = 599
+            scenario.record(status, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    scenario.wall_s = time.perf_counter() - started
+    return scenario
+
+
+async def run_scenarios(args, pdf_files: List[Path]) -> Dict:
+    import httpx
+    import logging
+    import app.main as main
+    from benchmarks.corpus import CONTRACT_TYPES
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    for handler in main.app.router.on_startup:
+        result = handler()
+        if asyncio.iscoroutine(result):
+            await result
+
+    rng = random.Random(args.seed)
+    contract_ids: List[str] = []
+    results: Dict[str, Dict] = {}
+    transport = httpx.ASGITransport(app=main.app, client=("127.0.0.1", 50000))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        async def upload(i):
+            pdf = pdf_files[i % len(pdf_files)]
+            response = await client.post(
+                "/api/v3/contracts/upload",
+                files={"file": (pdf.name, pdf.read_bytes(), "application/pdf")},
+                data={"contract_type": CONTRACT_TYPES[rng.randrange(len(CONTRACT_TYPES))]},
+            )
+            if response.status_code == 200:
+                contract_ids.append(response.json()["contract_id"])
+            return response
+
+        def pick(i):
+            return contract_ids[i % len(contract_ids)]
+
+        requests = {
+            "upload": upload,
+            "analyze": lambda i: client.post(f"/api/v3/contracts/{pick(i)}/analyze", json={"mode": "premium", "reuse": False}),
+            "history": lambda i: client.get("/history"),
+            "analytics": lambda i: client.get("/analytics"),
+            "export": lambda i: client.get(f"/api/v3/contracts/{pick(i)}/export/pdf"),
+            "copilot": lambda i: client.post("/api/copilot/chat", json={
+                "message": "Wie lang ist die Kündigungsfrist?", "contract_id": pick(i)}),
+            "explain": lambda i: client.post("/api/v3/clause/explain/batch", json={"contract_id": pick(i)}),
+        }
+
+        for name in args.scenarios:
+            if name != "upload" and not contract_ids:
+                await drive("upload", args.concurrency, args.concurrency, upload)
+            scenario = await drive(name, args.requests, args.concurrency, requests[name])
+            results[name] = scenario.to_dict()
+            print(f"  {name:<10} p50 {results[name]['p50_ms']:>9.1f}ms  p95 {results[name]['p95_ms']:>9.1f}ms  "
+                  f"p99 {results[name]['p99_ms']:>9.1f}ms  {results[name]['throughput_rps']:>7.1f} req/s  "
+                  f"err {results[name]['errors']}", flush=True)
+    return results
+
+
+def main(argv=None) -> Dict:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark Analyse-Hot-Path")
+    parser.add_argument("--requests", type=int, default=50, help="Anfragen je Szenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--llm-truncate-rate", type=float, default=0.0, help="Anteil abgebrochener LLM-Antworten (Reparaturpfad)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pdf", action="append", default=[], help="PDF oder Verzeichnis mit PDFs (mehrfach)")
+    parser.add_argument("--corpus", type=int, default=0, help="Anzahl synthetischer PDFs als Upload-Dateien")
+    parser.add_argument("--seed-contracts", type=int, default=0, help="Verträge, die vorab in die DB geschrieben werden")
+    parser.add_argument("--label", default="", help="Freitext im Ergebnis, z.B. Branch-Name")
+    parser.add_argument("--output", default="", help="Ergebnisdatei (Default: benchmarks/results/<ts>_<sha>.json)")
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unbekannte Szenarien: {', '.join(sorted(unknown))}")
+
+    pdf_files: List[Path] = []
+    for entry in args.pdf or ([] if args.corpus else [str(ROOT / "testvertrag.pdf")]):
+        path = Path(entry).resolve()
+        pdf_files.extend(sorted(path.glob("*.pdf")) if path.is_dir() else [path])
+    output = Path(args.output).resolve() if args.output else None
+
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.fake_llm import FakeLLMServer
+    from benchmarks import corpus
+
+    workdir = Path(tempfile.mkdtemp(prefix="contract-bench-"))
+    if args.corpus:
+        pdf_files.extend(corpus.write_pdfs(str(workdir / "corpus"), args.corpus, args.seed))
+    if not pdf_files:
+        parser.error("Keine PDF-Dateien gefunden")
+
+    llm = FakeLLMServer(args.llm_latency_ms, args.llm_jitter_ms, args.seed, truncate_rate=args.llm_truncate_rate).start()
+    prepare_environment(workdir, llm.base_url)
+    if args.seed_contracts:
+        seeded = corpus.seed_database(os.environ["CONTRACTS_DB_PATH"], args.seed_contracts, args.seed,
+                                      start=args.corpus)
+        print(f"{seeded['contracts']:,} Verträge vorab in der DB ({seeded['seconds']}s)", flush=True)
+    print(f"Benchmark: {args.requests} Anfragen x {args.concurrency} parallel, LLM {args.llm_latency_ms:g}ms "
+          f"(±{args.llm_jitter_ms:g}), Daten in {workdir}", flush=True)
+
+    started = time.time()
+    try:
+        scenarios = asyncio.run(run_scenarios(args, pdf_files))
+    finally:
+        llm.stop()
+
+    report = {
+        "schema": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+        "label": args.label,
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "seed": args.seed,
+            "pdf_files": len(pdf_files),
+            "corpus": args.corpus,
+            "seed_contracts": args.seed_contracts,
+        },
+        "llm_requests": llm.requests,
+        "peak_rss_mb": peak_rss_mb(),
+        "scenarios": scenarios,
+    }
+
+    output = output or (
+        RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(started))}_{report['git']['commit'][:8] or 'nogit'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Peak RSS {report['peak_rss_mb']} MB, Ergebnis: {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -84,45 +84,15 @@ class DashboardService:
             WHERE status='success' AND datetime(created_at) > datetime('now', '-{days} days')
             """).fetchone()
             
-            # Verteilung nach Schweregrad (safe fallback)
-            try:
-                severity_rows = conn.execute(f"""
-                SELECT severity, COUNT(*) as count
-                FROM analysis_log, json_each(risk_flags)
-                WHERE datetime(created_at) > datetime('now', '-{days} days')
-                  AND risk_flags IS NOT NULL AND risk_flags != ''
-                GROUP BY severity
-                """).fetchall()
-            except Exception:
-                severity_rows = []
-            
-            severity_dist = {row[0]: row[1] for row in severity_rows}
-            
-            # Top-Risiken (häufigste Titel) - safe fallback
-            try:
-                top_risks = conn.execute(f"""
-                SELECT json_extract(value, '$.title') as title, 
-                       json_extract(value, '$.severity') as severity, 
-                       COUNT(*) as count
-                FROM analysis_log, json_each(risk_flags)
-                WHERE datetime(created_at) > datetime('now', '-{days} days')
-                  AND risk_flags IS NOT NULL AND risk_flags != ''
-                GROUP BY title, severity
-                ORDER BY count DESC
-                LIMIT 10
-                """).fetchall()
-            except Exception:
-                top_risks = []
-            
-            return {
-                "avg_risk_flags_per_contract": round(avg_row[0] or 0, 2),
-                "max_risk_flags": avg_row[1] or 0,
-                "severity_distribution": severity_dist,
-                "top_risks": [
-                    {"title": row[0], "severity": row[1], "count": row[2]}
-                    for row in top_risks
-                ]
-            }
+        # Schweregrad-Verteilung und Top-Risiken aus der Fakten-Tabelle (analysis.sqlite)
+        from app.logging_service import get_severity_histogram, get_top_risks
+
+        return {
+            "avg_risk_flags_per_contract": round(avg_row[0] or 0, 2),
+            "max_risk_flags": avg_row[1] or 0,
+            "severity_distribution": get_severity_histogram(days),
+            "top_risks": get_top_risks(days, limit=10),
+        }
     
     def get_tenant_metrics(self) -> List[Dict[str, Any]]:
         """Gibt Metriken pro Tenant zurück."""
@@ -349,10 +349,6 @@ def reset_monthly_usage():
     return affected
 
 
-# Initialisiere beim Import
-init_product_subscriptions_table()
-
-
 if __name__ == "__main__":
     # Test
     print("Testing Multi-Product Subscriptions...")
@@ -0,0 +1,121 @@
+"""
+Tests für app/json_stream.py (inkrementeller Parser, Reparatur, parse_json_response)
+
+    python -m pytest -q test_json_stream.py
+"""
+
+import json
+
+import pytest
+
+from app.json_stream import IncrementalJSONParser, parse_json_response
+
+RESPONSE = json.dumps({
+    "summary": "Arbeitsvertrag mit Probezeit",
+    "risk_flags": [
+        {"severity": "high", "title": "Haftung unbegrenzt"},
+        {"severity": "low", "title": "Kurze Kündigungsfrist"},
+    ],
+    "risk_score": 42,
+    "is_valid": True,
+    "notes": None,
+}, ensure_ascii=False)
+
+
+def _feed_in_chunks(text: str, size: int) -> list:
+    parser = IncrementalJSONParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, len(RESPONSE)])
+def test_events_independent_of_chunking(size):
+    events = _feed_in_chunks(RESPONSE, size)
+    assert events == [
+        ("field", "summary", "Arbeitsvertrag mit Probezeit"),
+        ("item", "risk_flags", {"severity": "high", "title": "Haftung unbegrenzt"}),
+        ("item", "risk_flags", {"severity": "low", "title": "Kurze Kündigungsfrist"}),
+        ("field", "risk_flags", [
+            {"severity": "high", "title": "Haftung unbegrenzt"},
+            {"severity": "low", "title": "Kurze Kündigungsfrist"},
+        ]),
+        ("field", "risk_score", 42),
+        ("field", "is_valid", True),
+        ("field", "notes", None),
+    ]
+
+
+def test_item_emitted_before_array_closes():
+    parser = IncrementalJSONParser()
+    cut = RESPONSE.index('{"severity": "low"')
+    events = parser.feed(RESPONSE[:cut])
+    assert ("item", "risk_flags", {"severity": "high", "title": "Haftung unbegrenzt"}) in events
+    assert not any(kind == "field" and key == "risk_flags" for kind, key, _ in events)
+
+
+def test_escaped_quotes_and_braces_in_strings():
+    text = json.dumps({"summary": 'Klausel "§ 5 {Haftung}" [neu]', "risk_score": 1})
+    assert _feed_in_chunks(text, 2) == [
+        ("field", "summary", 'Klausel "§ 5 {Haftung}" [neu]'),
+        ("field", "risk_score", 1),
+    ]
+
+
+def test_preamble_and_fences_skipped():
+    events = _feed_in_chunks('Hier das Ergebnis:\n```json\n{"summary": "ok"}\n```', 4)
+    assert events == [("field", "summary", "ok")]
+
+
+def test_repair_cuts_at_last_complete_value():
+    parser = IncrementalJSONParser()
+    cut = RESPONSE.index('"title": "Kurze')
+    parser.feed(RESPONSE[:cut])
+    repaired = json.loads(parser.repair())
+    assert repaired == {
+        "summary": "Arbeitsvertrag mit Probezeit",
+        "risk_flags": [{"severity": "high", "title": "Haftung unbegrenzt"}, {"severity": "low"}],
+    }
+
+
+def test_repair_drops_unfinished_primitive():
+    parser = IncrementalJSONParser()
+    parser.feed('{"summary": "ok", "risk_score": 4')
+    # Zahl ohne abschließendes Zeichen kann noch weitergehen
+    assert json.loads(parser.repair()) == {"summary": "ok"}
+
+
+def test_repair_without_object():
+    parser = IncrementalJSONParser()
+    parser.feed("Keine Antwort")
+    assert parser.repair() is None
+
+
+def test_parse_valid_json_not_marked_repaired():
+    assert parse_json_response(RESPONSE) == (json.loads(RESPONSE), False)
+
+
+def test_parse_fenced_json_not_marked_repaired():
+    data, repaired = parse_json_response(f"```json\n{RESPONSE}\n```")
+    assert data == json.loads(RESPONSE)
+    assert repaired is False
+
+
+def test_parse_trailing_commas():
+    data, repaired = parse_json_response('{"risk_flags": [{"title": "A"},], "risk_score": 3,}')
+    assert data == {"risk_flags": [{"title": "A"}], "risk_score": 3}
+    assert repaired is True
+
+
+def test_parse_truncated_response():
+    data, repaired = parse_json_response(RESPONSE[:RESPONSE.index('"risk_score"') + 5])
+    assert repaired is True
+    assert data["summary"] == "Arbeitsvertrag mit Probezeit"
+    assert len(data["risk_flags"]) == 2
+    assert "risk_score" not in data
+
+
+def test_parse_garbage_raises():
+    with pytest.raises(json.JSONDecodeError):
+        parse_json_response("Das Modell hat keine JSON-Antwort geliefert.")
@@ -0,0 +1,99 @@
+"""
+Tests für app/minhash.py und den LSH-Index in app/near_duplicates.py
+
+    python -m pytest -q test_minhash.py
+"""
+
+import numpy as np
+import pytest
+
+from app.minhash import EMPTY_SIGNATURE, NUM_PERM, shingles, signature, similarity_matrix
+from app.near_duplicates import LSH_BANDS, LSH_ROWS, LSHIndex, document_signature
+
+TEXT = " ".join(
+    f"§ {n} Der Arbeitnehmer verpflichtet sich zur Verschwiegenheit über alle Geschäftsgeheimnisse "
+    f"des Arbeitgebers, auch nach Beendigung des Arbeitsverhältnisses Absatz {n}."
+    for n in range(1, 30)
+)
+
+
+def _with_differences(base: np.ndarray, count: int) -> np.ndarray:
+    """Kopie, in der die ersten count Positionen abweichen (Rest bleibt gleich)."""
+    sig = base.copy()
+    sig[:count] += np.uint64(1)
+    return sig
+
+
+def test_shingles_short_text_single_gram():
+    assert len(shingles(["nur", "zwei"], k=3)) == 1
+    assert len(shingles([], k=3)) == 0
+
+
+def test_signature_deterministic_and_empty():
+    hashes = shingles(TEXT.split())
+    assert np.array_equal(signature(hashes), signature(hashes.copy()))
+    assert signature(hashes).shape == (NUM_PERM,)
+    assert np.array_equal(signature(np.empty(0, dtype=np.uint64)), EMPTY_SIGNATURE)
+
+
+def test_similarity_estimates_jaccard():
+    words = TEXT.split()
+    a = shingles(words)
+    b = shingles(words[: len(words) // 2])
+    jaccard = len(np.intersect1d(a, b)) / len(np.union1d(a, b))
+    estimate = similarity_matrix(signature(a)[None, :], signature(b)[None, :])[0, 0]
+    assert estimate == pytest.approx(jaccard, abs=0.2)
+    assert similarity_matrix(signature(a)[None, :], signature(a)[None, :])[0, 0] == 1.0
+
+
+def test_lsh_layout_covers_signature():
+    assert LSH_BANDS * LSH_ROWS == NUM_PERM
+
+
+def test_query_applies_threshold():
+    base = np.arange(NUM_PERM, dtype=np.uint64) * np.uint64(7919)
+    index = LSHIndex()
+    # Abweichungen nur in den vorderen Bändern: alle drei bleiben LSH-Kandidaten
+    index.add("same", base.copy())
+    index.add("close", _with_differences(base, 16))   # 0.75
+    index.add("far", _with_differences(base, 48))     # 0.25
+
+    assert index.query(base, threshold=0.5) == [("same", 1.0), ("close", 0.75)]
+    assert index.query(base, threshold=0.75) == [("same", 1.0), ("close", 0.75)]
+    assert index.query(base, threshold=0.8) == [("same", 1.0)]
+    assert index.query(base, threshold=0.2) == [("same", 1.0), ("close", 0.75), ("far", 0.25)]
+
+
+def test_query_exclude_and_remove():
+    base = np.arange(NUM_PERM, dtype=np.uint64)
+    index = LSHIndex()
+    index.add("a", base.copy())
+    index.add("b", base.copy())
+    assert index.query(base, threshold=0.5, exclude="a") == [("b", 1.0)]
+    index.remove("b")
+    assert index.query(base, threshold=0.5, exclude="a") == []
+    assert len(index) == 1
+
+
+def test_query_without_shared_band_finds_nothing():
+    base = np.arange(NUM_PERM, dtype=np.uint64)
+    index = LSHIndex()
+    # In jedem Band eine Abweichung: 0.75 ähnlich, aber kein gemeinsamer Bucket
+    other = base.copy()
+    other[::LSH_ROWS] += np.uint64(1)
+    index.add("other", other)
+    assert index.query(base, threshold=0.5) == []
+
+
+def test_document_signature_near_duplicate():
+    sig, count = document_signature(TEXT)
+    edited, _ = document_signature(TEXT.replace("Absatz 7.", "Absatz 7 neu gefasst."))
+    unrelated, _ = document_signature("Mietvertrag über Gewerberäume in der Innenstadt. " * 20)
+    assert count > 0
+
+    index = LSHIndex()
+    index.add("edited", edited)
+    index.add("unrelated", unrelated)
+    hits = index.query(sig, threshold=0.8)
+    assert [sha for sha, _ in hits] == ["edited"]
+    assert hits[0][1] >= 0.8